@@ -50,6 +50,14 @@ def create_app():
     app.register_blueprint(model_validation_bp)
     app.register_blueprint(typical_scenario_bp)
     
+    # 第一个请求到来时恢复服务重启前登记的任务
+    # （flask db等命令行进程和调试模式下负责重载的监控进程不处理请求，不会接管任务）
+    from app.utils.process_manager import ProcessManager
+
+    @app.before_request
+    def recover_registered_tasks():
+        ProcessManager().recover()
+    
     # 创建数据库表
     # with app.app_context():
     #     db.create_all()
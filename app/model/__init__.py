@@ -22,6 +22,7 @@ from .online_prediction_tasks import (
     SituationPredictionTask, 
     SmallScalePredictionTask
 )
+from .execution_job import ExecutionJob
 
 # 您可以定义一个基础模型，包含通用字段，例如 id, created_at, updated_at
 # class BaseModel(db.Model):
@@ -30,4 +31,4 @@ from .online_prediction_tasks import (
 #     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 #     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-__all__ = ['Model', 'ModelInfo', 'ModelDetail', 'ModelTypeOption','DatasetDetail','DatasetInfo', 'FrequencyBandOption', 'ApplicationScenarioOption', 'ChannelDataset', 'ValidationTaskTypeOption', 'ModelValidationTask', 'ModelValidationTaskModelAssociation', 'SinglePointPredictionTask', 'SinglePointPredictionResult', 'SituationPredictionTask', 'SmallScalePredictionTask', 'BestPracticeCase']
\ No newline at end of file
+__all__ = ['Model', 'ModelInfo', 'ModelDetail', 'ModelTypeOption','DatasetDetail','DatasetInfo', 'FrequencyBandOption', 'ApplicationScenarioOption', 'ChannelDataset', 'ValidationTaskTypeOption', 'ModelValidationTask', 'ModelValidationTaskModelAssociation', 'SinglePointPredictionTask', 'SinglePointPredictionResult', 'SituationPredictionTask', 'SmallScalePredictionTask', 'BestPracticeCase', 'ExecutionJob']
\ No newline at end of file
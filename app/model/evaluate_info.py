@@ -77,6 +77,7 @@ class EvaluateInfo(db.Model):
     
     # 其他信息
     extra_parameter = db.Column(db.Text, nullable=True, comment='额外参数')
+    resource_usage = db.Column(db.JSON, nullable=True, comment='资源占用汇总(峰值内存、CPU秒数、墙钟时间等)')
     
     def __repr__(self):
         return f'<EvaluateInfo {self.uuid}>'
@@ -94,7 +95,8 @@ class EvaluateInfo(db.Model):
             'evaluate_status': self.evaluate_status,
             'start_time': self.start_time.isoformat() if self.start_time else None,
             'end_time': self.end_time.isoformat() if self.end_time else None,
-            'extra_parameter': self.extra_parameter
+            'extra_parameter': self.extra_parameter,
+            'resource_usage': self.resource_usage
         }
     
     def ensure_folders(self):
@@ -0,0 +1,78 @@
+"""
+分布式执行任务表
+EXECUTION_MODE为distributed时，模型运行任务写入该表，由各执行节点上的worker_agent.py领取执行
+"""
+from datetime import datetime
+from app import db
+
+
+class ExecutionJobStatus:
+    """执行任务状态（与进程管理器中的进程状态一致）"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    STOPPED = 'stopped'
+    TIMEOUT = 'timeout'
+    FAILED = 'failed'
+
+    FINISHED = (COMPLETED, STOPPED, TIMEOUT, FAILED)
+
+
+class ExecutionJob(db.Model):
+    """分布式执行任务表"""
+    __tablename__ = 'execution_jobs'
+
+    job_id = db.Column(db.String(64), primary_key=True, comment='任务ID（验证任务UUID或在线推演任务UUID）')
+    status = db.Column(db.String(20), nullable=False, default=ExecutionJobStatus.QUEUED, index=True, comment='任务状态')
+    priority = db.Column(db.Integer, nullable=False, default=10, comment='调度优先级，数值越小越先调度')
+
+    # 运行参数，共享存储目录下的路径以{STORAGE}占位，由执行节点替换为本机挂载路径
+    cmd = db.Column(db.JSON, nullable=False, comment='命令')
+    cwd = db.Column(db.Text, nullable=True, comment='工作目录')
+    env_delta = db.Column(db.JSON, nullable=True, comment='与服务进程环境变量不同的部分')
+    log_dir = db.Column(db.Text, nullable=True, comment='任务目录，执行节点将输出写入其中的日志文件')
+    result_path = db.Column(db.Text, nullable=True, comment='任务输出文件或目录')
+    resource_limits = db.Column(db.JSON, nullable=True, comment='资源配置')
+    on_complete = db.Column(db.String(255), nullable=True, comment='完成回调引用（模块:限定名）')
+    on_recover = db.Column(db.String(255), nullable=True, comment='服务重启后重建调用方状态的函数引用')
+
+    # 租约
+    agent_id = db.Column(db.String(128), nullable=True, comment='领取任务的执行节点')
+    attempts = db.Column(db.Integer, nullable=False, default=0, comment='已领取次数，同时作为租约版本号')
+    lease_expires_at = db.Column(db.DateTime, nullable=True, comment='租约到期时间，到期未续约的任务可被其他节点重新领取')
+    heartbeat_at = db.Column(db.DateTime, nullable=True, comment='最近一次心跳时间')
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False, comment='是否已请求停止')
+
+    # 结果
+    submit_time = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, comment='提交时间')
+    start_time = db.Column(db.DateTime, nullable=True, comment='开始时间')
+    end_time = db.Column(db.DateTime, nullable=True, comment='结束时间')
+    return_code = db.Column(db.Integer, nullable=True, comment='返回码')
+    resource_usage = db.Column(db.JSON, nullable=True, comment='资源占用汇总')
+    error_message = db.Column(db.Text, nullable=True, comment='错误信息')
+    callback_done = db.Column(db.Boolean, nullable=False, default=False, comment='提交方是否已执行完成回调')
+
+    def __repr__(self):
+        return f'<ExecutionJob {self.job_id}>'
+
+    def to_dict(self):
+        """
+        将执行任务转换为字典
+        :return: 执行任务信息字典
+        """
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'priority': self.priority,
+            'agent_id': self.agent_id,
+            'attempts': self.attempts,
+            'cancel_requested': self.cancel_requested,
+            'submit_time': self.submit_time.isoformat() if self.submit_time else None,
+            'start_time': self.start_time.isoformat() if self.start_time else None,
+            'end_time': self.end_time.isoformat() if self.end_time else None,
+            'heartbeat_at': self.heartbeat_at.isoformat() if self.heartbeat_at else None,
+            'lease_expires_at': self.lease_expires_at.isoformat() if self.lease_expires_at else None,
+            'return_code': self.return_code,
+            'resource_usage': self.resource_usage,
+            'error_message': self.error_message
+        }
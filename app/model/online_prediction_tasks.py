@@ -21,6 +21,9 @@ class SinglePointPredictionTask(db.Model):
     completed_samples = Column(Integer, nullable=True)
     overall_rmse_db = Column(Float, nullable=True)
 
+    task_state = Column(JSON, nullable=True) # 在线推演服务中的完整任务状态（TaskStateStore）
+    stop_requested_at = Column(DateTime, nullable=True) # 其他服务进程转发的停止请求，由任务所在的服务进程领取
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
@@ -62,6 +65,9 @@ class SituationPredictionTask(db.Model):
     result_value_unit = Column(String(20), nullable=True)
     result_url = Column(String(512), nullable=True)
 
+    task_state = Column(JSON, nullable=True) # 在线推演服务中的完整任务状态（TaskStateStore）
+    stop_requested_at = Column(DateTime, nullable=True) # 其他服务进程转发的停止请求，由任务所在的服务进程领取
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     model = relationship("Model")
@@ -79,6 +85,9 @@ class SmallScalePredictionTask(db.Model):
     result_pdp_data_storage_path = Column(String(512), nullable=True)
     result_ber_snr_data_storage_path = Column(String(512), nullable=True)
     
+    task_state = Column(JSON, nullable=True) # 在线推演服务中的完整任务状态（TaskStateStore）
+    stop_requested_at = Column(DateTime, nullable=True) # 其他服务进程转发的停止请求，由任务所在的服务进程领取
+
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     model = relationship("Model") 
\ No newline at end of file
@@ -7,6 +7,12 @@ from http import HTTPStatus
 from flask import Blueprint, request, jsonify
 from app.utils.response import ServerResponse
 from app.utils.process_manager import ProcessManager
+from app.utils.worker_pool import WarmWorkerPool
+from app.utils.job_queue import JobQueue
+from app.utils.result_cache import ResultCache
+from app.utils.task_store import TaskStateStore
+from app.utils.scenario_catalog import ScenarioCatalog
+from app.utils.matrix_transport import MatrixCache
 
 # 创建蓝图
 bp = Blueprint('dev', __name__)
@@ -39,15 +45,6 @@ def run_model():
     通过subprocess执行命令行指令
     """
     try:
-        # 检查是否达到最大进程数
-        if process_manager.get_running_process_count() >= process_manager.get_max_processes():
-            return jsonify(
-                ServerResponse.error(
-                    f"已达到最大进程数限制 ({process_manager.get_max_processes()})",
-                    HTTPStatus.TOO_MANY_REQUESTS.value
-                ).model_dump()
-            ), HTTPStatus.TOO_MANY_REQUESTS.value
-        
         # 生成唯一的进程ID
         process_id = str(uuid.uuid4())
         
@@ -67,12 +64,18 @@ def run_model():
         cmd = [python_exe, script_path, input_dir, output_dir]
         
         # 启动进程
+        # 达到最大进程数时任务进入等待队列，有空闲槽位后自动启动
         if process_manager.start_process(process_id, cmd, work_dir, env):
+            process_status = process_manager.get_process_status(process_id)
+            queued = process_status['status'] == 'queued'
             return jsonify(
                 ServerResponse.success(
                     data={
                         'process_id': process_id,
-                        'message': '模型任务已启动',
+                        'message': '模型任务已进入等待队列' if queued else '模型任务已启动',
+                        'queued': queued,
+                        'queue_position': process_status['queue_position'],
+                        'estimated_wait_seconds': process_status['estimated_wait_seconds'],
                         'running_count': process_manager.get_running_process_count(),
                         'max_processes': process_manager.get_max_processes()
                     },
@@ -99,9 +102,12 @@ def get_process_status(process_id):
     
     Args:
         process_id: 进程ID
+    查询参数：
+    - since: 可选参数，输出游标，只返回该游标之后的输出（上次返回的log_cursor）
     """
     try:
-        status = process_manager.get_process_status(process_id)
+        since = request.args.get('since', type=int)
+        status = process_manager.get_process_status(process_id, since)
         if status is None:
             return jsonify(
                 ServerResponse.error(
@@ -122,6 +128,39 @@ def get_process_status(process_id):
             ServerResponse.error(f"获取进程状态时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
         ), HTTPStatus.INTERNAL_SERVER_ERROR.value
 
+@bp.route('/process/<process_id>/logs', methods=['GET'])
+def get_process_logs(process_id):
+    """
+    增量获取指定进程的输出
+    
+    Args:
+        process_id: 进程ID
+    查询参数：
+    - since: 可选参数，输出游标，只返回该游标之后的输出（上次返回的next_cursor）
+    """
+    try:
+        since = request.args.get('since', type=int)
+        logs = process_manager.get_process_logs(process_id, since)
+        if logs is None:
+            return jsonify(
+                ServerResponse.error(
+                    "进程不存在",
+                    HTTPStatus.NOT_FOUND.value
+                ).model_dump()
+            ), HTTPStatus.NOT_FOUND.value
+            
+        return jsonify(
+            ServerResponse.success(
+                data=logs,
+                message='获取进程输出成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+        
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取进程输出时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
 @bp.route('/process/<process_id>/stop', methods=['POST'])
 def stop_process(process_id):
     """
@@ -132,8 +171,10 @@ def stop_process(process_id):
     """
     try:
         if process_manager.stop_process(process_id):
+            process_status = process_manager.get_process_status(process_id)
             return jsonify(
                 ServerResponse.success(
+                    data={'stop_report': process_status['stop_report']},
                     message='停止进程成功'
                 ).model_dump()
             ), HTTPStatus.OK.value
@@ -160,7 +201,9 @@ def get_max_processes():
             ServerResponse.success(
                 data={
                     'max_processes': process_manager.get_max_processes(),
-                    'running_count': process_manager.get_running_process_count()
+                    'running_count': process_manager.get_running_process_count(),
+                    'queued_count': process_manager.get_queued_process_count(),
+                    'free_cores': process_manager.get_free_core_count()
                 },
                 message='获取成功'
             ).model_dump()
@@ -169,4 +212,154 @@ def get_max_processes():
     except Exception as e:
         return jsonify(
             ServerResponse.error(f"获取最大进程数时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
-        ), HTTPStatus.INTERNAL_SERVER_ERROR.value 
\ No newline at end of file
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value 
+
+@bp.route('/process/config/scheduler', methods=['GET'])
+def get_scheduler_allocation():
+    """
+    获取公平分享调度的实时分配情况
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=process_manager.get_share_allocation(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取调度分配情况时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+@bp.route('/process/workers', methods=['GET'])
+def get_warm_workers():
+    """
+    获取常驻模型工作进程列表
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data={
+                    'enabled': WarmWorkerPool()._get_config('WARM_WORKER_ENABLED'),
+                    'workers': WarmWorkerPool().get_workers()
+                },
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取常驻工作进程时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+@bp.route('/process/reaper', methods=['GET'])
+def get_reaper_stats():
+    """
+    获取残留进程清理统计
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=process_manager.get_reaper_stats(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取残留进程清理统计时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+@bp.route('/process/jobs', methods=['GET'])
+def get_execution_jobs():
+    """
+    获取分布式执行任务表概况（各状态任务数和正在执行任务的节点）
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=JobQueue().get_summary(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取执行任务概况时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+@bp.route('/cache/stats', methods=['GET'])
+def get_result_cache_stats():
+    """
+    获取在线推演结果缓存统计（命中、未命中、节省的字节数、淘汰和失效次数）
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=ResultCache().get_stats(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取结果缓存统计时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+
+@bp.route('/tasks/store/stats', methods=['GET'])
+def get_task_store_stats():
+    """
+    获取在线推演任务状态存储统计（缓存任务数、待写入数、加载、写入和淘汰次数）
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=TaskStateStore().get_stats(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取任务状态存储统计时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+
+@bp.route('/scenarios/catalog/stats', methods=['GET'])
+def get_scenario_catalog_stats():
+    """
+    获取典型场景目录索引统计（场景数、重建次数和耗时、元信息读取次数）
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=ScenarioCatalog().get_stats(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取典型场景目录索引统计时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
+
+
+@bp.route('/matrices/cache/stats', methods=['GET'])
+def get_matrix_cache_stats():
+    """
+    获取结果矩阵缓存统计（命中、未命中、淘汰次数，当前的矩阵数和总大小）
+    """
+    try:
+        return jsonify(
+            ServerResponse.success(
+                data=MatrixCache().get_stats(),
+                message='获取成功'
+            ).model_dump()
+        ), HTTPStatus.OK.value
+
+    except Exception as e:
+        return jsonify(
+            ServerResponse.error(f"获取结果矩阵缓存统计时发生错误：{str(e)}", HTTPStatus.INTERNAL_SERVER_ERROR.value).model_dump()
+        ), HTTPStatus.INTERNAL_SERVER_ERROR.value
@@ -2,9 +2,11 @@
 验证任务相关API路由
 """
 from http import HTTPStatus
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from app.service.evaluate_service import EvaluateService
 from app.service.evaluate_result_service import EvaluateResultService
+from app.utils.matrix_transport import MATRIX_FORMAT_BINARY, negotiate_matrix_format, pack_binary_result
+from app.utils.matrix_pyramid import parse_lod_params
 from app.utils.response import ServerResponse
 
 # 创建蓝图
@@ -201,9 +203,12 @@ def get_evaluate_status(evaluate_uuid):
     """
     获取验证任务进程状态
     :param evaluate_uuid: 验证任务UUID
+    查询参数：
+    - since: 可选参数，输出游标，只返回该游标之后的输出（上次返回的log_cursor）
     """
     try:
-        result = EvaluateService.get_process_status(evaluate_uuid)
+        since = request.args.get('since', type=int)
+        result = EvaluateService.get_process_status(evaluate_uuid, since)
         
         return jsonify(
             ServerResponse.success(
@@ -254,27 +259,59 @@ def get_evaluate_result(evaluate_uuid):
     :param evaluate_uuid: 验证任务UUID
     查询参数：
     - index: 可选参数，指定要获取数据的序号（从0开始）
+    - since_index: 可选参数，客户端已有数据的最后一个序号（-1表示还没有数据），只返回之后的数据：
+      类型1返回该序号之后的行，类型2/3/4返回下一组数据；返回的current_index作为下次请求的since_index
+    - max_rows: 可选参数，类型1指定since_index时最多返回的行数
+    - lod / max_cells / pool / window: 可选参数，类型2返回降采样后的矩阵：lod指定级别（每级行列数减半），
+      max_cells按单元数上限选择级别，pool为块合并方式（mean、min、max），window为原始分辨率中的显示区域（起始行,起始列,结束行,结束列）
+    类型2的矩阵格式按Accept请求头协商：
+    - application/json（默认）：二维列表
+    - application/x-matrix+json：JSON中的{dtype, shape, encoding, data}，data为小端float32的base64字符串
+    - application/octet-stream：响应体依次为各矩阵的小端float32字节，矩阵名称、形状、数据类型和其余字段在X-Matrix-*、X-Result-Meta响应头中
     """
     try:
-        # 获取可选的index参数
-        index = request.args.get('index')
-        # 如果提供了index参数，将其转换为整数
-        if index is not None:
-            try:
-                index = int(index)
-            except ValueError:
-                return jsonify(
-                    ServerResponse.error("index参数必须是整数", HTTPStatus.BAD_REQUEST.value).model_dump()
-                ), HTTPStatus.BAD_REQUEST.value
+        # 获取可选的index、since_index和max_rows参数，提供时转换为整数
+        params = {}
+        for name in ('index', 'since_index', 'max_rows'):
+            value = request.args.get(name)
+            if value is not None:
+                try:
+                    value = int(value)
+                except ValueError:
+                    return jsonify(
+                        ServerResponse.error(f"{name}参数必须是整数", HTTPStatus.BAD_REQUEST.value).model_dump()
+                    ), HTTPStatus.BAD_REQUEST.value
+            params[name] = value
+        if params['max_rows'] is not None and params['max_rows'] <= 0:
+            return jsonify(
+                ServerResponse.error("max_rows参数必须是正整数", HTTPStatus.BAD_REQUEST.value).model_dump()
+            ), HTTPStatus.BAD_REQUEST.value
+        lod, error = parse_lod_params(request.args)
+        if error:
+            return jsonify(
+                ServerResponse.error(error, HTTPStatus.BAD_REQUEST.value).model_dump()
+            ), HTTPStatus.BAD_REQUEST.value
         
-        result = EvaluateResultService.get_evaluate_latest_result(evaluate_uuid, index)
+        matrix_format = negotiate_matrix_format(request.accept_mimetypes)
+        result = EvaluateResultService.get_evaluate_latest_result(evaluate_uuid, params['index'],
+                                                                  params['since_index'], params['max_rows'],
+                                                                  matrix_format, lod)
         
-        return jsonify(
+        # 二进制格式只用于包含矩阵的结果（类型2），其他类型仍返回JSON
+        packed = pack_binary_result(result) if matrix_format == MATRIX_FORMAT_BINARY else None
+        if packed:
+            body, headers = packed
+            headers['Vary'] = 'Accept'
+            return Response(body, mimetype='application/octet-stream', headers=headers), HTTPStatus.OK.value
+        
+        response = jsonify(
             ServerResponse.success(
                 data=result,
                 message='获取成功'
             ).model_dump()
-        ), HTTPStatus.OK.value
+        )
+        response.headers['Vary'] = 'Accept'
+        return response, HTTPStatus.OK.value
         
     except Exception as e:
         return jsonify(
@@ -1,4 +1,4 @@
-from flask import Blueprint, jsonify, current_app, request
+from flask import Blueprint, Response, jsonify, current_app, request, send_file, stream_with_context
 from app.service.online_deduction_service import (
     get_online_models_by_task_type_service, 
     create_prediction_task_service, 
@@ -6,8 +6,13 @@ from app.service.online_deduction_service import (
     get_available_typical_scenarios,
     get_task_status_service,
     get_task_result_service,
-    stop_task_service
+    get_task_result_file_service,
+    get_situation_heatmap_service,
+    stop_task_service,
+    stream_task_events_service
 )
+from app.utils.matrix_transport import MATRIX_FORMAT_BINARY, negotiate_matrix_format, pack_binary_result
+from app.utils.matrix_pyramid import parse_lod_params
 
 online_deduction_bp = Blueprint('online_deduction_bp', __name__, url_prefix='/api/v1/online_deduction')
 
@@ -162,6 +167,10 @@ def create_prediction_task_route():
                   frequency_band: { type: string }
                   modulation_mode: { type: string }
                   modulation_order: { type: integer }
+              include_scenario_csv:
+                type: boolean
+                default: true
+                description: "典型场景任务的响应中是否返回场景的CSV内容（scenario_csv_content），为false时不返回"
     responses:
       200:
         description: Task created successfully.
@@ -195,7 +204,7 @@ def create_prediction_task_route():
                       description: "任务状态描述"
                     scenario_csv_content: 
                       type: string
-                      description: "典型场景的input.csv文件内容（仅当scenario_type为typical_scenario时返回）"
+                      description: "典型场景的input.csv文件内容（仅当scenario_type为typical_scenario时返回，请求中include_scenario_csv为false时不返回）"
                       example: "39.9200,116.4200,30.0,39.9195,116.4195,1.5\n39.9200,116.4200,30.0,39.9205,116.4205,1.5"
                     scenario_info:
                       type: object
@@ -256,18 +265,18 @@ def get_prediction_task_results_route(task_uuid: str):
       - name: next_index
         in: query
         required: false
-        description: Next index to fetch from (for incremental results)
+        description: Next index to fetch from (for incremental results); pass the next_index of the previous response
         schema:
           type: integer
       - name: batch_size
         in: query
         required: false
-        description: Number of points to fetch
+        description: Number of points to fetch (all available points when omitted)
         schema:
           type: integer
     responses:
       200:
-        description: Task results
+        description: Task results read from output.csv while the model is still writing it (has_more is false once the task has finished and all points were returned)
       404:
         description: Task not found
       500:
@@ -307,16 +316,66 @@ def get_prediction_task_result_route(task_uuid: str):
         description: Task UUID
         schema:
           type: string
+      - name: offset
+        in: query
+        required: false
+        description: First data row to return (excluding the header), used together with limit
+        schema:
+          type: integer
+      - name: limit
+        in: query
+        required: false
+        description: Number of data rows to return; when omitted the full CSV is returned inline only if it is not larger than RESULT_INLINE_MAX_BYTES
+        schema:
+          type: integer
+      - name: lod
+        in: query
+        required: false
+        description: Situation tasks only. Return the result as a heatmap grid at this pyramid level (0 is full resolution, each level halves rows and columns)
+        schema:
+          type: integer
+      - name: max_cells
+        in: query
+        required: false
+        description: Situation tasks only. Return the heatmap grid at the finest level with at most this many cells in the window
+        schema:
+          type: integer
+      - name: pool
+        in: query
+        required: false
+        description: Block pooling used for coarser levels
+        schema:
+          type: string
+          enum: ["mean", "min", "max"]
+      - name: window
+        in: query
+        required: false
+        description: Zoom window in full-resolution cells, "row_start,col_start,row_stop,col_stop"
+        schema:
+          type: string
     responses:
       200:
-        description: Task result
+        description: Task result read from disk (result_csv_content, or header/rows/next_offset/has_more when paginated, plus download_url); with lod/max_cells/window, a heatmap grid (values as nested lists, base64 float32 for Accept application/x-matrix+json, or a float32 body for Accept application/octet-stream)
+      400:
+        description: Invalid LOD parameters, or LOD parameters on a task that is not a situation prediction
       404:
         description: Task not found
+      409:
+        description: Heatmap requested before the task has completed
       500:
         description: Internal server error
     """
+    offset = request.args.get('offset', type=int)
+    limit = request.args.get('limit', type=int)
+    lod, error = parse_lod_params(request.args)
+    if error:
+        return jsonify({"message": error, "code": "400"}), 400
+
     try:
-        result, error = get_prediction_task_result_service(task_uuid, batch_mode=False)
+        if lod is not None:
+            return _situation_heatmap_response(task_uuid, lod)
+
+        result, error = get_prediction_task_result_service(task_uuid, offset, limit, batch_mode=False)
 
         if error:
             if "not found" in error.lower():
@@ -331,6 +390,31 @@ def get_prediction_task_result_route(task_uuid: str):
         current_app.logger.error(f"Unexpected error in get_prediction_task_result_route: {str(e)}")
         return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500
 
+def _situation_heatmap_response(task_uuid, lod):
+    """
+    创建态势预测热力图响应，values的格式按Accept请求头协商
+    """
+    matrix_format = negotiate_matrix_format(request.accept_mimetypes)
+    result, error = get_situation_heatmap_service(task_uuid, lod, matrix_format)
+    if error:
+        if "not found" in error.lower():
+            return jsonify({"message": error, "code": "404"}), 404
+        if "not ready" in error.lower():
+            return jsonify({"message": error, "code": "409"}), 409
+        if "not a situation" in error.lower():
+            return jsonify({"message": error, "code": "400"}), 400
+        current_app.logger.error(f"Error getting situation heatmap for {task_uuid}: {error}")
+        return jsonify({"message": f"Failed to get situation heatmap: {error}", "code": "500"}), 500
+
+    packed = pack_binary_result(result['result']) if matrix_format == MATRIX_FORMAT_BINARY else None
+    if packed:
+        body, headers = packed
+        response = Response(body, mimetype='application/octet-stream', headers=headers)
+    else:
+        response = jsonify({"message": "success", "code": "200", "data": result})
+    response.headers['Vary'] = 'Accept'
+    return response, 200
+
 @online_deduction_bp.route('/typical_scenarios', methods=['GET'])
 def get_typical_scenarios_route():
     """
@@ -377,6 +461,18 @@ def get_task_status_route(task_uuid: str):
         description: Task UUID
         schema:
           type: string
+      - name: since
+        in: query
+        required: false
+        description: Process output cursor (log_cursor from the previous response); only newer output lines are returned
+        schema:
+          type: integer
+      - name: include_scenario_csv
+        in: query
+        required: false
+        description: Whether to return scenario_csv_content for typical-scenario tasks (default true; pass false to omit it)
+        schema:
+          type: boolean
     responses:
       200:
         description: Task status information
@@ -404,8 +500,11 @@ def get_task_status_route(task_uuid: str):
       500:
         description: Internal server error
     """
+    since = request.args.get('since', type=int)
+    include_scenario_csv = request.args.get('include_scenario_csv', 'true').lower() not in ('false', '0')
+
     try:
-        result, error = get_task_status_service(task_uuid)
+        result, error = get_task_status_service(task_uuid, since, include_scenario_csv)
 
         if error:
             if "not found" in error.lower():
@@ -434,6 +533,18 @@ def get_task_result_route(task_uuid: str):
         description: Task UUID
         schema:
           type: string
+      - name: offset
+        in: query
+        required: false
+        description: First data row to return (excluding the header), used together with limit
+        schema:
+          type: integer
+      - name: limit
+        in: query
+        required: false
+        description: Number of data rows to return
+        schema:
+          type: integer
     responses:
       200:
         description: Task result with CSV content
@@ -452,8 +563,17 @@ def get_task_result_route(task_uuid: str):
                     message: { type: string }
                     result_csv_content: 
                       type: string
-                      description: "任务完成时返回的CSV结果字符串"
+                      nullable: true
+                      description: "任务完成时返回的CSV结果字符串，结果超过RESULT_INLINE_MAX_BYTES时为null"
                       example: "lat,lon,height,path_loss\n39.9200,116.4200,30.0,95.5\n39.9250,116.4250,25.0,98.2"
+                    result_csv_inline: { type: boolean }
+                    result_size_bytes: { type: integer }
+                    total_rows: { type: integer }
+                    download_url: { type: string }
+                    header: { type: array, items: { type: string } }
+                    rows: { type: array, items: { type: array, items: { type: string } } }
+                    next_offset: { type: integer }
+                    has_more: { type: boolean }
                     completed_at: { type: string }
                     started_at: { type: string }
       404:
@@ -461,8 +581,11 @@ def get_task_result_route(task_uuid: str):
       500:
         description: Internal server error
     """
+    offset = request.args.get('offset', type=int)
+    limit = request.args.get('limit', type=int)
+
     try:
-        result, error = get_task_result_service(task_uuid)
+        result, error = get_task_result_service(task_uuid, offset, limit)
 
         if error:
             if "not found" in error.lower():
@@ -477,6 +600,68 @@ def get_task_result_route(task_uuid: str):
         current_app.logger.error(f"Unexpected error in get_task_result_route: {str(e)}")
         return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500
 
+@online_deduction_bp.route('/tasks/<string:task_uuid>/result/download', methods=['GET'])
+def download_task_result_route(task_uuid: str):
+    """
+    Download Task Result CSV
+    ---
+    tags:
+      - Online Deduction - Task Management
+    description: |
+      Streams output.csv from disk. Clients sending Accept-Encoding gzip receive a gzip-encoded body.
+      Range requests (served uncompressed), If-None-Match and If-Modified-Since are supported.
+    parameters:
+      - name: task_uuid
+        in: path
+        required: true
+        description: Task UUID
+        schema:
+          type: string
+    responses:
+      200:
+        description: Result CSV file
+        content:
+          text/csv:
+            schema:
+              type: string
+              format: binary
+      206:
+        description: Partial content for a Range request
+      304:
+        description: Not modified
+      404:
+        description: Task or result file not found
+      409:
+        description: Task has not completed
+      500:
+        description: Internal server error
+    """
+    # Range请求按未压缩的文件计算偏移量，不使用gzip
+    accept_gzip = 'gzip' in request.headers.get('Accept-Encoding', '').lower() and 'Range' not in request.headers
+
+    try:
+        result, error = get_task_result_file_service(task_uuid, accept_gzip)
+
+        if error:
+            if "not found" in error.lower():
+                return jsonify({"message": error, "code": "404"}), 404
+            if "not ready" in error.lower():
+                return jsonify({"message": error, "code": "409"}), 409
+            
+            current_app.logger.error(f"Error getting task result file for {task_uuid}: {error}")
+            return jsonify({"message": f"Failed to get task result file: {error}", "code": "500"}), 500
+
+        response = send_file(result['path'], mimetype='text/csv', as_attachment=True,
+                             download_name=result['download_name'], conditional=True, max_age=0)
+        if result['encoding']:
+            response.headers['Content-Encoding'] = result['encoding']
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in download_task_result_route: {str(e)}")
+        return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500
+
 @online_deduction_bp.route('/tasks/<string:task_uuid>/stop', methods=['POST'])
 def stop_task_route(task_uuid: str):
     """
@@ -530,4 +715,95 @@ def stop_task_route(task_uuid: str):
 
     except Exception as e:
         current_app.logger.error(f"Unexpected error in stop_task_route: {str(e)}")
-        return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500 
\ No newline at end of file
+        return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500 
+
+def _task_events_response(task_uuids):
+    """
+    创建任务事件流响应，Last-Event-ID可以通过请求头或last_event_id查询参数传入
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    stream, error = stream_task_events_service(task_uuids, last_event_id)
+    if error:
+        if "not found" in error.lower():
+            return jsonify({"message": error, "code": "404"}), 404
+        return jsonify({"message": error, "code": "400"}), 400
+
+    return Response(
+        stream_with_context(stream),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@online_deduction_bp.route('/tasks/<string:task_uuid>/events', methods=['GET'])
+def stream_task_events_route(task_uuid: str):
+    """
+    Stream Task Events (Server-Sent Events)
+    ---
+    tags:
+      - Online Deduction - Task Management
+    parameters:
+      - name: task_uuid
+        in: path
+        required: true
+        description: Task UUID
+        schema:
+          type: string
+      - name: Last-Event-ID
+        in: header
+        required: false
+        description: id of the last received event; the stream resumes after it (sent automatically by EventSource on reconnect)
+        schema:
+          type: string
+      - name: last_event_id
+        in: query
+        required: false
+        description: Same as the Last-Event-ID header, for clients that cannot set headers
+        schema:
+          type: string
+    responses:
+      200:
+        description: "text/event-stream with status, progress, log, results and end events; comment lines are heartbeats"
+      404:
+        description: Task not found
+    """
+    try:
+        return _task_events_response([task_uuid])
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in stream_task_events_route: {str(e)}")
+        return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500
+
+@online_deduction_bp.route('/tasks/events', methods=['GET'])
+def stream_multiple_task_events_route():
+    """
+    Stream Events of Multiple Tasks (Server-Sent Events)
+    ---
+    tags:
+      - Online Deduction - Task Management
+    parameters:
+      - name: task_uuids
+        in: query
+        required: true
+        description: Comma separated task UUIDs; every event carries task_uuid in its data
+        schema:
+          type: string
+      - name: Last-Event-ID
+        in: header
+        required: false
+        description: id of the last received event; the stream resumes after it
+        schema:
+          type: string
+    responses:
+      200:
+        description: "text/event-stream with status, progress, log, results and end events for all tasks"
+      400:
+        description: Missing task_uuids or too many tasks
+      404:
+        description: Task not found
+    """
+    task_uuids = [task_uuid.strip() for task_uuid in request.args.get('task_uuids', '').split(',') if task_uuid.strip()]
+
+    try:
+        return _task_events_response(task_uuids)
+    except Exception as e:
+        current_app.logger.error(f"Unexpected error in stream_multiple_task_events_route: {str(e)}")
+        return jsonify({"message": "An unexpected error occurred.", "code": "500"}), 500
@@ -5,21 +5,165 @@ import os
 import pandas as pd
 import re
 import time
+import threading
+from collections import OrderedDict
 from typing import Dict, List, Optional, Union, Tuple
 from app import db
 from app.model.evaluate_info import EvaluateInfo
 from app.model.dataset_info import DatasetInfo
+from app.utils.numeric_csv_tail import NumericCsvTail
+from app.utils.directory_index import DirectoryIndex
+from app.utils.matrix_transport import MATRIX_FORMAT_JSON, EMPTY_MATRIX, CachedMatrix, MatrixCache
 from flask import current_app
 
+# 类型1结果文件（pathloss_result.csv）的增量读取器：文件路径 -> NumericCsvTail，按最近访问顺序淘汰
+_PATHLOSS_TAILS = OrderedDict()
+_PATHLOSS_TAILS_MAX = 32
+_pathloss_tails_lock = threading.Lock()
+
+# 类型2/3/4输出子目录的文件列表索引：目录路径 -> DirectoryIndex，按最近访问顺序淘汰
+_DIRECTORY_INDEXES = OrderedDict()
+_DIRECTORY_INDEXES_MAX = 256
+_directory_indexes_lock = threading.Lock()
+
+
+def _get_pathloss_tail(output_file: str) -> NumericCsvTail:
+    """
+    获取类型1结果文件的增量读取器，同一验证任务的多个查看者共用一个读取器
+    :param output_file: pathloss_result.csv路径
+    :return: 增量读取器
+    """
+    key = os.path.abspath(output_file)
+    with _pathloss_tails_lock:
+        tail = _PATHLOSS_TAILS.get(key)
+        if tail is None:
+            tail = _PATHLOSS_TAILS[key] = NumericCsvTail(output_file, 3)
+            while len(_PATHLOSS_TAILS) > _PATHLOSS_TAILS_MAX:
+                _PATHLOSS_TAILS.popitem(last=False)
+        else:
+            _PATHLOSS_TAILS.move_to_end(key)
+        return tail
+
+
+def _get_directory_index(directory: str) -> DirectoryIndex:
+    """
+    获取输出子目录的文件列表索引，目录的修改时间变化时才重新扫描
+    :param directory: 目录路径
+    :return: 文件列表索引
+    """
+    key = os.path.abspath(directory)
+    with _directory_indexes_lock:
+        index = _DIRECTORY_INDEXES.get(key)
+        if index is None:
+            index = _DIRECTORY_INDEXES[key] = DirectoryIndex(directory)
+            while len(_DIRECTORY_INDEXES) > _DIRECTORY_INDEXES_MAX:
+                _DIRECTORY_INDEXES.popitem(last=False)
+        else:
+            _DIRECTORY_INDEXES.move_to_end(key)
+        return index
+
+
+def _sorted_frames(names: List[str], prefix: str, suffix: str, pattern: str) -> List[Tuple[int, str]]:
+    """
+    提取文件名中的序号并按序号排序（序号相同的文件保持目录顺序）
+    :param names: 文件名列表
+    :param prefix: 文件名前缀
+    :param suffix: 文件名后缀
+    :param pattern: 提取序号的正则表达式
+    :return: [(序号, 文件名), ...]
+    """
+    file_indices = []
+    for file in names:
+        if file.startswith(prefix) and file.endswith(suffix):
+            match = re.search(pattern, file)
+            if match:
+                file_indices.append((int(match.group(1)), file))
+    file_indices.sort(key=lambda x: x[0])
+    return file_indices
+
+
+def _files_by_number(names: List[str], pattern: str) -> Dict[int, str]:
+    """
+    建立序号 -> 文件名的映射，同一序号取目录顺序中的第一个文件
+    :param names: 文件名列表
+    :param pattern: 提取序号的正则表达式
+    :return: 序号 -> 文件名
+    """
+    files = {}
+    for file in names:
+        match = re.search(pattern, file)
+        if match:
+            files.setdefault(int(match.group(1)), file)
+    return files
+
+
+def _elevation_frames(names: List[str]) -> List[Tuple[int, str]]:
+    """类型2：elevation_output目录中的高程文件，按序号排序"""
+    return _sorted_frames(names, '', '_elevation.csv', r'.*?(\d+)_elevation\.csv$')
+
+
+def _path_loss_files(names: List[str]) -> Dict[int, str]:
+    """
+    类型2：pl_output目录中的路径损耗文件，序号 -> 文件名
+    与按文件名后缀f'{序号}_path_loss.csv'匹配的规则一致：文件名末尾的数字串的每个合法后缀（如'123'的3、23、123）都对应该文件
+    """
+    files = {}
+    suffix = '_path_loss.csv'
+    for file in names:
+        if not file.endswith(suffix):
+            continue
+        stem = file[:-len(suffix)]
+        start = len(stem)
+        while start > 0 and stem[start - 1].isdigit():
+            start -= 1
+        digits = stem[start:]
+        for i in range(len(digits)):
+            number = digits[i:]
+            if number == str(int(number)):
+                files.setdefault(int(number), file)
+    return files
+
+
+def _right_up_frames(names: List[str]) -> List[Tuple[int, str]]:
+    """类型3：right_up目录中的PDP图片，按序号排序"""
+    return _sorted_frames(names, 'gen_0_', '_pdp.png', r'gen_0_(\d+)_pdp\.png')
+
+
+def _first_png(names: List[str]) -> Optional[str]:
+    """类型3：left_up/left_down目录中的第一张图片"""
+    return next((file for file in names if file.endswith('.png')), None)
+
+
+def _pdp_frames(names: List[str]) -> List[Tuple[int, str]]:
+    """类型4：pdp目录中的3D曲面图，按序号排序"""
+    return _sorted_frames(names, '3d_surface_plot_', '.png', r'3d_surface_plot_(\d+)\.png')
+
+
+def _pl_files(names: List[str]) -> Dict[int, str]:
+    """类型4：pl目录中的路径损耗图片，序号 -> 文件名"""
+    return _files_by_number(names, r'pl_(\d+)\.png')
+
+
+def _sf_files(names: List[str]) -> Dict[int, str]:
+    """类型4：sf目录中的阴影衰落图片，序号 -> 文件名"""
+    return _files_by_number(names, r'sf_(\d+)\.png')
+
+
 class EvaluateResultService:
     """验证任务结果处理服务类"""
     
     @staticmethod
-    def get_evaluate_latest_result(evaluate_uuid: str, index: Optional[int] = None) -> Dict:
+    def get_evaluate_latest_result(evaluate_uuid: str, index: Optional[int] = None, since_index: Optional[int] = None,
+                                   max_rows: Optional[int] = None, matrix_format: str = MATRIX_FORMAT_JSON,
+                                   lod: Optional[Dict] = None) -> Dict:
         """
         获取验证任务的最新结果
         :param evaluate_uuid: 验证任务UUID
         :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，客户端已有数据的最后一个序号，只返回之后的数据（-1表示还没有数据）
+        :param max_rows: 可选参数，类型1指定since_index时最多返回的行数
+        :param matrix_format: 类型2的矩阵返回格式（json、base64或binary）
+        :param lod: 可选参数，类型2的多级分辨率参数（level、max_cells、pool、window），见parse_lod_params
         :return: 验证结果字典
         """
         # 获取验证任务信息
@@ -27,22 +171,69 @@ class EvaluateResultService:
         
         # 根据验证任务类型调用不同的处理方法
         if evaluate.evaluate_type == 1:
-            return EvaluateResultService._process_type1_result(evaluate, index)
+            result = EvaluateResultService._process_type1_result(evaluate, index, since_index, max_rows)
         elif evaluate.evaluate_type == 2:
-            return EvaluateResultService._process_type2_result(evaluate, index)
+            result = EvaluateResultService._process_type2_result(evaluate, index, since_index, matrix_format, lod)
         elif evaluate.evaluate_type == 3:
-            return EvaluateResultService._process_type3_result(evaluate, index)
+            result = EvaluateResultService._process_type3_result(evaluate, index, since_index)
         elif evaluate.evaluate_type == 4:
-            return EvaluateResultService._process_type4_result(evaluate, index)
-        # TODO: 其他类型的处理逻辑将在后续实现
-        return {}
+            result = EvaluateResultService._process_type4_result(evaluate, index, since_index)
+        else:
+            # TODO: 其他类型的处理逻辑将在后续实现
+            return {}
+        return EvaluateResultService._set_delta_fields(result, since_index)
+    
+    @staticmethod
+    def _resolve_target_index(latest_index: int, index: Optional[int] = None,
+                              since_index: Optional[int] = None) -> Optional[int]:
+        """
+        确定要返回的数据序号（类型2/3/4每次返回一组数据）
+        指定since_index时返回客户端已有数据之后的下一组，没有新数据时返回None；
+        否则按index返回（默认最新的一组），小于0时取0，大于latest_index时取latest_index
+        :param latest_index: 目前有效的最新的index
+        :param index: 用户请求的index
+        :param since_index: 客户端已有数据的最后一个序号
+        :return: 要返回的数据序号，没有新数据时为None
+        """
+        if since_index is not None:
+            if since_index >= latest_index:
+                return None
+            target_index = since_index + 1
+        else:
+            target_index = index if index is not None else latest_index
+        
+        # 检查index是否合法
+        if target_index < 0:
+            # 小于0则返回能找到的第一组数据
+            target_index = 0
+        elif target_index > latest_index:
+            # 大于最大序号则返回最后一组数据
+            target_index = latest_index
+        return target_index
     
     @staticmethod
-    def _process_type1_result(evaluate: EvaluateInfo, index: Optional[int] = None) -> Dict:
+    def _set_delta_fields(result: Dict, since_index: Optional[int]) -> Dict:
+        """
+        指定since_index时在结果中加入游标字段：since_index和has_more（是否还有更新的数据）；
+        没有新数据时current_index保持为since_index，latest_index小于since_index表示结果已被重新生成，客户端应从头获取
+        :param result: 处理结果字典
+        :param since_index: 客户端已有数据的最后一个序号
+        :return: 处理结果字典
+        """
+        if since_index is not None:
+            result['since_index'] = since_index
+            result.setdefault('has_more', result['current_index'] < result['latest_index'])
+        return result
+    
+    @staticmethod
+    def _process_type1_result(evaluate: EvaluateInfo, index: Optional[int] = None, since_index: Optional[int] = None,
+                              max_rows: Optional[int] = None) -> Dict:
         """
         处理类型1的验证结果
         :param evaluate: 验证任务对象
         :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，只返回该序号之后到index为止的行，current_index为返回的最后一行的序号
+        :param max_rows: 可选参数，指定since_index时最多返回的行数
         :return: 处理结果字典
         """
         result = {
@@ -68,60 +259,30 @@ class EvaluateResultService:
             if not os.path.exists(output_file):
                 return result
                 
-            # 读取CSV文件，最多重试3次
-            max_retries = 3
-            retry_count = 0
-            df = None
-            
-            while retry_count < max_retries:
-                try:
-                    df = pd.read_csv(output_file, header=None, names=['measure', 'predict', 'rmse'])
-                    if not df.empty:
-                        break
-                except Exception as e:
-                    current_app.logger.warning(f"第{retry_count + 1}次读取CSV文件失败: {str(e)}")
-                    retry_count += 1
-                    if retry_count < max_retries:
-                        time.sleep(0.3)  # 等待0.3秒后重试
-            
-            if df is None or df.empty:
-                print(df)
-                current_app.logger.error(f"读取CSV文件失败，已重试{max_retries}次")
+            # 增量读取CSV文件：只解析上次读取之后新写入的完整行，已解析的数据保存在内存中
+            tail = _get_pathloss_tail(output_file)
+            tail.poll()
+            if tail.rows == 0:
+                current_app.logger.error(f"CSV文件中没有数据: {output_file}")
                 return result
             
-            # 找到第一个全零行
-            last_row_index = -1
-            for index_row, row in df.iterrows():
-                if row['measure'] == 0 and row['predict'] == 0 and row['rmse'] == 0:
-                    last_row_index = index_row
-                    break
-            
-            # 如果找到全零行，只取到该行之前的数据
-            if last_row_index != -1:
-                df = df.iloc[:last_row_index]
-                last_row_index = last_row_index - 1
+            # 以第一个全零行作为数据结束标记，只取到该行之前、用户请求的index为止的数据；
+            # 指定since_index时只取客户端还没有的行
+            start = since_index + 1 if since_index is not None else 0
+            rows = tail.read_before_zero_row(index, start, max_rows if since_index is not None else None)
+            measure, predict, rmse = rows['columns']
+            target_index = rows['target_index']
             
-            # 设置latest_index
-            result['latest_index'] = last_row_index
-            
-            # 处理用户请求的index
-            target_index = index if index is not None else last_row_index
-            
-            # 检查index是否合法
-            if target_index < 0:
-                # 小于0则返回能找到的第一组数据
-                target_index = 0
-            elif target_index > last_row_index:
-                # 大于最大序号则返回最后一组数据
-                target_index = last_row_index
-            
-            # 设置current_index
+            # 设置latest_index和current_index
+            result['latest_index'] = rows['latest_index']
             result['current_index'] = target_index
-            
-            # 将数据转换为列表，只取到用户请求的index
-            result['measure'] = df['measure'].iloc[:target_index+1].tolist()
-            result['predict'] = df['predict'].iloc[:target_index+1].tolist()
-            result['rmse'] = df['rmse'].iloc[:target_index+1].tolist()
+            result['measure'] = measure
+            result['predict'] = predict
+            result['rmse'] = rmse
+            if since_index is not None:
+                result['start_index'] = start
+                result['current_index'] = target_index = rows['stop'] - 1 if rows['stop'] > start else since_index
+                result['has_more'] = rows['stop'] < rows['end']
             
             # 获取对应的卫星图片路径
             if evaluate.dataset_uuid and target_index != -1:
@@ -141,16 +302,87 @@ class EvaluateResultService:
         return result
     
     @staticmethod
-    def _process_type2_result(evaluate: EvaluateInfo, index: Optional[int] = None) -> Dict:
+    def _process_type2_result(evaluate: EvaluateInfo, index: Optional[int] = None,
+                              since_index: Optional[int] = None, matrix_format: str = MATRIX_FORMAT_JSON,
+                              lod: Optional[Dict] = None) -> Dict:
         """
         处理类型2的验证结果
         :param evaluate: 验证任务对象
         :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，返回该序号之后的下一组数据，没有新数据时不读取矩阵
+        :param matrix_format: 矩阵返回格式：json为二维列表，base64为带形状和数据类型的base64字符串，
+                              binary为CachedMatrix（由路由打包为二进制响应）
+        :param lod: 可选参数，多级分辨率参数（level、max_cells、pool、window），指定时返回金字塔中的一级，
+                    并在结果中加入lod字段
+        :return: 处理结果字典
+        """
+        result = EvaluateResultService._read_type2_result(evaluate, index, since_index)
+        names = ('elevation_matrix', 'pl_matrix')
+        try:
+            matrices = {name: result[name] for name in names}
+            if lod is not None:
+                # 两个矩阵的形状相同，使用同一级别和显示区域
+                for name in names:
+                    matrices[name], result['lod'] = result[name].view(**lod)
+            encoded = {name: matrices[name].encode(matrix_format) for name in names}
+        except (TypeError, ValueError) as e:
+            # 矩阵中有非数值内容时无法转换为float32
+            current_app.logger.error(f"转换类型2验证结果矩阵时发生错误: {str(e)}")
+            encoded = {name: EMPTY_MATRIX.encode(matrix_format) for name in names}
+        result.update(encoded)
+        return result
+    
+    @staticmethod
+    def _read_matrix_csv(path: str, name: str) -> Optional[CachedMatrix]:
+        """
+        读取无表头的矩阵CSV文件，文件未变化时直接使用缓存的矩阵
+        :param path: CSV文件路径
+        :param name: 文件类型名称（用于日志）
+        :return: 缓存的矩阵，读取失败时为None
+        """
+        def load(csv_path: str):
+            # 使用pandas读取CSV文件，最多重试3次
+            max_retries = 3
+            retry_count = 0
+            df = None
+            
+            while retry_count < max_retries:
+                try:
+                    df = pd.read_csv(csv_path, header=None)
+                    if not df.empty:
+                        break
+                except Exception as e:
+                    current_app.logger.warning(f"第{retry_count + 1}次读取{name} CSV文件失败: {str(e)}")
+                    retry_count += 1
+                    if retry_count < max_retries:
+                        time.sleep(0.3)  # 等待0.3秒后重试
+            
+            if df is None or df.empty:
+                current_app.logger.error(f"读取{name} CSV文件失败，已重试{max_retries}次")
+                return None
+            
+            # 保持解析得到的数据类型，JSON格式的数值与原有实现一致
+            return df.to_numpy()
+        
+        try:
+            return MatrixCache().get(path, load)
+        except Exception as e:
+            current_app.logger.warning(f"读取{name}文件失败: {str(e)}")
+            return None
+    
+    @staticmethod
+    def _read_type2_result(evaluate: EvaluateInfo, index: Optional[int] = None,
+                           since_index: Optional[int] = None) -> Dict:
+        """
+        读取类型2的验证结果，矩阵为CachedMatrix
+        :param evaluate: 验证任务对象
+        :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，返回该序号之后的下一组数据，没有新数据时不读取矩阵
         :return: 处理结果字典
         """
         result = {
-            'elevation_matrix': [],
-            'pl_matrix': [],
+            'elevation_matrix': EMPTY_MATRIX,
+            'pl_matrix': EMPTY_MATRIX,
             'satellite_path': None,
             'current_index': 0,  # 当前返回的数据的index
             'latest_index': 0    # 目前有效的最新的index
@@ -176,22 +408,8 @@ class EvaluateResultService:
             if not all(os.path.exists(d) for d in [elevation_dir, pl_dir]):
                 return result
             
-            # 获取elevation_output目录下的所有文件
-            elevation_files = [f for f in os.listdir(elevation_dir) 
-                             if f.endswith('_elevation.csv')]
-            if not elevation_files:
-                return result
-
-            # 提取所有文件中的数字并排序
-            file_indices = []
-            for file in elevation_files:
-                match = re.search(r'.*?(\d+)_elevation\.csv$', file)
-                if match:
-                    file_indices.append((int(match.group(1)), file))
-            
-            # 按序号排序
-            file_indices.sort(key=lambda x: x[0])
-            
+            # 获取elevation_output目录下按序号排序的所有高程文件（目录未变化时使用缓存的索引）
+            file_indices = _get_directory_index(elevation_dir).derive(_elevation_frames)
             if not file_indices:
                 return result
             
@@ -199,15 +417,11 @@ class EvaluateResultService:
             result['latest_index'] = len(file_indices) - 1
             
             # 处理用户请求的index
-            target_index = index if index is not None else result['latest_index']
-            
-            # 检查index是否合法
-            if target_index < 0:
-                # 小于0则返回能找到的第一组数据
-                target_index = 0
-            elif target_index > result['latest_index']:
-                # 大于最大序号则返回最后一组数据
-                target_index = result['latest_index']
+            target_index = EvaluateResultService._resolve_target_index(result['latest_index'], index, since_index)
+            if target_index is None:
+                # 客户端已有最新的数据
+                result['current_index'] = since_index
+                return result
             
             # 设置current_index
             result['current_index'] = target_index
@@ -218,11 +432,7 @@ class EvaluateResultService:
                 _, elevation_file = file_indices[target_index]
                 
                 # 获取对应的path_loss文件
-                pl_file = None
-                for file in os.listdir(pl_dir):
-                    if file.endswith(f'{file_indices[target_index][0]}_path_loss.csv'):
-                        pl_file = file
-                        break
+                pl_file = _get_directory_index(pl_dir).derive(_path_loss_files).get(file_indices[target_index][0])
                 
                 if not pl_file:
                     return result
@@ -239,67 +449,17 @@ class EvaluateResultService:
                     if not os.path.exists(os.path.join(current_app.config['STORAGE_FOLDER'], satellite_path)):
                         satellite_path = None
                 
-                # 读取elevation文件
-                elevation_path = os.path.join(elevation_dir, elevation_file)
-                try:
-                    # 使用pandas读取CSV文件，最多重试3次
-                    max_retries = 3
-                    retry_count = 0
-                    df_elevation = None
-                    
-                    while retry_count < max_retries:
-                        try:
-                            df_elevation = pd.read_csv(elevation_path, header=None)
-                            if not df_elevation.empty:
-                                break
-                        except Exception as e:
-                            current_app.logger.warning(f"第{retry_count + 1}次读取elevation CSV文件失败: {str(e)}")
-                            retry_count += 1
-                            if retry_count < max_retries:
-                                time.sleep(0.3)  # 等待0.3秒后重试
-                    
-                    if df_elevation is None or df_elevation.empty:
-                        current_app.logger.error(f"读取elevation CSV文件失败，已重试{max_retries}次")
-                        return result
-                    
-                    # 将DataFrame转换为二维列表
-                    elevation_data = df_elevation.values.tolist()
-                except Exception as e:
-                    current_app.logger.warning(f"读取elevation文件失败: {str(e)}")
+                # 读取elevation文件和path_loss文件（文件未变化时使用缓存的矩阵）
+                elevation_data = EvaluateResultService._read_matrix_csv(
+                    os.path.join(elevation_dir, elevation_file), 'elevation')
+                if elevation_data is None:
                     return result
-                
-                # 读取path_loss文件
-                pl_path = os.path.join(pl_dir, pl_file)
-                try:
-                    # 使用pandas读取CSV文件，最多重试3次
-                    max_retries = 3
-                    retry_count = 0
-                    df_pl = None
-                    
-                    while retry_count < max_retries:
-                        try:
-                            df_pl = pd.read_csv(pl_path, header=None)
-                            if not df_pl.empty:
-                                break
-                        except Exception as e:
-                            current_app.logger.warning(f"第{retry_count + 1}次读取path_loss CSV文件失败: {str(e)}")
-                            retry_count += 1
-                            if retry_count < max_retries:
-                                time.sleep(0.3)  # 等待0.3秒后重试
-                    
-                    if df_pl is None or df_pl.empty:
-                        current_app.logger.error(f"读取path_loss CSV文件失败，已重试{max_retries}次")
-                        return result
-                    
-                    # 将DataFrame转换为二维列表
-                    pl_data = df_pl.values.tolist()
-                except Exception as e:
-                    current_app.logger.warning(f"读取path_loss文件失败: {str(e)}")
+                pl_data = EvaluateResultService._read_matrix_csv(os.path.join(pl_dir, pl_file), 'path_loss')
+                if pl_data is None:
                     return result
                     
                 # 检查数据维度是否匹配
-                if len(elevation_data) != len(pl_data) or not all(len(row1) == len(row2) 
-                    for row1, row2 in zip(elevation_data, pl_data)):
+                if elevation_data.shape != pl_data.shape:
                     return result
                 
                 # 设置结果
@@ -314,11 +474,13 @@ class EvaluateResultService:
         return result
     
     @staticmethod
-    def _process_type3_result(evaluate: EvaluateInfo, index: Optional[int] = None) -> Dict:
+    def _process_type3_result(evaluate: EvaluateInfo, index: Optional[int] = None,
+                              since_index: Optional[int] = None) -> Dict:
         """
         处理类型3的验证结果
         :param evaluate: 验证任务对象
         :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，返回该序号之后的下一组右侧图片，没有新数据时不返回右侧图片
         :return: 处理结果字典
         """
         result = {
@@ -353,90 +515,70 @@ class EvaluateResultService:
             
             # 处理右侧图片
             if os.path.exists(right_up_dir) and os.path.exists(right_down_dir):
-                # 获取right_up目录下的所有图片
-                right_up_files = [f for f in os.listdir(right_up_dir) 
-                                if f.startswith('gen_0_') and f.endswith('_pdp.png')]
-                
-                if right_up_files:
-                    # 提取序号并排序
-                    file_indices = []
-                    for file in right_up_files:
-                        match = re.search(r'gen_0_(\d+)_pdp\.png', file)
-                        if match:
-                            file_indices.append((int(match.group(1)), file))
+                # 获取right_up目录下按序号排序的所有图片（目录未变化时使用缓存的索引）
+                file_indices = _get_directory_index(right_up_dir).derive(_right_up_frames)
+                if file_indices:
+                    # 设置latest_index（文件列表中的最大序号）
+                    result['latest_index'] = len(file_indices) - 1
                     
-                    # 按序号排序
-                    file_indices.sort(key=lambda x: x[0])
+                    # 处理用户请求的index，客户端已有最新的数据时为None
+                    target_index = EvaluateResultService._resolve_target_index(
+                        result['latest_index'], index, since_index)
                     
-                    if file_indices:
-                        # 设置latest_index（文件列表中的最大序号）
-                        result['latest_index'] = len(file_indices) - 1
-                        
-                        # 处理用户请求的index
-                        target_index = index if index is not None else result['latest_index']
+                    # 设置current_index
+                    result['current_index'] = target_index if target_index is not None else since_index
+                    
+                    # 获取目标文件
+                    if target_index is not None and target_index < len(file_indices):
+                        # 获取对应的right_up文件
+                        _, right_up_file = file_indices[target_index]
                         
-                        # 检查index是否合法
-                        if target_index < 0:
-                            # 小于0则返回能找到的第一组数据
-                            target_index = 0
-                        elif target_index > result['latest_index']:
-                            # 大于最大序号则返回最后一组数据
-                            target_index = result['latest_index']
+                        # 获取对应的right_down文件
+                        right_down_file = f'gen_1_{file_indices[target_index][0]}_pdp.png'
                         
-                        # 设置current_index
-                        result['current_index'] = target_index
+                        # 检查文件是否存在
+                        right_up_path = os.path.join(right_up_dir, right_up_file)
+                        right_down_path = os.path.join(right_down_dir, right_down_file)
                         
-                        # 获取目标文件
-                        if target_index < len(file_indices):
-                            # 获取对应的right_up文件
-                            _, right_up_file = file_indices[target_index]
-                            
-                            # 获取对应的right_down文件
-                            right_down_file = f'gen_1_{file_indices[target_index][0]}_pdp.png'
-                            
-                            # 检查文件是否存在
-                            right_up_path = os.path.join(right_up_dir, right_up_file)
-                            right_down_path = os.path.join(right_down_dir, right_down_file)
-                            
-                            if os.path.exists(right_up_path) and os.path.exists(right_down_path):
-                                result['right_up_path'] = os.path.join(
-                                    current_app.config['EVALUATE_FOLDER'],
-                                    evaluate.uuid,
-                                    current_app.config['EVALUATE_OUTPUT_FOLDER'],
-                                    'right_up',
-                                    right_up_file
-                                )
-                                result['right_down_path'] = os.path.join(
-                                    current_app.config['EVALUATE_FOLDER'],
-                                    evaluate.uuid,
-                                    current_app.config['EVALUATE_OUTPUT_FOLDER'],
-                                    'right_down',
-                                    right_down_file
-                                )
-            
+                        if os.path.exists(right_up_path) and os.path.exists(right_down_path):
+                            result['right_up_path'] = os.path.join(
+                                current_app.config['EVALUATE_FOLDER'],
+                                evaluate.uuid,
+                                current_app.config['EVALUATE_OUTPUT_FOLDER'],
+                                'right_up',
+                                right_up_file
+                            )
+                            result['right_down_path'] = os.path.join(
+                                current_app.config['EVALUATE_FOLDER'],
+                                evaluate.uuid,
+                                current_app.config['EVALUATE_OUTPUT_FOLDER'],
+                                'right_down',
+                                right_down_file
+                            )
+        
             # 处理左侧图片（这些图片通常只有一组）
             if os.path.exists(left_up_dir):
                 # 获取left_up目录下的唯一图片
-                left_up_files = [f for f in os.listdir(left_up_dir) if f.endswith('.png')]
-                if left_up_files:
+                left_up_file = _get_directory_index(left_up_dir).derive(_first_png)
+                if left_up_file:
                     result['left_up_path'] = os.path.join(
                         current_app.config['EVALUATE_FOLDER'],
                         evaluate.uuid,
                         current_app.config['EVALUATE_OUTPUT_FOLDER'],
                         'left_up',
-                        left_up_files[0]
+                        left_up_file
                     )
             
             if os.path.exists(left_down_dir):
                 # 获取left_down目录下的唯一图片
-                left_down_files = [f for f in os.listdir(left_down_dir) if f.endswith('.png')]
-                if left_down_files:
+                left_down_file = _get_directory_index(left_down_dir).derive(_first_png)
+                if left_down_file:
                     result['left_down_path'] = os.path.join(
                         current_app.config['EVALUATE_FOLDER'],
                         evaluate.uuid,
                         current_app.config['EVALUATE_OUTPUT_FOLDER'],
                         'left_down',
-                        left_down_files[0]
+                        left_down_file
                     )
             
         except Exception as e:
@@ -445,11 +587,13 @@ class EvaluateResultService:
         return result
     
     @staticmethod
-    def _process_type4_result(evaluate: EvaluateInfo, index: Optional[int] = None) -> Dict:
+    def _process_type4_result(evaluate: EvaluateInfo, index: Optional[int] = None,
+                              since_index: Optional[int] = None) -> Dict:
         """
         处理类型4的验证结果
         :param evaluate: 验证任务对象
         :param index: 可选参数，指定要获取数据的序号（从0开始）
+        :param since_index: 可选参数，返回该序号之后的下一组完整图片，没有新数据时不返回图片
         :return: 处理结果字典
         """
         result = {
@@ -482,25 +626,12 @@ class EvaluateResultService:
             if not all(os.path.exists(d) for d in [pdp_dir, pl_dir, sf_dir]):
                 return result
             
-            # 获取pdp文件夹中的所有图片
-            pdp_files = [f for f in os.listdir(pdp_dir) 
-                        if f.startswith('3d_surface_plot_') and f.endswith('.png')]
-            
-            if not pdp_files:
-                return result
-            
-            # 提取序号并排序
-            file_indices = []
-            for file in pdp_files:
-                match = re.search(r'3d_surface_plot_(\d+)\.png', file)
-                if match:
-                    file_indices.append((int(match.group(1)), file))
-            
-            # 按序号排序
-            file_indices.sort(key=lambda x: x[0])
-            
+            # 获取pdp文件夹中按序号排序的所有图片，以及pl、sf文件夹中序号 -> 文件名的映射（目录未变化时使用缓存的索引）
+            file_indices = _get_directory_index(pdp_dir).derive(_pdp_frames)
             if not file_indices:
                 return result
+            pl_files = _get_directory_index(pl_dir).derive(_pl_files)
+            sf_files = _get_directory_index(sf_dir).derive(_sf_files)
             
             def find_complete_image_set(start_index: int) -> Tuple[bool, int, Optional[str], Optional[str], Optional[str]]:
                 """
@@ -517,21 +648,9 @@ class EvaluateResultService:
                         
                     pdp_index, pdp_file = file_indices[current_idx]
                     
-                    # 查找对应的pl文件
-                    pl_file = None
-                    for file in os.listdir(pl_dir):
-                        match = re.search(r'pl_(\d+)\.png', file)
-                        if match and int(match.group(1)) == pdp_index:
-                            pl_file = file
-                            break
-                    
-                    # 查找对应的sf文件
-                    sf_file = None
-                    for file in os.listdir(sf_dir):
-                        match = re.search(r'sf_(\d+)\.png', file)
-                        if match and int(match.group(1)) == pdp_index:
-                            sf_file = file
-                            break
+                    # 查找对应的pl文件和sf文件
+                    pl_file = pl_files.get(pdp_index)
+                    sf_file = sf_files.get(pdp_index)
                     
                     # 检查是否找到完整的一组图片
                     if pdp_file and pl_file and sf_file:
@@ -555,18 +674,17 @@ class EvaluateResultService:
             result['latest_index'] = latest_complete_index
             
             # 处理用户请求的index
-            target_index = index if index is not None else latest_complete_index
-            
-            # 检查index是否合法
-            if target_index < 0:
-                # 小于0则返回能找到的第一组数据
-                target_index = 0
-            elif target_index > latest_complete_index:
-                # 大于最大序号则返回最后一组数据
-                target_index = latest_complete_index
+            target_index = EvaluateResultService._resolve_target_index(latest_complete_index, index, since_index)
+            if target_index is None:
+                # 客户端已有最新的数据
+                result['current_index'] = since_index
+                return result
             
             # 查找完整的图片组
             found, found_index, pdp_file, pl_file, sf_file = find_complete_image_set(target_index)
+            if found and since_index is not None and found_index <= since_index:
+                # 下一组图片不完整时向前找到的是客户端已有的数据，改为返回最新的完整图片组
+                found, found_index, pdp_file, pl_file, sf_file = find_complete_image_set(latest_complete_index)
             
             if found:
                 # 设置current_index为找到的完整图片组的索引
@@ -7,13 +7,14 @@ import shutil
 from typing import Dict
 from app import db, create_app
 from flask import current_app
-from app.model.evaluate_info import EvaluateInfo, EvaluateStatusType
+from app.model.evaluate_info import EvaluateInfo, EvaluateStatusType, get_evaluate_folder_path
 from app.model.model_info import ModelInfo
 from app.model.model_detail import ModelDetail
 from app.model.dataset_info import DatasetInfo
 from app.model.dataset_detail import DatasetDetail
 from app.service.search.search_factory import search_factory
-from app.utils.process_manager import ProcessManager
+from app.utils.process_manager import ProcessManager, PRIORITY_BATCH
+from app.utils.resource_profile import load_resource_profile
 
 
 class EvaluateService:
@@ -59,6 +60,8 @@ class EvaluateService:
                         evaluate.evaluate_status = EvaluateStatusType.ABORTED.value
                     # 设置结束时间
                     evaluate.end_time = datetime.utcnow()
+                    # 记录资源占用汇总
+                    evaluate.resource_usage = cls._process_manager.get_resource_summary(process_id)
                     db.session.commit()
         except Exception as e:
             # 记录错误日志
@@ -68,10 +71,11 @@ class EvaluateService:
                 db.session.rollback()
 
     @classmethod
-    def get_process_status(cls, evaluate_uuid: str) -> Dict:
+    def get_process_status(cls, evaluate_uuid: str, since: int = None) -> Dict:
         """
         获取验证任务进程状态
         :param evaluate_uuid: 验证任务UUID
+        :param since: 输出起始游标（可选），只返回该游标之后的输出
         :return: 进程状态信息
         """
         try:
@@ -79,7 +83,7 @@ class EvaluateService:
             evaluate = EvaluateInfo.query.get_or_404(evaluate_uuid)
 
             # 获取进程状态
-            status = cls._process_manager.get_process_status(evaluate_uuid)
+            status = cls._process_manager.get_process_status(evaluate_uuid, since)
             if status is None:
                 return {
                     'evaluate_uuid': evaluate_uuid,
@@ -150,7 +154,7 @@ class EvaluateService:
 
             # 检查是否有对应的进程
             process_status = EvaluateService._process_manager.get_process_status(evaluate_uuid)
-            if process_status and process_status.get('status') == 'running':
+            if process_status and process_status.get('status') in ('running', 'queued'):
                 raise ValueError("任务正在运行中，无法更新")
 
             # 如果提供了evaluate_type，验证其有效性
@@ -348,7 +352,7 @@ class EvaluateService:
             # 检查并停止可能正在运行的进程
             process_manager = ProcessManager()
             process_status = process_manager.get_process_status(evaluate_uuid)
-            if process_status and process_status['status'] == 'running':
+            if process_status and process_status['status'] in ('running', 'queued'):
                 process_manager.stop_process(evaluate_uuid)
 
             # 删除相关文件
@@ -501,10 +505,24 @@ class EvaluateService:
 
             # 启动进程
             process_manager = ProcessManager()
-            if process_manager.start_process(evaluate.uuid, cmd, work_dir, env, EvaluateService._on_process_complete):
+            if process_manager.start_process(evaluate.uuid, cmd, work_dir, env, EvaluateService._on_process_complete,
+                                             priority=PRIORITY_BATCH,
+                                             log_dir=get_evaluate_folder_path(evaluate.uuid),
+                                             worker_key=model_detail.uuid,
+                                             worker_job={
+                                                 'input_dir': input_dir,
+                                                 'output_dir': output_dir
+                                             },
+                                             resource_limits=load_resource_profile(evaluate.model_uuid),
+                                             result_path=output_dir):
+                process_status = process_manager.get_process_status(evaluate.uuid)
+                queued = process_status['status'] == 'queued'
                 return {
                     'process_id': evaluate.uuid,
-                    'message': '验证任务已启动',
+                    'message': '验证任务已进入等待队列' if queued else '验证任务已启动',
+                    'queued': queued,
+                    'queue_position': process_status['queue_position'],
+                    'estimated_wait_seconds': process_status['estimated_wait_seconds'],
                     'running_count': process_manager.get_running_process_count(),
                     'max_processes': process_manager.get_max_processes(),
                     'command': ' '.join(cmd),
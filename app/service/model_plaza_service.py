@@ -10,6 +10,7 @@ import json
 from typing import Dict, Any, Optional, Tuple, List
 from datetime import datetime
 from werkzeug.datastructures import FileStorage
+from app.utils.result_cache import ResultCache
 
 def get_models_plaza_service(page=1, page_size=10, model_name_search=None, 
                            model_type=None, frequency_bands_str=None, 
@@ -278,6 +279,9 @@ def delete_model_service(model_uuid: str) -> Tuple[bool, Optional[str]]:
         db.session.delete(model)
         db.session.commit()
 
+        # 清除该模型的在线推演结果缓存
+        ResultCache().invalidate_model(model_uuid)
+
         return True, None
 
     except Exception as e:
@@ -6,6 +6,7 @@ from app.model.model_info import ModelInfo
 from app.model.model_detail import ModelDetail
 from app.model.evaluate_info import EvaluateInfo, EvaluateStatusType
 from app.service.search.search_factory import search_factory
+from app.utils.result_cache import ResultCache
 
 class ModelService:
     """模型服务类"""
@@ -113,6 +114,9 @@ class ModelService:
             db.session.delete(model)
             db.session.commit()
             
+            # 清除该模型的在线推演结果缓存
+            ResultCache().invalidate_model(model_uuid)
+            
             return True
         except Exception as e:
             db.session.rollback()
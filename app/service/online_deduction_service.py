@@ -1,14 +1,33 @@
 import uuid
 import json
-import csv
 import os
+import gzip
 import shutil
 import shlex
-from typing import Dict, Any, List, Tuple, Optional
+import socket
+import time
+import sys
+import math
+import threading
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Tuple, Optional
 from datetime import datetime
 from flask import current_app
 from enum import Enum
-from app.utils.process_manager import ProcessManager
+from app.utils import process_group
+from app.utils.process_manager import ProcessManager, PRIORITY_INTERACTIVE
+from app.utils.resource_profile import load_resource_profile
+from app.utils.result_cache import ResultCache
+from app.utils.csv_tail import CsvTail, count_csv_rows, read_csv_page, is_header, parse_line
+from app.utils.matrix_transport import MATRIX_FORMAT_JSON, CachedMatrix, MatrixCache
+from app.utils.task_events import TaskEventHub
+from app.utils.task_store import TaskStateStore
+from app.utils.pair_generator import write_pairs_csv, get_frequency_from_params
+from app.utils.csv_shards import split_csv_rows, merge_csv_files, CsvRowCounter
+from app.utils.scenario_catalog import ScenarioCatalog
+from app.utils.scenario_binary import compile_scenario_csv, load_compiled_scenario, parse_scenario_csv, positions_to_list
 
 # 任务状态枚举
 class OnlineDeductionStatus(Enum):
@@ -17,8 +36,35 @@ class OnlineDeductionStatus(Enum):
     COMPLETED = "COMPLETED"
     ABORTED = "ABORTED"
 
-# 内存中存储任务状态（简化实现，生产环境建议使用数据库）
-TASK_STATUS_STORE = {}
+# 任务状态：内存缓存+数据库（在线推演任务表）持久化，按字典方式读写；
+# 结果保留在任务文件夹的output.csv中，这里只记录路径、大小和行数
+TASK_STATUS_STORE = TaskStateStore()
+
+# 合并运行：实际运行模型的任务UUID -> {'cache_key': 任务指纹, 'tasks': 附加在该次运行上的任务UUID列表}
+_COALESCED_RUNS = {}
+# 排队或运行中的任务指纹 -> 实际运行模型的任务UUID
+_INFLIGHT_RUNS = {}
+_runs_lock = threading.Lock()
+
+# 分片运行：任务UUID -> {'task_folder_path': 任务文件夹, 'shards': 各分片信息, 'counters': 分片序号 -> 输出行数统计器}
+_SHARD_GROUPS = {}
+_shards_lock = threading.Lock()
+# 支持分片运行的预测模式（各输入行的预测结果互相独立）
+_SHARD_MODES = ('point', 'link', 'situation')
+
+# 增量读取output.csv的读取器：输出文件路径 -> {'tail': CsvTail, 'total_samples': 输入样本数}，按最近访问排序；
+# 读取器只保存行数和稀疏索引（每256行一个字节偏移量），结果行按需从磁盘解析
+_RESULT_TAILS = OrderedDict()
+_RESULT_TAILS_MAX = 64
+_result_tails_lock = threading.Lock()
+
+# output.csv各字段可能的列名（表头不区分大小写）；没有表头时按lat,lon,height,...,path_loss的列顺序解析
+_RESULT_COLUMN_ALIASES = {
+    'lat': ('lat', 'latitude', 'rx_lat'),
+    'lon': ('lon', 'lng', 'longitude', 'rx_lon'),
+    'height': ('height', 'alt', 'altitude', 'rx_height'),
+    'path_loss_db': ('path_loss', 'path_loss_db', 'pathloss', 'pl')
+}
 
 # This mapping might need to be more sophisticated or stored elsewhere (e.g., in the database)
 # if a model can belong to multiple task types or if task_types are more dynamic.
@@ -40,6 +86,10 @@ TYPICAL_SCENARIO_MAPPING = {
 
 # 创建进程管理器实例
 _process_manager = ProcessManager()
+# 任务事件中心实例
+_task_events = TaskEventHub()
+# 结果缓存实例
+_result_cache = ResultCache()
 
 def _get_app():
     """
@@ -49,15 +99,38 @@ def _get_app():
     from app import create_app
     return create_app()
 
-def _on_process_complete(process_id: str, return_code: int):
+def _on_process_complete(process_id: str, return_code: int, resource_usage: Optional[Dict] = None):
     """
     进程结束时的回调函数
+    合并运行时，该次运行上附加的所有任务共享结束状态和output.csv；
+    分片运行的任务在所有分片结束并合并输出后调用，resource_usage为各分片的资源占用汇总
     """
     # 使用current_app而不是创建新的app实例
     try:
-        # 更新任务状态
-        if process_id in TASK_STATUS_STORE:
-            task_info = TASK_STATUS_STORE[process_id]
+        attached_tasks, cache_key = _end_run(process_id)
+        if resource_usage is None:
+            resource_usage = _process_manager.get_resource_summary(process_id)
+        
+        # 实际运行任务文件夹中的output.csv（根据main.py的输出文件名），结果保留在磁盘上，内存中只记录文件信息
+        run_output_csv_path = os.path.join(_get_task_folder_path(process_id), 'output.csv')
+        result_info = {}
+        try:
+            if os.path.exists(run_output_csv_path):
+                result_info = _get_result_file_info(run_output_csv_path)
+                # 正常结束且有输出的任务写入结果缓存
+                if return_code == 0 and cache_key and result_info['result_size_bytes']:
+                    _result_cache.put(cache_key, run_output_csv_path)
+            else:
+                current_app.logger.warning(f"Output CSV file not found: {run_output_csv_path}")
+        except Exception as e:
+            if current_app:
+                current_app.logger.error(f"读取任务结果失败: {str(e)}")
+        
+        # 更新任务状态，已被手动停止的任务保持原状态
+        for task_uuid in attached_tasks:
+            task_info = TASK_STATUS_STORE.get(task_uuid)
+            if task_info is None or task_info['status'] == OnlineDeductionStatus.ABORTED.value:
+                continue
             if return_code == 0:
                 task_info['status'] = OnlineDeductionStatus.COMPLETED.value
                 task_info['message'] = '任务完成'
@@ -66,27 +139,22 @@ def _on_process_complete(process_id: str, return_code: int):
                 task_info['message'] = f'任务异常结束，返回码: {return_code}'
             task_info['end_time'] = datetime.now().isoformat()
             
-            # 尝试读取输出结果
-            try:
-                # 从任务文件夹中读取output.csv（根据main.py的输出文件名）
-                task_folder_path = task_info.get('task_folder_path')
-                if task_folder_path:
-                    output_csv_path = os.path.join(task_folder_path, 'output.csv')
-                    if os.path.exists(output_csv_path):
-                        with open(output_csv_path, 'r', encoding='utf-8') as f:
-                            task_info['result_csv_content'] = f.read()
-                    else:
-                        current_app.logger.warning(f"Output CSV file not found: {output_csv_path}")
-                        task_info['result_csv_content'] = ""
-                else:
-                    current_app.logger.warning(f"Task folder path not found for task {process_id}")
-                    task_info['result_csv_content'] = ""
-            except Exception as e:
-                if current_app:
-                    current_app.logger.error(f"读取任务结果失败: {str(e)}")
-                task_info['result_csv_content'] = ""
+            # 记录资源占用汇总，同时写入任务元信息文件
+            task_info['resource_usage'] = resource_usage
+            _save_resource_usage_to_metadata(task_info.get('task_folder_path'), resource_usage)
             
-            TASK_STATUS_STORE[process_id] = task_info
+            # 跟随任务把共享的输出复制到自己的任务文件夹
+            if task_uuid != process_id and task_info.get('task_folder_path') and os.path.exists(run_output_csv_path):
+                try:
+                    output_csv_path = os.path.join(task_info['task_folder_path'], 'output.csv')
+                    shutil.copyfile(run_output_csv_path, output_csv_path)
+                    task_info['output_csv_path'] = output_csv_path
+                except Exception as e:
+                    current_app.logger.warning(f"复制任务 {task_uuid} 的输出失败: {str(e)}")
+            
+            task_info.update(result_info)
+            TASK_STATUS_STORE[task_uuid] = task_info
+            _publish_task_status(task_uuid)
             
     except Exception as e:
         if current_app:
@@ -94,6 +162,709 @@ def _on_process_complete(process_id: str, return_code: int):
         else:
             print(f"更新在线推演任务状态时发生错误: {str(e)}")
 
+def _restore_task_info(process_id: str, record: Dict[str, Any]):
+    """
+    服务重启后根据任务文件夹中的task_metadata.json重建任务状态，
+    合并运行时同时恢复附加在该次运行上的跟随任务
+    
+    Args:
+        process_id: 进程ID（任务UUID）
+        record: 进程管理器的任务登记记录
+    """
+    if TASK_STATUS_STORE.is_local(process_id) or not record.get('log_dir'):
+        return
+    task_metadata = _load_task_metadata(process_id, record['log_dir'])
+    attached_tasks = task_metadata.get('coalesced_tasks', [process_id])
+    for task_uuid in attached_tasks:
+        if task_uuid == process_id:
+            task_folder_path = record['log_dir']
+            metadata = task_metadata
+        else:
+            task_folder_path = _get_task_folder_path(task_uuid)
+            metadata = _load_task_metadata(task_uuid, task_folder_path)
+        
+        TASK_STATUS_STORE[task_uuid] = {
+            'task_uuid': task_uuid,
+            'task_folder_name': metadata.get('task_folder_name', os.path.basename(task_folder_path)),
+            'task_folder_path': task_folder_path,
+            'prediction_mode': metadata.get('prediction_mode'),
+            'scenario_type': metadata.get('scenario_type'),
+            'status': OnlineDeductionStatus.IN_PROGRESS.value,
+            'message': '服务重启后恢复的任务',
+            'created_at': metadata.get('created_at'),
+            'start_time': record.get('start_time'),
+            'end_time': None,
+            'input_csv_path': os.path.join(task_folder_path, metadata.get('input_file', 'input.csv')),
+            'metadata_file_path': os.path.join(task_folder_path, 'task_metadata.json'),
+            'output_csv_path': record.get('result_path'),
+            'model_uuid': metadata.get('model_uuid'),
+            'cache_key': metadata.get('cache_key'),
+            'run_task_uuid': process_id,
+            'owner': _current_owner()
+        }
+        if 'scenario_info' in metadata:
+            TASK_STATUS_STORE[task_uuid]['scenario_info'] = metadata['scenario_info']
+        _publish_task_status(task_uuid)
+    
+    with _runs_lock:
+        cache_key = task_metadata.get('cache_key')
+        _COALESCED_RUNS[process_id] = {'cache_key': cache_key, 'tasks': list(attached_tasks)}
+        if cache_key:
+            _INFLIGHT_RUNS[cache_key] = process_id
+
+def _load_task_metadata(task_uuid: str, task_folder_path: str) -> Dict[str, Any]:
+    """
+    读取任务文件夹中的task_metadata.json
+    
+    Args:
+        task_uuid: 任务UUID
+        task_folder_path: 任务文件夹路径
+    
+    Returns:
+        任务元信息，读取失败时为空字典
+    """
+    try:
+        with open(os.path.join(task_folder_path, 'task_metadata.json'), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        current_app.logger.warning(f"恢复任务 {task_uuid} 时读取元信息失败: {str(e)}")
+        return {}
+
+def _get_task_folder_path(task_uuid: str) -> str:
+    """
+    获取任务文件夹路径
+    
+    Args:
+        task_uuid: 任务UUID
+    
+    Returns:
+        任务文件夹路径
+    """
+    return os.path.join(
+        current_app.config.get('TASK_OUTPUT_DIR', 'storage/tasks'),
+        f"ONLINE-DEDUCTION-{task_uuid}"
+    )
+
+def _register_run(run_task_uuid: str, cache_key: Optional[str]):
+    """
+    登记即将启动的模型运行，相同指纹的新任务可以附加到该次运行上
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID（同时是进程ID）
+        cache_key: 任务指纹
+    """
+    with _runs_lock:
+        _COALESCED_RUNS[run_task_uuid] = {'cache_key': cache_key, 'tasks': [run_task_uuid]}
+        if cache_key:
+            _INFLIGHT_RUNS[cache_key] = run_task_uuid
+
+def _attach_to_run(cache_key: str, task_uuid: str) -> Optional[str]:
+    """
+    将任务作为跟随任务附加到指纹相同、仍在排队或运行中的模型运行上
+    跟随任务的运行中状态在加入任务列表前写入：该次运行随时可能结束，
+    之后_on_process_complete写入的结束状态不会再被覆盖
+    
+    Args:
+        cache_key: 任务指纹
+        task_uuid: 新任务UUID
+    
+    Returns:
+        实际运行模型的任务UUID，没有可附加的运行时返回None
+    """
+    # 排队状态只用于提示信息，在加锁前查询，持有_runs_lock时不调用进程管理器
+    candidate = _INFLIGHT_RUNS.get(cache_key)
+    if candidate is None:
+        return None
+    queued = (_get_run_status(candidate, sys.maxsize) or {}).get('status') == 'queued'
+    
+    with _runs_lock:
+        run_task_uuid = _INFLIGHT_RUNS.get(cache_key)
+        if run_task_uuid is None:
+            return None
+        task_info = TASK_STATUS_STORE.get(task_uuid)
+        if task_info is not None:
+            task_info.update({
+                'status': OnlineDeductionStatus.IN_PROGRESS.value,
+                'message': f"相同任务{'排队' if queued and run_task_uuid == candidate else '运行'}中，已合并到任务 {run_task_uuid}",
+                'start_time': datetime.now().isoformat(),
+                'output_csv_path': os.path.join(_get_task_folder_path(run_task_uuid), 'output.csv'),
+                'run_task_uuid': run_task_uuid,
+                'cache_key': cache_key,
+                'cache_hit': False
+            })
+        run = _COALESCED_RUNS[run_task_uuid]
+        run['tasks'].append(task_uuid)
+        _update_task_metadata(_get_task_folder_path(run_task_uuid), {'coalesced_tasks': run['tasks']})
+        return run_task_uuid
+
+def _detach_from_run(run_task_uuid: str, task_uuid: str) -> bool:
+    """
+    将任务从合并运行上移除
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID
+        task_uuid: 要移除的任务UUID
+    
+    Returns:
+        是否仍有其他任务附加在该次运行上（为True时进程应继续运行）
+    """
+    with _runs_lock:
+        run = _COALESCED_RUNS.get(run_task_uuid)
+        if run is None or task_uuid not in run['tasks'] or len(run['tasks']) == 1:
+            return False
+        run['tasks'].remove(task_uuid)
+        _update_task_metadata(_get_task_folder_path(run_task_uuid), {'coalesced_tasks': run['tasks']})
+        return True
+
+def _fail_run(run_task_uuid: str):
+    """
+    模型运行启动失败时结束登记，并将已附加的跟随任务标记为失败
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID
+    """
+    attached_tasks, _ = _end_run(run_task_uuid)
+    for task_uuid in attached_tasks:
+        task_info = TASK_STATUS_STORE.get(task_uuid)
+        if task_uuid != run_task_uuid and task_info is not None:
+            task_info['status'] = OnlineDeductionStatus.ABORTED.value
+            task_info['message'] = f"合并运行的任务 {run_task_uuid} 启动失败"
+            task_info['end_time'] = datetime.now().isoformat()
+            _publish_task_status(task_uuid)
+
+def _end_run(run_task_uuid: str) -> Tuple[List[str], Optional[str]]:
+    """
+    结束模型运行的登记，之后相同指纹的任务不再附加到该次运行上
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID
+    
+    Returns:
+        (附加在该次运行上的任务UUID列表, 任务指纹)
+    """
+    with _runs_lock:
+        run = _COALESCED_RUNS.pop(run_task_uuid, None)
+        if run is None:
+            task_info = TASK_STATUS_STORE.get(run_task_uuid, {})
+            return [run_task_uuid], task_info.get('cache_key')
+        if run['cache_key'] and _INFLIGHT_RUNS.get(run['cache_key']) == run_task_uuid:
+            del _INFLIGHT_RUNS[run['cache_key']]
+        return run['tasks'], run['cache_key']
+
+def _get_run_status(run_task_uuid: str, since: Optional[int] = None) -> Optional[Dict]:
+    """
+    获取一次模型运行的进程状态，分片运行时返回各分片的汇总状态
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID
+        since: 进程输出起始游标
+    
+    Returns:
+        进程状态，运行不存在时返回None
+    """
+    with _shards_lock:
+        group = _SHARD_GROUPS.get(run_task_uuid)
+    if group is None:
+        return _process_manager.get_process_status(run_task_uuid, since)
+    return _get_shard_group_status(run_task_uuid, group, since)
+
+def _stop_run(run_task_uuid: str) -> bool:
+    """
+    停止一次模型运行，分片运行时停止所有未结束的分片
+    
+    Args:
+        run_task_uuid: 实际运行模型的任务UUID
+    
+    Returns:
+        是否成功停止
+    """
+    with _shards_lock:
+        group = _SHARD_GROUPS.pop(run_task_uuid, None)
+    if group is None:
+        return _process_manager.stop_process(run_task_uuid)
+    
+    # 分片组已移除，之后结束的分片不再触发合并
+    for shard in group['shards']:
+        if shard['return_code'] is None and not _process_manager.stop_process(shard['process_id']):
+            current_app.logger.warning(f"停止分片 {shard['process_id']} 失败")
+    return True
+
+def _shard_process_id(task_uuid: str, shard_index: int) -> str:
+    """
+    获取分片的进程ID
+    """
+    return f"{task_uuid}-shard-{shard_index}"
+
+def _parse_shard_process_id(process_id: str) -> Tuple[str, int]:
+    """
+    从分片的进程ID中解析任务UUID和分片序号
+    """
+    task_uuid, _, shard_index = process_id.rpartition('-shard-')
+    return task_uuid, int(shard_index)
+
+def _choose_shard_count(task_data: Dict[str, Any], input_csv_path: str) -> int:
+    """
+    确定任务的分片数
+    请求中的shard_count优先（1表示不分片）；否则输入行数不少于SHARD_MIN_ROWS时，
+    按空闲槽位数、每个分片的最小行数和SHARD_MAX_COUNT确定
+    
+    Args:
+        task_data: 任务数据
+        input_csv_path: input.csv路径
+    
+    Returns:
+        分片数，1表示不分片
+    """
+    if task_data.get('prediction_mode') not in _SHARD_MODES:
+        return 1
+    requested = task_data.get('shard_count')
+    if requested is None and not current_app.config.get('SHARD_ENABLED', True):
+        return 1
+    
+    rows = count_csv_rows(input_csv_path)
+    max_count = current_app.config.get('SHARD_MAX_COUNT') or _process_manager.get_max_processes()
+    if requested is not None:
+        return max(1, min(int(requested), rows, max_count))
+    if rows < current_app.config.get('SHARD_MIN_ROWS', 1000000):
+        return 1
+    
+    free_slots = _process_manager.get_max_processes() - _process_manager.get_running_process_count() \
+        - _process_manager.get_queued_process_count()
+    min_rows_per_shard = max(current_app.config.get('SHARD_MIN_ROWS_PER_SHARD', 250000), 1)
+    return max(1, min(free_slots, rows // min_rows_per_shard, max_count))
+
+def _start_shard_group(task_uuid: str, shard_count: int, python_exe: str, script_path: str, work_dir: str,
+                       env: Dict[str, str], model_uuid: str, tif_path: Optional[str], task_folder_path: str):
+    """
+    将input.csv按行范围拆分到任务文件夹下的shards/<序号>/中，并为每个分片提交一个模型进程
+    
+    Args:
+        task_uuid: 任务UUID
+        shard_count: 分片数
+        python_exe: Python解释器路径
+        script_path: 模型脚本路径
+        work_dir: 工作目录
+        env: 环境变量
+        model_uuid: 模型UUID
+        tif_path: tif目录
+        task_folder_path: 任务文件夹
+    """
+    shard_folders = [os.path.join(task_folder_path, 'shards', str(index)) for index in range(shard_count)]
+    for folder in shard_folders:
+        os.makedirs(folder, exist_ok=True)
+    shard_rows = split_csv_rows(os.path.join(task_folder_path, 'input.csv'),
+                                [os.path.join(folder, 'input.csv') for folder in shard_folders])
+    shards = [{
+        'shard_index': index,
+        'process_id': _shard_process_id(task_uuid, index),
+        'folder': shard_folders[index],
+        'rows': shard_rows[index],
+        'return_code': None
+    } for index in range(shard_count)]
+    
+    group = {'task_folder_path': task_folder_path, 'shards': shards, 'counters': {}}
+    with _shards_lock:
+        _SHARD_GROUPS[task_uuid] = group
+        _save_shard_manifest(group)
+    
+    resource_limits = load_resource_profile(model_uuid)
+    started = []
+    try:
+        for shard in shards:
+            cmd = [python_exe, script_path, shard['folder'], shard['folder'], tif_path or ""]
+            if not _process_manager.start_process(shard['process_id'], cmd, work_dir, env, _on_shard_complete,
+                                                  priority=PRIORITY_INTERACTIVE, log_dir=shard['folder'],
+                                                  worker_key=model_uuid,
+                                                  worker_job={
+                                                      'input_dir': shard['folder'],
+                                                      'output_dir': shard['folder'],
+                                                      'tif_path': tif_path or ''
+                                                  },
+                                                  resource_limits=resource_limits,
+                                                  result_path=os.path.join(shard['folder'], 'output.csv'),
+                                                  on_recover=_restore_shard_info):
+                raise RuntimeError(f"启动分片 {shard['process_id']} 失败")
+            started.append(shard['process_id'])
+    except Exception:
+        with _shards_lock:
+            _SHARD_GROUPS.pop(task_uuid, None)
+        for process_id in started:
+            _process_manager.stop_process(process_id)
+        raise
+
+def _save_shard_manifest(group: Dict[str, Any]):
+    """
+    将各分片的行数和返回码写入任务元信息（调用方持有_shards_lock），服务重启后据此恢复分片组
+    
+    Args:
+        group: 分片组
+    """
+    _update_task_metadata(group['task_folder_path'], {'shards': [
+        {key: shard[key] for key in ('shard_index', 'process_id', 'rows', 'return_code')}
+        for shard in group['shards']
+    ]})
+
+def _on_shard_complete(process_id: str, return_code: int):
+    """
+    分片进程结束时的回调函数
+    所有分片成功结束后按分片顺序合并output.csv；任一分片失败时停止其余分片，任务以该分片的返回码结束
+    """
+    try:
+        task_uuid, shard_index = _parse_shard_process_id(process_id)
+        with _shards_lock:
+            group = _SHARD_GROUPS.get(task_uuid)
+            if group is None:
+                # 任务已被停止或已因其他分片失败而结束
+                return
+            shard = group['shards'][shard_index]
+            shard['return_code'] = return_code
+            shard['resource_usage'] = _process_manager.get_resource_summary(process_id)
+            _save_shard_manifest(group)
+            failed = return_code != 0
+            finished = failed or all(item['return_code'] is not None for item in group['shards'])
+            if finished:
+                _SHARD_GROUPS.pop(task_uuid, None)
+        if not finished:
+            return
+        
+        if failed:
+            current_app.logger.warning(f"任务 {task_uuid} 的分片 {shard_index} 异常结束，返回码: {return_code}，停止其余分片")
+            for item in group['shards']:
+                if item['return_code'] is None:
+                    _process_manager.stop_process(item['process_id'])
+        else:
+            try:
+                output_csv_path = os.path.join(group['task_folder_path'], 'output.csv')
+                merge_csv_files([os.path.join(item['folder'], 'output.csv') for item in group['shards']],
+                                output_csv_path)
+                # 合并后删除分片的输入和输出，保留分片文件夹中的日志
+                for item in group['shards']:
+                    for filename in ('input.csv', 'output.csv'):
+                        path = os.path.join(item['folder'], filename)
+                        if os.path.exists(path):
+                            os.remove(path)
+            except Exception as e:
+                current_app.logger.error(f"合并任务 {task_uuid} 的分片输出失败: {str(e)}")
+                return_code = 1
+        
+        _on_process_complete(task_uuid, return_code, {
+            'shards': [{'shard_index': item['shard_index'], 'return_code': item['return_code'],
+                        'resource_usage': item.get('resource_usage')} for item in group['shards']]
+        })
+    except Exception as e:
+        if current_app:
+            current_app.logger.error(f"处理分片 {process_id} 结束时发生错误: {str(e)}")
+        else:
+            print(f"处理分片 {process_id} 结束时发生错误: {str(e)}")
+
+def _restore_shard_info(process_id: str, record: Dict[str, Any]):
+    """
+    服务重启后根据任务元信息中的分片记录重建分片组和任务状态
+    
+    Args:
+        process_id: 分片的进程ID
+        record: 进程管理器的任务登记记录
+    """
+    if not record.get('log_dir'):
+        return
+    task_uuid, _ = _parse_shard_process_id(process_id)
+    task_folder_path = os.path.dirname(os.path.dirname(record['log_dir']))
+    with _shards_lock:
+        if task_uuid in _SHARD_GROUPS:
+            return
+        metadata = _load_task_metadata(task_uuid, task_folder_path)
+        if not metadata.get('shards'):
+            return
+        _SHARD_GROUPS[task_uuid] = {
+            'task_folder_path': task_folder_path,
+            'shards': [dict(shard, folder=os.path.join(task_folder_path, 'shards', str(shard['shard_index'])))
+                       for shard in metadata['shards']],
+            'counters': {}
+        }
+    _restore_task_info(task_uuid, {
+        'log_dir': task_folder_path,
+        'result_path': os.path.join(task_folder_path, 'output.csv'),
+        'start_time': record.get('start_time')
+    })
+
+def _get_shard_group_status(task_uuid: str, group: Dict[str, Any], since: Optional[int]) -> Dict[str, Any]:
+    """
+    汇总各分片的进程状态和已写出的行数
+    各分片的进程输出不合并，可通过分片的进程ID单独查询
+    
+    Args:
+        task_uuid: 任务UUID
+        group: 分片组
+        since: 进程输出起始游标（分片运行时没有合并的输出，原样返回）
+    
+    Returns:
+        与进程状态格式一致的汇总状态，另含shards、total_rows和completed_rows；
+        status为queued、running、completed、failed、stopped或timeout
+    """
+    shards = []
+    for shard in group['shards']:
+        # 游标取最大值，只读取状态不读取输出
+        process_status = _process_manager.get_process_status(shard['process_id'], sys.maxsize) or {}
+        counter = group['counters'].get(shard['shard_index'])
+        if counter is None:
+            counter = group['counters'].setdefault(shard['shard_index'],
+                                                   CsvRowCounter(os.path.join(shard['folder'], 'output.csv')))
+        completed_rows = shard['rows'] if shard['return_code'] == 0 else min(counter.poll(), shard['rows'])
+        shards.append({
+            'shard_index': shard['shard_index'],
+            'process_id': shard['process_id'],
+            'status': process_status.get('status', 'completed' if shard['return_code'] == 0 else None),
+            'return_code': shard['return_code'],
+            'total_rows': shard['rows'],
+            'completed_rows': completed_rows,
+            'queue_position': process_status.get('queue_position'),
+            'start_time': process_status.get('start_time'),
+            'end_time': process_status.get('end_time'),
+            'log_cursor': process_status.get('log_cursor')
+        })
+    
+    # 任一分片异常结束时为failed（其余分片随后被停止），被停止或超时时为stopped / timeout，都成功结束时为completed
+    statuses = [shard['status'] for shard in shards]
+    if any(shard['return_code'] not in (None, 0) and shard['status'] not in ('stopped', 'timeout') or
+           shard['status'] == 'failed' for shard in shards):
+        status = 'failed'
+    elif 'stopped' in statuses:
+        status = 'stopped'
+    elif 'timeout' in statuses:
+        status = 'timeout'
+    elif all(shard['return_code'] == 0 for shard in shards):
+        status = 'completed'
+    elif all(status == 'queued' for status in statuses):
+        status = 'queued'
+    else:
+        status = 'running'
+    queued = [shard for shard in shards if shard['status'] == 'queued' and shard['queue_position'] is not None]
+    estimated_wait_seconds = None
+    if queued:
+        estimates = [(_process_manager.get_process_status(shard['process_id'], sys.maxsize) or {})
+                     .get('estimated_wait_seconds') for shard in queued]
+        estimates = [estimate for estimate in estimates if estimate is not None]
+        estimated_wait_seconds = max(estimates) if estimates else None
+    start_times = [shard['start_time'] for shard in shards if shard['start_time']]
+    return {
+        'process_id': task_uuid,
+        'status': status,
+        'start_time': min(start_times) if start_times else '',
+        'queue_position': min(shard['queue_position'] for shard in queued) if queued else None,
+        'estimated_wait_seconds': estimated_wait_seconds,
+        'stdout': '',
+        'stderr': '',
+        'log_cursor': since or 0,
+        'shard_count': len(shards),
+        'shards': shards,
+        'total_rows': sum(shard['total_rows'] for shard in shards),
+        'completed_rows': sum(shard['completed_rows'] for shard in shards),
+        'running_count': _process_manager.get_running_process_count(),
+        'queued_count': _process_manager.get_queued_process_count(),
+        'max_processes': _process_manager.get_max_processes()
+    }
+
+def _task_status_snapshot(task_info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    获取推送给事件流的任务状态（不含结果内容）
+    
+    Args:
+        task_info: 任务状态
+    
+    Returns:
+        任务状态摘要
+    """
+    return {
+        'task_uuid': task_info['task_uuid'],
+        'status': task_info['status'],
+        'message': task_info.get('message'),
+        'prediction_mode': task_info.get('prediction_mode'),
+        'start_time': task_info.get('start_time'),
+        'end_time': task_info.get('end_time'),
+        'run_task_uuid': task_info.get('run_task_uuid'),
+        'cache_hit': task_info.get('cache_hit', False)
+    }
+
+def _publish_task_status(task_uuid: str):
+    """
+    向事件流发布任务的当前状态
+    
+    Args:
+        task_uuid: 任务UUID
+    """
+    task_info = TASK_STATUS_STORE.get(task_uuid)
+    if task_info is not None:
+        _task_events.publish(task_uuid, 'status', _task_status_snapshot(task_info))
+
+# 写入任务状态的进程状态字段（process_snapshot），其他服务进程查询时使用；不含每次查询都变化的字段（资源占用、预计等待时间）
+_SNAPSHOT_FIELDS = ('process_id', 'status', 'priority', 'execution_mode', 'submit_time', 'start_time', 'end_time',
+                    'return_code', 'log_cursor', 'log_total_lines', 'log_file', 'stop_report', 'queue_position',
+                    'shard_count', 'shards', 'total_rows', 'completed_rows')
+
+def _current_owner() -> str:
+    """
+    获取当前服务进程的任务所有者标识
+
+    Returns:
+        "主机名/进程ID:启动时间"
+    """
+    return f"{socket.gethostname()}/{process_group.owner_id()}"
+
+def _is_task_owner(task_info: Dict[str, Any]) -> bool:
+    """
+    判断任务是否由当前服务进程运行（模型进程、进程输出和事件推送都在该进程中）
+    
+    Args:
+        task_info: 任务状态
+    
+    Returns:
+        没有记录所有者（早期版本创建）或所有者为当前进程时返回True
+    """
+    owner = task_info.get('owner')
+    return owner is None or owner == _current_owner()
+
+def _refresh_process_snapshot(task_uuid: str, task_info: Dict[str, Any]):
+    """
+    将运行中任务的进程状态和最新输出写入任务状态，由任务状态存储的后台线程定期调用
+    
+    Args:
+        task_uuid: 任务UUID
+        task_info: 任务状态（原地修改）
+    """
+    if task_info.get('status') != OnlineDeductionStatus.IN_PROGRESS.value or not _is_task_owner(task_info):
+        return
+    run_task_uuid = task_info.get('run_task_uuid') or task_uuid
+    with _shards_lock:
+        group = _SHARD_GROUPS.get(run_task_uuid)
+    if group is None:
+        process_status = _process_manager.get_process_status(run_task_uuid, sys.maxsize)
+        log_lines = _process_manager.get_log_tail(run_task_uuid, current_app.config['TASK_SNAPSHOT_LOG_LINES'])
+    else:
+        process_status = _get_shard_group_status(run_task_uuid, group, None)
+        log_lines = None
+    if process_status is None:
+        return
+    snapshot = {key: process_status[key] for key in _SNAPSHOT_FIELDS if key in process_status}
+    snapshot['log_lines'] = log_lines or []
+    task_info['process_snapshot'] = snapshot
+
+def _handle_stop_request(task_uuid: str):
+    """
+    处理其他服务进程转发的停止请求
+    
+    Args:
+        task_uuid: 任务UUID
+    """
+    result, error = stop_task_service(task_uuid)
+    if error:
+        current_app.logger.warning(f"处理转发的停止请求失败: {error}")
+
+TASK_STATUS_STORE.set_hooks(on_tick=_refresh_process_snapshot, on_stop_request=_handle_stop_request)
+
+def _get_task_process_status(task_uuid: str, task_info: Dict[str, Any], since: Optional[int]) -> Optional[Dict]:
+    """
+    获取任务的进程状态：任务在当前服务进程中运行时直接查询，否则使用所有者写入的process_snapshot
+    
+    Args:
+        task_uuid: 任务UUID
+        task_info: 任务状态
+        since: 进程输出起始游标
+    
+    Returns:
+        进程状态，没有时返回None；来自快照时只包含最近TASK_SNAPSHOT_LOG_LINES行输出，owner为任务所在的服务进程
+    """
+    if _is_task_owner(task_info):
+        # 合并运行的任务使用实际运行模型的任务的进程状态，分片运行的任务返回各分片的进度
+        return _get_run_status(task_info.get('run_task_uuid') or task_uuid, since)
+    snapshot = task_info.get('process_snapshot')
+    # 任务结束后快照不再更新
+    if not snapshot or task_info['status'] != OnlineDeductionStatus.IN_PROGRESS.value:
+        return None
+    process_status = {key: value for key, value in snapshot.items() if key != 'log_lines'}
+    lines = [line for line in snapshot['log_lines'] if since is None or line[0] >= since]
+    first_cursor = snapshot['log_lines'][0][0] if snapshot['log_lines'] else snapshot.get('log_cursor', 0)
+    process_status.update({
+        'stdout': '\n'.join(line[2] for line in lines if line[1] == 'stdout'),
+        'stderr': '\n'.join(line[2] for line in lines if line[1] == 'stderr'),
+        'log_cursor': snapshot.get('log_cursor', since or 0),
+        'log_truncated': since is not None and since < first_cursor,
+        'estimated_wait_seconds': None,
+        'owner': task_info['owner']
+    })
+    return process_status
+
+def _save_resource_usage_to_metadata(task_folder_path: Optional[str], resource_usage: Optional[Dict]):
+    """
+    将资源占用汇总写入任务文件夹中的task_metadata.json
+    
+    Args:
+        task_folder_path: 任务文件夹路径
+        resource_usage: 资源占用汇总
+    """
+    if resource_usage is None:
+        return
+    _update_task_metadata(task_folder_path, {'resource_usage': resource_usage})
+
+def _update_task_metadata(task_folder_path: Optional[str], updates: Dict[str, Any]):
+    """
+    更新任务文件夹中task_metadata.json的字段
+    
+    Args:
+        task_folder_path: 任务文件夹路径
+        updates: 要写入的字段
+    """
+    if not task_folder_path:
+        return
+    metadata_file_path = os.path.join(task_folder_path, 'task_metadata.json')
+    try:
+        with open(metadata_file_path, 'r', encoding='utf-8') as f:
+            task_metadata = json.load(f)
+        task_metadata.update(updates)
+        with open(metadata_file_path, 'w', encoding='utf-8') as f:
+            json.dump(task_metadata, f, indent=2, ensure_ascii=False)
+    except Exception as e:
+        current_app.logger.warning(f"写入任务元信息失败: {str(e)}")
+
+def _get_result_file_info(output_csv_path: str) -> Dict[str, Any]:
+    """
+    获取结果文件的大小和数据行数
+    
+    Args:
+        output_csv_path: output.csv路径
+    
+    Returns:
+        {'result_size_bytes': 字节数, 'result_rows': 数据行数}
+    """
+    return {
+        'result_size_bytes': os.path.getsize(output_csv_path) if os.path.exists(output_csv_path) else 0,
+        'result_rows': count_csv_rows(output_csv_path)
+    }
+
+def _get_gzip_result_path(output_csv_path: str) -> str:
+    """
+    获取结果文件的gzip压缩版本，首次下载时生成并保存在output.csv旁边，结果文件更新后重新生成
+    
+    Args:
+        output_csv_path: output.csv路径
+    
+    Returns:
+        output.csv.gz路径
+    """
+    gzip_path = output_csv_path + '.gz'
+    if os.path.exists(gzip_path) and os.path.getmtime(gzip_path) >= os.path.getmtime(output_csv_path):
+        return gzip_path
+    
+    # 先写入临时文件再原子替换，并发下载时不会读到写了一半的文件
+    temp_path = f"{gzip_path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(output_csv_path, 'rb') as src, gzip.open(temp_path, 'wb', compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(temp_path, gzip_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return gzip_path
+
 def get_online_models_by_task_type_service(task_type: str) -> Tuple[List[Dict], Optional[str]]:
     """
     根据任务类型获取可用的在线推演模型列表
@@ -161,102 +932,55 @@ def load_typical_scenario_by_uuid(scenario_uuid: str) -> Tuple[Optional[Dict], O
         if not os.path.exists(base_dir):
             return None, f"Typical scenarios directory not found"
         
-        # 查找匹配的场景目录
-        scenario_dir = None
-        scenario_info = None
-        
-        for item in os.listdir(base_dir):
-            item_path = os.path.join(base_dir, item)
-            if os.path.isdir(item_path):
-                # 检查元数据文件
-                metadata_file = os.path.join(item_path, "scenario_metadata.json")
-                if os.path.exists(metadata_file):
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        
-                        # 检查UUID是否匹配
-                        if metadata.get("scenario_uuid") == scenario_uuid:
-                            scenario_dir = item_path
-                            scenario_info = metadata
-                            break
-                    except Exception as e:
-                        current_app.logger.warning(f"Failed to read metadata for {item}: {e}")
-                        continue
-        
-        if not scenario_dir:
+        # 通过场景目录索引查找匹配的场景目录
+        entry = ScenarioCatalog().get_by_uuid(base_dir, scenario_uuid)
+        if not entry:
             return None, f"Typical scenario with UUID '{scenario_uuid}' not found"
+        scenario_dir = entry['directory']
+        scenario_info = entry['metadata']
         
         # 读取input.csv文件
         input_csv_path = os.path.join(scenario_dir, "input.csv")
         if not os.path.exists(input_csv_path):
             return None, f"Input CSV file not found for scenario '{scenario_uuid}'"
         
-        tx_pos_list = []
-        rx_pos_list = []
-        
-        # 读取CSV文件
-        with open(input_csv_path, 'r', encoding='utf-8') as csvfile:
-            csv_reader = csv.reader(csvfile)
-            for row in csv_reader:
-                # 跳过空行
-                if not row or len(row) < 6:
-                    continue
-                
-                try:
-                    # 假设CSV格式为：tx_lat, tx_lon, tx_height, rx_lat, rx_lon, rx_height
-                    # 如果第一行是标题行（包含非数字），跳过
-                    tx_lat = float(row[0])
-                    tx_lon = float(row[1]) 
-                    tx_height = float(row[2])
-                    rx_lat = float(row[3])
-                    rx_lon = float(row[4])
-                    rx_height = float(row[5])
-                    
-                    tx_pos = {
-                        'lat': tx_lat,
-                        'lon': tx_lon,
-                        'height': tx_height
-                    }
-                    rx_pos = {
-                        'lat': rx_lat,
-                        'lon': rx_lon,
-                        'height': rx_height
-                    }
-                    
-                    # 避免重复添加相同的发射机位置
-                    if tx_pos not in tx_pos_list:
-                        tx_pos_list.append(tx_pos)
-                    # 避免重复添加相同的接收机位置  
-                    if rx_pos not in rx_pos_list:
-                        rx_pos_list.append(rx_pos)
-                        
-                except (ValueError, IndexError) as e:
-                    # 可能是标题行或无效数据，跳过
-                    current_app.logger.debug(f"Skipping row in CSV: {row}, error: {e}")
-                    continue
+        # 优先使用添加场景时预编译的二进制形式（去重后的发射机/接收机位置），
+        # 旧场景或input.csv已变化时解析CSV并重新编译，下次创建任务时直接加载
+        compiled = load_compiled_scenario(scenario_dir, input_csv_path)
+        if compiled is None:
+            try:
+                compile_scenario_csv(input_csv_path, scenario_dir)
+                compiled = load_compiled_scenario(scenario_dir, input_csv_path)
+            except Exception as e:
+                current_app.logger.warning(f"Failed to compile typical scenario '{scenario_uuid}': {e}")
+        if compiled is not None:
+            tx_pos_list = positions_to_list(compiled['tx'])
+            rx_pos_list = positions_to_list(compiled['rx'])
+            scenario_stats = compiled['stats']
+            # 释放内存映射，避免文件在Windows下被占用无法删除
+            del compiled
+        else:
+            tx_list, rx_list, pairs, skipped_rows = parse_scenario_csv(input_csv_path)
+            tx_pos_list = [{'lat': lat, 'lon': lon, 'height': height} for lat, lon, height in tx_list]
+            rx_pos_list = [{'lat': lat, 'lon': lon, 'height': height} for lat, lon, height in rx_list]
+            scenario_stats = {'rows': len(pairs), 'tx_count': len(tx_list), 'rx_count': len(rx_list),
+                              'skipped_rows': skipped_rows}
         
         if not tx_pos_list or not rx_pos_list:
             return None, f"No valid position data found in scenario '{scenario_uuid}'"
         
-        # 读取CSV文件内容作为字符串
-        csv_content = ""
-        try:
-            with open(input_csv_path, 'r', encoding='utf-8') as csvfile:
-                csv_content = csvfile.read()
-        except Exception as e:
-            current_app.logger.warning(f"Failed to read CSV content as string for scenario '{scenario_uuid}': {e}")
-            csv_content = ""
-        
+        # 原始CSV不读入内存：态势预测时直接复制为任务的input.csv，其他模式只使用去重后的位置
         point_config = {
             'tx_pos_list': tx_pos_list,
             'rx_pos_list': rx_pos_list,
             'scenario_source': f"typical_scenario:{scenario_uuid}",
             'scenario_info': scenario_info,
-            'csv_content': csv_content  # 添加CSV文件的字符串内容
+            'scenario_stats': scenario_stats,
+            'scenario_csv_path': input_csv_path
         }
         
-        current_app.logger.info(f"Loaded typical scenario '{scenario_uuid}': {len(tx_pos_list)} TX, {len(rx_pos_list)} RX")
+        current_app.logger.info(f"Loaded typical scenario '{scenario_uuid}': {len(tx_pos_list)} TX, {len(rx_pos_list)} RX, "
+                                f"{scenario_stats['rows']} rows")
         return point_config, None
         
     except Exception as e:
@@ -264,6 +988,26 @@ def load_typical_scenario_by_uuid(scenario_uuid: str) -> Tuple[Optional[Dict], O
         return None, f"Failed to load typical scenario: {str(e)}"
 
 
+def _read_scenario_csv(scenario_csv_path: Optional[str]) -> str:
+    """
+    读取典型场景的CSV内容（只在构建响应时读取一次，不保存在任务状态中）
+    
+    Args:
+        scenario_csv_path: 典型场景的input.csv路径
+    
+    Returns:
+        CSV文件的字符串内容，读取失败时为空字符串
+    """
+    if not scenario_csv_path:
+        return ""
+    try:
+        with open(scenario_csv_path, 'r', encoding='utf-8') as csvfile:
+            return csvfile.read()
+    except Exception as e:
+        current_app.logger.warning(f"Failed to read CSV content as string from '{scenario_csv_path}': {e}")
+        return ""
+
+
 def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[Dict], Optional[str]]:
     """
     创建预测任务
@@ -280,6 +1024,9 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
         for field in required_fields:
             if field not in task_data:
                 return None, f"Missing required field: {field}"
+        # 任务表的model_uuid为非空外键，缺少时任务状态无法持久化
+        if not isinstance(task_data['model_uuid'], str) or not task_data['model_uuid'].strip():
+            return None, "model_uuid must be a non-empty string"
 
         # 验证预测模式
         valid_modes = ["point", "link", "situation", "small_scale"]
@@ -293,6 +1040,12 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
         if scenario_type not in valid_scenario_types:
             return None, f"Invalid scenario_type. Must be one of: {', '.join(valid_scenario_types)}"
 
+        # 验证分片数（可选，1表示不分片）
+        shard_count = task_data.get('shard_count')
+        if shard_count is not None and (isinstance(shard_count, bool) or not isinstance(shard_count, int)
+                                        or shard_count < 1):
+            return None, "shard_count must be a positive integer"
+
         # 获取原始point_config
         original_point_config = task_data['point_config']
         if not isinstance(original_point_config, dict):
@@ -354,10 +1107,7 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
         task_folder_name = f"ONLINE-DEDUCTION-{task_uuid}"
         
         # 创建任务文件夹
-        task_folder_path = os.path.join(
-            current_app.config.get('TASK_OUTPUT_DIR', 'storage/tasks'),
-            task_folder_name
-        )
+        task_folder_path = _get_task_folder_path(task_uuid)
         os.makedirs(task_folder_path, exist_ok=True)
         
         # 生成input.csv文件
@@ -367,13 +1117,12 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
         if prediction_mode in ["point", "link", "small_scale"]:
             # 生成发射机-接收机配对的CSV文件
             csv_generation_error = _generate_tx_rx_pairs_csv_to_path(point_config, input_csv_path, task_data.get('param_config'))
-        elif scenario_type == "typical_scenario" and 'csv_content' in point_config:
-            # 直接使用典型场景的CSV内容
+        elif scenario_type == "typical_scenario" and point_config.get('scenario_csv_path'):
+            # 直接复制典型场景的input.csv
             try:
-                with open(input_csv_path, 'w', encoding='utf-8') as f:
-                    f.write(point_config['csv_content'])
+                shutil.copyfile(point_config['scenario_csv_path'], input_csv_path)
             except Exception as e:
-                csv_generation_error = f"Failed to write typical scenario CSV: {str(e)}"
+                csv_generation_error = f"Failed to copy typical scenario CSV: {str(e)}"
         
         if csv_generation_error:
             # 清理已创建的文件夹
@@ -418,19 +1167,23 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
             'created_at': datetime.now().isoformat(),
             'start_time': None,
             'end_time': None,
-            'result_csv_content': None,
             'input_csv_path': input_csv_path,
             'metadata_file_path': metadata_file_path,
-            'model_uuid': task_data.get('model_uuid')
+            'model_uuid': task_data.get('model_uuid'),
+            'owner': _current_owner()
         }
         
-        # 如果是典型场景，保存相关信息
-        if scenario_type == "typical_scenario" and 'csv_content' in point_config:
-            task_info["scenario_csv_content"] = point_config['csv_content']
+        # 如果是典型场景，保存场景元信息和CSV路径（CSV内容不保存在任务状态中，返回时从该路径读取）
+        if scenario_type == "typical_scenario":
+            task_info["scenario_csv_path"] = point_config.get('scenario_csv_path')
             task_info["scenario_info"] = point_config.get('scenario_info', {})
         
-        # 存储任务状态
-        TASK_STATUS_STORE[task_uuid] = task_info
+        # 存储任务状态（立即写入数据库，其他服务进程可查询）；
+        # 任务表中保存请求中的点位配置，典型场景展开后的发射机/接收机位置已写入input.csv，只另存行数和范围统计
+        stored_point_config = dict(original_point_config)
+        if scenario_type == "typical_scenario":
+            stored_point_config['scenario_stats'] = point_config.get('scenario_stats')
+        TASK_STATUS_STORE.create(task_uuid, task_info, stored_point_config, task_data.get('param_config'))
         
         try:
             # 实际启动模型运行
@@ -442,6 +1195,7 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
             task_info['status'] = OnlineDeductionStatus.ABORTED.value
             task_info['message'] = f"启动失败: {str(e)}"
             TASK_STATUS_STORE[task_uuid] = task_info
+        _publish_task_status(task_uuid)
         
         # 构建返回结果
         result = {
@@ -454,9 +1208,10 @@ def create_prediction_task_service(task_data: Dict[str, Any]) -> Tuple[Optional[
             "message": task_info['message']
         }
         
-        # 如果是典型场景，返回CSV内容
-        if scenario_type == "typical_scenario" and 'csv_content' in point_config:
-            result["scenario_csv_content"] = point_config['csv_content']
+        # 如果是典型场景，返回CSV内容（请求中include_scenario_csv为false时不返回）
+        if scenario_type == "typical_scenario":
+            if task_data.get('include_scenario_csv', True):
+                result["scenario_csv_content"] = _read_scenario_csv(point_config.get('scenario_csv_path'))
             result["scenario_info"] = point_config.get('scenario_info', {})
         
         current_app.logger.info(f"Created prediction task {task_uuid} in folder {task_folder_name}")
@@ -488,32 +1243,15 @@ def _generate_tx_rx_pairs_csv_to_path(point_config: Dict[str, Any], csv_file_pat
         if not tx_pos_list or not rx_pos_list:
             return "tx_pos_list and rx_pos_list are required"
         
-        # 获取频率参数（默认为5.9GHz对应的数值）
-        frequency = 5900  # 默认5.9GHz，单位MHz
-        if param_config and 'frequency_band' in param_config:
-            freq_str = param_config['frequency_band']
-            # 简单解析频率字符串，如"5.9GHz"
-            if 'GHz' in freq_str:
-                freq_val = float(freq_str.replace('GHz', '').strip())
-                frequency = int(freq_val * 1000)  # 转换为MHz
-        
-        # 写入CSV文件
-        with open(csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
-            csv_writer = csv.writer(csvfile)
-            # 生成所有发射机-接收机配对
-            for tx_pos in tx_pos_list:
-                for rx_pos in rx_pos_list:
-                    # 按照main.py期望的格式：tx_lat, tx_lon, tx_height, rx_lat, rx_lon, rx_height, frequency
-                    row = [
-                        tx_pos.get('lat', 0),      # 发射机纬度
-                        tx_pos.get('lon', 0),      # 发射机经度
-                        tx_pos.get('height', 0),   # 发射机高度
-                        rx_pos.get('lat', 0),      # 接收机纬度
-                        rx_pos.get('lon', 0),      # 接收机经度  
-                        rx_pos.get('height', 0),   # 接收机高度
-                        frequency                   # 频率（MHz）
-                    ]
-                    csv_writer.writerow(row)
+        # 获取频率参数（默认为5.9GHz对应的数值，单位MHz）
+        try:
+            frequency = get_frequency_from_params(param_config)
+        except ValueError as e:
+            return str(e)
+        
+        # 按块生成所有发射机-接收机配对并写入CSV文件
+        # 按照main.py期望的格式：tx_lat, tx_lon, tx_height, rx_lat, rx_lon, rx_height, frequency
+        write_pairs_csv(csv_file_path, tx_pos_list, rx_pos_list, frequency)
         
         current_app.logger.info(f"Generated CSV file: {csv_file_path}")
         return None
@@ -526,6 +1264,9 @@ def _generate_tx_rx_pairs_csv_to_path(point_config: Dict[str, Any], csv_file_pat
 def _run_prediction_model(task_uuid: str, task_data: Dict[str, Any], point_config: Dict[str, Any], task_folder_path: str) -> Dict[str, Any]:
     """
     实际运行预测模型
+    
+    Returns:
+        需要写入任务状态的字段；合并到已有运行时为空字典（状态已由_attach_to_run写入）
     """
     try:
         model_uuid = task_data.get('model_uuid')
@@ -594,6 +1335,60 @@ def _run_prediction_model(task_uuid: str, task_data: Dict[str, Any], point_confi
             # 添加一个默认的空字符串，避免参数缺失
             cmd.append("")
         
+        # 相同模型版本、输入、tif目录和参数的任务直接使用缓存结果
+        cache_key = _result_cache.build_key(model_uuid, input_csv_path, tif_path,
+                                            task_data.get('param_config'), task_data.get('prediction_mode'))
+        if cache_key:
+            _update_task_metadata(task_folder_path, {'cache_key': cache_key})
+            if task_uuid in TASK_STATUS_STORE:
+                TASK_STATUS_STORE[task_uuid]['cache_key'] = cache_key
+            if _result_cache.get(cache_key, output_csv_path):
+                current_app.logger.info(f"预测任务 {task_uuid} 命中结果缓存 {cache_key}")
+                _update_task_metadata(task_folder_path, {'cache_hit': True})
+                now = datetime.now().isoformat()
+                result = {
+                    'status': OnlineDeductionStatus.COMPLETED.value,
+                    'message': '任务完成（结果缓存）',
+                    'start_time': now,
+                    'end_time': now,
+                    'output_csv_path': output_csv_path,
+                    'cache_key': cache_key,
+                    'cache_hit': True
+                }
+                result.update(_get_result_file_info(output_csv_path))
+                return result
+            
+            # 相同的任务正在排队或运行时附加到该次运行上，共享状态和output.csv；
+            # 运行状态已由_attach_to_run写入，不再返回，避免覆盖该次运行在此期间结束时写入的状态
+            run_task_uuid = _attach_to_run(cache_key, task_uuid)
+            if run_task_uuid:
+                current_app.logger.info(f"预测任务 {task_uuid} 合并到正在运行的任务 {run_task_uuid}")
+                _update_task_metadata(task_folder_path, {'run_task_uuid': run_task_uuid})
+                return {}
+        
+        # 输入行数较多时拆分为多个分片，在空闲槽位上并行运行
+        shard_count = _choose_shard_count(task_data, input_csv_path)
+        if shard_count > 1:
+            current_app.logger.info(f"启动预测任务 {task_uuid}，拆分为{shard_count}个分片")
+            _register_run(task_uuid, cache_key)
+            try:
+                _start_shard_group(task_uuid, shard_count, python_exe, script_path, work_dir, env,
+                                   model_uuid, tif_path, task_folder_path)
+            except Exception:
+                _fail_run(task_uuid)
+                raise
+            return {
+                'status': OnlineDeductionStatus.IN_PROGRESS.value,
+                'message': f"任务已拆分为{shard_count}个分片运行",
+                'start_time': datetime.now().isoformat(),
+                'output_csv_path': output_csv_path,
+                'run_task_uuid': task_uuid,
+                'cache_key': cache_key,
+                'cache_hit': False,
+                'shard_count': shard_count,
+                'work_dir': work_dir
+            }
+        
         current_app.logger.info(f"启动预测任务 {task_uuid}")
         current_app.logger.info(f"任务文件夹: {task_folder_path}")
         current_app.logger.info(f"Python解释器: {python_exe}")
@@ -605,16 +1400,38 @@ def _run_prediction_model(task_uuid: str, task_data: Dict[str, Any], point_confi
         current_app.logger.info(f"完整命令: {' '.join(cmd)}")
         
         # 启动进程
-        if _process_manager.start_process(task_uuid, cmd, work_dir, env, _on_process_complete):
+        _register_run(task_uuid, cache_key)
+        try:
+            started = _process_manager.start_process(task_uuid, cmd, work_dir, env, _on_process_complete,
+                                                     priority=PRIORITY_INTERACTIVE, log_dir=task_folder_path,
+                                                     worker_key=model_uuid,
+                                                     worker_job={
+                                                         'input_dir': task_folder_path,
+                                                         'output_dir': task_folder_path,
+                                                         'tif_path': tif_path or ''
+                                                     },
+                                                     resource_limits=load_resource_profile(model_uuid),
+                                                     result_path=output_csv_path,
+                                                     on_recover=_restore_task_info)
+        except Exception:
+            _fail_run(task_uuid)
+            raise
+        if started:
+            process_status = _process_manager.get_process_status(task_uuid)
+            queued = process_status['status'] == 'queued'
             return {
                 'status': OnlineDeductionStatus.IN_PROGRESS.value,
-                'message': '任务已启动',
+                'message': f"任务排队中，前方还有{process_status['queue_position'] - 1}个任务" if queued else '任务已启动',
                 'start_time': datetime.now().isoformat(),
                 'output_csv_path': output_csv_path,
+                'run_task_uuid': task_uuid,
+                'cache_key': cache_key,
+                'cache_hit': False,
                 'command': ' '.join(cmd),
                 'work_dir': work_dir
             }
         else:
+            _fail_run(task_uuid)
             raise RuntimeError("启动预测任务失败")
             
     except Exception as e:
@@ -622,9 +1439,15 @@ def _run_prediction_model(task_uuid: str, task_data: Dict[str, Any], point_confi
         raise e
 
 
-def get_task_status_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
+def get_task_status_service(task_uuid: str, since: Optional[int] = None,
+                            include_scenario_csv: bool = True) -> Tuple[Optional[Dict], Optional[str]]:
     """
     获取任务状态
+    
+    Args:
+        task_uuid: 任务UUID
+        since: 进程输出起始游标，只返回该游标之后的输出
+        include_scenario_csv: 典型场景任务是否返回场景的CSV内容（scenario_csv_content）
     """
     try:
         if task_uuid not in TASK_STATUS_STORE:
@@ -632,11 +1455,16 @@ def get_task_status_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[st
         
         task_info = TASK_STATUS_STORE[task_uuid].copy()
         
-        # 获取进程状态
-        process_status = _process_manager.get_process_status(task_uuid)
+        # 获取进程状态（任务在其他服务进程中运行时使用该进程写入的快照）
+        process_status = _get_task_process_status(task_uuid, task_info, since)
+        task_info.pop('process_snapshot', None)
         if process_status:
             task_info['process_status'] = process_status
         
+        # 典型场景的CSV内容只在返回时从场景文件读取
+        if include_scenario_csv and task_info.get('scenario_csv_path'):
+            task_info['scenario_csv_content'] = _read_scenario_csv(task_info['scenario_csv_path'])
+        
         return task_info, None
         
     except Exception as e:
@@ -644,9 +1472,17 @@ def get_task_status_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[st
         return None, f"Error getting task status: {str(e)}"
 
 
-def get_task_result_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
+def get_task_result_service(task_uuid: str, offset: Optional[int] = None,
+                            limit: Optional[int] = None) -> Tuple[Optional[Dict], Optional[str]]:
     """
     获取任务结果
+    结果从磁盘读取：指定limit时分页返回数据行，否则在结果不超过RESULT_INLINE_MAX_BYTES时返回完整的CSV内容，
+    更大的结果只返回文件信息和下载地址
+    
+    Args:
+        task_uuid: 任务UUID
+        offset: 分页读取的起始行号（不含表头）
+        limit: 分页读取的行数，为None时不分页
     """
     try:
         if task_uuid not in TASK_STATUS_STORE:
@@ -657,13 +1493,39 @@ def get_task_result_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[st
         # 检查任务状态
         if task_info['status'] == OnlineDeductionStatus.COMPLETED.value:
             # 任务完成，返回结果
+            output_csv_path = task_info.get('output_csv_path') or ''
             result = {
                 'task_uuid': task_uuid,
                 'status': task_info['status'],
                 'message': task_info['message'],
-                'result_csv_content': task_info.get('result_csv_content', ''),
-                'completed_at': task_info.get('end_time')
+                'completed_at': task_info.get('end_time'),
+                'result_size_bytes': task_info.get('result_size_bytes', 0),
+                'total_rows': task_info.get('result_rows', 0),
+                'download_url': f"/api/v1/online_deduction/tasks/{task_uuid}/result/download"
             }
+            if limit is not None:
+                # 分页读取数据行
+                start = max(offset or 0, 0)
+                count = min(max(limit, 0), current_app.config.get('RESULT_PAGE_MAX_ROWS', 5000))
+                page = read_csv_page(output_csv_path, start, count)
+                result.update({
+                    'header': page['header'],
+                    'rows': page['rows'],
+                    'offset': start,
+                    'next_offset': page['next_index'],
+                    'has_more': page['has_more']
+                })
+            elif result['result_size_bytes'] <= current_app.config.get('RESULT_INLINE_MAX_BYTES', 1024 * 1024):
+                result_csv_content = ''
+                if os.path.exists(output_csv_path):
+                    with open(output_csv_path, 'r', encoding='utf-8') as f:
+                        result_csv_content = f.read()
+                result['result_csv_content'] = result_csv_content
+                result['result_csv_inline'] = True
+            else:
+                # 结果过大，通过download_url下载或使用offset/limit分页读取
+                result['result_csv_content'] = None
+                result['result_csv_inline'] = False
             return result, None
         elif task_info['status'] == OnlineDeductionStatus.IN_PROGRESS.value:
             # 任务进行中
@@ -688,6 +1550,182 @@ def get_task_result_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[st
         return None, f"Error getting task result: {str(e)}"
 
 
+def get_situation_heatmap_service(task_uuid: str, lod: Dict[str, Any],
+                                  matrix_format: str = MATRIX_FORMAT_JSON) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    获取态势预测结果的热力图网格
+    output.csv按接收点的经纬度排列为网格后缓存（文件未变化时不重新读取），按lod参数返回多级分辨率金字塔中的一级或显示区域
+    
+    Args:
+        task_uuid: 任务UUID
+        lod: 多级分辨率参数（level、max_cells、pool、window），见parse_lod_params
+        matrix_format: values的返回格式（json、base64或binary）
+    
+    Returns:
+        (result, error_message)
+    """
+    try:
+        if task_uuid not in TASK_STATUS_STORE:
+            return None, f"Task {task_uuid} not found"
+        
+        task_info = TASK_STATUS_STORE[task_uuid]
+        if task_info.get('prediction_mode') != 'situation':
+            return None, f"Task {task_uuid} is not a situation prediction task"
+        if task_info['status'] != OnlineDeductionStatus.COMPLETED.value:
+            return None, f"Task {task_uuid} result is not ready, status: {task_info['status']}"
+        
+        output_csv_path = task_info.get('output_csv_path') or ''
+        grid = MatrixCache().get(output_csv_path, _load_situation_grid)
+        if grid is None:
+            return None, f"Result file of task {task_uuid} not found"
+        
+        matrix, lod_info = grid.view(**lod)
+        row_start, col_start = lod_info['window'][:2]
+        origin, cell_size = grid.attrs['grid_origin'], grid.attrs['cell_size_deg']
+        return {
+            'task_uuid': task_uuid,
+            'status': task_info['status'],
+            'prediction_mode': 'situation',
+            'result': {
+                'heatmap_data_type': 'grid',
+                # 显示区域第一个单元的经纬度；第0行为纬度最小的一行
+                'grid_origin': {
+                    'lat': origin['lat'] + row_start * cell_size['lat_delta'],
+                    'lon': origin['lon'] + col_start * cell_size['lon_delta']
+                },
+                'cell_size_deg': {
+                    'lat_delta': cell_size['lat_delta'] * lod_info['factor'],
+                    'lon_delta': cell_size['lon_delta'] * lod_info['factor']
+                },
+                'rows': matrix.shape[0],
+                'cols': matrix.shape[1],
+                'values': matrix.encode(matrix_format),
+                'value_unit': 'dB',
+                'samples': grid.attrs['samples'],
+                'binned': grid.attrs['binned'],
+                'lod': lod_info
+            }
+        }, None
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting situation heatmap: {str(e)}")
+        return None, f"Error getting situation heatmap: {str(e)}"
+
+
+def _load_situation_grid(output_csv_path: str) -> Optional[CachedMatrix]:
+    """
+    将态势预测的output.csv（每行一个接收点的路径损耗）按经纬度排列为网格：
+    行按纬度从小到大、列按经度从小到大排列，没有结果的单元为NaN；
+    同一接收点有多个结果（多个发射机）时取最小的路径损耗（最强的链路）
+    
+    Args:
+        output_csv_path: output.csv路径
+    
+    Returns:
+        网格矩阵，attrs中包含grid_origin、cell_size_deg（相邻行列的经纬度间隔的中位数）、samples（样本数）和binned；
+        文件中没有数据行时为None。接收点不是规则网格、去重后的行数×列数超过SITUATION_GRID_MAX_CELLS时，
+        按固定的经纬度间隔分箱（binned为True，cell_size_deg为分箱间隔），每个单元取其中最小的路径损耗
+    """
+    with open(output_csv_path, 'rb') as f:
+        fields = parse_line(f.readline().rstrip(b'\n'))
+    header = fields if is_header(fields) else None
+    columns = _resolve_result_columns(header, len(fields))
+    usecols = [columns['lat'], columns['lon'], columns['path_loss_db']]
+    if None in usecols or len(set(usecols)) < len(usecols):
+        raise ValueError("output.csv中缺少lat、lon或path_loss列")
+    
+    df = pd.read_csv(output_csv_path, header=0 if header else None, usecols=usecols)
+    # usecols不保证列的顺序，按列号取出
+    data = df.iloc[:, [sorted(usecols).index(column) for column in usecols]].to_numpy(dtype=np.float64)
+    data = data[~np.isnan(data[:, :2]).any(axis=1)]
+    if not len(data):
+        return None
+    
+    # 经纬度四舍五入到1e-9度后去重，避免浮点误差把同一行（列）拆开
+    data[:, :2] = np.round(data[:, :2], 9)
+    lats, row_index = np.unique(data[:, 0], return_inverse=True)
+    lons, col_index = np.unique(data[:, 1], return_inverse=True)
+    max_cells = current_app.config['SITUATION_GRID_MAX_CELLS']
+    if len(lats) * len(lons) <= max_cells:
+        shape = (len(lats), len(lons))
+        cell_size_deg = {
+            'lat_delta': float(np.median(np.diff(lats))) if len(lats) > 1 else 0.0,
+            'lon_delta': float(np.median(np.diff(lons))) if len(lons) > 1 else 0.0
+        }
+        binned = False
+    else:
+        # 散布的接收点去重后行列数都接近样本数，网格单元数为样本数的平方，改为按固定间隔分箱
+        step = _situation_bin_step(lats[-1] - lats[0], lons[-1] - lons[0], max_cells)
+        row_index = np.floor((data[:, 0] - lats[0]) / step).astype(np.int64)
+        col_index = np.floor((data[:, 1] - lons[0]) / step).astype(np.int64)
+        shape = (int(row_index.max()) + 1, int(col_index.max()) + 1)
+        cell_size_deg = {'lat_delta': float(step), 'lon_delta': float(step)}
+        binned = True
+    grid = np.full(shape, np.nan)
+    np.fmin.at(grid, (row_index, col_index), data[:, 2])
+    return CachedMatrix(grid, nan_to_none=True, attrs={
+        'grid_origin': {'lat': float(lats[0]), 'lon': float(lons[0])},
+        'cell_size_deg': cell_size_deg,
+        'samples': int(len(data)),
+        'binned': binned
+    })
+
+def _situation_bin_step(lat_span: float, lon_span: float, max_cells: int) -> float:
+    """
+    计算态势热力图的分箱间隔：经纬度方向间隔相同，行数×列数不超过单元数上限
+    
+    Args:
+        lat_span: 纬度范围（度）
+        lon_span: 经度范围（度）
+        max_cells: 单元数上限
+    
+    Returns:
+        分箱间隔（度）
+    """
+    if lat_span > 0 and lon_span > 0:
+        step = math.sqrt(lat_span * lon_span / max_cells)
+    else:
+        step = max(lat_span, lon_span) / max(max_cells - 1, 1)
+    # 每个方向的单元数为floor(范围/间隔)+1，逐步放大间隔直到不超过上限
+    while (math.floor(lat_span / step) + 1) * (math.floor(lon_span / step) + 1) > max_cells:
+        step *= 1.01
+    return step
+
+
+def get_task_result_file_service(task_uuid: str, accept_gzip: bool = False) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    获取任务结果文件，供下载接口直接从磁盘发送
+    
+    Args:
+        task_uuid: 任务UUID
+        accept_gzip: 客户端是否接受gzip编码，结果不小于RESULT_GZIP_MIN_BYTES时返回压缩文件
+    
+    Returns:
+        ({'path': 文件路径, 'encoding': 'gzip'或None, 'download_name': 下载文件名}, error_message)
+    """
+    try:
+        if task_uuid not in TASK_STATUS_STORE:
+            return None, f"Task {task_uuid} not found"
+        
+        task_info = TASK_STATUS_STORE[task_uuid]
+        if task_info['status'] != OnlineDeductionStatus.COMPLETED.value:
+            return None, f"Task {task_uuid} result is not ready, status: {task_info['status']}"
+        
+        output_csv_path = task_info.get('output_csv_path')
+        if not output_csv_path or not os.path.exists(output_csv_path):
+            return None, f"Result file of task {task_uuid} not found"
+        
+        result = {'path': output_csv_path, 'encoding': None, 'download_name': f"{task_uuid}.csv"}
+        if accept_gzip and os.path.getsize(output_csv_path) >= current_app.config.get('RESULT_GZIP_MIN_BYTES', 1024):
+            result['path'] = _get_gzip_result_path(output_csv_path)
+            result['encoding'] = 'gzip'
+        return result, None
+        
+    except Exception as e:
+        current_app.logger.error(f"Error getting task result file: {str(e)}")
+        return None, f"Error getting task result file: {str(e)}"
+
+
 def stop_task_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
     """
     停止任务
@@ -702,14 +1740,26 @@ def stop_task_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
         if task_info['status'] != OnlineDeductionStatus.IN_PROGRESS.value:
             return None, f"Task {task_uuid} is not running"
         
-        # 停止进程
-        success = _process_manager.stop_process(task_uuid)
+        # 任务在其他服务进程中运行时通过数据库转发停止请求
+        if not _is_task_owner(task_info):
+            return _forward_stop_request(task_uuid)
+        
+        # 合并运行上还有其他任务时只移除当前任务，否则停止进程
+        run_task_uuid = task_info.get('run_task_uuid') or task_uuid
+        detached = _detach_from_run(run_task_uuid, task_uuid)
+        if detached:
+            success = True
+        else:
+            success = _stop_run(run_task_uuid)
+            if success:
+                _end_run(run_task_uuid)
         
         if success:
             task_info['status'] = OnlineDeductionStatus.ABORTED.value
-            task_info['message'] = '任务已被手动停止'
+            task_info['message'] = '任务已被手动停止，合并运行的其他任务继续运行' if detached else '任务已被手动停止'
             task_info['end_time'] = datetime.now().isoformat()
             TASK_STATUS_STORE[task_uuid] = task_info
+            _publish_task_status(task_uuid)
             
             result = {
                 'task_uuid': task_uuid,
@@ -725,6 +1775,38 @@ def stop_task_service(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
         return None, f"Error stopping task: {str(e)}"
 
 
+def _forward_stop_request(task_uuid: str) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    将停止请求转发给任务所在的服务进程，等待其确认最多TASK_STOP_FORWARD_TIMEOUT秒
+    
+    Args:
+        task_uuid: 任务UUID
+    
+    Returns:
+        (停止结果, error_message)；超时时stop_requested为True，请求保留在数据库中，由所有者进程或接管任务的进程处理
+    """
+    if not TASK_STATUS_STORE.request_stop(task_uuid):
+        return None, f"Task {task_uuid} not found"
+    deadline = time.monotonic() + current_app.config['TASK_STOP_FORWARD_TIMEOUT']
+    task_info = TASK_STATUS_STORE[task_uuid]
+    while time.monotonic() < deadline:
+        time.sleep(current_app.config['TASK_STORE_FLUSH_INTERVAL'] / 2)
+        task_info = TASK_STATUS_STORE.get(task_uuid, refresh=True) or task_info
+        if task_info['status'] != OnlineDeductionStatus.IN_PROGRESS.value:
+            break
+    
+    result = {
+        'task_uuid': task_uuid,
+        'status': task_info['status'],
+        'message': task_info.get('message'),
+        'owner': task_info.get('owner')
+    }
+    if task_info['status'] == OnlineDeductionStatus.IN_PROGRESS.value:
+        result['stop_requested'] = True
+        result['message'] = '停止请求已转发给任务所在的服务进程，尚未确认'
+    return result, None
+
+
 def get_prediction_task_result_service(task_uuid: str, next_index: Optional[int] = None, 
                                      batch_size: Optional[int] = None, 
                                      batch_mode: bool = True) -> Tuple[Optional[Dict], Optional[str]]:
@@ -741,6 +1823,14 @@ def get_prediction_task_result_service(task_uuid: str, next_index: Optional[int]
         (result, error_message)
     """
     try:
+        if batch_mode:
+            # 返回增量结果 (用于point和link模式)
+            return _get_incremental_results(task_uuid, next_index, batch_size)
+        
+        # 已创建的任务从磁盘读取结果，next_index和batch_size用于分页
+        if task_uuid in TASK_STATUS_STORE:
+            return get_task_result_service(task_uuid, next_index, batch_size)
+        
         # TODO: 这里应该从数据库查询任务信息和结果
         # 暂时返回模拟数据
         
@@ -748,45 +1838,21 @@ def get_prediction_task_result_service(task_uuid: str, next_index: Optional[int]
         if not task_uuid.startswith("pred-task-"):
             return None, "Task not found"
         
-        if batch_mode:
-            # 返回增量结果 (用于point和link模式)
-            mock_result = {
-                "task_uuid": task_uuid,
-                "status": "IN_PROGRESS",
-                "prediction_mode": "link",
-                "total_samples": 100,
-                "completed_samples": 50,
-                "results": [
-                    {
-                        "sample_index": 0,
-                        "pos": {"lat": 39.916, "lon": 116.405, "height": 1.5},
-                        "distance_from_start_m": 0.0,
-                        "path_loss_db": 95.5
-                    },
-                    {
-                        "sample_index": 1,
-                        "pos": {"lat": 39.917, "lon": 116.406, "height": 1.5},
-                        "distance_from_start_m": 100.0,
-                        "path_loss_db": 98.2
-                    }
-                ]
-            }
-        else:
-            # 返回完整结果 (用于situation和small_scale模式)
-            mock_result = {
-                "task_uuid": task_uuid,
-                "status": "COMPLETED",
-                "prediction_mode": "situation",
-                "result": {
-                    "heatmap_data_type": "grid",
-                    "grid_origin": {"lat": 39.900, "lon": 116.390},
-                    "cell_size_deg": {"lat_delta": 0.0001, "lon_delta": 0.0001},
-                    "rows": 300,
-                    "cols": 300,
-                    "values": [[100.5, 101.2], [102.1, 103.0]],  # 简化的示例数据
-                    "value_unit": "dB"
-                }
+        # 返回完整结果 (用于situation和small_scale模式)
+        mock_result = {
+            "task_uuid": task_uuid,
+            "status": "COMPLETED",
+            "prediction_mode": "situation",
+            "result": {
+                "heatmap_data_type": "grid",
+                "grid_origin": {"lat": 39.900, "lon": 116.390},
+                "cell_size_deg": {"lat_delta": 0.0001, "lon_delta": 0.0001},
+                "rows": 300,
+                "cols": 300,
+                "values": [[100.5, 101.2], [102.1, 103.0]],  # 简化的示例数据
+                "value_unit": "dB"
             }
+        }
         
         return mock_result, None
         
@@ -795,6 +1861,368 @@ def get_prediction_task_result_service(task_uuid: str, next_index: Optional[int]
         return None, f"Service error: {str(e)}"
 
 
+def _get_incremental_results(task_uuid: str, next_index: Optional[int],
+                             batch_size: Optional[int]) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    读取任务output.csv中从next_index开始的结果，模型仍在写入时只解析新追加的完整行
+    
+    Args:
+        task_uuid: 任务UUID
+        next_index: 起始样本序号，默认为0
+        batch_size: 返回的样本数，为空时返回之后的全部样本
+    
+    Returns:
+        (result, error_message)
+    """
+    task_info = TASK_STATUS_STORE.get(task_uuid)
+    if task_info is None:
+        return None, f"Task {task_uuid} not found"
+    
+    next_index = max(next_index or 0, 0)
+    if batch_size is not None and batch_size <= 0:
+        return None, "batch_size must be a positive integer"
+    
+    finished = task_info['status'] not in (OnlineDeductionStatus.NOT_STARTED.value,
+                                           OnlineDeductionStatus.IN_PROGRESS.value)
+    output_csv_path = task_info.get('output_csv_path') or os.path.join(task_info['task_folder_path'], 'output.csv')
+    entry = _get_result_tail(output_csv_path, task_info.get('input_csv_path'))
+    tail = entry['tail']
+    tail.poll(final=finished)
+    results = tail.read(next_index, batch_size)
+    completed_samples = tail.get_stats()['rows']
+    
+    return {
+        'task_uuid': task_uuid,
+        'status': task_info['status'],
+        'prediction_mode': task_info.get('prediction_mode'),
+        'total_samples': entry['total_samples'],
+        'completed_samples': completed_samples,
+        'next_index': next_index + len(results),
+        'has_more': not finished or next_index + len(results) < completed_samples,
+        'results': results
+    }, None
+
+def _get_result_tail(output_csv_path: str, input_csv_path: Optional[str]) -> Dict[str, Any]:
+    """
+    获取输出文件的增量读取器，同一个输出文件（如合并运行的任务）共用一个读取器
+    
+    Args:
+        output_csv_path: output.csv路径
+        input_csv_path: input.csv路径，用于统计样本总数
+    
+    Returns:
+        {'tail': CsvTail, 'total_samples': 样本总数}
+    """
+    key = os.path.abspath(output_csv_path)
+    with _result_tails_lock:
+        entry = _RESULT_TAILS.get(key)
+        if entry is not None:
+            _RESULT_TAILS.move_to_end(key)
+            return entry
+    
+    entry = {
+        'tail': CsvTail(output_csv_path, _make_result_row_parser()),
+        'total_samples': count_csv_rows(input_csv_path) if input_csv_path else 0
+    }
+    with _result_tails_lock:
+        entry = _RESULT_TAILS.setdefault(key, entry)
+        while len(_RESULT_TAILS) > _RESULT_TAILS_MAX:
+            _RESULT_TAILS.popitem(last=False)
+    return entry
+
+def _resolve_result_columns(header: Optional[List[str]], field_count: int) -> Dict[str, Optional[int]]:
+    """
+    确定output.csv中各字段所在的列
+    
+    Args:
+        header: 表头，没有表头时为None
+        field_count: 当前行的字段数
+    
+    Returns:
+        字段名 -> 列序号（找不到时为None）
+    """
+    if header is None:
+        return {'lat': 0, 'lon': 1, 'height': 2, 'path_loss_db': field_count - 1}
+    names = [name.lower() for name in header]
+    columns = {}
+    for field, aliases in _RESULT_COLUMN_ALIASES.items():
+        columns[field] = next((names.index(alias) for alias in aliases if alias in names), None)
+    return columns
+
+def _make_result_row_parser():
+    """
+    创建output.csv的行解析函数，每个读取器使用独立的解析函数（记录各自的第一个样本位置）
+    
+    Returns:
+        行解析函数，参数为(字段列表, 表头, 样本序号)，返回结果样本，无法解析的行返回None
+    """
+    state = {}
+    
+    def parse(fields: List[str], header: Optional[List[str]], index: int) -> Optional[Dict[str, Any]]:
+        columns = _resolve_result_columns(header, len(fields))
+        values = {}
+        for field, column in columns.items():
+            try:
+                values[field] = float(fields[column]) if column is not None and column < len(fields) else None
+            except ValueError:
+                values[field] = None
+        if values['path_loss_db'] is None:
+            return None
+        
+        # distance_from_start_m为与第一个样本的水平距离（链路模式下即沿路径的起点距离）
+        pos = {'lat': values['lat'], 'lon': values['lon'], 'height': values['height']}
+        if index == 0:
+            state['first_pos'] = pos
+        first_pos = state.get('first_pos')
+        distance = None
+        if first_pos and None not in (pos['lat'], pos['lon'], first_pos['lat'], first_pos['lon']):
+            distance = round(_haversine_m(first_pos['lat'], first_pos['lon'], pos['lat'], pos['lon']), 3)
+        return {
+            'sample_index': index,
+            'pos': pos,
+            'distance_from_start_m': distance,
+            'path_loss_db': values['path_loss_db']
+        }
+    
+    return parse
+
+def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    计算两点之间的大圆距离
+    
+    Args:
+        lat1: 起点纬度
+        lon1: 起点经度
+        lat2: 终点纬度
+        lon2: 终点经度
+    
+    Returns:
+        距离（米）
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * 6371000.0 * math.asin(min(1.0, math.sqrt(a)))
+
+def stream_task_events_service(task_uuids: List[str], last_event_id: Optional[str] = None) -> Tuple[Optional[Iterator[str]], Optional[str]]:
+    """
+    创建任务事件流（Server-Sent Events）
+    推送状态变化（status）、进度（progress）、新增的进程输出（log）和新增的结果行（results），所有任务结束且结果推送完毕后发送end事件
+    
+    Args:
+        task_uuids: 任务UUID列表
+        last_event_id: 断线重连时浏览器带回的Last-Event-ID，从该位置之后继续推送
+    
+    Returns:
+        (SSE文本生成器, error_message)
+    """
+    if not task_uuids:
+        return None, "task_uuids is required"
+    max_tasks = current_app.config['SSE_MAX_TASKS']
+    if len(task_uuids) > max_tasks:
+        return None, f"Too many tasks, at most {max_tasks} tasks per stream"
+    for task_uuid in task_uuids:
+        if task_uuid not in TASK_STATUS_STORE:
+            return None, f"Task {task_uuid} not found"
+    return _task_event_stream(task_uuids, _parse_event_id(last_event_id, len(task_uuids))), None
+
+def _parse_event_id(last_event_id: Optional[str], task_count: int) -> Optional[List[List[int]]]:
+    """
+    解析事件ID：每个任务一组"状态事件序号:已推送结果行数:进程输出游标"，多个任务之间以逗号分隔，顺序与订阅的任务一致
+    
+    Args:
+        last_event_id: 事件ID
+        task_count: 订阅的任务数
+    
+    Returns:
+        每个任务的[状态事件序号, 已推送结果行数, 进程输出游标]，事件ID为空或格式不符时返回None
+    """
+    if not last_event_id:
+        return None
+    try:
+        cursors = [[int(value) for value in part.split(':')] for part in last_event_id.split(',')]
+    except ValueError:
+        return None
+    if len(cursors) != task_count or any(len(cursor) != 3 for cursor in cursors):
+        return None
+    return cursors
+
+def _format_sse(event_type: str, data: Dict[str, Any], event_id: str) -> str:
+    """
+    格式化一条SSE事件
+    
+    Args:
+        event_type: 事件类型
+        data: 事件数据
+        event_id: 事件ID
+    
+    Returns:
+        SSE文本
+    """
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def _task_event_stream(task_uuids: List[str], cursors: Optional[List[List[int]]]) -> Iterator[str]:
+    """
+    任务事件流生成器：状态变化发布后立即唤醒，进度和结果每隔SSE_POLL_INTERVAL秒检查一次
+    
+    Args:
+        task_uuids: 任务UUID列表
+        cursors: _parse_event_id的返回值，为None时从当前状态开始推送
+    
+    Yields:
+        SSE文本
+    """
+    poll_interval = current_app.config['SSE_POLL_INTERVAL']
+    heartbeat_seconds = current_app.config['SSE_HEARTBEAT_SECONDS']
+    states = []
+    for index, task_uuid in enumerate(task_uuids):
+        status_seq, result_index, log_cursor = cursors[index] if cursors else (None, 0, None)
+        states.append({
+            'task_uuid': task_uuid,
+            'status_seq': status_seq,
+            'result_index': result_index,
+            'log_cursor': log_cursor,
+            'progress': None,
+            'status': None,
+            'done': False
+        })
+    
+    def event_id(cursor_by_task: Dict[str, str]) -> str:
+        return ','.join(cursor_by_task.get(state['task_uuid']) or _format_cursor(state) for state in states)
+    
+    yield f"retry: {current_app.config['SSE_RETRY_MS']}\n\n"
+    generation = _task_events.generation
+    last_sent = time.monotonic()
+    while True:
+        sent = False
+        for state in states:
+            for event_type, data, cursor in _collect_task_events(state):
+                yield _format_sse(event_type, data, event_id({state['task_uuid']: cursor}))
+                sent = True
+        if all(state['done'] for state in states):
+            yield _format_sse('end', {'task_uuids': task_uuids}, event_id({}))
+            return
+        
+        now = time.monotonic()
+        if sent:
+            last_sent = now
+        elif now - last_sent >= heartbeat_seconds:
+            yield ": heartbeat\n\n"
+            last_sent = now
+        generation = _task_events.wait(generation, min(poll_interval, heartbeat_seconds))
+
+def _format_cursor(state: Dict[str, Any]) -> str:
+    """
+    格式化一个任务的推送位置
+    
+    Args:
+        state: 任务的推送状态
+    
+    Returns:
+        "状态事件序号:已推送结果行数:进程输出游标"
+    """
+    return f"{state['status_seq'] or 0}:{state['result_index']}:{state['log_cursor'] or 0}"
+
+def _collect_task_events(state: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], str]]:
+    """
+    收集一个任务自上次推送以来的事件，并推进该任务的推送位置
+    
+    Args:
+        state: 任务的推送状态
+    
+    Returns:
+        [(事件类型, 事件数据, 推送该事件后的推送位置)]，重连时从事件对应的位置继续，不会遗漏之后的事件
+    """
+    task_uuid = state['task_uuid']
+    task_info = TASK_STATUS_STORE.get(task_uuid)
+    events = []
+    
+    def emit(event_type: str, data: Dict[str, Any]):
+        events.append((event_type, data, _format_cursor(state)))
+    
+    if task_info is None:
+        state['done'] = True
+        emit('status', {'task_uuid': task_uuid, 'status': None, 'message': f"Task {task_uuid} not found"})
+        return events
+    
+    # 状态变化：首次连接或补发的事件已被淘汰时发送当前状态
+    replay, complete = ([], False) if state['status_seq'] is None else \
+        _task_events.get_since(task_uuid, state['status_seq'])
+    if complete:
+        for seq, event_type, data in replay:
+            state['status_seq'] = seq
+            state['status'] = data.get('status')
+            emit(event_type, data)
+    else:
+        state['status_seq'] = _task_events.last_seq(task_uuid)
+        state['status'] = task_info['status']
+        emit('status', _task_status_snapshot(task_info))
+    # 在其他服务进程中运行的任务不会向本进程的事件中心发布状态，按重新加载的任务状态检查变化
+    if task_info['status'] != state['status'] and not _is_task_owner(task_info):
+        state['status'] = task_info['status']
+        emit('status', _task_status_snapshot(task_info))
+    finished = task_info['status'] not in (OnlineDeductionStatus.NOT_STARTED.value,
+                                           OnlineDeductionStatus.IN_PROGRESS.value)
+    
+    # 进度和进程输出
+    progress = {'task_uuid': task_uuid, 'status': task_info['status']}
+    process_status = None
+    if not finished:
+        process_status = _get_task_process_status(task_uuid, task_info, state['log_cursor'])
+    if process_status:
+        progress.update({
+            'process_status': process_status['status'],
+            'queue_position': process_status['queue_position'],
+            'estimated_wait_seconds': process_status['estimated_wait_seconds']
+        })
+        if 'shards' in process_status:
+            # 分片运行：输出在所有分片结束后合并，运行期间按各分片已写出的行数报告进度
+            progress.update({
+                'total_samples': process_status['total_rows'],
+                'completed_samples': process_status['completed_rows'],
+                'shards': [{key: shard[key] for key in ('shard_index', 'status', 'total_rows', 'completed_rows')}
+                           for shard in process_status['shards']]
+            })
+        state['log_cursor'] = process_status['log_cursor']
+        if process_status['stdout'] or process_status['stderr']:
+            emit('log', {
+                'task_uuid': task_uuid,
+                'stdout': process_status['stdout'],
+                'stderr': process_status['stderr']
+            })
+    
+    # 新增的结果行（单点和链路预测）
+    tail = None
+    if task_info.get('prediction_mode') in ('point', 'link'):
+        output_csv_path = task_info.get('output_csv_path') or os.path.join(task_info['task_folder_path'], 'output.csv')
+        entry = _get_result_tail(output_csv_path, task_info.get('input_csv_path'))
+        tail = entry['tail']
+        tail.poll(final=finished)
+        if 'shards' not in progress:
+            progress['total_samples'] = entry['total_samples']
+            progress['completed_samples'] = tail.get_stats()['rows']
+    
+    if progress != state['progress']:
+        state['progress'] = progress
+        emit('progress', progress)
+    
+    if tail is not None:
+        batch_size = current_app.config['SSE_RESULT_BATCH_SIZE']
+        while True:
+            results = tail.read(state['result_index'], batch_size)
+            if not results:
+                break
+            state['result_index'] += len(results)
+            emit('results', {
+                'task_uuid': task_uuid,
+                'next_index': state['result_index'],
+                'results': results
+            })
+    
+    state['done'] = finished and (tail is None or state['result_index'] >= tail.get_stats()['rows'])
+    return events
+
 def _get_tif_path_for_task(task_uuid: str, task_data: Dict[str, Any], point_config: Dict[str, Any]) -> Optional[str]:
     """
     获取任务所需的tif文件路径
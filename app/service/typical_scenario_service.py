@@ -6,6 +6,8 @@ import uuid
 from flask import current_app
 from typing import Dict, Any, Tuple, Optional, List
 from datetime import datetime
+from app.utils.scenario_catalog import ScenarioCatalog
+from app.utils.scenario_binary import compile_scenario_csv
 
 # 预测类型映射
 PREDICTION_TYPE_MAPPING = {
@@ -113,6 +115,17 @@ def add_typical_scenario_service(scenario_name: str, prediction_type: str, tif_i
         shutil.copy2(input_file_path, target_input_path)
         current_app.logger.info(f"Copied CSV input file to: {target_input_path}")
 
+        # 预编译二进制形式（去重后的发射机/接收机位置和配对索引），创建任务时直接加载
+        input_stats = None
+        try:
+            compiled_stats = compile_scenario_csv(target_input_path, scenario_dir)
+            input_stats = {key: compiled_stats[key] for key in ('rows', 'tx_count', 'rx_count', 'skipped_rows', 'bbox')}
+            current_app.logger.info(f"Compiled scenario input: {input_stats['rows']} rows, "
+                                    f"{input_stats['tx_count']} TX, {input_stats['rx_count']} RX")
+        except Exception as e:
+            # 编译失败不影响添加场景，首次创建任务时会重新编译
+            current_app.logger.warning(f"Failed to compile scenario input {target_input_path}: {e}")
+
         # 创建元信息文件，记录tif图指令映射
         metadata = {
             "scenario_uuid": scenario_uuid,
@@ -123,6 +136,7 @@ def add_typical_scenario_service(scenario_name: str, prediction_type: str, tif_i
             "tif_image_name": tif_image_name,
             "input_file": input_filename,
             "input_file_type": "csv",
+            "input_stats": input_stats,
             "created_at": datetime.now().isoformat(),
             "description": f"典型场景: {scenario_name} ({prediction_type})",
             "tif_mapping": {
@@ -135,6 +149,7 @@ def add_typical_scenario_service(scenario_name: str, prediction_type: str, tif_i
         with open(metadata_file, 'w', encoding='utf-8') as f:
             json.dump(metadata, f, indent=2, ensure_ascii=False)
         current_app.logger.info(f"Created metadata file: {metadata_file}")
+        ScenarioCatalog().invalidate()
 
         result = {
             "scenario_uuid": scenario_uuid,
@@ -145,6 +160,7 @@ def add_typical_scenario_service(scenario_name: str, prediction_type: str, tif_i
             "input_file": target_input_path,
             "metadata_file": metadata_file,
             "tif_image_name": tif_image_name,
+            "input_stats": input_stats,
             "created_at": metadata["created_at"]
         }
 
@@ -174,24 +190,9 @@ def find_scenario_by_name(scenario_name: str, prediction_type: Optional[str] = N
         if not os.path.exists(base_dir):
             return None, f"Typical scenario '{scenario_name}' not found"
 
-        for item in os.listdir(base_dir):
-            item_path = os.path.join(base_dir, item)
-            if os.path.isdir(item_path):
-                metadata_file = os.path.join(item_path, "scenario_metadata.json")
-                if os.path.exists(metadata_file):
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-
-                        # 匹配场景名称
-                        if metadata.get("scenario_name") == scenario_name:
-                            # 如果指定了预测类型，还需要匹配类型
-                            if prediction_type and metadata.get("prediction_type") != prediction_type:
-                                continue
-                            return item, None  # item就是文件夹名称(type_prefix_uuid)
-                    except Exception as e:
-                        current_app.logger.warning(f"Failed to read metadata for {item}: {e}")
-                        continue
+        entry = ScenarioCatalog().find_by_name(base_dir, scenario_name, prediction_type)
+        if entry:
+            return entry['folder_name'], None  # 文件夹名称(type_prefix_uuid)
 
         type_info = f" with type '{prediction_type}'" if prediction_type else ""
         return None, f"Typical scenario '{scenario_name}'{type_info} not found"
@@ -282,54 +283,38 @@ def list_typical_scenarios_by_type_service(prediction_type: str) -> Tuple[Option
         type_prefix = PREDICTION_TYPE_MAPPING[prediction_type]
         scenarios = []
 
-        for item in os.listdir(base_dir):
-            item_path = os.path.join(base_dir, item)
-            if os.path.isdir(item_path):
-                # 检查是否匹配预测类型前缀
-                if item.startswith(f"{type_prefix}_"):
-                    scenario_info = {
-                        "folder_name": item,
-                        "directory": item_path,
-                        "type": "directory"
-                    }
-
-                    # 尝试读取元信息
-                    metadata_file = os.path.join(item_path, "scenario_metadata.json")
-                    if os.path.exists(metadata_file):
-                        try:
-                            with open(metadata_file, 'r', encoding='utf-8') as f:
-                                metadata = json.load(f)
-
-                            # 再次验证预测类型是否匹配
-                            if metadata.get("prediction_type") == prediction_type:
-                                scenario_info.update({
-                                    "uuid": metadata.get("scenario_uuid"),
-                                    "name": metadata.get("scenario_name"),
-                                    "prediction_type": metadata.get("prediction_type"),
-                                    "prediction_type_code": metadata.get("prediction_type_code"),
-                                    "tif_image_name": metadata.get("tif_image_name"),
-                                    "created_at": metadata.get("created_at"),
-                                    "description": metadata.get("description"),
-                                    "type": "directory_with_metadata"
-                                })
-                                scenarios.append(scenario_info)
-                        except Exception as e:
-                            current_app.logger.warning(f"Failed to read metadata for {item}: {e}")
-                            # 即使读取元数据失败，但文件夹名称匹配，也添加基本信息
-                            scenario_info.update({
-                                "prediction_type_code": type_prefix,
-                                "name": f"Unknown_{item[:16]}",
-                                "prediction_type": prediction_type
-                            })
-                            scenarios.append(scenario_info)
-                    else:
-                        # 没有元数据文件但文件夹名称匹配
-                        scenario_info.update({
-                            "prediction_type_code": type_prefix,
-                            "name": f"Unknown_{item[:16]}",
-                            "prediction_type": prediction_type
-                        })
-                        scenarios.append(scenario_info)
+        # 匹配预测类型前缀的场景文件夹
+        for entry in ScenarioCatalog().list_by_type_code(base_dir, type_prefix):
+            item = entry['folder_name']
+            scenario_info = {
+                "folder_name": item,
+                "directory": entry['directory'],
+                "type": "directory"
+            }
+
+            metadata = entry['metadata']
+            if metadata is not None:
+                # 再次验证预测类型是否匹配
+                if metadata.get("prediction_type") == prediction_type:
+                    scenario_info.update({
+                        "uuid": metadata.get("scenario_uuid"),
+                        "name": metadata.get("scenario_name"),
+                        "prediction_type": metadata.get("prediction_type"),
+                        "prediction_type_code": metadata.get("prediction_type_code"),
+                        "tif_image_name": metadata.get("tif_image_name"),
+                        "created_at": metadata.get("created_at"),
+                        "description": metadata.get("description"),
+                        "type": "directory_with_metadata"
+                    })
+                    scenarios.append(scenario_info)
+            else:
+                # 没有元数据文件或读取失败，但文件夹名称匹配，也添加基本信息
+                scenario_info.update({
+                    "prediction_type_code": type_prefix,
+                    "name": f"Unknown_{item[:16]}",
+                    "prediction_type": prediction_type
+                })
+                scenarios.append(scenario_info)
 
         result = {
             "scenarios": scenarios,
@@ -361,50 +346,46 @@ def list_all_typical_scenarios_service() -> Tuple[Optional[Dict], Optional[str]]
 
         scenarios = []
 
-        for item in os.listdir(base_dir):
-            item_path = os.path.join(base_dir, item)
-            if os.path.isdir(item_path):
-                # 这是一个场景目录（type_prefix_uuid命名）
-                scenario_info = {
-                    "folder_name": item,
-                    "directory": item_path,
-                    "type": "directory"
-                }
-
-                # 尝试读取元信息
-                metadata_file = os.path.join(item_path, "scenario_metadata.json")
-                if os.path.exists(metadata_file):
-                    try:
-                        with open(metadata_file, 'r', encoding='utf-8') as f:
-                            metadata = json.load(f)
-                        scenario_info.update({
-                            "uuid": metadata.get("scenario_uuid"),
-                            "name": metadata.get("scenario_name"),
-                            "prediction_type": metadata.get("prediction_type"),
-                            "prediction_type_code": metadata.get("prediction_type_code"),
-                            "tif_image_name": metadata.get("tif_image_name"),
-                            "created_at": metadata.get("created_at"),
-                            "description": metadata.get("description"),
-                            "type": "directory_with_metadata"
-                        })
-                    except Exception as e:
-                        current_app.logger.warning(f"Failed to read metadata for {item}: {e}")
-                        # 尝试从文件夹名称解析类型
-                        if '_' in item:
-                            type_prefix = item.split('_')[0]
-                            scenario_info["prediction_type_code"] = type_prefix
-                            scenario_info["name"] = f"Unknown_{item[:16]}"
-                        else:
-                            scenario_info["name"] = f"Unknown_{item[:8]}"
+        entries, csv_files = ScenarioCatalog().list_entries(base_dir)
+        for entry in entries:
+            item = entry['folder_name']
+            # 这是一个场景目录（type_prefix_uuid命名）
+            scenario_info = {
+                "folder_name": item,
+                "directory": entry['directory'],
+                "type": "directory"
+            }
 
-                scenarios.append(scenario_info)
-            elif item.endswith('.csv'):
-                # 这是一个CSV文件（旧的格式）
-                scenarios.append({
-                    "name": item.replace('.csv', ''),
-                    "file": item_path,
-                    "type": "csv_file"
+            metadata = entry['metadata']
+            if metadata is not None:
+                scenario_info.update({
+                    "uuid": metadata.get("scenario_uuid"),
+                    "name": metadata.get("scenario_name"),
+                    "prediction_type": metadata.get("prediction_type"),
+                    "prediction_type_code": metadata.get("prediction_type_code"),
+                    "tif_image_name": metadata.get("tif_image_name"),
+                    "created_at": metadata.get("created_at"),
+                    "description": metadata.get("description"),
+                    "type": "directory_with_metadata"
                 })
+            elif entry['error']:
+                # 元信息读取失败，尝试从文件夹名称解析类型
+                if '_' in item:
+                    type_prefix = item.split('_')[0]
+                    scenario_info["prediction_type_code"] = type_prefix
+                    scenario_info["name"] = f"Unknown_{item[:16]}"
+                else:
+                    scenario_info["name"] = f"Unknown_{item[:8]}"
+
+            scenarios.append(scenario_info)
+
+        for item in csv_files:
+            # 这是一个CSV文件（旧的格式）
+            scenarios.append({
+                "name": item.replace('.csv', ''),
+                "file": os.path.join(base_dir, item),
+                "type": "csv_file"
+            })
 
         # 按预测类型分组
         scenarios_by_type = {}
@@ -474,6 +455,7 @@ def delete_typical_scenario_service(scenario_identifier: str) -> Tuple[Optional[
 
         # 删除整个场景目录
         shutil.rmtree(scenario_dir)
+        ScenarioCatalog().invalidate()
 
         result = {
             "scenario_uuid": scenario_uuid,
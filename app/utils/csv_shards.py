@@ -0,0 +1,184 @@
+"""
+CSV分片
+将输入CSV按行范围拆分为多个分片文件、按分片顺序合并各分片的输出，以及增量统计分片输出的行数
+"""
+import os
+import uuid
+import threading
+from typing import Dict, List, Optional
+from app.utils.csv_tail import is_header, parse_line
+
+# 复制文件时每次读取的字节数
+_COPY_CHUNK_BYTES = 1024 * 1024
+
+
+def _read_first_line(path: str) -> Optional[bytes]:
+    """
+    读取文件的第一个非空行
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        bytes: 不含换行符的行内容，文件为空时返回None
+    """
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                return line.rstrip(b'\r\n')
+    return None
+
+
+def split_csv_rows(src_path: str, dest_paths: List[str]) -> List[int]:
+    """
+    将CSV文件的数据行按顺序拆分为行数接近的若干个分片，首行为表头时每个分片都保留表头，空行被忽略
+
+    Args:
+        src_path: 输入文件路径
+        dest_paths: 各分片的输出路径，分片数即列表长度
+
+    Returns:
+        List[int]: 各分片的数据行数
+    """
+    first_line = _read_first_line(src_path)
+    has_header = first_line is not None and is_header(parse_line(first_line))
+    total_rows = 0
+    with open(src_path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                total_rows += 1
+    if has_header:
+        total_rows -= 1
+
+    shard_count = len(dest_paths)
+    base, extra = divmod(total_rows, shard_count)
+    counts = [base + (1 if index < extra else 0) for index in range(shard_count)]
+
+    with open(src_path, 'rb') as src:
+        lines = (line if line.endswith(b'\n') else line + b'\n' for line in src if line.strip())
+        header = next(lines) if has_header else None
+        for dest_path, count in zip(dest_paths, counts):
+            with open(dest_path, 'wb') as dest:
+                if header is not None:
+                    dest.write(header)
+                for _ in range(count):
+                    dest.write(next(lines))
+    return counts
+
+
+def merge_csv_files(src_paths: List[str], dest_path: str) -> int:
+    """
+    按顺序合并各分片的输出CSV，后续分片与第一个分片表头相同时跳过其表头；
+    先写入临时文件再原子替换，读取方不会看到合并了一半的文件
+
+    Args:
+        src_paths: 各分片的输出路径（按输入顺序）
+        dest_path: 合并后的文件路径
+
+    Returns:
+        int: 合并后的字节数
+    """
+    temp_path = f"{dest_path}.{uuid.uuid4().hex}.tmp"
+    header = None
+    try:
+        with open(temp_path, 'wb') as dest:
+            for src_path in src_paths:
+                if not os.path.exists(src_path):
+                    continue
+                first_line = _read_first_line(src_path)
+                if first_line is None:
+                    continue
+                skip_header = False
+                if is_header(parse_line(first_line)):
+                    if header is None:
+                        header = first_line
+                    else:
+                        skip_header = first_line == header
+                with open(src_path, 'rb') as src:
+                    if skip_header:
+                        for line in src:
+                            if line.strip():
+                                break
+                    last = b'\n'
+                    for chunk in iter(lambda: src.read(_COPY_CHUNK_BYTES), b''):
+                        dest.write(chunk)
+                        last = chunk[-1:]
+                    # 分片输出的最后一行没有换行符时补上，避免与下一个分片的首行连在一起
+                    if last != b'\n':
+                        dest.write(b'\n')
+            size = dest.tell()
+        os.replace(temp_path, dest_path)
+        return size
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+class CsvRowCounter:
+    """
+    CSV文件数据行数的增量统计
+    只读取上次之后新追加的内容，不保存行内容；首行为表头时不计入
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化统计器
+
+        Args:
+            path: CSV文件路径
+        """
+        self.path = path
+        self.rows = 0
+        self.offset = 0
+        self._inode = None
+        self._first_line_read = False
+        self._pending = b''
+        self._lock = threading.Lock()
+
+    def poll(self) -> int:
+        """
+        统计新追加的完整行
+
+        Returns:
+            int: 当前的数据行数
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return self.rows
+            # 文件被替换或截断后重写时从头统计
+            if stat.st_ino != self._inode or stat.st_size < self.offset:
+                self._inode = stat.st_ino
+                self.rows = 0
+                self.offset = 0
+                self._first_line_read = False
+                self._pending = b''
+            if stat.st_size == self.offset:
+                return self.rows
+
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read(stat.st_size - self.offset)
+            self.offset += len(data)
+            lines = (self._pending + data).split(b'\n')
+            self._pending = lines.pop()
+            for line in lines:
+                if not line.strip():
+                    continue
+                if not self._first_line_read:
+                    self._first_line_read = True
+                    if is_header(parse_line(line)):
+                        continue
+                self.rows += 1
+            return self.rows
+
+    def get_stats(self) -> Dict:
+        """
+        获取统计进度
+
+        Returns:
+            Dict: 数据行数和已读取的字节偏移量
+        """
+        with self._lock:
+            return {'rows': self.rows, 'offset': self.offset}
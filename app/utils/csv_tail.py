@@ -0,0 +1,294 @@
+"""
+CSV文件增量读取
+读取模型仍在写入的CSV文件：记录已读取的字节偏移量和行数，每次只解析新追加的完整行；
+已读取的行不保存在内存中，按稀疏索引从磁盘读取
+"""
+import os
+import csv
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# 每次读取的字节数
+_READ_CHUNK_BYTES = 1024 * 1024
+# CsvTail稀疏索引的默认间隔：每隔该行数记录一次行首的字节偏移量
+_INDEX_INTERVAL = 256
+
+
+def is_header(fields: List[str]) -> bool:
+    """
+    判断一行是否为表头：存在不能解析为数值的非空字段
+
+    Args:
+        fields: 字段列表
+
+    Returns:
+        bool: 是否为表头
+    """
+    for field in fields:
+        field = field.strip()
+        if not field:
+            continue
+        try:
+            float(field)
+        except ValueError:
+            return True
+    return False
+
+
+def parse_line(line: bytes) -> List[str]:
+    """
+    解析一行CSV
+
+    Args:
+        line: 不含换行符的行内容
+
+    Returns:
+        List[str]: 字段列表
+    """
+    text = line.decode('utf-8', errors='replace').lstrip('\ufeff').rstrip('\r')
+    return next(csv.reader([text]), [])
+
+
+def count_csv_rows(path: str) -> int:
+    """
+    统计CSV文件的数据行数（不含表头和空行）
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        int: 数据行数，文件不存在时返回0
+    """
+    if not os.path.exists(path):
+        return 0
+    rows = 0
+    first_line = None
+    with open(path, 'rb') as f:
+        pending = b''
+        for chunk in iter(lambda: f.read(_READ_CHUNK_BYTES), b''):
+            lines = (pending + chunk).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if not line.strip():
+                    continue
+                if first_line is None:
+                    first_line = line
+                rows += 1
+        if pending.strip():
+            if first_line is None:
+                first_line = pending
+            rows += 1
+    if first_line is not None and is_header(parse_line(first_line)):
+        rows -= 1
+    return rows
+
+
+def read_csv_page(path: str, start: int, count: int) -> Dict[str, Any]:
+    """
+    从磁盘逐行读取CSV文件的一页数据行（不含表头和空行），不把整个文件读入内存
+
+    Args:
+        path: 文件路径
+        start: 起始行号
+        count: 行数
+
+    Returns:
+        Dict: 表头（没有表头时为None）、行列表（字段列表）、下一页的起始行号和是否还有更多行
+    """
+    header = None
+    rows = []
+    has_more = False
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+            lines = (line for line in csv.reader(f) if any(field.strip() for field in line))
+            first = next(lines, None)
+            if first is not None:
+                if first and first[0].startswith('\ufeff'):
+                    first[0] = first[0].lstrip('\ufeff')
+                if is_header(first):
+                    header = [field.strip() for field in first]
+                else:
+                    lines = itertools.chain([first], lines)
+                page = list(itertools.islice(lines, start, start + count + 1))
+                has_more = len(page) > count
+                rows = page[:count]
+    return {
+        'header': header,
+        'rows': rows,
+        'next_index': start + len(rows),
+        'has_more': has_more
+    }
+
+
+class CsvTail:
+    """
+    CSV文件增量读取器
+    只解析以换行符结尾的完整行，未写完的最后一行留到下次读取；
+    文件被替换或变短（被模型重写）时从头重新读取。首行为表头时按表头字段名解析后续各行
+    内存中只保存行数和稀疏的行号->字节偏移量索引，读取时从最近的索引位置开始在磁盘上解析所需的行
+    """
+
+    def __init__(self, path: str, row_parser: Optional[Callable[[List[str], Optional[List[str]], int], Any]] = None,
+                 index_interval: int = _INDEX_INTERVAL):
+        """
+        初始化读取器
+
+        Args:
+            path: CSV文件路径
+            row_parser: 行解析函数，参数为(字段列表, 表头或None, 行号)，返回None的行被忽略；为None时返回原始字段列表。
+                同一行可能被解析多次，结果应只取决于参数（以及第0行）
+            index_interval: 稀疏索引的间隔（行数）
+        """
+        self.path = path
+        self.row_parser = row_parser
+        self.index_interval = max(int(index_interval), 1)
+        self.header: Optional[List[str]] = None
+        self.rows = 0
+        self.offset = 0
+        # 第k*index_interval行的行首字节偏移量
+        self._checkpoints: List[int] = []
+        self._inode = None
+        self._first_line_read = False
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        """清空已读取的内容（调用方持有锁）"""
+        self.header = None
+        self.rows = 0
+        self.offset = 0
+        self._checkpoints = []
+        self._first_line_read = False
+
+    def _parse_row(self, line: bytes, index: int) -> Any:
+        """
+        解析一行数据
+
+        Args:
+            line: 不含换行符的行内容
+            index: 行号
+
+        Returns:
+            解析结果，应忽略的行返回None
+        """
+        fields = parse_line(line)
+        return self.row_parser(fields, self.header, index) if self.row_parser else fields
+
+    def poll(self, final: bool = False) -> int:
+        """
+        读取文件中新追加的完整行，只统计行数并记录索引，不保存解析结果
+
+        Args:
+            final: 写入方是否已结束，为True时没有换行符的最后一行也会被解析
+
+        Returns:
+            int: 新增的行数
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return 0
+            size = stat.st_size
+            # 文件被替换或截断后重写时从头读取
+            if stat.st_ino != self._inode or size < self.offset:
+                self._reset()
+                self._inode = stat.st_ino
+            if size == self.offset:
+                return 0
+
+            added = 0
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                while self.offset < size:
+                    data = f.read(min(_READ_CHUNK_BYTES, size - self.offset))
+                    if not data:
+                        break
+                    if not data.endswith(b'\n') and self.offset + len(data) < size:
+                        # 每次读取到行尾为止
+                        data += f.readline(size - self.offset - len(data))
+                    last_chunk = self.offset + len(data) >= size
+                    end = len(data) if final and last_chunk else data.rfind(b'\n')
+                    if end < 0:
+                        break
+                    line_offset = self.offset
+                    for line in data[:end].split(b'\n'):
+                        line_start = line_offset
+                        line_offset += len(line) + 1
+                        if not line.strip():
+                            continue
+                        if not self._first_line_read:
+                            self._first_line_read = True
+                            fields = parse_line(line)
+                            if is_header(fields):
+                                self.header = [field.strip() for field in fields]
+                                continue
+                        if self._parse_row(line, self.rows) is None:
+                            continue
+                        if self.rows % self.index_interval == 0:
+                            self._checkpoints.append(line_start)
+                        self.rows += 1
+                        added += 1
+                    self.offset += min(end + 1, len(data))
+                    f.seek(self.offset)
+            return added
+
+    def read(self, start: int = 0, count: Optional[int] = None) -> List[Any]:
+        """
+        获取已统计的行：从不超过start的最近索引位置开始在磁盘上解析
+
+        Args:
+            start: 起始行号
+            count: 行数，为None时返回起始行号之后的全部行
+
+        Returns:
+            List: 行列表
+        """
+        with self._lock:
+            stop = self.rows if count is None else min(start + count, self.rows)
+            if start < 0 or start >= stop:
+                return []
+            checkpoint = start // self.index_interval
+            position = self._checkpoints[checkpoint]
+            index = checkpoint * self.index_interval
+            rows = []
+            try:
+                f = open(self.path, 'rb')
+            except OSError:
+                return []
+            with f:
+                # 读取之后文件被替换时不返回其他文件的内容
+                if os.fstat(f.fileno()).st_ino != self._inode:
+                    return []
+                f.seek(position)
+                pending = b''
+                while index < stop and position < self.offset:
+                    chunk = f.read(min(_READ_CHUNK_BYTES, self.offset - position))
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    lines = (pending + chunk).split(b'\n')
+                    # 读到已统计的位置时最后一段也是完整的行（poll(final=True)解析的无换行符的最后一行）
+                    pending = lines.pop() if position < self.offset else b''
+                    for line in lines:
+                        if not line.strip():
+                            continue
+                        row = self._parse_row(line, index)
+                        if row is None:
+                            continue
+                        if index >= start:
+                            rows.append(row)
+                        index += 1
+                        if index >= stop:
+                            break
+            return rows
+
+    def get_stats(self) -> Dict:
+        """
+        获取读取进度
+
+        Returns:
+            Dict: 已统计行数和已读取的字节偏移量
+        """
+        with self._lock:
+            return {'rows': self.rows, 'offset': self.offset}
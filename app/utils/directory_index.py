@@ -0,0 +1,99 @@
+"""
+目录文件列表索引
+缓存目录下的文件名列表（与os.listdir的顺序一致），目录的修改时间变化时才用os.scandir重新扫描；
+调用方通过derive注册由文件名列表派生的结构（如按序号排序的帧列表、序号 -> 文件名的映射），
+文件名列表不变时直接复用，无需每次请求都遍历目录和解析文件名
+"""
+import os
+import time
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+# 目录修改时间与扫描时间相差不超过该秒数时，下次访问仍重新扫描：
+# 修改时间精度较低的文件系统上，同一时间粒度内的后续写入不会改变目录的修改时间
+_RACY_SECONDS = 2.0
+
+
+class DirectoryIndex:
+    """
+    单个目录的文件列表索引
+    """
+
+    def __init__(self, path: str):
+        """
+        初始化索引
+
+        Args:
+            path: 目录路径
+        """
+        self.path = path
+        self.scans = 0
+        self._names: Optional[List[str]] = None
+        self._mtime_ns = None
+        self._scanned_at = 0.0
+        self._derived: Dict[Callable, Any] = {}
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> bool:
+        """
+        目录的修改时间变化或上次扫描时处于修改时间的精度范围内时重新扫描（调用方持有锁）
+
+        Returns:
+            bool: 目录是否存在
+        """
+        try:
+            mtime_ns = os.stat(self.path).st_mtime_ns
+        except OSError:
+            self._names = None
+            self._mtime_ns = None
+            self._derived.clear()
+            return False
+
+        racy = mtime_ns / 1e9 >= self._scanned_at - _RACY_SECONDS
+        if self._names is not None and mtime_ns == self._mtime_ns and not racy:
+            return True
+
+        scanned_at = time.time()
+        with os.scandir(self.path) as entries:
+            names = [entry.name for entry in entries]
+        self.scans += 1
+        if names != self._names:
+            self._names = names
+            self._derived.clear()
+        self._mtime_ns = mtime_ns
+        self._scanned_at = scanned_at
+        return True
+
+    def exists(self) -> bool:
+        """
+        目录是否存在
+        """
+        with self._lock:
+            return self._refresh()
+
+    def names(self) -> List[str]:
+        """
+        获取文件名列表
+
+        Returns:
+            List[str]: 文件名列表（与os.listdir的顺序一致），目录不存在时为空列表
+        """
+        with self._lock:
+            return list(self._names) if self._refresh() else []
+
+    def derive(self, builder: Callable[[List[str]], Any]) -> Any:
+        """
+        获取由文件名列表派生的结构，文件名列表不变时复用上次的结果
+
+        Args:
+            builder: 派生函数，参数为文件名列表；同一个函数对象对应同一个缓存结果，返回值不应被调用方修改
+
+        Returns:
+            派生结构，目录不存在时以空列表调用builder
+        """
+        with self._lock:
+            if not self._refresh():
+                return builder([])
+            if builder not in self._derived:
+                self._derived[builder] = builder(self._names)
+            return self._derived[builder]
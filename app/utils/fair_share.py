@@ -0,0 +1,238 @@
+"""
+公平分享调度策略
+决定等待队列中任务的启动顺序：优先级随等待时间老化，同一有效优先级内按提交者和模型的加权占用从低到高排序，
+并对每个提交者、每个模型的并发数设置上限
+所有函数都不加锁，由进程管理器在持有状态锁时调用
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from flask import current_app, has_request_context, request
+from config import Config
+
+# 无法识别提交者时使用的名称
+ANONYMOUS_SUBMITTER = 'anonymous'
+
+
+def _get_config(key: str):
+    """
+    读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+    Args:
+        key: 配置项名称
+
+    Returns:
+        配置值
+    """
+    try:
+        return current_app.config[key]
+    except RuntimeError:
+        return getattr(Config, key)
+
+
+def resolve_submitter() -> str:
+    """
+    识别当前请求的提交者：优先使用SCHEDULER_SUBMITTER_HEADER请求头，其次使用客户端地址
+
+    Returns:
+        str: 提交者标识，不在请求上下文中时返回anonymous
+    """
+    if not has_request_context():
+        return ANONYMOUS_SUBMITTER
+    header = _get_config('SCHEDULER_SUBMITTER_HEADER')
+    return request.headers.get(header) or request.remote_addr or ANONYMOUS_SUBMITTER
+
+
+def get_submitter_weight(submitter: str) -> float:
+    """
+    获取提交者的分享权重
+
+    Args:
+        submitter: 提交者标识
+
+    Returns:
+        float: 权重，未配置时为1
+    """
+    weight = _get_config('SCHEDULER_SUBMITTER_WEIGHTS').get(submitter, 1)
+    return float(weight) if weight and weight > 0 else 1.0
+
+
+def get_model_weight(process_info: Dict) -> float:
+    """
+    获取任务所属模型的分享权重（模型资源配置中的share_weight）
+
+    Args:
+        process_info: 进程信息
+
+    Returns:
+        float: 权重，未配置时为1
+    """
+    weight = process_info['resource_limits'].get('share_weight') or 1
+    return float(weight) if weight > 0 else 1.0
+
+
+def get_model_cap(process_info: Dict) -> int:
+    """
+    获取任务所属模型的并发上限（模型资源配置中的max_concurrency）
+
+    Args:
+        process_info: 进程信息
+
+    Returns:
+        int: 并发上限，0表示不限制
+    """
+    cap = process_info['resource_limits'].get('max_concurrency')
+    return cap if cap is not None else _get_config('SCHEDULER_MAX_PER_MODEL')
+
+
+def count_running(processes: Dict[str, Dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    统计每个提交者、每个模型运行中的任务数
+
+    Args:
+        processes: 进程管理器中的进程表
+
+    Returns:
+        Tuple: (提交者 -> 运行数, 模型分组键 -> 运行数)
+    """
+    by_submitter = {}
+    by_model = {}
+    for info in processes.values():
+        if info['status'] != 'running':
+            continue
+        by_submitter[info['submitter']] = by_submitter.get(info['submitter'], 0) + 1
+        if info['worker_key']:
+            by_model[info['worker_key']] = by_model.get(info['worker_key'], 0) + 1
+    return by_submitter, by_model
+
+
+def get_effective_priority(priority: int, process_info: Dict, now: datetime) -> int:
+    """
+    计算老化后的有效优先级：每等待SCHEDULER_AGING_SECONDS秒，优先级数值减1
+
+    Args:
+        priority: 提交时的优先级
+        process_info: 进程信息
+        now: 当前时间
+
+    Returns:
+        int: 有效优先级，数值越小越先调度
+    """
+    aging_seconds = _get_config('SCHEDULER_AGING_SECONDS')
+    if aging_seconds <= 0:
+        return priority
+    waited = (now - process_info['submit_time']).total_seconds()
+    return priority - int(waited // aging_seconds)
+
+
+def order_pending(pending: List[Tuple], processes: Dict[str, Dict], running: Tuple[Dict, Dict],
+                  now: datetime) -> List[Tuple]:
+    """
+    按调度顺序排列等待队列
+
+    Args:
+        pending: 等待队列，元素为 (优先级, 提交序号, 进程ID)
+        processes: 进程管理器中的进程表
+        running: count_running的返回值
+        now: 当前时间
+
+    Returns:
+        List[Tuple]: 排序后的等待队列
+    """
+    by_submitter, by_model = running
+
+    def key(entry):
+        priority, sequence, process_id = entry
+        info = processes[process_id]
+        submitter_usage = by_submitter.get(info['submitter'], 0) / get_submitter_weight(info['submitter'])
+        model_usage = by_model.get(info['worker_key'], 0) / get_model_weight(info) if info['worker_key'] else 0
+        return get_effective_priority(priority, info, now), submitter_usage, model_usage, sequence
+
+    return sorted(pending, key=key)
+
+
+def get_cap_reason(process_info: Dict, running: Tuple[Dict, Dict]) -> Optional[str]:
+    """
+    检查任务是否因并发上限不能启动
+
+    Args:
+        process_info: 进程信息
+        running: count_running的返回值
+
+    Returns:
+        str: submitter_cap或model_cap，未达到上限时返回None
+    """
+    by_submitter, by_model = running
+    submitter_cap = _get_config('SCHEDULER_MAX_PER_SUBMITTER')
+    if submitter_cap and by_submitter.get(process_info['submitter'], 0) >= submitter_cap:
+        return 'submitter_cap'
+    model_cap = get_model_cap(process_info)
+    if process_info['worker_key'] and model_cap and by_model.get(process_info['worker_key'], 0) >= model_cap:
+        return 'model_cap'
+    return None
+
+
+def build_allocation(pending: List[Tuple], processes: Dict[str, Dict], max_processes: int) -> Dict:
+    """
+    汇总当前的分享分配情况：每个活跃提交者和模型按权重应得的槽位数、实际运行数、排队数，以及等待队列的调度顺序
+
+    Args:
+        pending: 等待队列
+        processes: 进程管理器中的进程表
+        max_processes: 最大进程数
+
+    Returns:
+        Dict: 调度参数、提交者分配、模型分配和排队顺序
+    """
+    now = datetime.now()
+    running = count_running(processes)
+    submitters = {}
+    models = {}
+    for info in processes.values():
+        if info['status'] not in ('running', 'queued'):
+            continue
+        field = 'running' if info['status'] == 'running' else 'queued'
+        submitter = submitters.setdefault(info['submitter'], {
+            'submitter': info['submitter'],
+            'weight': get_submitter_weight(info['submitter']),
+            'cap': _get_config('SCHEDULER_MAX_PER_SUBMITTER'),
+            'running': 0,
+            'queued': 0
+        })
+        submitter[field] += 1
+        if info['worker_key']:
+            model = models.setdefault(info['worker_key'], {
+                'model_key': info['worker_key'],
+                'weight': get_model_weight(info),
+                'cap': get_model_cap(info),
+                'running': 0,
+                'queued': 0
+            })
+            model[field] += 1
+
+    for group in (submitters, models):
+        total_weight = sum(item['weight'] for item in group.values())
+        for item in group.values():
+            item['fair_share_slots'] = round(max_processes * item['weight'] / total_weight, 2)
+
+    queue = []
+    for priority, _, process_id in order_pending(pending, processes, running, now):
+        info = processes[process_id]
+        queue.append({
+            'process_id': process_id,
+            'submitter': info['submitter'],
+            'model_key': info['worker_key'],
+            'priority': priority,
+            'effective_priority': get_effective_priority(priority, info, now),
+            'waited_seconds': round((now - info['submit_time']).total_seconds(), 1),
+            'blocked_by': get_cap_reason(info, running)
+        })
+
+    return {
+        'max_processes': max_processes,
+        'aging_seconds': _get_config('SCHEDULER_AGING_SECONDS'),
+        'max_per_submitter': _get_config('SCHEDULER_MAX_PER_SUBMITTER'),
+        'max_per_model': _get_config('SCHEDULER_MAX_PER_MODEL'),
+        'submitters': list(submitters.values()),
+        'models': list(models.values()),
+        'queue': queue
+    }
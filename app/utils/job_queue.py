@@ -0,0 +1,567 @@
+"""
+分布式任务队列
+EXECUTION_MODE为distributed时，进程管理器把任务写入共享数据库中的执行任务表，
+各执行节点上的worker_agent.py以租约方式领取任务、定期心跳续约并回报结果，
+提交方的后台线程检查已结束的任务并执行完成回调
+"""
+import os
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Callable
+from flask import current_app
+from sqlalchemy import or_, and_, func
+from config import Config
+from app import db
+from app.model.execution_job import ExecutionJob, ExecutionJobStatus
+from app.utils.task_registry import callable_ref, resolve_ref
+
+# 共享存储目录在任务表中的占位符，各节点替换为本机的挂载路径
+STORAGE_TOKEN = '{STORAGE}'
+# 执行节点写入任务目录的输出日志文件名，每行为"输出流\t行内容"
+AGENT_LOG_FILENAME = 'agent_output.log'
+
+
+def to_portable(value: Optional[str], storage_folder: str) -> Optional[str]:
+    """
+    将路径中的共享存储目录替换为占位符
+
+    Args:
+        value: 路径或包含路径的字符串（如PATH环境变量）
+        storage_folder: 本机共享存储目录
+
+    Returns:
+        str: 替换后的字符串
+    """
+    if not value:
+        return value
+    return value.replace(storage_folder, STORAGE_TOKEN)
+
+
+def from_portable(value: Optional[str], storage_folder: str) -> Optional[str]:
+    """
+    将占位符替换为本机共享存储目录
+
+    Args:
+        value: to_portable处理后的字符串
+        storage_folder: 本机共享存储目录
+
+    Returns:
+        str: 替换后的字符串
+    """
+    if not value:
+        return value
+    return value.replace(STORAGE_TOKEN, storage_folder)
+
+
+def read_agent_log(log_dir: Optional[str], since: Optional[int], max_bytes: int) -> Dict:
+    """
+    读取执行节点写入的输出日志
+    游标为文件中的字节偏移量，只返回完整的行
+
+    Args:
+        log_dir: 任务目录
+        since: 起始游标，为None时返回最近max_bytes字节内的输出
+        max_bytes: 单次最多返回的字节数，超出时丢弃较早的部分
+
+    Returns:
+        Dict: stdout、stderr、next_cursor、truncated、total_bytes和日志文件路径
+    """
+    result = {'stdout': '', 'stderr': '', 'next_cursor': since or 0, 'truncated': False,
+              'total_bytes': 0, 'log_file': None}
+    if not log_dir:
+        return result
+    path = os.path.join(log_dir, AGENT_LOG_FILENAME)
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return result
+
+    start = since or 0
+    if size - start > max_bytes:
+        start = size - max_bytes
+        result['truncated'] = since is not None
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(size - start)
+    if start > 0 and start != since:
+        # 从截断位置开始时跳过不完整的首行
+        skipped = data.find(b'\n') + 1
+        data = data[skipped:]
+        start += skipped
+    # 末尾尚未写完的行留到下次读取
+    data = data[:data.rfind(b'\n') + 1]
+
+    output = {'stdout': [], 'stderr': []}
+    for raw in data.decode('utf-8', errors='replace').splitlines():
+        stream, _, line = raw.partition('\t')
+        output.get(stream, output['stdout']).append(line)
+    result.update({
+        'stdout': '\n'.join(output['stdout']),
+        'stderr': '\n'.join(output['stderr']),
+        'next_cursor': start + len(data),
+        'total_bytes': size,
+        'log_file': path
+    })
+    return result
+
+
+class JobQueue:
+    """
+    分布式任务队列单例类
+    领取、续约和回报结果都以(任务ID, 领取次数)为条件更新，领取次数同时作为租约版本号，
+    租约被其他节点接手后旧节点的更新不会生效
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(JobQueue, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            # 提交方检查已结束任务的后台线程
+            self._watcher = None
+            self._app = None
+            self.initialized = True
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        try:
+            return current_app.config[key]
+        except RuntimeError:
+            return getattr(Config, key)
+
+    # ------------------------------------------------------------------
+    # 提交方
+    # ------------------------------------------------------------------
+
+    def enqueue(self, job_id: str, cmd: list, cwd: str, env: dict,
+                on_complete: Optional[Callable[[str, int], None]], priority: int,
+                log_dir: Optional[str], resource_limits: Optional[Dict], result_path: Optional[str],
+                on_recover: Optional[Callable[[str, Dict], None]]) -> bool:
+        """
+        写入执行任务（需在Flask应用上下文中调用），参数与ProcessManager.start_process一致
+
+        Returns:
+            bool: 是否成功写入，同一任务ID仍在排队或运行时返回False
+        """
+        storage_folder = self._get_config('STORAGE_FOLDER')
+        existing = ExecutionJob.query.get(job_id)
+        if existing is not None:
+            if existing.status in (ExecutionJobStatus.QUEUED, ExecutionJobStatus.RUNNING):
+                print(f"任务 {job_id} 已在运行或排队中")
+                return False
+            # 重新运行已结束的任务（如重新启动验证任务）
+            db.session.delete(existing)
+            db.session.flush()
+
+        env = env or {}
+        env_delta = {key: to_portable(value, storage_folder)
+                     for key, value in env.items() if os.environ.get(key) != value}
+        db.session.add(ExecutionJob(
+            job_id=job_id,
+            status=ExecutionJobStatus.QUEUED,
+            priority=priority,
+            cmd=[to_portable(arg, storage_folder) for arg in cmd],
+            cwd=to_portable(cwd, storage_folder),
+            env_delta=env_delta,
+            log_dir=to_portable(log_dir, storage_folder),
+            result_path=to_portable(result_path, storage_folder),
+            resource_limits=resource_limits or {},
+            on_complete=callable_ref(on_complete),
+            on_recover=callable_ref(on_recover),
+            attempts=0,
+            cancel_requested=False,
+            callback_done=False,
+            submit_time=datetime.utcnow()
+        ))
+        db.session.commit()
+        if log_dir:
+            # 清除上一次运行留下的输出
+            try:
+                os.remove(os.path.join(log_dir, AGENT_LOG_FILENAME))
+            except OSError:
+                pass
+        self._ensure_watcher()
+        return True
+
+    def get_status(self, job_id: str, since: Optional[int] = None) -> Optional[Dict]:
+        """
+        获取执行任务状态，字段与ProcessManager.get_process_status一致
+
+        Args:
+            job_id: 任务ID
+            since: 输出起始游标（日志文件字节偏移量）
+
+        Returns:
+            Dict: 任务状态，不存在时返回None
+        """
+        job = ExecutionJob.query.get(job_id)
+        if job is None:
+            return None
+        storage_folder = self._get_config('STORAGE_FOLDER')
+        logs = read_agent_log(from_portable(job.log_dir, storage_folder), since,
+                              self._get_config('PROCESS_LOG_BUFFER_BYTES'))
+
+        queue_position = None
+        if job.status == ExecutionJobStatus.QUEUED:
+            queue_position = ExecutionJob.query.filter(
+                ExecutionJob.status == ExecutionJobStatus.QUEUED,
+                or_(ExecutionJob.priority < job.priority,
+                    and_(ExecutionJob.priority == job.priority, ExecutionJob.submit_time < job.submit_time))
+            ).count() + 1
+        counts = self._count_by_status()
+
+        return {
+            'process_id': job_id,
+            'status': job.status,
+            'priority': job.priority,
+            'execution_mode': 'distributed',
+            'agent_id': job.agent_id,
+            'attempts': job.attempts,
+            'cancel_requested': job.cancel_requested,
+            'submit_time': job.submit_time.isoformat(),
+            'start_time': job.start_time.isoformat() if job.start_time else '',
+            'end_time': job.end_time.isoformat() if job.end_time else '',
+            'return_code': job.return_code,
+            'error_message': job.error_message,
+            'stdout': logs['stdout'],
+            'stderr': logs['stderr'],
+            'log_cursor': logs['next_cursor'],
+            'log_truncated': logs['truncated'],
+            'log_total_lines': None,
+            'log_total_bytes': logs['total_bytes'],
+            'log_file': logs['log_file'],
+            'resource_usage': job.resource_usage,
+            'resource_limits': job.resource_limits,
+            'cpu_cores': [],
+            'stop_report': None,
+            'queue_position': queue_position,
+            'estimated_wait_seconds': None,
+            'running_count': counts.get(ExecutionJobStatus.RUNNING, 0),
+            'queued_count': counts.get(ExecutionJobStatus.QUEUED, 0),
+            'max_processes': None
+        }
+
+    def stop(self, job_id: str) -> bool:
+        """
+        停止执行任务：排队中的任务直接结束，运行中的任务由执行节点在下次心跳时终止
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 任务是否处于可停止的状态
+        """
+        updated = ExecutionJob.query.filter_by(job_id=job_id, status=ExecutionJobStatus.QUEUED).update({
+            'status': ExecutionJobStatus.STOPPED,
+            'end_time': datetime.utcnow(),
+            # 与本机模式一致，排队中被停止的任务不执行完成回调
+            'callback_done': True
+        }, synchronize_session=False)
+        if not updated:
+            updated = ExecutionJob.query.filter_by(job_id=job_id, status=ExecutionJobStatus.RUNNING).update(
+                {'cancel_requested': True}, synchronize_session=False)
+        db.session.commit()
+        return bool(updated)
+
+    def get_resource_usage(self, job_id: str) -> Optional[Dict]:
+        """
+        获取执行节点回报的资源占用汇总
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            Dict: 资源占用汇总，任务不存在或尚未结束时返回None
+        """
+        job = ExecutionJob.query.get(job_id)
+        return job.resource_usage if job else None
+
+    def get_summary(self) -> Dict:
+        """
+        获取任务表概况
+
+        Returns:
+            Dict: 各状态任务数和最近有心跳的执行节点
+        """
+        agents = {}
+        running = ExecutionJob.query.filter_by(status=ExecutionJobStatus.RUNNING).all()
+        for job in running:
+            agent = agents.setdefault(job.agent_id, {'agent_id': job.agent_id, 'running_jobs': [], 'last_heartbeat': None})
+            agent['running_jobs'].append(job.job_id)
+            if job.heartbeat_at and (agent['last_heartbeat'] is None or job.heartbeat_at.isoformat() > agent['last_heartbeat']):
+                agent['last_heartbeat'] = job.heartbeat_at.isoformat()
+        return {
+            'execution_mode': self._get_config('EXECUTION_MODE'),
+            'counts': self._count_by_status(),
+            'agents': list(agents.values())
+        }
+
+    def recover(self):
+        """
+        服务重启后重建调用方状态并恢复后台检查线程（需在Flask应用上下文中调用）
+        """
+        storage_folder = self._get_config('STORAGE_FOLDER')
+        pending = ExecutionJob.query.filter_by(callback_done=False).all()
+        for job in pending:
+            on_recover = resolve_ref(job.on_recover)
+            if on_recover is None:
+                continue
+            try:
+                on_recover(job.job_id, {
+                    'process_id': job.job_id,
+                    'status': job.status,
+                    'log_dir': from_portable(job.log_dir, storage_folder),
+                    'result_path': from_portable(job.result_path, storage_folder),
+                    'submit_time': job.submit_time.isoformat(),
+                    'start_time': job.start_time.isoformat() if job.start_time else None
+                })
+            except Exception as e:
+                print(f"恢复执行任务 {job.job_id} 失败: {str(e)}")
+        if pending:
+            self._ensure_watcher()
+
+    def _count_by_status(self) -> Dict[str, int]:
+        """
+        统计各状态的任务数
+
+        Returns:
+            Dict[str, int]: 状态到任务数的映射
+        """
+        rows = db.session.query(ExecutionJob.status, func.count(ExecutionJob.job_id)).group_by(ExecutionJob.status).all()
+        return {status: count for status, count in rows}
+
+    def _ensure_watcher(self):
+        """
+        启动提交方的后台检查线程（每个服务进程一个）
+        """
+        with self._lock:
+            if self._watcher is not None and self._watcher.is_alive():
+                return
+            self._app = current_app._get_current_object()
+            self._watcher = threading.Thread(target=self._watch_loop, name='job-queue-watcher', daemon=True)
+            self._watcher.start()
+
+    def _watch_loop(self):
+        """
+        定期结束失联的任务并执行已结束任务的完成回调
+        """
+        while True:
+            time.sleep(self._get_config('JOB_POLL_INTERVAL'))
+            with self._app.app_context():
+                try:
+                    self._expire_leases()
+                    self._run_callbacks()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"检查执行任务时发生错误: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _expire_leases(self):
+        """
+        租约到期且不会再被领取的任务（已达到最大领取次数或已请求停止）标记为结束
+        """
+        now = datetime.utcnow()
+        expired = and_(ExecutionJob.status == ExecutionJobStatus.RUNNING, ExecutionJob.lease_expires_at < now)
+        ExecutionJob.query.filter(expired, ExecutionJob.cancel_requested.is_(True)).update({
+            'status': ExecutionJobStatus.STOPPED,
+            'return_code': -1,
+            'end_time': now,
+            'error_message': '执行节点失联'
+        }, synchronize_session=False)
+        ExecutionJob.query.filter(expired, ExecutionJob.attempts >= self._get_config('JOB_MAX_ATTEMPTS')).update({
+            'status': ExecutionJobStatus.FAILED,
+            'return_code': -1,
+            'end_time': now,
+            'error_message': '执行节点失联且已达到最大领取次数'
+        }, synchronize_session=False)
+        db.session.commit()
+
+    def _run_callbacks(self):
+        """
+        执行已结束任务的完成回调，每个任务只执行一次
+        """
+        finished = ExecutionJob.query.filter(
+            ExecutionJob.status.in_(ExecutionJobStatus.FINISHED),
+            ExecutionJob.callback_done.is_(False)
+        ).all()
+        for job in finished:
+            job_id, return_code, on_complete_ref = job.job_id, job.return_code, job.on_complete
+            claimed = ExecutionJob.query.filter_by(job_id=job_id, callback_done=False).update(
+                {'callback_done': True}, synchronize_session=False)
+            db.session.commit()
+            if not claimed:
+                continue
+            on_complete = resolve_ref(on_complete_ref)
+            if on_complete is None:
+                continue
+            try:
+                on_complete(job_id, return_code if return_code is not None else -1)
+            except Exception as e:
+                db.session.rollback()
+                print(f"执行回调函数时发生错误: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # 执行节点
+    # ------------------------------------------------------------------
+
+    def claim(self, agent_id: str) -> Optional[Dict]:
+        """
+        领取一个任务：排队中的任务，或租约已到期、领取次数未达上限的运行中任务
+
+        Args:
+            agent_id: 执行节点标识
+
+        Returns:
+            Dict: 任务内容（路径仍为占位符形式），附带本次领取的attempt；没有可领取的任务时返回None
+        """
+        now = datetime.utcnow()
+        try:
+            candidates = ExecutionJob.query.filter(
+                ExecutionJob.cancel_requested.is_(False),
+                or_(ExecutionJob.status == ExecutionJobStatus.QUEUED,
+                    and_(ExecutionJob.status == ExecutionJobStatus.RUNNING,
+                         ExecutionJob.lease_expires_at < now,
+                         ExecutionJob.attempts < self._get_config('JOB_MAX_ATTEMPTS')))
+            ).order_by(ExecutionJob.priority, ExecutionJob.submit_time).limit(10).all()
+            jobs = [{
+                'job_id': job.job_id,
+                'status': job.status,
+                'attempt': job.attempts + 1,
+                'cmd': job.cmd,
+                'cwd': job.cwd,
+                'env_delta': job.env_delta or {},
+                'log_dir': job.log_dir,
+                'result_path': job.result_path,
+                'resource_limits': job.resource_limits or {}
+            } for job in candidates]
+            db.session.commit()
+
+            for job in jobs:
+                # 以读取时的状态和领取次数为条件，多个节点同时领取时只有一个成功
+                claimed = ExecutionJob.query.filter_by(
+                    job_id=job['job_id'], status=job['status'], attempts=job['attempt'] - 1
+                ).update({
+                    'status': ExecutionJobStatus.RUNNING,
+                    'agent_id': agent_id,
+                    'attempts': job['attempt'],
+                    'start_time': now,
+                    'heartbeat_at': now,
+                    'lease_expires_at': now + timedelta(seconds=self._get_config('JOB_LEASE_SECONDS'))
+                }, synchronize_session=False)
+                db.session.commit()
+                if claimed:
+                    return job
+            return None
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def heartbeat(self, job_id: str, agent_id: str, attempt: int) -> Optional[bool]:
+        """
+        续约
+
+        Args:
+            job_id: 任务ID
+            agent_id: 执行节点标识
+            attempt: 领取时的attempt
+
+        Returns:
+            bool: 提交方是否已请求停止；租约已被其他节点接手或任务已结束时返回None
+        """
+        now = datetime.utcnow()
+        try:
+            renewed = ExecutionJob.query.filter_by(
+                job_id=job_id, agent_id=agent_id, attempts=attempt, status=ExecutionJobStatus.RUNNING
+            ).update({
+                'heartbeat_at': now,
+                'lease_expires_at': now + timedelta(seconds=self._get_config('JOB_LEASE_SECONDS'))
+            }, synchronize_session=False)
+            cancel_requested = None
+            if renewed:
+                cancel_requested = bool(db.session.query(ExecutionJob.cancel_requested)
+                                        .filter_by(job_id=job_id).scalar())
+            db.session.commit()
+            return cancel_requested
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def finish(self, job_id: str, agent_id: str, attempt: int, status: str, return_code: int,
+               resource_usage: Optional[Dict] = None, error_message: Optional[str] = None) -> bool:
+        """
+        回报任务结果
+
+        Args:
+            job_id: 任务ID
+            agent_id: 执行节点标识
+            attempt: 领取时的attempt
+            status: 结束状态
+            return_code: 返回码
+            resource_usage: 资源占用汇总
+            error_message: 错误信息
+
+        Returns:
+            bool: 是否写入成功，租约已被其他节点接手时返回False
+        """
+        try:
+            updated = ExecutionJob.query.filter_by(
+                job_id=job_id, agent_id=agent_id, attempts=attempt, status=ExecutionJobStatus.RUNNING
+            ).update({
+                'status': status,
+                'return_code': return_code,
+                'end_time': datetime.utcnow(),
+                'resource_usage': resource_usage,
+                'error_message': error_message
+            }, synchronize_session=False)
+            db.session.commit()
+            return bool(updated)
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def release(self, job_id: str, agent_id: str, attempt: int) -> bool:
+        """
+        执行节点退出时交还任务，使其可以立即被其他节点领取；已请求停止的任务直接结束
+
+        Args:
+            job_id: 任务ID
+            agent_id: 执行节点标识
+            attempt: 领取时的attempt
+
+        Returns:
+            bool: 是否交还成功
+        """
+        held = dict(job_id=job_id, agent_id=agent_id, attempts=attempt, status=ExecutionJobStatus.RUNNING)
+        try:
+            updated = ExecutionJob.query.filter_by(cancel_requested=False, **held).update({
+                'status': ExecutionJobStatus.QUEUED,
+                'agent_id': None,
+                'lease_expires_at': None
+            }, synchronize_session=False)
+            if not updated:
+                updated = ExecutionJob.query.filter_by(cancel_requested=True, **held).update({
+                    'status': ExecutionJobStatus.STOPPED,
+                    'return_code': -1,
+                    'end_time': datetime.utcnow()
+                }, synchronize_session=False)
+            db.session.commit()
+            return bool(updated)
+        except Exception:
+            db.session.rollback()
+            raise
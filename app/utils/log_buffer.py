@@ -0,0 +1,149 @@
+"""
+进程输出环形缓冲区
+按字节数限制内存占用，超出部分溢写到日志文件，支持基于游标的增量读取
+"""
+import os
+import itertools
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+STREAMS = ('stdout', 'stderr')
+
+
+class LogRingBuffer:
+    """
+    进程输出环形缓冲区
+    每一行输出分配一个递增的游标（行号，从0开始，stdout和stderr共用），
+    缓冲区总字节数超过上限时淘汰最旧的行；配置了溢写文件时被淘汰的行追加写入该文件
+    """
+
+    def __init__(self, max_bytes: int, spill_path: Optional[str] = None):
+        """
+        初始化缓冲区
+
+        Args:
+            max_bytes: 缓冲区保留的最大字节数
+            spill_path: 溢写日志文件路径，为None时直接丢弃被淘汰的行
+        """
+        self.max_bytes = max_bytes
+        self.spill_path = spill_path
+        # 元素为 (游标, 输出流, 行内容, 字节数)
+        self._lines = deque()
+        self._retained_bytes = 0
+        self._next_cursor = 0
+        self._totals = {stream: {'lines': 0, 'bytes': 0} for stream in STREAMS}
+        self._spill_file = None
+        self._spilled_lines = 0
+        self._lock = threading.Lock()
+
+    def append(self, stream: str, line: str):
+        """
+        追加一行输出
+
+        Args:
+            stream: 'stdout'或'stderr'
+            line: 行内容（不含换行符）
+        """
+        size = len(line.encode('utf-8')) + 1
+        with self._lock:
+            self._lines.append((self._next_cursor, stream, line, size))
+            self._next_cursor += 1
+            self._retained_bytes += size
+            self._totals[stream]['lines'] += 1
+            self._totals[stream]['bytes'] += size
+
+            # 至少保留最新的一行
+            while self._retained_bytes > self.max_bytes and len(self._lines) > 1:
+                evicted = self._lines.popleft()
+                self._retained_bytes -= evicted[3]
+                self._spill(evicted)
+
+    def _spill(self, entry):
+        """
+        将被淘汰的行写入溢写文件
+
+        Args:
+            entry: (游标, 输出流, 行内容, 字节数)
+        """
+        if not self.spill_path:
+            return
+        try:
+            if self._spill_file is None:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                self._spill_file = open(self.spill_path, 'a', encoding='utf-8')
+            cursor, stream, line, _ = entry
+            self._spill_file.write(f"{cursor}\t{stream}\t{line}\n")
+            self._spilled_lines += 1
+        except Exception as e:
+            print(f"写入进程日志文件失败: {str(e)}")
+            self.spill_path = None
+
+    def close(self):
+        """
+        关闭溢写文件，进程结束后调用
+        """
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def read(self, since: Optional[int] = None) -> Dict:
+        """
+        读取游标之后的输出
+
+        Args:
+            since: 起始游标（包含），为None时返回缓冲区中保留的全部输出
+
+        Returns:
+            Dict: 新输出及游标、计数信息；truncated为True表示since之后有部分行已被淘汰，
+                需要从溢写文件中查看
+        """
+        with self._lock:
+            first_cursor = self._lines[0][0] if self._lines else self._next_cursor
+            if since is None or since < first_cursor:
+                start = first_cursor
+            else:
+                start = min(since, self._next_cursor)
+
+            # 游标连续，从尾部取出新增的行，耗时只与新增行数相关
+            count = self._next_cursor - start
+            entries = list(itertools.islice(reversed(self._lines), count))
+            entries.reverse()
+
+            output = {stream: [] for stream in STREAMS}
+            for _, stream, line, _ in entries:
+                output[stream].append(line)
+
+            return {
+                'stdout': '\n'.join(output['stdout']),
+                'stderr': '\n'.join(output['stderr']),
+                'cursor': start,
+                'next_cursor': self._next_cursor,
+                'first_cursor': first_cursor,
+                'truncated': since is not None and since < first_cursor,
+                'total_lines': self._next_cursor,
+                'total_bytes': sum(total['bytes'] for total in self._totals.values()),
+                'stdout_total_lines': self._totals['stdout']['lines'],
+                'stdout_total_bytes': self._totals['stdout']['bytes'],
+                'stderr_total_lines': self._totals['stderr']['lines'],
+                'stderr_total_bytes': self._totals['stderr']['bytes'],
+                'retained_bytes': self._retained_bytes,
+                'spilled_lines': self._spilled_lines,
+                'spill_file': self.spill_path if self._spilled_lines else None
+            }
+
+    def tail(self, count: int) -> List[List]:
+        """
+        读取最新的若干行（保留各行的游标和输出流）
+
+        Args:
+            count: 最多读取的行数
+
+        Returns:
+            List[List]: [游标, 输出流, 行内容]列表，按游标递增
+        """
+        with self._lock:
+            entries = list(itertools.islice(reversed(self._lines), count))
+        entries.reverse()
+        return [[cursor, stream, line] for cursor, stream, line, _ in entries]
@@ -0,0 +1,225 @@
+"""
+矩阵的多级分辨率（LOD）金字塔
+第k级把原始矩阵的每个2^k×2^k块合并为一个单元（块均值、最小值或最大值，忽略NaN），
+各级只在首次请求时由上一级计算并缓存；按显示区域的单元数上限（max_cells）选择级别，
+放大查看局部区域时直接从已计算的级别中截取
+"""
+import math
+import threading
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+# 块合并方式
+POOL_MEAN = 'mean'
+POOL_MIN = 'min'
+POOL_MAX = 'max'
+POOL_MODES = (POOL_MEAN, POOL_MIN, POOL_MAX)
+
+
+def _halve(array: np.ndarray, reduce, fill: float) -> np.ndarray:
+    """
+    将每个2×2块合并为一个单元，行数或列数为奇数时以fill补齐
+
+    Args:
+        array: 二维数组
+        reduce: 合并函数（如np.add、np.fmin），按轴归约
+        fill: 补齐的值
+
+    Returns:
+        np.ndarray: 行数和列数减半（向上取整）的数组
+    """
+    rows, cols = array.shape
+    if rows % 2 or cols % 2:
+        padded = np.full((rows + rows % 2, cols + cols % 2), fill, dtype=array.dtype)
+        padded[:rows, :cols] = array
+        array = padded
+    blocks = array.reshape(array.shape[0] // 2, 2, array.shape[1] // 2, 2)
+    return reduce.reduce(reduce.reduce(blocks, axis=3), axis=1)
+
+
+def level_count(shape: Tuple[int, int]) -> int:
+    """
+    金字塔的级数：最高一级的行数和列数都为1
+
+    Args:
+        shape: 原始矩阵的形状
+
+    Returns:
+        int: 级数（至少为1，第0级为原始矩阵）
+    """
+    return max(math.ceil(math.log2(max(shape[0], shape[1], 1))), 0) + 1
+
+
+def choose_level(rows: int, cols: int, max_cells: int, max_level: int) -> int:
+    """
+    选择单元数不超过max_cells的最精细的级别
+
+    Args:
+        rows: 显示区域在第0级的行数
+        cols: 显示区域在第0级的列数
+        max_cells: 单元数上限
+        max_level: 最高级别
+
+    Returns:
+        int: 级别，max_level仍超过上限时返回max_level
+    """
+    for level in range(max_level + 1):
+        factor = 1 << level
+        if math.ceil(rows / factor) * math.ceil(cols / factor) <= max_cells:
+            return level
+    return max_level
+
+
+class MatrixPyramid:
+    """
+    单个矩阵的金字塔，各级按合并方式分别缓存
+    均值保存各级的和与有效单元数，由原始单元精确计算，不是均值的均值
+    """
+
+    def __init__(self, array: np.ndarray):
+        """
+        初始化金字塔
+
+        Args:
+            array: 二维数值数组（第0级），NaN表示没有数据
+        """
+        self.shape = (int(array.shape[0]), int(array.shape[1]))
+        self.levels = level_count(self.shape)
+        self._base = np.asarray(array, dtype=np.float64)
+        # 合并方式 -> 各级的中间结果：均值为(和, 有效单元数)，最小值和最大值为数组本身
+        self._states: Dict[str, List[Any]] = {}
+        # (级别, 合并方式) -> 该级的数值
+        self._values: Dict[Tuple[int, str], np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, level: int, pool: str):
+        """
+        获取指定级别的中间结果，缺少的级别由上一级计算（调用方持有锁）
+        """
+        states = self._states.get(pool)
+        if states is None:
+            if pool == POOL_MEAN:
+                valid = ~np.isnan(self._base)
+                states = [(np.where(valid, self._base, 0.0), valid.astype(np.int32))]
+            else:
+                states = [self._base]
+            self._states[pool] = states
+        while len(states) <= level:
+            previous = states[-1]
+            if pool == POOL_MEAN:
+                states.append((_halve(previous[0], np.add, 0.0), _halve(previous[1], np.add, 0)))
+            else:
+                states.append(_halve(previous, np.fmin if pool == POOL_MIN else np.fmax, np.nan))
+        return states[level]
+
+    def level(self, level: int, pool: str = POOL_MEAN) -> np.ndarray:
+        """
+        获取指定级别的矩阵
+
+        Args:
+            level: 级别（0为原始矩阵，超过最高级别时取最高级别）
+            pool: 合并方式（mean、min或max）
+
+        Returns:
+            np.ndarray: float64数组，块内全部为NaN时该单元为NaN
+        """
+        level = min(max(level, 0), self.levels - 1)
+        with self._lock:
+            key = (level, pool)
+            if key not in self._values:
+                state = self._state(level, pool)
+                if pool == POOL_MEAN:
+                    total, count = state
+                    with np.errstate(invalid='ignore', divide='ignore'):
+                        values = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+                else:
+                    values = state
+                self._values[key] = values
+            return self._values[key]
+
+    @property
+    def nbytes(self) -> int:
+        """已计算的各级占用的字节数"""
+        with self._lock:
+            arrays = [self._base] + list(self._values.values())
+            for states in self._states.values():
+                for state in states:
+                    arrays.extend(state if isinstance(state, tuple) else (state,))
+            # 最小值和最大值的第0级、各级的数值与中间结果是同一个数组，只计算一次
+            return sum(int(array.nbytes) for array in {id(array): array for array in arrays}.values())
+
+
+def resolve_view(shape: Tuple[int, int], level: Optional[int] = None, max_cells: Optional[int] = None,
+                 window: Optional[List[int]] = None) -> Dict[str, Any]:
+    """
+    确定显示区域使用的级别和该级别中的行列范围
+
+    Args:
+        shape: 原始矩阵的形状
+        level: 指定的级别
+        max_cells: 显示区域的单元数上限，与level同时指定时取两者中较粗的级别
+        window: 显示区域在第0级中的行列范围[起始行, 起始列, 结束行, 结束列]（不含结束行列），为None时为整个矩阵
+
+    Returns:
+        Dict: level、factor（每个单元对应的原始行列数）、rows/cols（该级中的切片）、
+              window（按块对齐后在第0级中的范围）和max_level
+    """
+    rows, cols = shape
+    max_level = level_count(shape) - 1
+    if window is None:
+        window = [0, 0, rows, cols]
+    row_start, col_start = min(max(window[0], 0), rows), min(max(window[1], 0), cols)
+    row_stop, col_stop = min(max(window[2], row_start), rows), min(max(window[3], col_start), cols)
+
+    chosen = min(max(level or 0, 0), max_level)
+    if max_cells is not None:
+        chosen = max(chosen, choose_level(row_stop - row_start, col_stop - col_start, max_cells, max_level))
+    factor = 1 << chosen
+    level_rows = slice(row_start // factor, math.ceil(row_stop / factor))
+    level_cols = slice(col_start // factor, math.ceil(col_stop / factor))
+    return {
+        'level': chosen,
+        'factor': factor,
+        'rows': level_rows,
+        'cols': level_cols,
+        'window': [level_rows.start * factor, level_cols.start * factor,
+                   min(level_rows.stop * factor, rows), min(level_cols.stop * factor, cols)],
+        'max_level': max_level
+    }
+
+
+def parse_lod_params(args) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    解析请求中的LOD参数：lod（级别）、max_cells（单元数上限）、pool（合并方式）和window（显示区域）
+
+    Args:
+        args: request.args
+
+    Returns:
+        Tuple: (参数字典, 错误信息)；没有指定lod、max_cells和window时参数字典为None
+    """
+    params = {'level': None, 'max_cells': None, 'pool': args.get('pool', POOL_MEAN), 'window': None}
+    for name, key, minimum in (('lod', 'level', 0), ('max_cells', 'max_cells', 1)):
+        value = args.get(name)
+        if value is None:
+            continue
+        try:
+            params[key] = int(value)
+        except ValueError:
+            return None, f"{name}参数必须是整数"
+        if params[key] < minimum:
+            return None, f"{name}参数不能小于{minimum}"
+    if params['pool'] not in POOL_MODES:
+        return None, f"pool参数必须是{'、'.join(POOL_MODES)}之一"
+    window = args.get('window')
+    if window is not None:
+        try:
+            params['window'] = [int(value) for value in window.split(',')]
+        except ValueError:
+            params['window'] = None
+        if params['window'] is None or len(params['window']) != 4 \
+                or params['window'][0] >= params['window'][2] or params['window'][1] >= params['window'][3]:
+            return None, "window参数格式为起始行,起始列,结束行,结束列，且结束行列大于起始行列"
+    if params['level'] is None and params['max_cells'] is None and params['window'] is None:
+        return None, None
+    return params, None
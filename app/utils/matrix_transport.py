@@ -0,0 +1,301 @@
+"""
+矩阵的二进制传输与缓存
+结果接口中的网格（如验证任务类型2的高程矩阵和路径损耗矩阵）除JSON二维列表外，还可以按Accept请求头
+以小端float32二进制或JSON中的base64字符串返回，并附带形状和数据类型；
+从CSV文件读取的矩阵按文件缓存，文件未变化时重复查看不再解析和转换
+"""
+import os
+import json
+import base64
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from flask import current_app
+from config import Config
+from app.utils.matrix_pyramid import POOL_MEAN, MatrixPyramid, resolve_view
+
+# 矩阵的返回格式
+MATRIX_FORMAT_JSON = 'json'
+MATRIX_FORMAT_BASE64 = 'base64'
+MATRIX_FORMAT_BINARY = 'binary'
+
+# 返回格式对应的媒体类型，按Accept请求头协商；没有Accept请求头或为*/*时返回JSON
+MATRIX_MIMETYPES = OrderedDict([
+    ('application/json', MATRIX_FORMAT_JSON),
+    ('application/x-matrix+json', MATRIX_FORMAT_BASE64),
+    ('application/octet-stream', MATRIX_FORMAT_BINARY)
+])
+
+# 二进制和base64格式的数据类型：小端float32
+MATRIX_DTYPE = '<f4'
+
+
+def _get_config(key: str):
+    """
+    读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+    Args:
+        key: 配置项名称
+
+    Returns:
+        配置值
+    """
+    try:
+        return current_app.config[key]
+    except RuntimeError:
+        return getattr(Config, key)
+
+
+def negotiate_matrix_format(accept_mimetypes) -> str:
+    """
+    按Accept请求头选择矩阵的返回格式
+
+    Args:
+        accept_mimetypes: request.accept_mimetypes
+
+    Returns:
+        str: MATRIX_FORMAT_JSON、MATRIX_FORMAT_BASE64或MATRIX_FORMAT_BINARY
+    """
+    mimetype = accept_mimetypes.best_match(list(MATRIX_MIMETYPES), default='application/json')
+    return MATRIX_MIMETYPES[mimetype]
+
+
+class CachedMatrix:
+    """
+    缓存的矩阵，原始数组和按需生成的float32字节、base64字符串、多级分辨率金字塔一起保存
+    """
+
+    def __init__(self, array: np.ndarray, nan_to_none: bool = False, attrs: Optional[Dict[str, Any]] = None):
+        """
+        初始化缓存的矩阵
+
+        Args:
+            array: 二维数组，保持CSV解析得到的数据类型（JSON格式的数值与原有实现一致）
+            nan_to_none: JSON格式中是否将NaN（没有数据的单元）转换为null
+            attrs: 附加信息（如网格的经纬度原点和单元大小）
+        """
+        self.array = array
+        self.shape = tuple(int(n) for n in array.shape)
+        self.nan_to_none = nan_to_none
+        self.attrs = attrs or {}
+        self._encoded: Dict[str, Any] = {}
+        self._pyramid: Optional[MatrixPyramid] = None
+        # (级别, 合并方式) -> 整个级别的CachedMatrix，重复查看时复用其编码结果
+        self._levels: Dict[Tuple[int, str], 'CachedMatrix'] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        """原始数组、已生成的编码结果和金字塔占用的字节数"""
+        with self._lock:
+            total = int(self.array.nbytes) + sum(len(value) for value in self._encoded.values())
+            if self._pyramid is not None:
+                total += self._pyramid.nbytes
+            levels = list(self._levels.values())
+        # 各级的数组属于金字塔，这里只计算其编码结果
+        return total + sum(level.nbytes - int(level.array.nbytes) for level in levels)
+
+    def view(self, level: Optional[int] = None, max_cells: Optional[int] = None, pool: str = POOL_MEAN,
+             window: Optional[list] = None) -> Tuple['CachedMatrix', Dict[str, Any]]:
+        """
+        获取多级分辨率金字塔中的一级或其中的显示区域，金字塔在首次使用时生成
+
+        Args:
+            level: 级别（0为原始分辨率，每升一级行数和列数减半）
+            max_cells: 显示区域的单元数上限，按上限选择最精细的级别
+            pool: 块合并方式（mean、min或max）
+            window: 显示区域在原始分辨率中的范围[起始行, 起始列, 结束行, 结束列]
+
+        Returns:
+            Tuple: (该级别的矩阵, LOD信息{level, factor, pool, max_level, full_shape, window})；
+            矩阵中NaN在JSON格式中为null
+        """
+        view = resolve_view(self.shape, level, max_cells, window)
+        with self._lock:
+            if self._pyramid is None:
+                self._pyramid = MatrixPyramid(self.array)
+            pyramid = self._pyramid
+        values = pyramid.level(view['level'], pool)
+        if view['rows'] == slice(0, values.shape[0]) and view['cols'] == slice(0, values.shape[1]):
+            with self._lock:
+                key = (view['level'], pool)
+                if key not in self._levels:
+                    self._levels[key] = CachedMatrix(values, nan_to_none=True)
+                matrix = self._levels[key]
+        else:
+            matrix = CachedMatrix(values[view['rows'], view['cols']], nan_to_none=True)
+        return matrix, {
+            'level': view['level'],
+            'factor': view['factor'],
+            'pool': pool,
+            'max_level': view['max_level'],
+            'full_shape': list(self.shape),
+            'window': view['window']
+        }
+
+    def to_bytes(self) -> bytes:
+        """
+        转换为小端float32、按行存储的字节，结果被缓存
+
+        Returns:
+            bytes: 长度为行数×列数×4
+        """
+        with self._lock:
+            if 'bytes' not in self._encoded:
+                self._encoded['bytes'] = np.ascontiguousarray(self.array, dtype=MATRIX_DTYPE).tobytes()
+            return self._encoded['bytes']
+
+    def to_base64(self) -> Dict[str, Any]:
+        """
+        转换为JSON中使用的base64形式，base64字符串被缓存
+
+        Returns:
+            Dict: {'dtype': '<f4', 'shape': [行数, 列数], 'encoding': 'base64', 'data': base64字符串}
+        """
+        data = self.to_bytes()
+        with self._lock:
+            if 'base64' not in self._encoded:
+                self._encoded['base64'] = base64.b64encode(data).decode('ascii')
+            return {'dtype': MATRIX_DTYPE, 'shape': list(self.shape), 'encoding': 'base64',
+                    'data': self._encoded['base64']}
+
+    def encode(self, matrix_format: str) -> Any:
+        """
+        按返回格式转换矩阵
+
+        Args:
+            matrix_format: 返回格式
+
+        Returns:
+            JSON格式为二维列表，base64格式为字典，二进制格式为CachedMatrix本身（由pack_binary_result打包）
+        """
+        if matrix_format == MATRIX_FORMAT_BINARY:
+            return self
+        if matrix_format == MATRIX_FORMAT_BASE64:
+            return self.to_base64()
+        if self.nan_to_none and self.array.dtype.kind == 'f':
+            missing = np.isnan(self.array)
+            if missing.any():
+                return np.where(missing, None, self.array).tolist()
+        return self.array.tolist()
+
+
+# 没有数据时返回的空矩阵
+EMPTY_MATRIX = CachedMatrix(np.empty((0, 0), dtype=np.float64))
+
+
+def _file_key(path: str) -> Tuple[int, int, int]:
+    """
+    文件的inode、大小和修改时间，任一变化时缓存失效
+    """
+    stat = os.stat(path)
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+class MatrixCache:
+    """
+    矩阵缓存单例类
+    按文件缓存矩阵，文件的inode、大小或修改时间变化时重新读取；总大小超过MATRIX_CACHE_MAX_BYTES时淘汰最久未使用的矩阵
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(MatrixCache, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            # 文件路径 -> (文件标识, CachedMatrix)，按最近访问顺序从旧到新排列
+            self._entries: 'OrderedDict[str, Tuple[Tuple[int, int, int], CachedMatrix]]' = OrderedDict()
+            self._state_lock = threading.Lock()
+            self._stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+            self.initialized = True
+
+    def get(self, path: str, loader: Callable[[str], Any]) -> Optional[CachedMatrix]:
+        """
+        获取文件对应的矩阵，文件未变化时直接返回缓存，否则调用loader读取
+        缓存的矩阵在使用中会增加编码结果和金字塔，每次访问时都检查总大小
+
+        Args:
+            path: 文件路径
+            loader: 读取函数，参数为文件路径，返回二维数组或CachedMatrix，读取失败时返回None（不缓存）
+
+        Returns:
+            Optional[CachedMatrix]: 缓存的矩阵，文件不存在或读取失败时返回None
+        """
+        path = os.path.abspath(path)
+        try:
+            # 在读取之前获取文件标识，读取过程中文件被修改时下次访问重新读取
+            key = _file_key(path)
+        except OSError:
+            return None
+        with self._state_lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == key:
+                self._entries.move_to_end(path)
+                self._stats['hits'] += 1
+                self._evict()
+                return entry[1]
+            self._stats['misses'] += 1
+
+        array = loader(path)
+        if array is None:
+            return None
+        matrix = array if isinstance(array, CachedMatrix) else CachedMatrix(array)
+        with self._state_lock:
+            self._entries[path] = (key, matrix)
+            self._entries.move_to_end(path)
+            self._evict()
+        return matrix
+
+    def _evict(self):
+        """淘汰最久未使用的矩阵直到总大小不超过上限，最近访问的矩阵始终保留（调用方持有状态锁）"""
+        max_bytes = _get_config('MATRIX_CACHE_MAX_BYTES')
+        total = sum(matrix.nbytes for _, matrix in self._entries.values())
+        while len(self._entries) > 1 and total > max_bytes:
+            _, (_, matrix) = self._entries.popitem(last=False)
+            total -= matrix.nbytes
+            self._stats['evictions'] += 1
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            Dict: 命中数、未命中数、淘汰数、当前的矩阵数和总大小
+        """
+        with self._state_lock:
+            stats = dict(self._stats)
+            stats.update({
+                'entries': len(self._entries),
+                'total_bytes': sum(matrix.nbytes for _, matrix in self._entries.values()),
+                'max_bytes': _get_config('MATRIX_CACHE_MAX_BYTES')
+            })
+            return stats
+
+
+def pack_binary_result(result: Dict) -> Optional[Tuple[bytes, Dict[str, str]]]:
+    """
+    将结果中的矩阵（值为CachedMatrix的字段）打包为二进制响应：响应体依次为各矩阵的小端float32字节，
+    矩阵名称、形状和数据类型以及其余字段放在响应头中
+
+    Args:
+        result: 结果字典
+
+    Returns:
+        Optional[Tuple]: (响应体, 响应头)，结果中没有矩阵时返回None（应返回JSON）
+    """
+    names = [key for key, value in result.items() if isinstance(value, CachedMatrix)]
+    if not names:
+        return None
+    meta = {key: value for key, value in result.items() if key not in names}
+    return b''.join(result[name].to_bytes() for name in names), {
+        'X-Matrix-Names': ','.join(names),
+        'X-Matrix-Shapes': ';'.join(','.join(str(n) for n in result[name].shape) for name in names),
+        'X-Matrix-Dtype': MATRIX_DTYPE,
+        'X-Result-Meta': json.dumps(meta, ensure_ascii=True)
+    }
@@ -0,0 +1,179 @@
+"""
+数值CSV文件增量读取
+读取模型仍在写入的无表头数值CSV文件（如验证任务类型1的pathloss_result.csv）：
+记录已读取的字节偏移量，已解析的行保存为float64数组，每次只解析新追加的完整行，并增量查找第一个全零行
+"""
+import io
+import os
+import threading
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional
+
+# 追加判断时比对的已读取内容末尾字节数
+_BOUNDARY_BYTES = 64
+# 数组的初始容量（行）
+_INITIAL_CAPACITY = 1024
+
+
+class NumericCsvTail:
+    """
+    数值CSV文件增量读取器
+    只解析以换行符结尾的完整行，未写完的最后一行留到下次读取；文件未变化（大小和修改时间相同）时不读取文件。
+    以下情况从头重新读取：文件被替换、变短、大小不变但修改时间变化（被原地重写），
+    或者变长但已读取内容的末尾字节发生变化（不是追加写入）
+    """
+
+    def __init__(self, path: str, column_count: int):
+        """
+        初始化读取器
+
+        Args:
+            path: CSV文件路径
+            column_count: 列数，多余的列被忽略，缺少的列为NaN
+        """
+        self.path = path
+        self.column_count = column_count
+        self.resets = 0
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """清空已读取的内容（调用方持有锁）"""
+        self._data = np.empty((_INITIAL_CAPACITY, self.column_count), dtype=np.float64)
+        self.rows = 0
+        self.offset = 0
+        self.first_zero_row = -1
+        self._inode = None
+        self._mtime = None
+        self._boundary = b''
+
+    def _parse(self, data: bytes) -> np.ndarray:
+        """
+        解析完整行，解析规则与pd.read_csv(header=None)一致（空行被忽略）
+
+        Args:
+            data: 以换行符结尾的若干行
+
+        Returns:
+            np.ndarray: 数组(行数, 列数)
+        """
+        df = pd.read_csv(io.BytesIO(data), header=None, names=list(range(self.column_count)))
+        return df.to_numpy(dtype=np.float64)
+
+    def _append(self, block: np.ndarray):
+        """
+        追加已解析的行，并在尚未找到全零行时查找（调用方持有锁）
+
+        Args:
+            block: 数组(行数, 列数)
+        """
+        needed = self.rows + len(block)
+        if needed > len(self._data):
+            capacity = max(needed, len(self._data) * 2)
+            data = np.empty((capacity, self.column_count), dtype=np.float64)
+            data[:self.rows] = self._data[:self.rows]
+            self._data = data
+        self._data[self.rows:needed] = block
+        if self.first_zero_row == -1:
+            zero_rows = np.flatnonzero(np.all(block == 0, axis=1))
+            if len(zero_rows):
+                self.first_zero_row = self.rows + int(zero_rows[0])
+        self.rows = needed
+
+    def poll(self) -> int:
+        """
+        读取文件中新追加的完整行
+
+        Returns:
+            int: 新解析的行数
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                return 0
+            size = stat.st_size
+            if stat.st_ino == self._inode and size == self.offset and stat.st_mtime_ns == self._mtime:
+                return 0
+
+            with open(self.path, 'rb') as f:
+                if self._inode is not None:
+                    rewritten = stat.st_ino != self._inode or size <= self.offset
+                    if not rewritten and self._boundary:
+                        f.seek(self.offset - len(self._boundary))
+                        rewritten = f.read(len(self._boundary)) != self._boundary
+                    if rewritten:
+                        self._reset()
+                        self.resets += 1
+                f.seek(self.offset)
+                data = f.read(size - self.offset)
+
+            end = data.rfind(b'\n') + 1
+            # 先解析再更新偏移量，解析失败时下次重新读取同一段内容
+            block = self._parse(data[:end]) if data[:end].strip() else None
+            self._inode = stat.st_ino
+            # 未写完的最后一行不计入偏移量，修改时间留到下次读取完整行时更新
+            self._mtime = stat.st_mtime_ns if end == len(data) else None
+            self.offset += end
+            self._boundary = (self._boundary + data[:end])[-_BOUNDARY_BYTES:]
+            if block is None:
+                return 0
+            self._append(block)
+            return len(block)
+
+    def read_before_zero_row(self, index: Optional[int] = None, start: int = 0,
+                             max_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        读取第一个全零行（数据结束标记）之前、从start行到指定行为止的数据
+
+        latest_index为全零行的前一行（未找到全零行时为-1）；index为None时取latest_index，
+        小于0时取0，大于latest_index时取latest_index
+
+        Args:
+            index: 要读取到的行号（从0开始）
+            start: 起始行号，用于只返回客户端还没有的行
+            max_rows: 最多返回的行数，为None时不限制
+
+        Returns:
+            Dict: columns（各列的数值列表）、latest_index、target_index（实际读取到的行号）、
+            stop（返回的最后一行之后的行号）和end（不限制行数时的stop）
+        """
+        with self._lock:
+            if self.first_zero_row != -1:
+                available = self.first_zero_row
+                latest_index = self.first_zero_row - 1
+            else:
+                available = self.rows
+                latest_index = -1
+            target_index = latest_index if index is None else index
+            if target_index < 0:
+                target_index = 0
+            elif target_index > latest_index:
+                target_index = latest_index
+            start = max(start, 0)
+            end = max(start, min(target_index + 1, available))
+            stop = end if max_rows is None else min(end, start + max_rows)
+            return {
+                'columns': [self._data[start:stop, column].tolist() for column in range(self.column_count)],
+                'latest_index': latest_index,
+                'target_index': target_index,
+                'stop': stop,
+                'end': end
+            }
+
+    def get_stats(self) -> Dict:
+        """
+        获取读取进度
+
+        Returns:
+            Dict: 已解析行数、已读取的字节偏移量、第一个全零行、重新读取次数和数组占用的字节数
+        """
+        with self._lock:
+            return {
+                'rows': self.rows,
+                'offset': self.offset,
+                'first_zero_row': self.first_zero_row,
+                'resets': self.resets,
+                'nbytes': int(self._data.nbytes)
+            }
@@ -0,0 +1,179 @@
+"""
+发射机-接收机配对CSV生成
+按块生成发射机×接收机的笛卡尔积并流式写入磁盘：每个发射机和接收机的字段只格式化一次，
+每块数据行由str.join在C层拼接后一次写入，内存占用与配对总数无关
+"""
+import io
+import csv
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+# 未提供频率时使用的默认频率（MHz）
+DEFAULT_FREQUENCY_MHZ = 5900
+# 每次写入的数据行数
+DEFAULT_CHUNK_ROWS = 65536
+
+# 频率单位 -> 换算为MHz的倍数
+_UNIT_TO_MHZ = {
+    'hz': Decimal('0.000001'),
+    'khz': Decimal('0.001'),
+    'mhz': Decimal('1'),
+    'ghz': Decimal('1000'),
+    'thz': Decimal('1000000')
+}
+_NUMBER = r'[0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?'
+# 数值或范围（取中心频率），单位可省略（默认MHz）、可省略Hz（如"3.5G"）
+_FREQUENCY_PATTERN = re.compile(
+    rf'^\s*({_NUMBER})\s*(?:(?:-|~|～)\s*({_NUMBER})\s*)?([kKmMgGtT]?)\s*([hH][zZ])?\s*$'
+)
+
+# csv.writer默认的行结束符，与原有的逐行写入结果一致
+_LINE_TERMINATOR = '\r\n'
+
+
+def _to_number(value: Decimal) -> Union[int, float]:
+    """
+    将十进制数转换为int（整数值）或float
+
+    Args:
+        value: 十进制数
+
+    Returns:
+        Union[int, float]: 数值
+    """
+    return int(value) if value == value.to_integral_value() else float(value)
+
+
+def parse_frequency_mhz(value: Any) -> Union[int, float]:
+    """
+    解析频率，统一换算为MHz
+
+    支持数值（视为MHz）和带单位的字符串，如"5.9GHz"、"2400 MHz"、"3.5G"、"868e3 kHz"，
+    范围（如"3.4-3.6GHz"）取中心频率；单位不区分大小写
+
+    Args:
+        value: 频率
+
+    Returns:
+        Union[int, float]: 频率（MHz），整数值返回int
+
+    Raises:
+        ValueError: 无法解析或频率不为正数
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"无法解析频率: {value!r}")
+    if isinstance(value, (int, float)):
+        mhz = Decimal(str(value))
+    elif isinstance(value, str):
+        match = _FREQUENCY_PATTERN.match(value)
+        if not match:
+            raise ValueError(f"无法解析频率: {value!r}")
+        low, high, prefix, hz = match.groups()
+        if not prefix and hz:
+            unit = 'hz'
+        else:
+            unit = (prefix or 'm').lower() + 'hz'
+        try:
+            number = Decimal(low) if high is None else (Decimal(low) + Decimal(high)) / 2
+        except InvalidOperation:
+            raise ValueError(f"无法解析频率: {value!r}")
+        mhz = number * _UNIT_TO_MHZ[unit]
+    else:
+        raise ValueError(f"无法解析频率: {value!r}")
+    if not mhz.is_finite() or mhz <= 0:
+        raise ValueError(f"频率必须为正数: {value!r}")
+    return _to_number(mhz.normalize())
+
+
+def _format_fields(fields: List[Any]) -> str:
+    """
+    按csv.writer的规则格式化一组字段（不含行结束符）
+
+    Args:
+        fields: 字段列表
+
+    Returns:
+        str: 以逗号分隔的字段
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator='').writerow(fields)
+    return buffer.getvalue()
+
+
+def iter_pair_chunks(tx_pos_list: List[Dict[str, Any]], rx_pos_list: List[Dict[str, Any]], frequency: Any,
+                     chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[str]:
+    """
+    按块生成发射机×接收机配对的CSV内容
+
+    每行格式为tx_lat,tx_lon,tx_height,rx_lat,rx_lon,rx_height,frequency（与模型main.py期望的格式一致），
+    按发射机优先的顺序排列；同一发射机的若干行为"发射机前缀 + 接收机后缀"，由str.join一次拼接
+
+    Args:
+        tx_pos_list: 发射机位置列表
+        rx_pos_list: 接收机位置列表
+        frequency: 频率（MHz）
+        chunk_rows: 每块的数据行数
+
+    Returns:
+        Iterator[str]: CSV内容块
+    """
+    chunk_rows = max(int(chunk_rows), 1)
+    tx_prefixes = [_format_fields([pos.get('lat', 0), pos.get('lon', 0), pos.get('height', 0)]) + ','
+                   for pos in tx_pos_list]
+    frequency_field = _format_fields([frequency])
+    rx_suffixes = [f"{_format_fields([pos.get('lat', 0), pos.get('lon', 0), pos.get('height', 0)])},"
+                   f"{frequency_field}{_LINE_TERMINATOR}" for pos in rx_pos_list]
+    rx_count = len(rx_suffixes)
+    if not tx_prefixes or not rx_count:
+        return
+
+    if rx_count >= chunk_rows:
+        # 接收机较多：每个发射机按接收机切块
+        for prefix in tx_prefixes:
+            for start in range(0, rx_count, chunk_rows):
+                yield prefix + prefix.join(rx_suffixes[start:start + chunk_rows])
+    else:
+        # 接收机较少：多个发射机合并为一块
+        tx_per_chunk = chunk_rows // rx_count
+        for start in range(0, len(tx_prefixes), tx_per_chunk):
+            yield ''.join(prefix + prefix.join(rx_suffixes) for prefix in tx_prefixes[start:start + tx_per_chunk])
+
+
+def write_pairs_csv(csv_file_path: str, tx_pos_list: List[Dict[str, Any]], rx_pos_list: List[Dict[str, Any]],
+                    frequency: Any = DEFAULT_FREQUENCY_MHZ, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> int:
+    """
+    生成发射机×接收机配对的CSV文件
+
+    Args:
+        csv_file_path: CSV文件保存路径
+        tx_pos_list: 发射机位置列表
+        rx_pos_list: 接收机位置列表
+        frequency: 频率（MHz）
+        chunk_rows: 每次写入的数据行数
+
+    Returns:
+        int: 写入的数据行数
+    """
+    with open(csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        for chunk in iter_pair_chunks(tx_pos_list, rx_pos_list, frequency, chunk_rows):
+            csvfile.write(chunk)
+    return len(tx_pos_list) * len(rx_pos_list)
+
+
+def get_frequency_from_params(param_config: Optional[Dict[str, Any]]) -> Union[int, float]:
+    """
+    从参数配置中读取频率（frequency_band），未提供时返回默认频率
+
+    Args:
+        param_config: 参数配置
+
+    Returns:
+        Union[int, float]: 频率（MHz）
+
+    Raises:
+        ValueError: frequency_band无法解析
+    """
+    if param_config and param_config.get('frequency_band') not in (None, ''):
+        return parse_frequency_mhz(param_config['frequency_band'])
+    return DEFAULT_FREQUENCY_MHZ
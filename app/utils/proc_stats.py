@@ -0,0 +1,324 @@
+"""
+进程资源采样
+从/proc读取子进程树的CPU时间、内存、I/O和线程数，仅在Linux上可用
+"""
+import os
+import sys
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+_CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def is_supported() -> bool:
+    """
+    当前平台是否支持/proc采样
+
+    Returns:
+        bool: Linux且/proc可用时返回True
+    """
+    return sys.platform.startswith('linux') and os.path.isdir('/proc')
+
+
+def read_stat(pid: int) -> Optional[Dict]:
+    """
+    解析/proc/<pid>/stat
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        Dict: 状态、父进程ID、进程组ID、启动时间、CPU秒数、线程数和常驻内存字节数，进程不存在时返回None
+    """
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    # 进程名可能包含空格和括号，从最后一个')'之后开始按空格分割
+    fields = data[data.rfind(b')') + 2:].split()
+    try:
+        return {
+            'state': fields[0].decode('ascii', errors='replace'),
+            'ppid': int(fields[1]),
+            'pgrp': int(fields[2]),
+            'cpu_seconds': (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS,
+            'threads': int(fields[17]),
+            'start': int(fields[19]),
+            'rss_bytes': int(fields[21]) * _PAGE_SIZE
+        }
+    except (IndexError, ValueError):
+        return None
+
+
+def scan_processes() -> Dict[int, Dict]:
+    """
+    读取系统中所有进程的stat信息，每个采样周期只扫描一次，供所有任务共用
+
+    Returns:
+        Dict[int, Dict]: 进程ID到stat信息的映射
+    """
+    table = {}
+    try:
+        entries = os.listdir('/proc')
+    except OSError:
+        return table
+    for entry in entries:
+        if entry.isdigit():
+            stat = read_stat(int(entry))
+            if stat is not None:
+                table[int(entry)] = stat
+    return table
+
+
+def build_children_map(table: Dict[int, Dict]) -> Dict[int, List[int]]:
+    """
+    根据进程表构建父进程到子进程的映射
+
+    Args:
+        table: scan_processes返回的进程表
+
+    Returns:
+        Dict[int, List[int]]: 父进程ID到子进程ID列表的映射
+    """
+    children = {}
+    for pid, stat in table.items():
+        children.setdefault(stat['ppid'], []).append(pid)
+    return children
+
+
+def collect_tree(root_pid: int, children: Dict[int, List[int]]) -> List[int]:
+    """
+    获取根进程及其全部子孙进程
+
+    Args:
+        root_pid: 根进程ID
+        children: build_children_map返回的父子映射
+
+    Returns:
+        List[int]: 进程ID列表，第一个为根进程
+    """
+    tree = []
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        tree.append(pid)
+        stack.extend(children.get(pid, ()))
+    return tree
+
+
+def read_environ_value(pid: int, name: str) -> Optional[str]:
+    """
+    读取进程启动时的环境变量值
+
+    Args:
+        pid: 进程ID
+        name: 环境变量名
+
+    Returns:
+        str: 环境变量值，不存在或无权限读取时返回None
+    """
+    prefix = name.encode() + b'='
+    try:
+        with open(f'/proc/{pid}/environ', 'rb') as f:
+            data = f.read()
+    except OSError:
+        return None
+    for item in data.split(b'\0'):
+        if item.startswith(prefix):
+            return item[len(prefix):].decode('utf-8', errors='replace')
+    return None
+
+
+def _read_io(pid: int) -> Dict[str, int]:
+    """
+    读取/proc/<pid>/io中实际发生的磁盘读写字节数
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        Dict[str, int]: read_bytes和write_bytes，无权限读取时为0
+    """
+    result = {'read_bytes': 0, 'write_bytes': 0}
+    try:
+        with open(f'/proc/{pid}/io', 'r') as f:
+            for line in f:
+                name, _, value = line.partition(':')
+                if name in result:
+                    result[name] = int(value)
+    except (OSError, ValueError):
+        pass
+    return result
+
+
+def _read_peak_rss(pid: int) -> int:
+    """
+    读取/proc/<pid>/status中的VmHWM（进程生命周期内的常驻内存峰值）
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        int: 峰值常驻内存字节数，读取失败时返回0
+    """
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+class ResourceTracker:
+    """
+    单个任务的资源统计
+    每次采样遍历根进程及其全部子孙进程；已退出子进程的CPU时间和I/O保留其最后一次采样值，
+    进程以(PID, 启动时间)区分，避免PID被复用时计入无关进程
+    """
+
+    def __init__(self, root_pid: int, history: int = 60, baseline: bool = False):
+        """
+        初始化资源统计
+
+        Args:
+            root_pid: 根进程ID
+            history: 保留的最近采样点数量
+            baseline: 是否以首次采样时根进程已消耗的资源为基线（常驻工作进程在任务开始前已在运行）
+        """
+        self.root_pid = root_pid
+        self.baseline = baseline
+        self.samples = deque(maxlen=history)
+        # (PID, 启动时间) -> {'cpu_seconds','read_bytes','write_bytes'} 的最新值和基线
+        self._latest: Dict[tuple, Dict] = {}
+        self._base: Dict[tuple, Dict] = {}
+        self._peak_rss_bytes = 0
+        self._max_threads = 0
+        self._max_processes = 0
+        self._sample_count = 0
+        self._last = None
+        # 采样线程写入、请求线程读取
+        self._lock = threading.Lock()
+
+    def sample(self, table: Dict[int, Dict], children: Dict[int, List[int]]):
+        """
+        采样一次
+
+        Args:
+            table: scan_processes返回的进程表
+            children: build_children_map返回的父子映射
+        """
+        if self.root_pid not in table:
+            return
+
+        tree = collect_tree(self.root_pid, children)
+        with self._lock:
+            self._record(tree, table)
+
+    def _record(self, tree: List[int], table: Dict[int, Dict]):
+        """
+        记录一次采样结果
+
+        Args:
+            tree: 根进程及其子孙进程ID
+            table: scan_processes返回的进程表
+        """
+        rss_bytes = 0
+        threads = 0
+        for pid in tree:
+            stat = table[pid]
+            key = (pid, stat['start'])
+            values = {'cpu_seconds': stat['cpu_seconds'], **_read_io(pid)}
+            if key not in self._latest and self.baseline and pid == self.root_pid:
+                self._base[key] = values
+            self._latest[key] = values
+            rss_bytes += stat['rss_bytes']
+            threads += stat['threads']
+
+        totals = self._totals()
+        now = time.time()
+        cpu_percent = None
+        if self._last is not None and now > self._last[0]:
+            cpu_percent = round((totals['cpu_seconds'] - self._last[1]) / (now - self._last[0]) * 100, 1)
+        self._last = (now, totals['cpu_seconds'])
+
+        self._peak_rss_bytes = max(self._peak_rss_bytes, rss_bytes)
+        if not self.baseline:
+            # 冷启动的根进程由本任务独占，VmHWM可以捕捉到两次采样之间的峰值
+            self._peak_rss_bytes = max(self._peak_rss_bytes, _read_peak_rss(self.root_pid))
+        self._max_threads = max(self._max_threads, threads)
+        self._max_processes = max(self._max_processes, len(tree))
+        self._sample_count += 1
+
+        self.samples.append({
+            'timestamp': round(now, 3),
+            'cpu_seconds': round(totals['cpu_seconds'], 2),
+            'cpu_percent': cpu_percent,
+            'rss_bytes': rss_bytes,
+            'read_bytes': totals['read_bytes'],
+            'write_bytes': totals['write_bytes'],
+            'threads': threads,
+            'process_count': len(tree)
+        })
+
+    def _totals(self) -> Dict:
+        """
+        汇总所有出现过的进程扣除基线后的CPU时间和I/O
+
+        Returns:
+            Dict: cpu_seconds、read_bytes、write_bytes
+        """
+        totals = {'cpu_seconds': 0.0, 'read_bytes': 0, 'write_bytes': 0}
+        for key, values in self._latest.items():
+            base = self._base.get(key)
+            for name in totals:
+                totals[name] += values[name] - (base[name] if base else 0)
+        return totals
+
+    def summary(self, wall_time_seconds: Optional[float] = None) -> Dict:
+        """
+        获取资源占用汇总
+
+        Args:
+            wall_time_seconds: 任务运行的墙钟时间（秒）
+
+        Returns:
+            Dict: 峰值内存、CPU秒数、墙钟时间、I/O字节数等
+        """
+        with self._lock:
+            totals = self._totals()
+        return {
+            'peak_rss_bytes': self._peak_rss_bytes,
+            'cpu_seconds': round(totals['cpu_seconds'], 2),
+            'wall_time_seconds': round(wall_time_seconds, 2) if wall_time_seconds is not None else None,
+            'read_bytes': totals['read_bytes'],
+            'write_bytes': totals['write_bytes'],
+            'max_threads': self._max_threads,
+            'max_processes': self._max_processes,
+            'sample_count': self._sample_count
+        }
+
+    def get_latest_sample(self) -> Optional[Dict]:
+        """
+        获取最近一次采样
+
+        Returns:
+            Dict: 采样点，尚未采样时返回None
+        """
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def get_samples(self) -> List[Dict]:
+        """
+        获取最近的采样点
+
+        Returns:
+            List[Dict]: 采样点列表，按时间升序
+        """
+        with self._lock:
+            return list(self.samples)
@@ -0,0 +1,262 @@
+"""
+进程组管理
+每个任务在独立的会话（进程组）中运行，停止时向整个进程组发送信号，
+并查找失去任务记录的残留进程
+"""
+import os
+import signal
+import subprocess
+import threading
+from typing import Dict, List, Callable, Optional
+from app.utils import proc_stats
+
+# 子进程环境变量中的任务标识，用于识别残留进程属于哪个任务
+TASK_ID_ENV = 'BJUST_TASK_ID'
+# 子进程环境变量中的所有者标识（启动该任务的服务进程或执行节点），多个服务进程只清理各自的残留进程
+OWNER_ENV = 'BJUST_TASK_OWNER'
+
+
+def owner_id(pid: Optional[int] = None) -> str:
+    """
+    获取进程的所有者标识：进程ID和启动时间，PID被复用时标识不同
+
+    Args:
+        pid: 进程ID，为None时为当前进程（每次调用时读取，fork出的服务进程各自不同）
+
+    Returns:
+        str: "进程ID:启动时间"，无法获取启动时间时为"进程ID:0"
+    """
+    pid = os.getpid() if pid is None else pid
+    stat = proc_stats.read_stat(pid) if proc_stats.is_supported() else None
+    return f"{pid}:{stat['start'] if stat else 0}"
+
+
+def is_pid_alive(pid: int, pid_start: Optional[int]) -> bool:
+    """
+    判断进程是否仍在运行
+
+    Args:
+        pid: 进程ID
+        pid_start: 进程启动时间（开机后的时钟节拍数），为None时不比较
+
+    Returns:
+        bool: 进程存在且不是复用了同一PID的其他进程时返回True
+    """
+    if proc_stats.is_supported():
+        stat = proc_stats.read_stat(pid)
+        return stat is not None and stat['state'] != 'Z' and (pid_start is None or stat['start'] == pid_start)
+    if os.name == 'nt':
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        exit_code = ctypes.c_ulong()
+        kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+        kernel32.CloseHandle(handle)
+        return exit_code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+        return True
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+
+
+def is_owner_alive(owner: str) -> bool:
+    """
+    所有者标识对应的进程是否仍在运行
+
+    Args:
+        owner: owner_id返回的标识
+
+    Returns:
+        bool: 进程存在且启动时间一致时返回True；标识无法解析时视为仍在运行
+    """
+    try:
+        pid, start = (int(part) for part in owner.split(':'))
+    except ValueError:
+        return True
+    return is_pid_alive(pid, start or None)
+
+
+def tag_env(env: Dict, task_id: str) -> Dict:
+    """
+    在子进程环境变量中写入任务标识和当前进程的所有者标识
+
+    Args:
+        env: 环境变量（原地修改）
+        task_id: 任务标识
+
+    Returns:
+        Dict: env本身
+    """
+    env[TASK_ID_ENV] = task_id
+    env[OWNER_ENV] = owner_id()
+    return env
+
+
+def popen_kwargs() -> Dict:
+    """
+    在独立进程组中创建子进程所需的Popen参数
+
+    Returns:
+        Dict: POSIX下为start_new_session，Windows下为进程组创建标志
+    """
+    if os.name == 'posix':
+        return {'start_new_session': True}
+    return {
+        # Windows下隐藏控制台窗口并创建新的进程组
+        'creationflags': getattr(subprocess, 'CREATE_NO_WINDOW', 0) | getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)
+    }
+
+
+def get_group_members(pgid: int, table: Optional[Dict[int, Dict]] = None) -> List[int]:
+    """
+    获取进程组中尚未退出的进程
+
+    Args:
+        pgid: 进程组ID
+        table: scan_processes返回的进程表，为None时重新扫描
+
+    Returns:
+        List[int]: 进程ID列表（不含僵尸进程）
+    """
+    if table is None:
+        table = proc_stats.scan_processes()
+    return [pid for pid, stat in table.items() if stat['pgrp'] == pgid and stat['state'] != 'Z']
+
+
+def _is_group_alive(pgid: int) -> bool:
+    """
+    进程组中是否还有存活的进程
+
+    Args:
+        pgid: 进程组ID
+
+    Returns:
+        bool: 有存活进程时返回True
+    """
+    if proc_stats.is_supported():
+        return bool(get_group_members(pgid))
+    try:
+        os.killpg(pgid, 0)
+        return True
+    except (ProcessLookupError, PermissionError):
+        return False
+
+
+def _signal_group(pgid: int, sig: int):
+    """
+    向进程组发送信号，进程组已不存在时忽略
+
+    Args:
+        pgid: 进程组ID
+        sig: 信号
+    """
+    try:
+        os.killpg(pgid, sig)
+    except ProcessLookupError:
+        pass
+
+
+def terminate_group(process, grace_seconds: float, on_finished: Optional[Callable[[bool], None]] = None):
+    """
+    结束子进程所在的整个进程组：先发送SIGTERM，宽限期后仍有存活进程则发送SIGKILL
+    宽限期在后台计时，不阻塞调用方
+
+    Args:
+        process: 以popen_kwargs()创建的subprocess.Popen对象（进程组ID等于其PID）
+        grace_seconds: 宽限期（秒）
+        on_finished: 结束流程完成后的回调，参数为是否发送了SIGKILL
+    """
+    if os.name != 'posix':
+        # Windows没有进程组信号，直接结束整个进程树
+        subprocess.run(['taskkill', '/T', '/F', '/PID', str(process.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                       creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+        if on_finished:
+            on_finished(False)
+        return
+
+    pgid = process.pid
+    _signal_group(pgid, signal.SIGTERM)
+
+    def escalate():
+        escalated = False
+        if _is_group_alive(pgid):
+            _signal_group(pgid, signal.SIGKILL)
+            escalated = True
+        if on_finished:
+            try:
+                on_finished(escalated)
+            except Exception as e:
+                print(f"处理进程组结束回调时发生错误: {str(e)}")
+
+    timer = threading.Timer(grace_seconds, escalate)
+    timer.daemon = True
+    timer.start()
+
+
+def find_strays(is_known: Callable[[str], bool],
+                is_adopted: Optional[Callable[[str], bool]] = None) -> List[Dict]:
+    """
+    查找带有任务标识、但对应任务已不在运行的残留进程（仅Linux）
+    只检查所有者为当前进程或所有者已退出的进程；其他服务进程、执行节点仍在运行的任务不受影响，
+    没有所有者标识的进程（早期版本启动）无法判断归属，也不清理
+
+    Args:
+        is_known: 判断任务标识是否仍属于当前进程中运行中任务的函数
+        is_adopted: 判断所有者已退出的任务是否已被其他存活的服务进程接管的函数，为None时不检查
+
+    Returns:
+        List[Dict]: 残留进程列表，包含pid、task_id、owner、rss_bytes、threads
+    """
+    if not proc_stats.is_supported():
+        return []
+    own_pid = os.getpid()
+    own_owner = owner_id(own_pid)
+    strays = []
+    for pid, stat in proc_stats.scan_processes().items():
+        if pid == own_pid or stat['state'] == 'Z':
+            continue
+        task_id = proc_stats.read_environ_value(pid, TASK_ID_ENV)
+        if not task_id or is_known(task_id):
+            continue
+        owner = proc_stats.read_environ_value(pid, OWNER_ENV)
+        if owner != own_owner:
+            if owner is None or is_owner_alive(owner):
+                continue
+            if is_adopted is not None and is_adopted(task_id):
+                continue
+        strays.append({
+            'pid': pid,
+            'task_id': task_id,
+            'owner': owner,
+            'rss_bytes': stat['rss_bytes'],
+            'threads': stat['threads']
+        })
+    return strays
+
+
+def kill_strays(strays: List[Dict]) -> Dict:
+    """
+    强制结束残留进程
+
+    Args:
+        strays: find_strays返回的残留进程列表
+
+    Returns:
+        Dict: 结束的进程数和释放的常驻内存字节数
+    """
+    killed = 0
+    freed_rss_bytes = 0
+    for stray in strays:
+        try:
+            os.kill(stray['pid'], signal.SIGKILL)
+            killed += 1
+            freed_rss_bytes += stray['rss_bytes']
+        except (ProcessLookupError, PermissionError):
+            pass
+    return {'killed': killed, 'freed_rss_bytes': freed_rss_bytes}
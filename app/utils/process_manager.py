@@ -3,263 +3,981 @@
 用于管理异步执行的子进程
 """
 import os
+import time
+import heapq
+import itertools
 import subprocess
 import threading
-import queue
-from typing import Dict, Optional, Callable
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Callable
 from datetime import datetime
 from flask import current_app
+from config import Config
 from app import db
 from app.model.evaluate_info import EvaluateInfo, EvaluateStatusType
+from app.utils.process_reactor import ProcessReactor
+from app.utils.log_buffer import LogRingBuffer
+from app.utils.worker_pool import WarmWorkerPool, WarmWorkerJob
+from app.utils import proc_stats
+from app.utils import resource_profile
+from app.utils import process_group
+from app.utils import fair_share
+from app.utils.task_registry import TaskRegistry, ReattachedProcess, resolve_ref
+from app.utils.job_queue import JobQueue
+
+# 进程输出溢写日志文件名（位于任务目录下）
+PROCESS_LOG_FILENAME = 'process_output.log'
+
+# 任务优先级（数值越小越先调度）
+PRIORITY_INTERACTIVE = 0  # 交互式任务，如在线推演
+PRIORITY_BATCH = 10  # 批量任务，如模型验证
 
 class ProcessManager:
     """
     进程管理器单例类
     用于管理所有异步执行的子进程
+    超过最大进程数的任务进入等待队列，按公平分享策略（见fair_share）排队：优先级随等待时间老化，
+    同一有效优先级内按提交者和模型的加权占用从低到高调度，并限制每个提交者、每个模型的并发数；
+    有进程结束时自动调度下一个任务
     """
     _instance = None
     _lock = threading.Lock()
-    
+
     def __new__(cls):
         with cls._lock:
             if cls._instance is None:
                 cls._instance = super(ProcessManager, cls).__new__(cls)
             return cls._instance
-    
+
     def __init__(self):
         if not hasattr(self, 'initialized'):
             self.processes: Dict[str, Dict] = {}
+            # 等待队列，元素为 (优先级, 提交序号, 进程ID)，调度顺序由fair_share决定
+            self._pending = []
+            self._sequence = itertools.count()
+            # 保护processes和等待队列的可重入锁
+            self._state_lock = threading.RLock()
+            # 最近完成的进程运行时长（秒），用于估算排队等待时间
+            self._recent_durations = deque(maxlen=50)
+            # 所有子进程的输出和退出事件由同一个反应器线程处理
+            self._reactor = ProcessReactor()
+            # 完成回调可能访问数据库，放到独立线程池执行以免阻塞反应器
+            self._callback_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='process-callback')
+            # 实现了工作进程协议的模型由常驻工作进程执行
+            self._worker_pool = WarmWorkerPool()
+            # 为要求独占核心的任务分配互不重叠的CPU核心
+            self._core_allocator = resource_profile.CoreAllocator()
+            # 后台维护线程：采样资源占用、结束超过最长运行时间的任务
+            self._housekeeper = None
+            # 残留进程清理统计
+            self._reaper_stats = {'runs': 0, 'killed': 0, 'freed_rss_bytes': 0, 'last_run': None}
+            self._last_reap = 0.0
+            # 持久化任务登记表，服务重启后据此恢复任务
+            self._registry = TaskRegistry()
+            self._recovered = False
+            # 首次恢复时的Flask应用，维护线程在其上下文中接管其他服务进程退出后留下的任务
+            self._recovery_app = None
+            # 分布式模式下任务写入共享执行任务表，由执行节点领取
+            self._job_queue = JobQueue()
             self.initialized = True
-    
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        try:
+            return current_app.config[key]
+        except RuntimeError:
+            return getattr(Config, key)
+
+    def _is_distributed(self) -> bool:
+        """
+        是否以分布式模式运行任务
+
+        Returns:
+            bool: EXECUTION_MODE为distributed时返回True
+        """
+        return self._get_config('EXECUTION_MODE') == 'distributed'
+
     def get_max_processes(self) -> int:
         """
         获取最大进程数
-        
+
         Returns:
             int: 最大进程数
         """
-        return current_app.config['MAX_PROCESSES']
-    
+        return self._get_config('MAX_PROCESSES')
+
     def get_running_process_count(self) -> int:
         """
         获取当前运行的进程数
-        
+
         Returns:
             int: 运行中的进程数
         """
-        return sum(1 for info in self.processes.values() if info['status'] == 'running')
-    
-    def _read_output(self, pipe, output_queue):
+        with self._state_lock:
+            return sum(1 for info in self.processes.values() if info['status'] == 'running')
+
+    def get_queued_process_count(self) -> int:
+        """
+        获取当前排队等待的进程数
+
+        Returns:
+            int: 排队中的进程数
+        """
+        with self._state_lock:
+            return sum(1 for info in self.processes.values() if info['status'] == 'queued')
+
+    @staticmethod
+    def _append_output(process_info: Dict, process_id: str, stream: str, line: str):
         """
-        读取进程输出的线程函数
-        
+        反应器读到一行输出时的回调
+
         Args:
-            pipe: 进程的输出管道
-            output_queue: 用于存储输出的队列
+            process_info: 进程信息
+            process_id: 进程ID
+            stream: 'stdout'或'stderr'
+            line: 行内容
         """
-        try:
-            for line in iter(pipe.readline, ''):
-                output_queue.put(line.strip())
-        except Exception as e:
-            print(f"读取进程输出时发生错误: {str(e)}")
-        finally:
-            pipe.close()
-    
-    def start_process(self, process_id: str, cmd: list, cwd: str, env: dict, 
-                     on_complete: Callable[[str, int], None] = None) -> bool:
-        """
-        启动一个新的子进程
-        
+        process_info['log_buffer'].append(stream, line)
+
+    def start_process(self, process_id: str, cmd: list, cwd: str, env: dict,
+                     on_complete: Callable[[str, int], None] = None,
+                     priority: int = PRIORITY_BATCH, log_dir: Optional[str] = None,
+                     worker_key: Optional[str] = None, worker_job: Optional[Dict] = None,
+                     resource_limits: Optional[Dict] = None, result_path: Optional[str] = None,
+                     on_recover: Callable[[str, Dict], None] = None,
+                     submitter: Optional[str] = None) -> bool:
+        """
+        提交一个新的子进程
+        运行中的进程数未达到上限时立即启动，否则进入等待队列，
+        有空闲槽位时按公平分享顺序自动启动
+
         Args:
             process_id: 进程ID
             cmd: 要执行的命令
             cwd: 工作目录
             env: 环境变量
-            on_complete: 进程结束时的回调函数，接收进程ID和返回码作为参数
-            
+            on_complete: 进程结束时的回调函数，接收进程ID和返回码作为参数，
+                在提交时的Flask应用上下文中执行
+            priority: 调度优先级，数值越小越先调度，默认为批量任务优先级
+            log_dir: 任务目录，输出超出内存缓冲区上限时溢写到该目录下的日志文件
+            worker_key: 常驻工作进程分组键（通常为模型UUID），为None时总是冷启动
+            worker_job: 下发给常驻工作进程的任务内容（如input_dir、output_dir、tif_path），
+                会自动附带argv（命令中脚本之后的参数）；模型未实现工作进程协议时忽略
+            resource_limits: 资源配置（memory_limit_mb、cpu_cores、nice、max_wall_seconds，0表示不限制），
+                通常由resource_profile.load_resource_profile读取；为None时不施加限制
+            result_path: 任务输出文件或目录，服务重启期间结束的任务据此推断是否成功
+            on_recover: 服务重启后恢复该任务时调用的函数，接收进程ID和登记记录，用于重建调用方的内存状态；
+                与on_complete一样必须是模块级函数或类方法，以便重启后重新导入
+            submitter: 提交者标识，用于公平分享调度；为None时根据当前请求识别
+
+        Returns:
+            bool: 是否成功启动或进入等待队列
+
+        EXECUTION_MODE为distributed时任务不在本机启动，而是写入共享执行任务表，由worker_agent.py领取执行
+        （不使用常驻工作进程）；状态查询、停止和完成回调的调用方式不变
+        """
+        if self._is_distributed():
+            return self._job_queue.enqueue(process_id, cmd, cwd, env, on_complete, priority, log_dir,
+                                           resource_limits, result_path, on_recover)
+
+        with self._state_lock:
+            existing = self.processes.get(process_id)
+            if existing and existing['status'] in ('queued', 'running'):
+                print(f"进程 {process_id} 已在运行或排队中")
+                return False
+
+            # 记录进程信息，初始状态为排队
+            process_info = self._new_process_info(cmd, cwd, env, on_complete, priority, log_dir, worker_key,
+                                                  worker_job, resource_limits, result_path, on_recover,
+                                                  submitter or fair_share.resolve_submitter())
+            self.processes[process_id] = process_info
+            self._pending.append((priority, next(self._sequence), process_id))
+
+        self._registry.add(process_id, process_info)
+        self._dispatch_pending()
+
+        with self._state_lock:
+            process_info = self.processes[process_id]
+            # 此后的启动失败发生在延迟调度中，需要通过回调通知调用方
+            process_info['deferred'] = True
+            return process_info['status'] != 'failed'
+
+    def _new_process_info(self, cmd: list, cwd: str, env: dict, on_complete: Optional[Callable],
+                          priority: int, log_dir: Optional[str], worker_key: Optional[str],
+                          worker_job: Optional[Dict], resource_limits: Optional[Dict],
+                          result_path: Optional[str], on_recover: Optional[Callable],
+                          submitter: str) -> Dict:
+        """
+        构造排队状态的进程信息
+
+        Returns:
+            Dict: 进程信息
+        """
+        try:
+            app = current_app._get_current_object()
+        except RuntimeError:
+            app = None
+
+        return {
+            'process': None,
+            'submit_time': datetime.now(),
+            'start_time': None,
+            'status': 'queued',
+            'priority': priority,
+            'submitter': submitter,
+            'cmd': cmd,
+            'cwd': cwd,
+            'env': env,
+            'on_complete': on_complete,
+            'on_recover': on_recover,
+            'log_dir': log_dir,
+            'result_path': result_path,
+            'worker_key': worker_key,
+            'worker_job': worker_job,
+            'resource_limits': resource_limits or {},
+            'cpu_cores': [],
+            'cgroup': None,
+            'execution_mode': None,
+            'app': app,
+            'log_buffer': LogRingBuffer(
+                self._get_config('PROCESS_LOG_BUFFER_BYTES'),
+                os.path.join(log_dir, PROCESS_LOG_FILENAME) if log_dir else None
+            )
+        }
+
+    def _dispatch_pending(self):
+        """
+        按公平分享顺序从等待队列中取出任务，直到运行中的进程数达到上限或没有可启动的任务
+        """
+        failed = []
+        with self._state_lock:
+            max_processes = self.get_max_processes()
+            while self.get_running_process_count() < max_processes:
+                entry = self._pick_next()
+                if entry is None:
+                    break
+                self._pending.remove(entry)
+                process_id = entry[2]
+                process_info = self.processes[process_id]
+                if not self._launch(process_id, process_info):
+                    self._release_resources(process_info)
+                    failed.append((process_id, process_info))
+
+        # 延迟调度的任务启动失败时通过回调通知调用方
+        for process_id, process_info in failed:
+            if process_info.get('deferred'):
+                self._schedule_callback(process_info, process_id, -1)
+
+    def _pick_next(self) -> Optional[tuple]:
+        """
+        选出下一个可以启动的任务并为其分配CPU核心（调用方持有状态锁）
+        每启动一个任务后重新排序，使同一提交者的后续任务让位于占用更少的提交者
+
+        Returns:
+            tuple: 等待队列条目，没有可启动的任务时返回None
+        """
+        # 已被停止的排队任务直接移出队列
+        self._pending = [entry for entry in self._pending
+                         if self.processes.get(entry[2], {}).get('status') == 'queued']
+        running = fair_share.count_running(self.processes)
+        waiting_for_cores = False
+        for entry in fair_share.order_pending(self._pending, self.processes, running, datetime.now()):
+            process_info = self.processes[entry[2]]
+            if fair_share.get_cap_reason(process_info, running):
+                continue
+            requested = process_info['resource_limits'].get('cpu_cores', 0)
+            # 一旦有任务等待核心，之后要求独占核心的任务也继续等待，避免小任务插队；不绑定核心的任务照常调度
+            cores = None if waiting_for_cores and requested else self._core_allocator.allocate(requested)
+            if cores is None:
+                waiting_for_cores = True
+                continue
+            process_info['cpu_cores'] = cores
+            return entry
+        return None
+
+    def _schedule_callback(self, process_info: Dict, process_id: str, return_code: int):
+        """
+        在回调线程池中执行进程的完成回调
+
+        Args:
+            process_info: 进程信息
+            process_id: 进程ID
+            return_code: 进程返回码
+        """
+        on_complete = process_info.get('on_complete')
+        if not on_complete:
+            self._registry.remove(process_id)
+            return
+
+        def run():
+            try:
+                if process_info.get('app') is not None:
+                    with process_info['app'].app_context():
+                        on_complete(process_id, return_code)
+                else:
+                    on_complete(process_id, return_code)
+            except Exception as e:
+                print(f"执行回调函数时发生错误: {str(e)}")
+            finally:
+                # 回调执行完毕后任务无需再恢复
+                self._registry.remove(process_id)
+
+        self._callback_executor.submit(run)
+
+    def _launch(self, process_id: str, process_info: Dict) -> bool:
+        """
+        启动任务：模型实现了工作进程协议时交给常驻工作进程，否则冷启动子进程
+
+        Args:
+            process_id: 进程ID
+            process_info: 进程信息
+
+        Returns:
+            bool: 是否成功启动
+        """
+        if process_info['worker_key'] and process_info['worker_job'] is not None:
+            cmd = process_info['cmd']
+            job = self._worker_pool.submit(
+                process_info['worker_key'], cmd[0], process_info['cwd'], process_info['env'],
+                process_id, dict(process_info['worker_job'], argv=cmd[2:]),
+                partial(self._append_output, process_info, process_id),
+                partial(self._on_process_exit, process_info, process_id),
+                partial(self._fall_back_to_cold_start, process_id, process_info),
+                process_info['resource_limits']
+            )
+            if job is not None:
+                # 常驻工作进程在每个任务开始时切换到本任务分配的核心
+                resource_profile.pin_threads(job.pid, process_info['cpu_cores'] or self._core_allocator.all_cores)
+                process_info['process'] = job
+                process_info['start_time'] = datetime.now()
+                process_info['status'] = 'running'
+                process_info['execution_mode'] = 'warm'
+                self._track_resources(process_info, job.pid, baseline=True)
+                self._registry.mark_running(process_id, job.pid, process_info['start_time'])
+                return True
+
+        return self._launch_cold(process_id, process_info)
+
+    def _fall_back_to_cold_start(self, process_id: str, process_info: Dict):
+        """
+        常驻工作进程未能就绪时，改为冷启动子进程执行同一任务
+
+        Args:
+            process_id: 进程ID
+            process_info: 进程信息
+        """
+        print(f"模型 {process_info['worker_key']} 的常驻工作进程未能就绪，任务 {process_id} 改为冷启动")
+        with self._state_lock:
+            if process_info['status'] != 'running':
+                # 等待期间已被停止
+                process_info['log_buffer'].close()
+                launched = None
+            else:
+                launched = self._launch_cold(process_id, process_info)
+                if launched is False:
+                    self._release_resources(process_info)
+
+        if launched is False:
+            self._dispatch_pending()
+            self._schedule_callback(process_info, process_id, -1)
+
+    def _launch_cold(self, process_id: str, process_info: Dict) -> bool:
+        """
+        实际创建子进程并交给反应器监听
+
+        Args:
+            process_id: 进程ID
+            process_info: 进程信息
+
         Returns:
             bool: 是否成功启动
         """
+        limits = process_info['resource_limits']
+        process_info['cgroup'] = resource_profile.setup_cgroup(process_id, limits.get('memory_limit_mb', 0))
+        # 子孙进程继承任务标识，任务记录消失后据此清理残留进程
+        env = dict(process_info['env'] if process_info['env'] is not None else os.environ)
+        process_group.tag_env(env, process_id)
         try:
-            # 检查是否达到最大进程数
-            if self.get_running_process_count() >= self.get_max_processes():
-                print(f"已达到最大进程数限制 ({self.get_max_processes()})")
-                return False
-            
-            # 创建进程
+            # 创建进程（独立的进程组，停止时整组结束）
             process = subprocess.Popen(
-                cmd,
-                cwd=cwd,
+                process_info['cmd'],
+                cwd=process_info['cwd'],
                 env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1,  # 设置缓冲区大小为1
-                creationflags=subprocess.CREATE_NO_WINDOW  # Windows下隐藏控制台窗口
-            )
-            
-            # 创建输出队列
-            stdout_queue = queue.Queue()
-            stderr_queue = queue.Queue()
-            
-            # 记录进程信息
-            self.processes[process_id] = {
-                'process': process,
-                'start_time': datetime.now(),
-                'status': 'running',
-                'cmd': cmd,
-                'cwd': cwd,
-                'on_complete': on_complete,
-                'stdout_queue': stdout_queue,
-                'stderr_queue': stderr_queue,
-                'stdout_buffer': [],
-                'stderr_buffer': []
-            }
-            
-            # 启动输出读取线程
-            stdout_thread = threading.Thread(
-                target=self._read_output,
-                args=(process.stdout, stdout_queue),
-                daemon=True
-            )
-            stderr_thread = threading.Thread(
-                target=self._read_output,
-                args=(process.stderr, stderr_queue),
-                daemon=True
+                preexec_fn=resource_profile.build_preexec_fn(limits, process_info['cpu_cores'], process_info['cgroup']),
+                **process_group.popen_kwargs()
             )
-            stdout_thread.start()
-            stderr_thread.start()
-            
-            # 启动监控线程
-            self._monitor_process(process_id)
-            
-            return True
-            
         except Exception as e:
             print(f"启动进程失败: {str(e)}")
+            process_info['status'] = 'failed'
+            process_info['end_time'] = datetime.now()
             return False
-    
+
+        process_info['process'] = process
+        process_info['start_time'] = datetime.now()
+        process_info['status'] = 'running'
+        process_info['execution_mode'] = 'cold'
+        self._track_resources(process_info, process.pid)
+        self._registry.mark_running(process_id, process.pid, process_info['start_time'])
+
+        # 由反应器统一读取输出并感知进程退出
+        self._reactor.watch(process_id, process,
+                            partial(self._append_output, process_info),
+                            partial(self._on_process_exit, process_info))
+
+        return True
+
+    def _track_resources(self, process_info: Dict, pid: Optional[int], baseline: bool = False):
+        """
+        为任务创建资源统计并确保维护线程已启动
+
+        Args:
+            process_info: 进程信息
+            pid: 根进程ID
+            baseline: 是否扣除根进程在任务开始前已消耗的资源（常驻工作进程）
+        """
+        self._ensure_housekeeper()
+        if pid is None or not proc_stats.is_supported():
+            return
+        tracker = proc_stats.ResourceTracker(pid, self._get_config('PROCESS_SAMPLE_HISTORY'), baseline)
+        if baseline:
+            # 立即采样一次记录基线，排除工作进程在本任务之前消耗的资源
+            table = proc_stats.scan_processes()
+            tracker.sample(table, proc_stats.build_children_map(table))
+        process_info['resource_tracker'] = tracker
+
+    def _ensure_housekeeper(self):
+        """
+        确保维护线程已启动
+        """
+        with self._state_lock:
+            if self._housekeeper is None:
+                self._housekeeper = threading.Thread(target=self._housekeeping_loop, name='process-housekeeper',
+                                                     daemon=True)
+                self._housekeeper.start()
+
+    def _housekeeping_loop(self):
+        """
+        维护线程主循环：结束超过最长运行时间的任务、定期清理残留进程并接管已退出的服务进程留下的任务，
+        并为所有运行中的任务采样资源占用
+        """
+        while True:
+            time.sleep(self._get_config('PROCESS_SAMPLE_INTERVAL'))
+            if time.time() - self._last_reap >= self._get_config('PROCESS_REAPER_INTERVAL'):
+                self._last_reap = time.time()
+                if self._recovery_app is not None:
+                    try:
+                        with self._recovery_app.app_context():
+                            self._recover_orphans()
+                    except Exception as e:
+                        print(f"接管已退出的服务进程留下的任务时发生错误: {str(e)}")
+                try:
+                    self._reap_strays()
+                except Exception as e:
+                    print(f"清理残留进程时发生错误: {str(e)}")
+
+            now = datetime.now()
+            with self._state_lock:
+                running = [(process_id, info) for process_id, info in self.processes.items()
+                           if info['status'] == 'running']
+            for process_id, info in running:
+                max_wall_seconds = info['resource_limits'].get('max_wall_seconds', 0)
+                if max_wall_seconds and (now - info['start_time']).total_seconds() > max_wall_seconds:
+                    print(f"进程 {process_id} 运行超过 {max_wall_seconds} 秒，强制结束")
+                    self._terminate(info, 'timeout')
+
+            trackers = [info['resource_tracker'] for _, info in running if info.get('resource_tracker')]
+            if not trackers:
+                continue
+            try:
+                table = proc_stats.scan_processes()
+                children = proc_stats.build_children_map(table)
+                for tracker in trackers:
+                    tracker.sample(table, children)
+            except Exception as e:
+                print(f"采样进程资源占用时发生错误: {str(e)}")
+
+    def _is_task_alive(self, task_id: str) -> bool:
+        """
+        判断残留进程携带的任务标识是否仍属于运行中（或正在停止）的任务
+
+        Args:
+            task_id: 任务标识（进程ID或常驻工作进程ID）
+
+        Returns:
+            bool: 任务仍在运行时返回True
+        """
+        if self._worker_pool.is_worker_alive(task_id):
+            return True
+        with self._state_lock:
+            process_info = self.processes.get(task_id)
+            return bool(process_info) and (process_info['status'] == 'running' or process_info.get('stopping', False))
+
+    def _reap_strays(self):
+        """
+        结束任务记录已不存在或任务已结束、但仍在运行的残留进程
+        """
+        strays = process_group.find_strays(self._is_task_alive, self._registry.is_adopted)
+        result = process_group.kill_strays(strays) if strays else {'killed': 0, 'freed_rss_bytes': 0}
+        with self._state_lock:
+            self._reaper_stats['runs'] += 1
+            self._reaper_stats['killed'] += result['killed']
+            self._reaper_stats['freed_rss_bytes'] += result['freed_rss_bytes']
+            self._reaper_stats['last_run'] = datetime.now().isoformat()
+        if result['killed']:
+            task_ids = sorted({stray['task_id'] for stray in strays})
+            print(f"清理残留进程 {result['killed']} 个（任务: {', '.join(task_ids)}），"
+                  f"释放内存 {result['freed_rss_bytes'] / 1024 / 1024:.1f}MB")
+
+    def get_reaper_stats(self) -> Dict:
+        """
+        获取残留进程清理统计
+
+        Returns:
+            Dict: 清理次数、结束的进程数、释放的内存字节数和最近一次清理时间
+        """
+        with self._state_lock:
+            return dict(self._reaper_stats)
+
+    def _get_resource_usage(self, process_info: Dict) -> Optional[Dict]:
+        """
+        获取任务的资源占用：已结束的任务返回汇总，运行中的任务返回当前汇总及最近的采样点
+
+        Args:
+            process_info: 进程信息
+
+        Returns:
+            Dict: 资源占用信息，平台不支持采样时返回None
+        """
+        if 'resource_usage' in process_info:
+            return process_info['resource_usage']
+        tracker = process_info.get('resource_tracker')
+        if tracker is None:
+            return None
+        usage = tracker.summary((datetime.now() - process_info['start_time']).total_seconds())
+        usage['samples'] = tracker.get_samples()
+        return usage
+
+    def _release_resources(self, process_info: Dict):
+        """
+        归还任务占用的CPU核心并删除其cgroup
+
+        Args:
+            process_info: 进程信息
+        """
+        with self._state_lock:
+            self._core_allocator.release(process_info['cpu_cores'])
+            process_info['cpu_cores'] = []
+        resource_profile.remove_cgroup(process_info['cgroup'])
+        process_info['cgroup'] = None
+
+    def get_free_core_count(self) -> int:
+        """
+        获取未分配给独占任务的CPU核心数
+
+        Returns:
+            int: 空闲核心数
+        """
+        with self._state_lock:
+            return self._core_allocator.get_free_count()
+
+    def get_resource_summary(self, process_id: str) -> Optional[Dict]:
+        """
+        获取已结束任务的资源占用汇总（峰值内存、CPU秒数、墙钟时间等），供完成回调持久化
+
+        Args:
+            process_id: 进程ID
+
+        Returns:
+            Dict: 资源占用汇总，任务不存在、未结束或平台不支持采样时返回None
+        """
+        process_info = self.processes.get(process_id)
+        if process_info is None:
+            return self._job_queue.get_resource_usage(process_id) if self._is_distributed() else None
+        return process_info.get('resource_usage')
+
     def stop_process(self, process_id: str) -> bool:
         """
-        停止指定的进程
-        
+        停止指定的进程，排队中的任务直接移出等待队列
+
         Args:
             process_id: 进程ID
-            
+
         Returns:
             bool: 是否成功停止
         """
-        if process_id not in self.processes:
-            return False
-            
-        try:
+        with self._state_lock:
+            if process_id not in self.processes:
+                return self._job_queue.stop(process_id) if self._is_distributed() else False
+
             process_info = self.processes[process_id]
+            if process_info['status'] == 'queued':
+                # 条目留在等待队列中，下次调度时_pick_next按状态过滤掉已停止的条目
+                process_info['status'] = 'stopped'
+                process_info['end_time'] = datetime.now()
+                self._registry.remove(process_id)
+                return True
+
+        return self._terminate(process_info, 'stopped')
+
+    def _terminate(self, process_info: Dict, status: str) -> bool:
+        """
+        终止运行中的进程
+
+        Args:
+            process_info: 进程信息
+            status: 终止后的状态，手动停止为stopped，超时为timeout
+
+        Returns:
+            bool: 是否成功终止
+        """
+        try:
             process = process_info['process']
-            
-            # 终止进程
-            process.terminate()
-            process_info['status'] = 'stopped'
+            if process is None:
+                return False
+
+            report = self._build_stop_report(process_info, process)
+            process_info['stop_report'] = report
+            process_info['stopping'] = True
+
+            def on_finished(escalated: bool):
+                report['escalated_to_sigkill'] = escalated
+                report['finished'] = True
+                process_info['stopping'] = False
+                print(f"进程 {process.pid} 已结束（{'SIGKILL' if escalated else 'SIGTERM'}），"
+                      f"释放 {report['freed_cores']} 个核心、{report['freed_rss_bytes'] / 1024 / 1024:.1f}MB 内存，"
+                      f"共 {report['processes']} 个进程")
+
+            # 终止整个进程组：先SIGTERM，宽限期后仍未退出则SIGKILL
+            grace_seconds = self._get_config('PROCESS_STOP_GRACE_SECONDS')
+            if isinstance(process, WarmWorkerJob):
+                process.terminate(grace_seconds, on_finished)
+            else:
+                process_group.terminate_group(process, grace_seconds, on_finished)
+            process_info['status'] = status
             process_info['end_time'] = datetime.now()
-            
+
             return True
-            
+
         except Exception as e:
             print(f"停止进程失败: {str(e)}")
             return False
-    
-    def get_process_status(self, process_id: str) -> Optional[Dict]:
+
+    def _build_stop_report(self, process_info: Dict, process) -> Dict:
+        """
+        统计停止前任务进程组占用的资源，作为停止后释放的资源
+
+        Args:
+            process_info: 进程信息
+            process: subprocess.Popen对象或常驻工作进程任务句柄
+
+        Returns:
+            Dict: 进程数、常驻内存字节数、核心数（绑定核心时为分配的核心数，否则为最近一次采样的CPU占用折算）
+        """
+        report = {
+            'requested_at': datetime.now().isoformat(),
+            'processes': 0,
+            'freed_rss_bytes': 0,
+            'freed_cores': len(process_info['cpu_cores']),
+            'escalated_to_sigkill': None,
+            'finished': False
+        }
+        if not process_info['cpu_cores'] and process_info.get('resource_tracker'):
+            latest = process_info['resource_tracker'].get_latest_sample()
+            if latest and latest['cpu_percent'] is not None:
+                report['freed_cores'] = round(latest['cpu_percent'] / 100, 2)
+
+        if proc_stats.is_supported() and process.pid is not None:
+            table = proc_stats.scan_processes()
+            members = set(proc_stats.collect_tree(process.pid, proc_stats.build_children_map(table)))
+            members.update(process_group.get_group_members(process.pid, table))
+            members = [pid for pid in members if pid in table]
+            report['processes'] = len(members)
+            report['freed_rss_bytes'] = sum(table[pid]['rss_bytes'] for pid in members)
+        return report
+
+    def _get_queue_position(self, process_id: str) -> Optional[int]:
+        """
+        获取排队任务在调度顺序中的位置（从1开始）
+
+        Args:
+            process_id: 进程ID
+
+        Returns:
+            int: 排队位置，不在队列中则返回None
+        """
+        with self._state_lock:
+            queued = [entry for entry in self._pending
+                      if self.processes.get(entry[2], {}).get('status') == 'queued']
+            ordered = fair_share.order_pending(queued, self.processes,
+                                               fair_share.count_running(self.processes), datetime.now())
+            for position, (_, _, pending_id) in enumerate(ordered, start=1):
+                if pending_id == process_id:
+                    return position
+        return None
+
+    def get_share_allocation(self) -> Dict:
+        """
+        获取当前的公平分享分配情况
+
+        Returns:
+            Dict: 调度参数、各提交者和模型按权重应得的槽位数与实际运行数、排队顺序及受限原因
+        """
+        with self._state_lock:
+            queued = [entry for entry in self._pending
+                      if self.processes.get(entry[2], {}).get('status') == 'queued']
+            return fair_share.build_allocation(queued, self.processes, self.get_max_processes())
+
+    def _estimate_wait_seconds(self, queue_position: int) -> float:
+        """
+        估算排队任务的等待时间
+        以最近完成进程的平均运行时长估算每个任务的耗时，
+        模拟各槽位依次空闲并被前序排队任务占用的过程
+
+        Args:
+            queue_position: 排队位置（从1开始）
+
+        Returns:
+            float: 预计等待秒数
+        """
+        with self._state_lock:
+            if self._recent_durations:
+                average = sum(self._recent_durations) / len(self._recent_durations)
+            else:
+                average = float(self._get_config('PROCESS_RUNTIME_ESTIMATE'))
+
+            now = datetime.now()
+            slot_free_times = []
+            for info in self.processes.values():
+                if info['status'] == 'running' and info.get('start_time'):
+                    elapsed = (now - info['start_time']).total_seconds()
+                    slot_free_times.append(max(average - elapsed, 0.0))
+            # 空闲槽位视为立即可用
+            while len(slot_free_times) < self.get_max_processes():
+                slot_free_times.append(0.0)
+
+        heapq.heapify(slot_free_times)
+        wait = 0.0
+        for _ in range(queue_position):
+            wait = heapq.heappop(slot_free_times)
+            heapq.heappush(slot_free_times, wait + average)
+        return round(wait, 1)
+
+    def get_process_logs(self, process_id: str, since: Optional[int] = None) -> Optional[Dict]:
+        """
+        获取进程输出
+
+        Args:
+            process_id: 进程ID
+            since: 起始游标，只返回该游标之后的输出；为None时返回缓冲区中保留的全部输出
+
+        Returns:
+            Dict: 输出内容及游标、字节数和行数计数，如果进程不存在则返回None
+        """
+        process_info = self.processes.get(process_id)
+        if process_info is None:
+            return None
+        return process_info['log_buffer'].read(since)
+
+    def get_process_status(self, process_id: str, since: Optional[int] = None) -> Optional[Dict]:
         """
         获取进程状态
-        
+
         Args:
             process_id: 进程ID
-            
+            since: 输出起始游标，只返回该游标之后的输出；为None时返回缓冲区中保留的全部输出
+
         Returns:
             Dict: 进程状态信息，如果进程不存在则返回None
         """
         if process_id not in self.processes:
-            return None
-            
+            return self._job_queue.get_status(process_id, since) if self._is_distributed() else None
+
         process_info = self.processes[process_id]
         process = process_info['process']
-        
-        # 非阻塞读取输出
-        try:
-            # 读取stdout
-            while True:
-                try:
-                    line = process_info['stdout_queue'].get_nowait()
-                    process_info['stdout_buffer'].append(line)
-                except queue.Empty:
-                    break
-                    
-            # 读取stderr
-            while True:
-                try:
-                    line = process_info['stderr_queue'].get_nowait()
-                    process_info['stderr_buffer'].append(line)
-                except queue.Empty:
-                    break
-                    
-        except Exception as e:
-            print(f"读取进程输出时发生错误: {str(e)}")
-            
+
+        # 排队信息
+        queue_position = None
+        estimated_wait_seconds = None
+        if process_info['status'] == 'queued':
+            queue_position = self._get_queue_position(process_id)
+            if queue_position is not None:
+                estimated_wait_seconds = self._estimate_wait_seconds(queue_position)
+
+        logs = process_info['log_buffer'].read(since)
+
         return {
             'process_id': process_id,
             'status': process_info['status'],
-            'start_time': process_info['start_time'].isoformat(),
+            'priority': process_info['priority'],
+            'submitter': process_info['submitter'],
+            'execution_mode': process_info['execution_mode'],
+            'submit_time': process_info['submit_time'].isoformat(),
+            'start_time': process_info['start_time'].isoformat() if process_info['start_time'] else '',
             'end_time': process_info.get('end_time', '').isoformat() if 'end_time' in process_info else '',
-            'return_code': process.returncode,
-            'stdout': '\n'.join(process_info['stdout_buffer']),
-            'stderr': '\n'.join(process_info['stderr_buffer']),
+            'return_code': process.returncode if process else None,
+            'stdout': logs['stdout'],
+            'stderr': logs['stderr'],
+            'log_cursor': logs['next_cursor'],
+            'log_truncated': logs['truncated'],
+            'log_total_lines': logs['total_lines'],
+            'log_total_bytes': logs['total_bytes'],
+            'log_file': logs['spill_file'],
+            'resource_usage': self._get_resource_usage(process_info),
+            'resource_limits': process_info['resource_limits'],
+            'cpu_cores': process_info['cpu_cores'],
+            'stop_report': process_info.get('stop_report'),
+            'queue_position': queue_position,
+            'estimated_wait_seconds': estimated_wait_seconds,
             'running_count': self.get_running_process_count(),
+            'queued_count': self.get_queued_process_count(),
             'max_processes': self.get_max_processes()
         }
-    
-    def _monitor_process(self, process_id: str):
+
+    def get_log_tail(self, process_id: str, count: int) -> Optional[List[List]]:
         """
-        监控进程状态的线程函数
-        
+        获取进程最新的若干行输出
+
         Args:
             process_id: 进程ID
+            count: 最多读取的行数
+
+        Returns:
+            List[List]: [游标, 输出流, 行内容]列表，进程不在本进程管理器中时返回None
         """
-        def monitor():
-            process_info = self.processes[process_id]
-            process = process_info['process']
-            
-            # 等待进程结束
-            process.wait()
-            
-            # 更新进程状态
-            process_info['status'] = 'completed'
-            process_info['end_time'] = datetime.now()
-            
-            # 获取最终输出
+        process_info = self.processes.get(process_id)
+        if process_info is None:
+            return None
+        return process_info['log_buffer'].tail(count)
+
+    def _on_process_exit(self, process_info: Dict, process_id: str, return_code: int):
+        """
+        反应器在进程退出且输出读取完毕后的回调
+
+        Args:
+            process_info: 进程信息
+            process_id: 进程ID
+            return_code: 进程返回码
+        """
+        process_info['log_buffer'].close()
+
+        # 更新进程状态（被手动停止或超时的进程保留原状态）
+        with self._state_lock:
+            self._release_resources(process_info)
+            if process_info['status'] == 'running':
+                process_info['status'] = 'completed'
+                process_info['end_time'] = datetime.now()
+            wall_time = (datetime.now() - process_info['start_time']).total_seconds()
+            self._recent_durations.append(wall_time)
+            tracker = process_info.get('resource_tracker')
+            if tracker is not None:
+                process_info['resource_usage'] = tracker.summary(wall_time)
+
+        self._registry.mark_finished(process_id, process_info['status'], return_code)
+
+        # 槽位已释放，调度等待队列中的下一个任务
+        self._dispatch_pending()
+
+        # 调用回调函数
+        self._schedule_callback(process_info, process_id, return_code)
+
+    def recover(self):
+        """
+        恢复服务重启前登记的任务（每个服务进程只执行一次，需在Flask应用上下文中调用）
+        只恢复所有者（登记任务的服务进程）已退出的任务，多个服务进程共用登记表时不会重复接管彼此仍在运行的任务；
+        之后维护线程定期接管其他服务进程退出后留下的任务
+        仍在运行的子进程被重新接管并等待其结束；重启期间已结束的任务根据输出推断返回码后执行完成回调；
+        排队中的任务重新提交；分布式模式下还会为尚未执行完成回调的执行任务重建调用方状态
+        """
+        with self._state_lock:
+            if self._recovered:
+                return
+            self._recovered = True
+            self._recovery_app = current_app._get_current_object()
+
+        self._recover_orphans()
+        self._ensure_housekeeper()
+
+        if self._is_distributed():
             try:
-                while True:
-                    try:
-                        line = process_info['stdout_queue'].get_nowait()
-                        process_info['stdout_buffer'].append(line)
-                    except queue.Empty:
-                        break
-                        
-                while True:
-                    try:
-                        line = process_info['stderr_queue'].get_nowait()
-                        process_info['stderr_buffer'].append(line)
-                    except queue.Empty:
-                        break
+                self._job_queue.recover()
             except Exception as e:
-                print(f"获取最终输出时发生错误: {str(e)}")
-            
-            # 调用回调函数
-            if process_info.get('on_complete'):
-                try:
-                    process_info['on_complete'](process_id, process.returncode)
-                except Exception as e:
-                    print(f"执行回调函数时发生错误: {str(e)}")
-            
-        # 启动监控线程
-        thread = threading.Thread(target=monitor)
-        thread.daemon = True
-        thread.start() 
\ No newline at end of file
+                print(f"恢复执行任务失败: {str(e)}")
+
+    def _recover_orphans(self):
+        """
+        接管所有者已退出的登记记录并恢复对应的任务（需在Flask应用上下文中调用）
+        每条记录先以所有者为条件原子地改为当前服务进程，改写失败说明已被其他服务进程接管
+        """
+        for record in self._registry.load_orphaned():
+            if not self._registry.claim(record['process_id'], record['owner']):
+                continue
+            try:
+                self._recover_task(record)
+            except Exception as e:
+                print(f"恢复任务 {record['process_id']} 失败: {str(e)}")
+
+    def _recover_task(self, record: Dict):
+        """
+        恢复单个已接管的登记任务
+
+        Args:
+            record: 登记记录
+        """
+        process_id = record['process_id']
+        submitter = record['submitter'] or fair_share.ANONYMOUS_SUBMITTER
+        on_complete = resolve_ref(record['on_complete'])
+        on_recover = resolve_ref(record['on_recover'])
+        if on_recover is not None:
+            on_recover(process_id, record)
+
+        if record['status'] == 'queued':
+            # 重新提交时以当前服务进程为所有者覆盖原记录
+            self.start_process(process_id, record['cmd'], record['cwd'], record['env'], on_complete,
+                               record['priority'], record['log_dir'], record['worker_key'], record['worker_job'],
+                               record['resource_limits'], record['result_path'], on_recover, submitter)
+            return
+
+        process_info = self._new_process_info(record['cmd'], record['cwd'], record['env'], on_complete,
+                                              record['priority'], record['log_dir'], record['worker_key'],
+                                              record['worker_job'], record['resource_limits'],
+                                              record['result_path'], on_recover, submitter)
+        process_info['submit_time'] = datetime.fromisoformat(record['submit_time'])
+        process_info['start_time'] = datetime.fromisoformat(record['start_time'] or record['submit_time'])
+        process_info['execution_mode'] = 'reattached'
+        process_info['deferred'] = True
+
+        if record['status'] != 'running' or record['pid'] is None:
+            # 进程已结束但完成回调尚未执行
+            process_info['status'] = record['status']
+            process_info['end_time'] = datetime.now()
+            with self._state_lock:
+                self.processes[process_id] = process_info
+            return_code = record['return_code'] if record['return_code'] is not None else -1
+            self._schedule_callback(process_info, process_id, return_code)
+            return
+
+        # 重新接管子进程：原输出管道已随旧服务进程关闭，此后的输出无法获取
+        process = ReattachedProcess(record['pid'], record['pid_start'], record['result_path'])
+        process_info['process'] = process
+        process_info['status'] = 'running'
+        process_info['log_buffer'].append('stderr', '服务重启后重新接管该进程，重启前后的输出未被记录')
+        with self._state_lock:
+            self.processes[process_id] = process_info
+        self._track_resources(process_info, process.pid)
+        self._reactor.watch(process_id, process,
+                            partial(self._append_output, process_info),
+                            partial(self._on_process_exit, process_info))
+        print(f"重新接管进程 {process_id}（PID {process.pid}）")
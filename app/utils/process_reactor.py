@@ -0,0 +1,338 @@
+"""
+子进程I/O反应器
+在单个线程中通过selectors多路复用所有子进程的输出管道和退出通知
+"""
+import os
+import locale
+import itertools
+import selectors
+import threading
+from typing import Dict, Callable
+
+# 单次从管道读取的最大字节数
+_READ_CHUNK_SIZE = 65536
+# 不支持pidfd时轮询子进程退出状态的间隔（秒）
+_POLL_INTERVAL = 0.5
+
+
+class ProcessReactor:
+    """
+    子进程I/O反应器单例类
+    Linux等POSIX平台上由一个后台线程通过selectors监听所有子进程的stdout/stderr管道，
+    并通过pidfd（不可用时退化为定时轮询）感知子进程退出；
+    Windows上管道不支持select，退化为每个进程独立的读取线程和等待线程
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ProcessReactor, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self.encoding = locale.getpreferredencoding(False)
+            # 以内部序号区分监听条目，避免同一进程标识被复用时相互覆盖
+            self._watched: Dict[int, Dict] = {}
+            self._tokens = itertools.count()
+            self._incoming = []
+            self._incoming_lock = threading.Lock()
+            self._selector = None
+            self._thread = None
+            self._wake_r = None
+            self._wake_w = None
+            self.initialized = True
+
+    @staticmethod
+    def is_multiplexed() -> bool:
+        """
+        当前平台是否使用单线程多路复用
+
+        Returns:
+            bool: POSIX平台返回True
+        """
+        return os.name == 'posix'
+
+    def watch(self, key: str, process, on_output: Callable[[str, str, str], None],
+              on_exit: Callable[[str, int], None]):
+        """
+        开始监听一个子进程
+        子进程必须以stdout=PIPE、stderr=PIPE的字节模式创建
+
+        Args:
+            key: 进程标识
+            process: subprocess.Popen对象
+            on_output: 每读到一行输出时调用，参数为(进程标识, 'stdout'或'stderr', 行内容)
+            on_exit: 进程退出且输出读取完毕后调用，参数为(进程标识, 返回码)
+        """
+        if not self.is_multiplexed():
+            self._watch_with_threads(key, process, on_output, on_exit)
+            return
+
+        with self._incoming_lock:
+            self._ensure_loop()
+            self._incoming.append((next(self._tokens), key, process, on_output, on_exit))
+        self._wake()
+
+    def _ensure_loop(self):
+        """
+        延迟创建selector、唤醒管道和反应器线程
+        """
+        if self._thread is not None:
+            return
+        self._selector = selectors.DefaultSelector()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_r, False)
+        os.set_blocking(self._wake_w, False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ, ('wake', None, None))
+        self._thread = threading.Thread(target=self._run, name='process-reactor', daemon=True)
+        self._thread.start()
+
+    def _wake(self):
+        """
+        唤醒阻塞在select上的反应器线程
+        """
+        try:
+            os.write(self._wake_w, b'\0')
+        except BlockingIOError:
+            # 唤醒管道已满，说明反应器线程必然会被唤醒
+            pass
+
+    def _register(self, token: int, key: str, process, on_output, on_exit):
+        """
+        在反应器线程中注册子进程的管道和pidfd
+
+        Args:
+            token: 监听条目序号
+            key: 进程标识
+            process: subprocess.Popen对象
+            on_output: 输出回调
+            on_exit: 退出回调
+        """
+        entry = {
+            'key': key,
+            'process': process,
+            'on_output': on_output,
+            'on_exit': on_exit,
+            'streams': {},
+            'partial': {},
+            'pidfd': None,
+            'exited': False
+        }
+        for stream, pipe in (('stdout', process.stdout), ('stderr', process.stderr)):
+            if pipe is None:
+                continue
+            fd = pipe.fileno()
+            os.set_blocking(fd, False)
+            entry['streams'][stream] = pipe
+            entry['partial'][stream] = b''
+            self._selector.register(fd, selectors.EVENT_READ, ('pipe', token, stream))
+
+        if hasattr(os, 'pidfd_open'):
+            try:
+                entry['pidfd'] = os.pidfd_open(process.pid)
+                self._selector.register(entry['pidfd'], selectors.EVENT_READ, ('exit', token, None))
+            except OSError:
+                entry['pidfd'] = None
+
+        self._watched[token] = entry
+
+    def _run(self):
+        """
+        反应器主循环
+        """
+        while True:
+            polling = any(entry['pidfd'] is None for entry in self._watched.values())
+            events = self._selector.select(_POLL_INTERVAL if polling else None)
+
+            for selector_key, _ in events:
+                kind, token, stream = selector_key.data
+                try:
+                    if kind == 'wake':
+                        self._drain_wake_pipe()
+                    elif kind == 'pipe':
+                        self._read_pipe(token, stream)
+                    elif kind == 'exit':
+                        self._handle_exit(token)
+                except Exception as e:
+                    print(f"反应器处理事件时发生错误: {str(e)}")
+
+            # 无pidfd的进程通过轮询检测退出
+            if polling:
+                for token, entry in list(self._watched.items()):
+                    if entry['pidfd'] is None and entry['process'].poll() is not None:
+                        self._handle_exit(token)
+
+    def _drain_wake_pipe(self):
+        """
+        清空唤醒管道并注册新提交的子进程
+        """
+        try:
+            while os.read(self._wake_r, _READ_CHUNK_SIZE):
+                pass
+        except BlockingIOError:
+            pass
+
+        with self._incoming_lock:
+            incoming, self._incoming = self._incoming, []
+        for item in incoming:
+            try:
+                self._register(*item)
+            except Exception as e:
+                print(f"注册子进程到反应器失败: {str(e)}")
+
+    def _read_pipe(self, token: int, stream: str, drain: bool = False):
+        """
+        读取管道中当前可用的数据并按行分发
+
+        Args:
+            token: 监听条目序号
+            stream: 'stdout'或'stderr'
+            drain: 是否循环读取直到管道暂无数据
+        """
+        entry = self._watched.get(token)
+        if entry is None or stream not in entry['streams']:
+            return
+
+        pipe = entry['streams'][stream]
+        while True:
+            try:
+                chunk = os.read(pipe.fileno(), _READ_CHUNK_SIZE)
+            except BlockingIOError:
+                return
+
+            if not chunk:
+                # EOF：输出剩余的不完整行并关闭管道
+                rest = entry['partial'].pop(stream)
+                if rest:
+                    self._emit(entry, stream, rest)
+                self._close_stream(entry, stream)
+                self._finish_if_done(token)
+                return
+
+            data = entry['partial'][stream] + chunk
+            *lines, entry['partial'][stream] = data.split(b'\n')
+            for line in lines:
+                self._emit(entry, stream, line)
+
+            if not drain:
+                return
+
+    def _emit(self, entry: Dict, stream: str, raw_line: bytes):
+        """
+        解码一行输出并调用输出回调
+
+        Args:
+            entry: 监听条目
+            stream: 'stdout'或'stderr'
+            raw_line: 原始字节行
+        """
+        try:
+            entry['on_output'](entry['key'], stream, raw_line.decode(self.encoding, errors='replace').strip())
+        except Exception as e:
+            print(f"处理进程输出时发生错误: {str(e)}")
+
+    def _close_stream(self, entry: Dict, stream: str):
+        """
+        注销并关闭一个输出管道
+
+        Args:
+            entry: 监听条目
+            stream: 'stdout'或'stderr'
+        """
+        pipe = entry['streams'].pop(stream)
+        try:
+            self._selector.unregister(pipe.fileno())
+        except (KeyError, ValueError):
+            pass
+        pipe.close()
+
+    def _handle_exit(self, token: int):
+        """
+        子进程退出：读取管道中剩余的数据后结束监听
+        孙进程可能继承并持有管道，因此不等待EOF
+
+        Args:
+            token: 监听条目序号
+        """
+        entry = self._watched.get(token)
+        if entry is None or entry['exited']:
+            return
+        entry['exited'] = True
+
+        if entry['pidfd'] is not None:
+            self._selector.unregister(entry['pidfd'])
+            os.close(entry['pidfd'])
+            entry['pidfd'] = None
+
+        for stream in list(entry['streams']):
+            self._read_pipe(token, stream, drain=True)
+        for stream in list(entry['streams']):
+            rest = entry['partial'].pop(stream, b'')
+            if rest:
+                self._emit(entry, stream, rest)
+            self._close_stream(entry, stream)
+
+        self._finish_if_done(token)
+
+    def _finish_if_done(self, token: int):
+        """
+        进程已退出且所有管道已关闭时调用退出回调
+
+        Args:
+            token: 监听条目序号
+        """
+        entry = self._watched.get(token)
+        if entry is None or entry['streams']:
+            return
+        if not entry['exited']:
+            # 管道已全部关闭但进程尚未退出，等待pidfd或轮询通知
+            if entry['pidfd'] is not None or entry['process'].poll() is None:
+                return
+            entry['exited'] = True
+
+        del self._watched[token]
+        return_code = entry['process'].wait()
+        try:
+            entry['on_exit'](entry['key'], return_code)
+        except Exception as e:
+            print(f"处理进程退出时发生错误: {str(e)}")
+
+    def _watch_with_threads(self, key: str, process, on_output, on_exit):
+        """
+        Windows下的退化实现：每个管道一个读取线程，另有一个线程等待进程结束
+
+        Args:
+            key: 进程标识
+            process: subprocess.Popen对象
+            on_output: 输出回调
+            on_exit: 退出回调
+        """
+        def read(stream, pipe):
+            try:
+                for line in iter(pipe.readline, b''):
+                    on_output(key, stream, line.decode(self.encoding, errors='replace').strip())
+            except Exception as e:
+                print(f"读取进程输出时发生错误: {str(e)}")
+            finally:
+                pipe.close()
+
+        readers = []
+        for stream, pipe in (('stdout', process.stdout), ('stderr', process.stderr)):
+            if pipe is not None:
+                thread = threading.Thread(target=read, args=(stream, pipe), daemon=True)
+                thread.start()
+                readers.append(thread)
+
+        def wait():
+            return_code = process.wait()
+            for thread in readers:
+                thread.join()
+            try:
+                on_exit(key, return_code)
+            except Exception as e:
+                print(f"处理进程退出时发生错误: {str(e)}")
+
+        threading.Thread(target=wait, daemon=True).start()
@@ -0,0 +1,266 @@
+"""
+模型资源配置
+按模型读取内存上限、CPU核数、nice值和最长运行时间，并在Linux上通过cgroup v2、rlimit和CPU亲和性施加限制
+"""
+import os
+import json
+from typing import Dict, List, Optional, Callable
+from flask import current_app
+from config import Config
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# 资源配置项及对应的全局默认值配置名
+PROFILE_DEFAULTS = {
+    'memory_limit_mb': 'MODEL_DEFAULT_MEMORY_LIMIT_MB',
+    'cpu_cores': 'MODEL_DEFAULT_CPU_CORES',
+    'nice': 'MODEL_DEFAULT_NICE',
+    'max_wall_seconds': 'MODEL_DEFAULT_MAX_WALL_SECONDS',
+    'max_concurrency': 'SCHEDULER_MAX_PER_MODEL',
+    'share_weight': 'MODEL_DEFAULT_SHARE_WEIGHT'
+}
+
+
+def _get_config(key: str):
+    """
+    读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+    Args:
+        key: 配置项名称
+
+    Returns:
+        配置值
+    """
+    try:
+        return current_app.config[key]
+    except RuntimeError:
+        return getattr(Config, key)
+
+
+def get_profile_path(model_uuid: str) -> str:
+    """
+    获取模型资源配置文件路径（与模型Python环境目录同级）
+
+    Args:
+        model_uuid: 模型UUID
+
+    Returns:
+        str: 配置文件路径
+    """
+    return os.path.join(
+        _get_config('STORAGE_FOLDER'),
+        _get_config('MODEL_FOLDER'),
+        model_uuid,
+        _get_config('MODEL_RESOURCE_PROFILE_FILE')
+    )
+
+
+def load_resource_profile(model_uuid: Optional[str]) -> Dict:
+    """
+    读取模型资源配置，未配置的项使用全局默认值，0表示不限制
+
+    Args:
+        model_uuid: 模型UUID
+
+    Returns:
+        Dict: memory_limit_mb、cpu_cores、nice、max_wall_seconds，以及调度使用的max_concurrency和share_weight
+    """
+    profile = {key: _get_config(config_key) for key, config_key in PROFILE_DEFAULTS.items()}
+    if not model_uuid:
+        return profile
+
+    profile_path = get_profile_path(model_uuid)
+    if not os.path.isfile(profile_path):
+        return profile
+    try:
+        with open(profile_path, 'r', encoding='utf-8') as f:
+            custom = json.load(f)
+        for key in PROFILE_DEFAULTS:
+            if custom.get(key) is not None:
+                profile[key] = int(custom[key])
+    except (OSError, ValueError, TypeError) as e:
+        print(f"读取模型资源配置失败 {profile_path}: {str(e)}")
+    return profile
+
+
+def is_supported() -> bool:
+    """
+    当前平台是否支持施加资源限制
+
+    Returns:
+        bool: POSIX平台返回True
+    """
+    return os.name == 'posix'
+
+
+class CoreAllocator:
+    """
+    CPU核心分配器
+    为要求独占核心的任务分配互不重叠的核心集合，任务结束后归还
+    调用方负责加锁
+    """
+
+    def __init__(self):
+        if hasattr(os, 'sched_getaffinity'):
+            self.all_cores = sorted(os.sched_getaffinity(0))
+        else:
+            self.all_cores = []
+        self._free = set(self.all_cores)
+
+    def allocate(self, count: int) -> Optional[List[int]]:
+        """
+        分配指定数量的核心
+
+        Args:
+            count: 需要的核心数，超过本机可用核心数时按可用核心数分配
+
+        Returns:
+            List[int]: 分配到的核心编号；空闲核心不足时返回None；count为0或平台不支持时返回空列表
+        """
+        if count <= 0 or not self.all_cores:
+            return []
+        count = min(count, len(self.all_cores))
+        if len(self._free) < count:
+            return None
+        cores = sorted(self._free)[:count]
+        self._free.difference_update(cores)
+        return cores
+
+    def release(self, cores: List[int]):
+        """
+        归还核心
+
+        Args:
+            cores: 核心编号列表
+        """
+        self._free.update(cores)
+
+    def get_free_count(self) -> int:
+        """
+        获取空闲核心数
+
+        Returns:
+            int: 空闲核心数
+        """
+        return len(self._free)
+
+
+def setup_cgroup(name: str, memory_limit_mb: int) -> Optional[str]:
+    """
+    在cgroup v2下为任务创建子cgroup并设置memory.max
+
+    Args:
+        name: 子cgroup名称（任务ID）
+        memory_limit_mb: 内存上限（MB）
+
+    Returns:
+        str: 子cgroup目录，cgroup v2不可用或无权限时返回None（调用方应退回rlimit）
+    """
+    root = _get_config('CGROUP_ROOT')
+    if not memory_limit_mb or not root or not os.path.isfile('/sys/fs/cgroup/cgroup.controllers'):
+        return None
+    try:
+        os.makedirs(root, exist_ok=True)
+        with open(os.path.join(root, 'cgroup.subtree_control'), 'r') as f:
+            enabled = f.read().split()
+        if 'memory' not in enabled:
+            with open(os.path.join(root, 'cgroup.subtree_control'), 'w') as f:
+                f.write('+memory')
+        path = os.path.join(root, name)
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, 'memory.max'), 'w') as f:
+            f.write(str(memory_limit_mb * 1024 * 1024))
+        return path
+    except OSError as e:
+        print(f"创建cgroup失败，改用rlimit限制内存: {str(e)}")
+        return None
+
+
+def remove_cgroup(path: Optional[str]):
+    """
+    删除任务的子cgroup（其中的进程必须已全部退出）
+
+    Args:
+        path: 子cgroup目录
+    """
+    if not path:
+        return
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        # 仍有残留进程时无法删除
+        print(f"删除cgroup失败 {path}: {str(e)}")
+
+
+def build_preexec_fn(profile: Dict, cores: List[int], cgroup_path: Optional[str]) -> Optional[Callable[[], None]]:
+    """
+    构造在子进程exec之前执行的限制函数
+    函数中只调用系统调用，不导入模块、不加锁，以降低多线程环境下fork的风险
+
+    Args:
+        profile: 资源配置
+        cores: 绑定的CPU核心，为空时不绑定
+        cgroup_path: 子cgroup目录，为None时使用RLIMIT_DATA限制内存
+
+    Returns:
+        Callable: 限制函数，无需限制或平台不支持时返回None
+    """
+    if not is_supported():
+        return None
+    nice = profile.get('nice') or 0
+    memory_limit = (profile.get('memory_limit_mb') or 0) * 1024 * 1024
+    procs_path = os.path.join(cgroup_path, 'cgroup.procs') if cgroup_path else None
+    if not (nice or memory_limit or cores):
+        return None
+
+    def preexec():
+        if procs_path:
+            try:
+                fd = os.open(procs_path, os.O_WRONLY)
+                try:
+                    os.write(fd, b'0')
+                finally:
+                    os.close(fd)
+            except OSError:
+                pass
+        elif memory_limit and resource is not None:
+            try:
+                resource.setrlimit(resource.RLIMIT_DATA, (memory_limit, memory_limit))
+            except (OSError, ValueError):
+                pass
+        if cores:
+            try:
+                os.sched_setaffinity(0, cores)
+            except OSError:
+                pass
+        if nice:
+            try:
+                os.nice(nice)
+            except OSError:
+                pass
+
+    return preexec
+
+
+def pin_threads(pid: int, cores: List[int]):
+    """
+    将已在运行的进程的所有线程绑定到指定核心（用于常驻工作进程在任务开始时切换核心）
+
+    Args:
+        pid: 进程ID
+        cores: 核心编号列表
+    """
+    if not cores or not hasattr(os, 'sched_setaffinity'):
+        return
+    try:
+        thread_ids = [int(tid) for tid in os.listdir(f'/proc/{pid}/task')]
+    except OSError:
+        thread_ids = [pid]
+    for tid in thread_ids:
+        try:
+            os.sched_setaffinity(tid, cores)
+        except OSError:
+            pass
@@ -0,0 +1,454 @@
+"""
+在线推演结果缓存
+以(模型代码和环境版本、input.csv内容、tif目录、参数配置)的哈希为键保存output.csv，
+相同的提交直接复制缓存结果，不再启动模型进程；缓存总大小超过上限时淘汰最久未使用的结果
+"""
+import os
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from config import Config
+
+# 小于该大小的模型代码文件按内容计算版本，更大的文件（如模型权重）按大小和修改时间计算
+_CONTENT_HASH_MAX_BYTES = 1024 * 1024
+# 计入模型版本的文件类型：源代码和配置，以及模型权重；模型运行时写入代码目录的日志、临时文件等不影响版本
+_VERSION_FILE_SUFFIXES = ('.py', '.pyx', '.pyd', '.so', '.json', '.yaml', '.yml', '.toml', '.cfg', '.ini',
+                          '.pt', '.pth', '.ckpt', '.onnx', '.pkl', '.pickle', '.h5', '.hdf5', '.bin',
+                          '.safetensors', '.npy', '.npz', '.joblib', '.pb', '.tflite')
+# 计算文件哈希时每次读取的字节数
+_READ_CHUNK_BYTES = 1024 * 1024
+# 缓存结果文件的扩展名
+_ENTRY_SUFFIX = '.csv'
+
+
+def _get_config(key: str):
+    """
+    读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+    Args:
+        key: 配置项名称
+
+    Returns:
+        配置值
+    """
+    try:
+        return current_app.config[key]
+    except RuntimeError:
+        return getattr(Config, key)
+
+
+def _walk_files(root: str) -> List[Tuple[str, str]]:
+    """
+    按固定顺序列出目录下的所有文件
+
+    Args:
+        root: 目录路径
+
+    Returns:
+        List[Tuple]: (相对路径, 绝对路径)列表，按相对路径排序
+    """
+    files = []
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for name in file_names:
+            path = os.path.join(dir_path, name)
+            files.append((os.path.relpath(path, root).replace(os.sep, '/'), path))
+    files.sort()
+    return files
+
+
+def _update_with_file(digest, path: str):
+    """
+    将文件内容加入哈希
+
+    Args:
+        digest: hashlib哈希对象
+        path: 文件路径
+    """
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_READ_CHUNK_BYTES), b''):
+            digest.update(chunk)
+
+
+# 模型UUID -> (模型文件清单, 版本标识)：清单只包含计入版本的文件的路径、大小和修改时间，
+# 清单未变化时直接使用缓存的版本，不重新读取文件内容
+_model_versions: Dict[str, Tuple[Tuple, str]] = {}
+_model_versions_lock = threading.Lock()
+
+
+def _list_version_files(code_dir: str, env_dir: str) -> Tuple:
+    """
+    列出计入模型版本的文件及其大小和修改时间
+    代码目录中只包含源代码、配置和权重文件（_VERSION_FILE_SUFFIXES），模型运行时写入的日志、临时文件不计入；
+    Python环境文件数量很多，只取顶层条目
+
+    Args:
+        code_dir: 模型代码目录
+        env_dir: Python环境目录
+
+    Returns:
+        Tuple: ((类别, 相对路径, 大小, 修改时间, 绝对路径), ...)，按类别和相对路径排序
+    """
+    files = []
+    for rel_path, path in _walk_files(code_dir):
+        if '__pycache__' in rel_path.split('/') or not rel_path.lower().endswith(_VERSION_FILE_SUFFIXES):
+            continue
+        stat = os.stat(path)
+        files.append(('code', rel_path, stat.st_size, stat.st_mtime_ns, path))
+    if os.path.isdir(env_dir):
+        for name in sorted(os.listdir(env_dir)):
+            path = os.path.join(env_dir, name)
+            stat = os.stat(path)
+            files.append(('env', name, stat.st_size, stat.st_mtime_ns, path))
+    return tuple(files)
+
+
+def get_model_version(model_uuid: str) -> str:
+    """
+    获取模型代码和Python环境的版本标识
+    每次只检查文件清单（大小和修改时间），清单变化（模型被重新上传或替换）时才重新计算；
+    模型被删除或替换时由forget_model_version清除
+
+    Args:
+        model_uuid: 模型UUID
+
+    Returns:
+        str: 版本标识（16位十六进制）
+    """
+    model_dir = os.path.join(_get_config('STORAGE_FOLDER'), _get_config('MODEL_FOLDER'), model_uuid)
+    files = _list_version_files(os.path.join(model_dir, _get_config('MODEL_CODE_FOLDER')),
+                                os.path.join(model_dir, _get_config('MODEL_PYTHON_ENV_FOLDER')))
+    with _model_versions_lock:
+        cached = _model_versions.get(model_uuid)
+    if cached is not None and cached[0] == files:
+        return cached[1]
+
+    version = _compute_model_version(files)
+    with _model_versions_lock:
+        _model_versions[model_uuid] = (files, version)
+    return version
+
+
+def forget_model_version(model_uuid: str):
+    """
+    清除缓存的模型版本，下次使用时重新计算
+
+    Args:
+        model_uuid: 模型UUID
+    """
+    with _model_versions_lock:
+        _model_versions.pop(model_uuid, None)
+
+
+def _compute_model_version(files: Tuple) -> str:
+    """
+    计算模型版本标识：代码目录中的小文件按内容计算（只改变修改时间不改变版本），大文件和Python环境按大小和修改时间计算
+
+    Args:
+        files: _list_version_files返回的文件清单
+
+    Returns:
+        str: 版本标识（16位十六进制）
+    """
+    digest = hashlib.sha256()
+    for kind, rel_path, size, mtime_ns, path in files:
+        digest.update(f"{kind}\0{rel_path}\0{size}\0".encode('utf-8'))
+        if kind == 'code' and size <= _CONTENT_HASH_MAX_BYTES:
+            _update_with_file(digest, path)
+        else:
+            digest.update(f"{mtime_ns}\0".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def get_tif_identity(tif_path: Optional[str]) -> str:
+    """
+    计算tif目录的标识：目录名及其中每个文件的相对路径、大小和修改时间
+
+    Args:
+        tif_path: tif目录或文件路径
+
+    Returns:
+        str: 标识字符串，没有tif时为空字符串
+    """
+    if not tif_path or not os.path.exists(tif_path):
+        return ''
+    if os.path.isfile(tif_path):
+        entries = [(os.path.basename(tif_path), tif_path)]
+    else:
+        entries = _walk_files(tif_path)
+    digest = hashlib.sha256(os.path.basename(os.path.normpath(tif_path)).encode('utf-8'))
+    for rel_path, path in entries:
+        stat = os.stat(path)
+        digest.update(f"\0{rel_path}\0{stat.st_size}\0{stat.st_mtime_ns}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    结果缓存单例类
+    缓存文件位于RESULT_CACHE_DIR/<模型UUID>/<模型版本>/<内容哈希>.csv，
+    以文件修改时间记录最近使用时间，服务启动后首次访问时扫描目录重建LRU索引
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ResultCache, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            # 缓存键 -> 文件大小，按最近使用时间从旧到新排列
+            self._entries: 'OrderedDict[str, int]' = OrderedDict()
+            self._total_bytes = 0
+            self._loaded = False
+            self._state_lock = threading.RLock()
+            self._stats = {
+                'hits': 0,
+                'misses': 0,
+                'stores': 0,
+                'evictions': 0,
+                'invalidations': 0,
+                'bytes_saved': 0
+            }
+            self.initialized = True
+
+    def is_enabled(self) -> bool:
+        """
+        是否启用结果缓存
+
+        Returns:
+            bool: 是否启用
+        """
+        return bool(_get_config('RESULT_CACHE_ENABLED'))
+
+    def _entry_path(self, key: str) -> str:
+        """
+        获取缓存键对应的文件路径
+
+        Args:
+            key: 缓存键（模型UUID/模型版本/内容哈希）
+
+        Returns:
+            str: 缓存文件路径
+        """
+        return os.path.join(_get_config('RESULT_CACHE_DIR'), *key.split('/')) + _ENTRY_SUFFIX
+
+    def _ensure_loaded(self):
+        """首次访问时扫描缓存目录，按修改时间重建LRU索引（调用方持有状态锁）"""
+        if self._loaded:
+            return
+        self._loaded = True
+        cache_dir = _get_config('RESULT_CACHE_DIR')
+        if not os.path.isdir(cache_dir):
+            return
+        found = []
+        for rel_path, path in _walk_files(cache_dir):
+            parts = rel_path.split('/')
+            if len(parts) != 3 or not rel_path.endswith(_ENTRY_SUFFIX):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            found.append((stat.st_mtime, rel_path[:-len(_ENTRY_SUFFIX)], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total_bytes += size
+
+    def build_key(self, model_uuid: str, input_csv_path: str, tif_path: Optional[str],
+                  param_config: Optional[Dict], prediction_mode: str) -> Optional[str]:
+        """
+        计算任务的缓存键，同时作为在线推演合并运行的任务指纹（未启用缓存时同样计算）
+
+        Args:
+            model_uuid: 模型UUID
+            input_csv_path: input.csv路径
+            tif_path: tif目录路径
+            param_config: 参数配置
+            prediction_mode: 预测模式
+
+        Returns:
+            str: 缓存键（模型UUID/模型版本/内容哈希），计算失败时返回None
+        """
+        try:
+            digest = hashlib.sha256()
+            digest.update(f"{prediction_mode}\0".encode('utf-8'))
+            digest.update(json.dumps(param_config or {}, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+            digest.update(f"\0{get_tif_identity(tif_path)}\0".encode('utf-8'))
+            _update_with_file(digest, input_csv_path)
+            return f"{model_uuid}/{get_model_version(model_uuid)}/{digest.hexdigest()}"
+        except Exception as e:
+            current_app.logger.warning(f"计算结果缓存键失败: {str(e)}")
+            return None
+
+    def get(self, key: str, dest_path: str) -> bool:
+        """
+        查找缓存结果，命中时复制到目标路径
+        同一模型的其他版本的缓存在这里清除（模型被替换后旧结果不再有效）
+
+        Args:
+            key: 缓存键
+            dest_path: 目标文件路径（任务的output.csv）
+
+        Returns:
+            bool: 是否命中，未启用缓存时返回False
+        """
+        if not self.is_enabled():
+            return False
+        model_uuid, version, _ = key.split('/')
+        path = self._entry_path(key)
+        with self._state_lock:
+            self._ensure_loaded()
+            self._remove_stale_versions(model_uuid, version)
+            if not os.path.isfile(path):
+                self._drop(key)
+                self._stats['misses'] += 1
+                return False
+            if key not in self._entries:
+                # 其他服务进程写入的结果
+                self._entries[key] = os.path.getsize(path)
+                self._total_bytes += self._entries[key]
+            try:
+                shutil.copyfile(path, dest_path)
+                os.utime(path)
+            except OSError as e:
+                current_app.logger.warning(f"读取缓存结果 {key} 失败: {str(e)}")
+                self._drop(key)
+                self._stats['misses'] += 1
+                return False
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            self._stats['bytes_saved'] += self._entries[key]
+            return True
+
+    def put(self, key: str, source_path: str):
+        """
+        保存任务结果，超出总大小上限时淘汰最久未使用的结果
+
+        Args:
+            key: 缓存键
+            source_path: 任务的output.csv路径
+        """
+        if not self.is_enabled():
+            return
+        path = self._entry_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            size = os.path.getsize(source_path)
+            if size > _get_config('RESULT_CACHE_MAX_BYTES'):
+                return
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，其他进程不会读到不完整的结果
+            shutil.copyfile(source_path, temp_path)
+            os.replace(temp_path, path)
+        except OSError as e:
+            current_app.logger.warning(f"保存缓存结果 {key} 失败: {str(e)}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+
+        with self._state_lock:
+            self._ensure_loaded()
+            self._drop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._stats['stores'] += 1
+            self._evict()
+
+    def invalidate_model(self, model_uuid: str) -> int:
+        """
+        清除模型的所有缓存结果（模型被删除或替换时调用）
+
+        Args:
+            model_uuid: 模型UUID
+
+        Returns:
+            int: 清除的结果数
+        """
+        forget_model_version(model_uuid)
+        with self._state_lock:
+            self._ensure_loaded()
+            keys = [key for key in self._entries if key.split('/')[0] == model_uuid]
+            for key in keys:
+                self._drop(key)
+            self._stats['invalidations'] += len(keys)
+            shutil.rmtree(os.path.join(_get_config('RESULT_CACHE_DIR'), model_uuid), ignore_errors=True)
+            return len(keys)
+
+    def _remove_stale_versions(self, model_uuid: str, version: str):
+        """
+        清除模型其他版本的缓存结果（调用方持有状态锁）
+
+        Args:
+            model_uuid: 模型UUID
+            version: 当前模型版本
+        """
+        stale = [key for key in self._entries if key.split('/')[0] == model_uuid and key.split('/')[1] != version]
+        for key in stale:
+            self._remove_file(key)
+            self._drop(key)
+        self._stats['invalidations'] += len(stale)
+        # 其他服务进程写入的旧版本目录不在本进程的索引中，同样删除
+        model_dir = os.path.join(_get_config('RESULT_CACHE_DIR'), model_uuid)
+        for name in os.listdir(model_dir) if os.path.isdir(model_dir) else []:
+            if name != version:
+                shutil.rmtree(os.path.join(model_dir, name), ignore_errors=True)
+
+    def _evict(self):
+        """淘汰最久未使用的结果直到总大小不超过上限（调用方持有状态锁）"""
+        max_bytes = _get_config('RESULT_CACHE_MAX_BYTES')
+        while self._entries and self._total_bytes > max_bytes:
+            key = next(iter(self._entries))
+            self._remove_file(key)
+            self._drop(key)
+            self._stats['evictions'] += 1
+
+    def _remove_file(self, key: str):
+        """
+        删除缓存文件
+
+        Args:
+            key: 缓存键
+        """
+        try:
+            os.remove(self._entry_path(key))
+        except OSError:
+            pass
+
+    def _drop(self, key: str):
+        """
+        从索引中移除缓存键（调用方持有状态锁）
+
+        Args:
+            key: 缓存键
+        """
+        size = self._entries.pop(key, None)
+        if size is not None:
+            self._total_bytes -= size
+
+    def get_stats(self) -> Dict:
+        """
+        获取缓存统计
+
+        Returns:
+            Dict: 命中数、未命中数、命中率、节省的字节数、淘汰数、失效数以及当前的结果数和总大小
+        """
+        with self._state_lock:
+            self._ensure_loaded()
+            lookups = self._stats['hits'] + self._stats['misses']
+            stats = dict(self._stats)
+            stats.update({
+                'enabled': self.is_enabled(),
+                'hit_rate': round(self._stats['hits'] / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'total_bytes': self._total_bytes,
+                'max_bytes': _get_config('RESULT_CACHE_MAX_BYTES')
+            })
+            return stats
@@ -0,0 +1,172 @@
+"""
+典型场景输入的二进制形式
+添加典型场景时将input.csv预编译为紧凑的二进制形式：去重后的发射机、接收机位置（float64数组）、
+每行对应的发射机/接收机序号（配对索引）以及行数和经纬度范围统计。
+创建任务时以内存映射方式加载，不再逐行解析CSV和线性查找去重
+"""
+import os
+import csv
+import json
+import uuid
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+# 二进制形式所在的子文件夹（位于场景文件夹内）
+COMPILED_DIRNAME = "compiled"
+# 格式版本，变化后旧的二进制形式视为失效并重新编译
+FORMAT_VERSION = 1
+
+_STATS_FILENAME = "stats.json"
+_ARRAY_FILENAMES = ("tx.npy", "rx.npy", "pairs.npy")
+
+
+def parse_scenario_csv(csv_path: str) -> Tuple[List[Tuple[float, float, float]], List[Tuple[float, float, float]],
+                                               List[Tuple[int, int]], int]:
+    """
+    解析典型场景的input.csv，发射机和接收机位置按首次出现的顺序以哈希表去重
+
+    每行格式为tx_lat, tx_lon, tx_height, rx_lat, rx_lon, rx_height[, ...]，
+    列数不足6或无法转换为数值的行（如标题行）被跳过
+
+    Args:
+        csv_path: CSV文件路径
+
+    Returns:
+        Tuple: (发射机位置列表, 接收机位置列表, 每行的(发射机序号, 接收机序号)列表, 跳过的行数)
+    """
+    tx_index: Dict[Tuple[float, float, float], int] = {}
+    rx_index: Dict[Tuple[float, float, float], int] = {}
+    pairs = []
+    skipped_rows = 0
+    with open(csv_path, 'r', encoding='utf-8') as csvfile:
+        for row in csv.reader(csvfile):
+            # 跳过空行
+            if not row or len(row) < 6:
+                continue
+            try:
+                tx_pos = (float(row[0]), float(row[1]), float(row[2]))
+                rx_pos = (float(row[3]), float(row[4]), float(row[5]))
+            except ValueError:
+                # 可能是标题行或无效数据，跳过
+                skipped_rows += 1
+                continue
+            pairs.append((tx_index.setdefault(tx_pos, len(tx_index)), rx_index.setdefault(rx_pos, len(rx_index))))
+    return list(tx_index), list(rx_index), pairs, skipped_rows
+
+
+def _source_key(csv_path: str) -> Dict[str, int]:
+    """
+    源文件的修改时间和大小，用于判断二进制形式是否过期
+    """
+    stat = os.stat(csv_path)
+    return {'source_size': stat.st_size, 'source_mtime_ns': stat.st_mtime_ns}
+
+
+def compile_scenario_csv(csv_path: str, scenario_dir: str) -> Dict[str, Any]:
+    """
+    将典型场景的input.csv编译为二进制形式，保存到场景文件夹的compiled/子文件夹
+
+    各数组先写入临时文件再原子替换，统计信息最后写入，作为二进制形式完整可用的标志
+
+    Args:
+        csv_path: input.csv路径
+        scenario_dir: 场景文件夹
+
+    Returns:
+        Dict: 统计信息（行数、去重后的发射机和接收机数、跳过的行数、经纬度范围）
+    """
+    source_key = _source_key(csv_path)
+    tx_list, rx_list, pairs, skipped_rows = parse_scenario_csv(csv_path)
+    arrays = (
+        np.asarray(tx_list, dtype=np.float64).reshape(-1, 3),
+        np.asarray(rx_list, dtype=np.float64).reshape(-1, 3),
+        np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    )
+
+    positions = np.concatenate(arrays[:2])
+    bbox = None
+    if len(positions):
+        bbox = {
+            'min_lat': float(positions[:, 0].min()), 'max_lat': float(positions[:, 0].max()),
+            'min_lon': float(positions[:, 1].min()), 'max_lon': float(positions[:, 1].max()),
+            'min_height': float(positions[:, 2].min()), 'max_height': float(positions[:, 2].max())
+        }
+    stats = {
+        'format_version': FORMAT_VERSION,
+        'rows': len(pairs),
+        'tx_count': len(tx_list),
+        'rx_count': len(rx_list),
+        'skipped_rows': skipped_rows,
+        'bbox': bbox
+    }
+    stats.update(source_key)
+
+    compiled_dir = os.path.join(scenario_dir, COMPILED_DIRNAME)
+    os.makedirs(compiled_dir, exist_ok=True)
+    # 先删除旧的统计信息，写入过程中被中断时二进制形式视为不存在
+    stats_path = os.path.join(compiled_dir, _STATS_FILENAME)
+    if os.path.exists(stats_path):
+        os.remove(stats_path)
+    for filename, array in zip(_ARRAY_FILENAMES, arrays):
+        _atomic_write(os.path.join(compiled_dir, filename), lambda f, a=array: np.save(f, a))
+    _atomic_write(stats_path, lambda f: f.write(json.dumps(stats, ensure_ascii=False, indent=2).encode('utf-8')))
+    return stats
+
+
+def _atomic_write(path: str, write):
+    """
+    先写入临时文件再原子替换
+
+    Args:
+        path: 目标路径
+        write: 接收二进制文件对象的写入函数
+    """
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            write(f)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def load_compiled_scenario(scenario_dir: str, csv_path: str) -> Optional[Dict[str, Any]]:
+    """
+    以内存映射方式加载场景的二进制形式
+
+    Args:
+        scenario_dir: 场景文件夹
+        csv_path: input.csv路径
+
+    Returns:
+        Optional[Dict]: {'tx': 发射机数组(N, 3), 'rx': 接收机数组(M, 3), 'pairs': 配对索引(rows, 2), 'stats': 统计信息}；
+        二进制形式不存在、版本不一致或input.csv已变化时返回None
+    """
+    compiled_dir = os.path.join(scenario_dir, COMPILED_DIRNAME)
+    try:
+        with open(os.path.join(compiled_dir, _STATS_FILENAME), 'r', encoding='utf-8') as f:
+            stats = json.load(f)
+        if stats.get('format_version') != FORMAT_VERSION:
+            return None
+        source_key = _source_key(csv_path)
+        if any(stats.get(key) != value for key, value in source_key.items()):
+            return None
+        tx, rx, pairs = (np.load(os.path.join(compiled_dir, filename), mmap_mode='r')
+                         for filename in _ARRAY_FILENAMES)
+    except (OSError, ValueError):
+        return None
+    return {'tx': tx, 'rx': rx, 'pairs': pairs, 'stats': stats}
+
+
+def positions_to_list(positions: np.ndarray) -> List[Dict[str, float]]:
+    """
+    将位置数组转换为点位配置使用的位置列表
+
+    Args:
+        positions: 位置数组(N, 3)，列依次为lat、lon、height
+
+    Returns:
+        List[Dict]: [{'lat': ..., 'lon': ..., 'height': ...}, ...]
+    """
+    return [{'lat': lat, 'lon': lon, 'height': height} for lat, lon, height in positions.tolist()]
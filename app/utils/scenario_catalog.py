@@ -0,0 +1,283 @@
+"""
+典型场景目录索引
+进程内缓存典型场景目录下各场景的元信息（scenario_metadata.json），按场景UUID和场景名称建立索引，
+查找和列出场景时不再逐个读取所有场景的元信息文件。
+基础目录的修改时间变化、超过复查间隔或由添加/删除服务显式失效时重建索引，
+重建时只重新读取修改时间或大小发生变化的元信息文件
+"""
+import os
+import copy
+import json
+import time
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from flask import current_app, has_app_context
+from config import Config
+
+METADATA_FILENAME = "scenario_metadata.json"
+
+
+class ScenarioCatalog:
+    """
+    典型场景目录索引单例类
+    返回的场景条目和元信息均为副本，调用方可以直接修改
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ScenarioCatalog, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self._catalog_lock = threading.RLock()
+            self._base_dir = None
+            # 基础目录的修改时间（纳秒），目录不存在时为None
+            self._dir_mtime = None
+            self._built_at = 0.0
+            self._dirty = True
+            # 文件夹名称 -> 场景条目，按os.listdir的顺序排列
+            self._entries: Dict[str, Dict[str, Any]] = {}
+            # 基础目录下的CSV文件（旧的场景格式）
+            self._csv_files: List[str] = []
+            self._by_uuid: Dict[str, str] = {}
+            self._by_name: Dict[str, List[str]] = {}
+            self._stats = {
+                'builds': 0,
+                'invalidations': 0,
+                'metadata_loads': 0,
+                'metadata_errors': 0,
+                'lookups': 0,
+                'last_build_seconds': 0.0,
+                'max_build_seconds': 0.0,
+                'total_build_seconds': 0.0,
+                'last_build_at': None
+            }
+            self.initialized = True
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，没有应用上下文时回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        if has_app_context():
+            return current_app.config.get(key, getattr(Config, key, None))
+        return getattr(Config, key, None)
+
+    def invalidate(self):
+        """
+        使索引失效，下次查找时重建（添加、删除或修改场景后调用）
+        """
+        with self._catalog_lock:
+            self._dirty = True
+            self._stats['invalidations'] += 1
+
+    def _ensure_fresh(self, base_dir: str):
+        """
+        检查索引是否需要重建：基础目录变化、目录修改时间变化、已失效或超过复查间隔
+
+        Args:
+            base_dir: 典型场景基础目录
+        """
+        try:
+            dir_mtime = os.stat(base_dir).st_mtime_ns
+        except OSError:
+            dir_mtime = None
+        recheck_seconds = self._get_config('SCENARIO_CATALOG_RECHECK_SECONDS') or 0
+        if (self._dirty or base_dir != self._base_dir or dir_mtime != self._dir_mtime
+                or time.time() - self._built_at >= recheck_seconds):
+            self._rebuild(base_dir, dir_mtime)
+
+    def _rebuild(self, base_dir: str, dir_mtime: Optional[int]):
+        """
+        重建索引，元信息文件的修改时间和大小都未变化的场景沿用已读取的元信息
+
+        Args:
+            base_dir: 典型场景基础目录
+            dir_mtime: 基础目录的修改时间（纳秒）
+        """
+        start = time.perf_counter()
+        previous = self._entries if base_dir == self._base_dir else {}
+        entries = {}
+        csv_files = []
+        if dir_mtime is not None:
+            for item in os.listdir(base_dir):
+                item_path = os.path.join(base_dir, item)
+                if os.path.isdir(item_path):
+                    entries[item] = self._load_entry(item, item_path, previous.get(item))
+                elif item.endswith('.csv'):
+                    csv_files.append(item)
+
+        by_uuid, by_name = {}, {}
+        for folder_name, entry in entries.items():
+            metadata = entry['metadata']
+            if metadata is None:
+                continue
+            # 多个场景UUID相同时与原有的遍历查找一致，使用第一个
+            by_uuid.setdefault(metadata.get("scenario_uuid"), folder_name)
+            by_name.setdefault(metadata.get("scenario_name"), []).append(folder_name)
+
+        self._base_dir = base_dir
+        self._dir_mtime = dir_mtime
+        self._entries = entries
+        self._csv_files = csv_files
+        self._by_uuid = by_uuid
+        self._by_name = by_name
+        self._built_at = time.time()
+        self._dirty = False
+
+        elapsed = time.perf_counter() - start
+        self._stats['builds'] += 1
+        self._stats['last_build_seconds'] = elapsed
+        self._stats['max_build_seconds'] = max(self._stats['max_build_seconds'], elapsed)
+        self._stats['total_build_seconds'] += elapsed
+        self._stats['last_build_at'] = datetime.now().isoformat()
+
+    def _load_entry(self, folder_name: str, directory: str, previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        读取一个场景文件夹的元信息
+
+        Args:
+            folder_name: 文件夹名称
+            directory: 文件夹路径
+            previous: 上次索引中的条目
+
+        Returns:
+            Dict: 场景条目，包含folder_name、directory、metadata（无元信息文件或读取失败时为None）和error
+        """
+        metadata_file = os.path.join(directory, METADATA_FILENAME)
+        try:
+            stat = os.stat(metadata_file)
+            file_key = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            return {'folder_name': folder_name, 'directory': directory, 'metadata': None, 'error': None,
+                    'file_key': None}
+        if previous is not None and previous['file_key'] == file_key:
+            return previous
+
+        entry = {'folder_name': folder_name, 'directory': directory, 'metadata': None, 'error': None,
+                 'file_key': file_key}
+        self._stats['metadata_loads'] += 1
+        try:
+            with open(metadata_file, 'r', encoding='utf-8') as f:
+                entry['metadata'] = json.load(f)
+        except Exception as e:
+            self._stats['metadata_errors'] += 1
+            entry['error'] = str(e)
+            if has_app_context():
+                current_app.logger.warning(f"Failed to read metadata for {folder_name}: {e}")
+            else:
+                print(f"Failed to read metadata for {folder_name}: {e}")
+        return entry
+
+    @staticmethod
+    def _copy_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        复制场景条目（不含内部使用的file_key）
+        """
+        return {
+            'folder_name': entry['folder_name'],
+            'directory': entry['directory'],
+            'metadata': copy.deepcopy(entry['metadata']),
+            'error': entry['error']
+        }
+
+    def get_by_uuid(self, base_dir: str, scenario_uuid: str) -> Optional[Dict[str, Any]]:
+        """
+        按场景UUID查找场景
+
+        Args:
+            base_dir: 典型场景基础目录
+            scenario_uuid: 场景UUID（元信息中的scenario_uuid）
+
+        Returns:
+            Optional[Dict]: 场景条目，不存在时返回None
+        """
+        with self._catalog_lock:
+            self._ensure_fresh(base_dir)
+            self._stats['lookups'] += 1
+            folder_name = self._by_uuid.get(scenario_uuid)
+            return self._copy_entry(self._entries[folder_name]) if folder_name is not None else None
+
+    def find_by_name(self, base_dir: str, scenario_name: str,
+                     prediction_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        按场景名称查找场景，同名场景按目录顺序取第一个
+
+        Args:
+            base_dir: 典型场景基础目录
+            scenario_name: 场景名称
+            prediction_type: 预测类型（可选，用于进一步过滤）
+
+        Returns:
+            Optional[Dict]: 场景条目，不存在时返回None
+        """
+        with self._catalog_lock:
+            self._ensure_fresh(base_dir)
+            self._stats['lookups'] += 1
+            for folder_name in self._by_name.get(scenario_name, []):
+                entry = self._entries[folder_name]
+                if prediction_type and entry['metadata'].get("prediction_type") != prediction_type:
+                    continue
+                return self._copy_entry(entry)
+            return None
+
+    def list_by_type_code(self, base_dir: str, type_code: str) -> List[Dict[str, Any]]:
+        """
+        列出文件夹名称以指定预测类型代码为前缀的场景（包括没有元信息或元信息读取失败的文件夹）
+
+        Args:
+            base_dir: 典型场景基础目录
+            type_code: 预测类型代码（如single_point）
+
+        Returns:
+            List[Dict]: 场景条目列表（按目录顺序）
+        """
+        with self._catalog_lock:
+            self._ensure_fresh(base_dir)
+            self._stats['lookups'] += 1
+            return [self._copy_entry(entry) for folder_name, entry in self._entries.items()
+                    if folder_name.startswith(f"{type_code}_")]
+
+    def list_entries(self, base_dir: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        列出所有场景文件夹和基础目录下的CSV文件
+
+        Args:
+            base_dir: 典型场景基础目录
+
+        Returns:
+            Tuple[List[Dict], List[str]]: 场景条目列表（按目录顺序）和CSV文件名列表
+        """
+        with self._catalog_lock:
+            self._ensure_fresh(base_dir)
+            self._stats['lookups'] += 1
+            return [self._copy_entry(entry) for entry in self._entries.values()], list(self._csv_files)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计
+
+        Returns:
+            Dict: 场景数、重建次数和耗时、元信息读取次数和查找次数
+        """
+        with self._catalog_lock:
+            stats = {
+                'base_dir': self._base_dir,
+                'scenarios': len(self._entries),
+                'with_metadata': sum(1 for entry in self._entries.values() if entry['metadata'] is not None),
+                'csv_files': len(self._csv_files),
+                'recheck_seconds': self._get_config('SCENARIO_CATALOG_RECHECK_SECONDS')
+            }
+            stats.update(self._stats)
+            return stats
@@ -0,0 +1,118 @@
+"""
+任务事件中心
+按任务保存最近的状态变化事件（每个任务的事件序号从1递增），供SSE连接推送和断线后按序号补发
+"""
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Tuple
+
+# 每个任务保留的事件数
+_EVENTS_PER_TOPIC = 256
+# 最多保留事件的任务数，超出时淘汰最久没有事件的任务
+_MAX_TOPICS = 1024
+
+
+class TaskEventHub:
+    """
+    任务事件中心单例类
+    发布方调用publish，订阅方用get_since按序号增量读取，并在wait中等待任意任务的新事件
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(TaskEventHub, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            # 任务ID -> {'seq': 最新序号, 'events': deque[(序号, 事件类型, 数据)]}
+            self._topics: 'OrderedDict[str, Dict]' = OrderedDict()
+            # 每次发布事件后递增，订阅方据此判断是否有新事件
+            self._generation = 0
+            self._condition = threading.Condition()
+            self.initialized = True
+
+    @property
+    def generation(self) -> int:
+        """当前的发布计数"""
+        with self._condition:
+            return self._generation
+
+    def publish(self, topic: str, event_type: str, data: Dict[str, Any]) -> int:
+        """
+        发布事件并唤醒等待中的订阅方
+
+        Args:
+            topic: 任务ID
+            event_type: 事件类型
+            data: 事件数据
+
+        Returns:
+            int: 事件序号
+        """
+        with self._condition:
+            entry = self._topics.pop(topic, None)
+            if entry is None:
+                entry = {'seq': 0, 'events': deque(maxlen=_EVENTS_PER_TOPIC)}
+            self._topics[topic] = entry
+            while len(self._topics) > _MAX_TOPICS:
+                self._topics.popitem(last=False)
+            entry['seq'] += 1
+            entry['events'].append((entry['seq'], event_type, data))
+            self._generation += 1
+            self._condition.notify_all()
+            return entry['seq']
+
+    def last_seq(self, topic: str) -> int:
+        """
+        获取任务最新的事件序号
+
+        Args:
+            topic: 任务ID
+
+        Returns:
+            int: 最新序号，没有事件时为0
+        """
+        with self._condition:
+            entry = self._topics.get(topic)
+            return entry['seq'] if entry else 0
+
+    def get_since(self, topic: str, seq: int) -> Tuple[List[Tuple[int, str, Dict]], bool]:
+        """
+        获取序号之后的事件
+
+        Args:
+            topic: 任务ID
+            seq: 已收到的最后一个事件序号
+
+        Returns:
+            Tuple: (事件列表, 是否完整)；序号之后的部分事件已被淘汰时不完整，订阅方应改为发送当前状态
+        """
+        with self._condition:
+            entry = self._topics.get(topic)
+            if entry is None:
+                return [], seq == 0
+            if seq > entry['seq']:
+                # 服务重启后序号重新计数
+                return [], False
+            events = [event for event in entry['events'] if event[0] > seq]
+            complete = not events or events[0][0] == seq + 1
+            return events, complete
+
+    def wait(self, generation: int, timeout: float) -> int:
+        """
+        等待新事件
+
+        Args:
+            generation: 上次读取的发布计数
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            int: 最新的发布计数
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._generation != generation, timeout)
+            return self._generation
@@ -0,0 +1,411 @@
+"""
+持久化任务登记表
+将进程管理器中的任务记录保存到SQLite文件，服务重启后据此重新接管仍在运行的子进程、
+结算重启期间已结束的任务并重新提交排队中的任务；
+每条记录带有所有者（登记该任务的服务进程），多个服务进程共用登记表时只恢复所有者已退出的记录
+"""
+import os
+import json
+import signal
+import sqlite3
+import importlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Callable
+from flask import current_app
+from config import Config
+from app.utils import proc_stats
+from app.utils import process_group
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    process_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    priority INTEGER NOT NULL,
+    submitter TEXT,
+    cmd TEXT NOT NULL,
+    cwd TEXT,
+    env_delta TEXT,
+    log_dir TEXT,
+    result_path TEXT,
+    on_complete TEXT,
+    on_recover TEXT,
+    worker_key TEXT,
+    worker_job TEXT,
+    resource_limits TEXT,
+    pid INTEGER,
+    pid_start INTEGER,
+    submit_time TEXT,
+    start_time TEXT,
+    return_code INTEGER,
+    owner TEXT
+)
+"""
+
+
+def callable_ref(func: Optional[Callable]) -> Optional[str]:
+    """
+    获取可在重启后重新导入的函数引用
+
+    Args:
+        func: 模块级函数或类方法
+
+    Returns:
+        str: "模块:限定名"形式的引用，lambda或局部函数返回None
+    """
+    if func is None:
+        return None
+    module = getattr(func, '__module__', None)
+    qualname = getattr(func, '__qualname__', None)
+    if not module or not qualname or '<' in qualname:
+        return None
+    return f"{module}:{qualname}"
+
+
+def resolve_ref(ref: Optional[str]) -> Optional[Callable]:
+    """
+    根据引用导入函数
+
+    Args:
+        ref: callable_ref返回的引用
+
+    Returns:
+        Callable: 函数，导入失败时返回None
+    """
+    if not ref:
+        return None
+    module_name, _, qualname = ref.partition(':')
+    try:
+        target = importlib.import_module(module_name)
+        for name in qualname.split('.'):
+            target = getattr(target, name)
+        return target
+    except (ImportError, AttributeError) as e:
+        print(f"无法导入任务回调 {ref}: {str(e)}")
+        return None
+
+
+def infer_return_code(result_path: Optional[str]) -> int:
+    """
+    根据任务输出推断返回码（重启期间结束的任务无法获取真实返回码）
+
+    Args:
+        result_path: 任务输出文件或目录
+
+    Returns:
+        int: 输出文件非空或输出目录中有文件时返回0，否则返回-1
+    """
+    if not result_path:
+        return -1
+    if os.path.isfile(result_path):
+        return 0 if os.path.getsize(result_path) > 0 else -1
+    if os.path.isdir(result_path):
+        return 0 if os.listdir(result_path) else -1
+    return -1
+
+
+def get_process_start(pid: int) -> Optional[int]:
+    """
+    获取进程启动时间（开机后的时钟节拍数），用于识别PID复用
+
+    Args:
+        pid: 进程ID
+
+    Returns:
+        int: 启动时间，非Linux平台或进程不存在时返回None
+    """
+    if not proc_stats.is_supported():
+        return None
+    stat = proc_stats.read_stat(pid)
+    return stat['start'] if stat else None
+
+
+class ReattachedProcess:
+    """
+    服务重启后重新接管的子进程句柄
+    子进程已不是当前服务的子进程，无法获取真实返回码和输出；
+    进程结束后根据输出文件推断返回码。提供与subprocess.Popen一致的pid、returncode、poll、wait和terminate接口
+    """
+
+    def __init__(self, pid: int, pid_start: Optional[int], result_path: Optional[str]):
+        """
+        初始化句柄
+
+        Args:
+            pid: 进程ID
+            pid_start: 登记时的进程启动时间
+            result_path: 任务输出文件或目录
+        """
+        self.pid = pid
+        self.pid_start = pid_start
+        self.result_path = result_path
+        self.returncode = None
+        self.stdout = None
+        self.stderr = None
+
+    def poll(self) -> Optional[int]:
+        """
+        检查进程是否已结束
+
+        Returns:
+            int: 推断的返回码，进程仍在运行时返回None
+        """
+        if self.returncode is None and not process_group.is_pid_alive(self.pid, self.pid_start):
+            self.returncode = infer_return_code(self.result_path)
+        return self.returncode
+
+    def wait(self) -> int:
+        """
+        获取返回码（仅在反应器确认进程已退出后调用）
+
+        Returns:
+            int: 推断的返回码
+        """
+        if self.returncode is None:
+            self.returncode = infer_return_code(self.result_path)
+        return self.returncode
+
+    def send_signal(self, sig: int):
+        """
+        向进程发送信号
+
+        Args:
+            sig: 信号
+        """
+        if self.poll() is None:
+            os.kill(self.pid, sig)
+
+    def terminate(self):
+        """终止进程"""
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        """强制结束进程"""
+        self.send_signal(getattr(signal, 'SIGKILL', signal.SIGTERM))
+
+
+class TaskRegistry:
+    """
+    持久化任务登记表单例类
+    使用标准库sqlite3，单个连接由锁保护，可在任意线程中调用
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(TaskRegistry, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self._conn = None
+            self._conn_lock = threading.Lock()
+            self.initialized = True
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        try:
+            return current_app.config[key]
+        except RuntimeError:
+            return getattr(Config, key)
+
+    def _connect(self) -> sqlite3.Connection:
+        """
+        获取数据库连接，首次调用时打开数据库文件并建表（调用方持有连接锁）
+
+        Returns:
+            sqlite3.Connection: 连接
+        """
+        if self._conn is None:
+            path = self._get_config('TASK_REGISTRY_PATH')
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute(_SCHEMA)
+            # 兼容早期版本创建的登记表
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(tasks)')}
+            if 'submitter' not in columns:
+                self._conn.execute('ALTER TABLE tasks ADD COLUMN submitter TEXT')
+            if 'owner' not in columns:
+                self._conn.execute('ALTER TABLE tasks ADD COLUMN owner TEXT')
+        return self._conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        """
+        执行SQL
+
+        Args:
+            sql: SQL语句
+            params: 参数
+
+        Returns:
+            List[sqlite3.Row]: 查询结果
+        """
+        with self._conn_lock:
+            return self._connect().execute(sql, params).fetchall()
+
+    def _execute_update(self, sql: str, params: tuple = ()) -> int:
+        """
+        执行写操作
+
+        Args:
+            sql: SQL语句
+            params: 参数
+
+        Returns:
+            int: 影响的行数
+        """
+        with self._conn_lock:
+            return self._connect().execute(sql, params).rowcount
+
+    def _safe_execute(self, sql: str, params: tuple = ()):
+        """
+        执行写操作，登记表不可用时只打印错误，不影响任务本身
+
+        Args:
+            sql: SQL语句
+            params: 参数
+        """
+        try:
+            self._execute(sql, params)
+        except (sqlite3.Error, OSError) as e:
+            print(f"写入任务登记表失败: {str(e)}")
+
+    def add(self, process_id: str, process_info: Dict):
+        """
+        登记新提交的任务
+
+        Args:
+            process_id: 进程ID
+            process_info: 进程管理器中的进程信息
+        """
+        env = process_info['env'] or {}
+        # 只保存与服务进程环境变量不同的部分
+        env_delta = {key: value for key, value in env.items() if os.environ.get(key) != value}
+        self._safe_execute(
+            'INSERT OR REPLACE INTO tasks (process_id, status, priority, submitter, cmd, cwd, env_delta, log_dir, '
+            'result_path, on_complete, on_recover, worker_key, worker_job, resource_limits, submit_time, owner) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (process_id, process_info['status'], process_info['priority'], process_info['submitter'],
+             json.dumps(process_info['cmd']),
+             process_info['cwd'], json.dumps(env_delta), process_info.get('log_dir'), process_info.get('result_path'),
+             callable_ref(process_info['on_complete']), callable_ref(process_info.get('on_recover')),
+             process_info['worker_key'], json.dumps(process_info['worker_job']),
+             json.dumps(process_info['resource_limits']), process_info['submit_time'].isoformat(),
+             process_group.owner_id())
+        )
+
+    def mark_running(self, process_id: str, pid: Optional[int], start_time: datetime):
+        """
+        记录任务已启动
+
+        Args:
+            process_id: 进程ID
+            pid: 子进程（或常驻工作进程）PID
+            start_time: 启动时间
+        """
+        pid_start = get_process_start(pid) if pid is not None else None
+        self._safe_execute(
+            "UPDATE tasks SET status = 'running', pid = ?, pid_start = ?, start_time = ? WHERE process_id = ?",
+            (pid, pid_start, start_time.isoformat(), process_id)
+        )
+
+    def mark_finished(self, process_id: str, status: str, return_code: int):
+        """
+        记录任务已结束、等待执行完成回调
+
+        Args:
+            process_id: 进程ID
+            status: 结束状态
+            return_code: 返回码
+        """
+        self._safe_execute(
+            'UPDATE tasks SET status = ?, return_code = ? WHERE process_id = ?',
+            (status, return_code, process_id)
+        )
+
+    def remove(self, process_id: str):
+        """
+        删除任务记录（完成回调执行完毕或排队任务被停止后）
+
+        Args:
+            process_id: 进程ID
+        """
+        self._safe_execute('DELETE FROM tasks WHERE process_id = ?', (process_id,))
+
+    def claim(self, process_id: str, previous_owner: Optional[str]) -> bool:
+        """
+        将记录的所有者改为当前服务进程；只有所有者仍为previous_owner时才成功，
+        多个服务进程同时恢复同一条记录时只有一个成功
+
+        Args:
+            process_id: 进程ID
+            previous_owner: 读取记录时的所有者（早期版本的记录为None）
+
+        Returns:
+            bool: 是否成功接管
+        """
+        try:
+            return self._execute_update('UPDATE tasks SET owner = ? WHERE process_id = ? AND owner IS ?',
+                                        (process_group.owner_id(), process_id, previous_owner)) == 1
+        except (sqlite3.Error, OSError) as e:
+            print(f"接管任务记录失败: {str(e)}")
+            return False
+
+    def is_adopted(self, process_id: str) -> bool:
+        """
+        任务是否登记在仍在运行的服务进程名下（所有者已退出的残留进程被其他服务进程接管后不应清理）
+
+        Args:
+            process_id: 进程ID
+
+        Returns:
+            bool: 记录存在且所有者仍在运行时返回True
+        """
+        try:
+            rows = self._execute('SELECT owner FROM tasks WHERE process_id = ?', (process_id,))
+        except (sqlite3.Error, OSError):
+            # 登记表不可用时无法判断，按已接管处理，不清理
+            return True
+        return bool(rows) and rows[0]['owner'] is not None and process_group.is_owner_alive(rows[0]['owner'])
+
+    def load_orphaned(self) -> List[Dict]:
+        """
+        读取所有者已退出的任务记录（不含当前服务进程登记的记录），按提交时间排序
+
+        Returns:
+            List[Dict]: 任务记录，JSON字段已解析、环境变量已与当前服务进程的环境合并；
+                owner为读取时的所有者，接管前需调用claim
+        """
+        try:
+            rows = self._execute('SELECT * FROM tasks ORDER BY submit_time')
+        except (sqlite3.Error, OSError) as e:
+            print(f"读取任务登记表失败: {str(e)}")
+            return []
+
+        own_owner = process_group.owner_id()
+        records = []
+        for row in rows:
+            record = dict(row)
+            owner = record['owner']
+            if owner == own_owner or (owner is not None and process_group.is_owner_alive(owner)):
+                continue
+            env = os.environ.copy()
+            env.update(json.loads(record.pop('env_delta') or '{}'))
+            record['env'] = env
+            for key in ('cmd', 'worker_job', 'resource_limits'):
+                record[key] = json.loads(record[key]) if record[key] else None
+            records.append(record)
+        return records
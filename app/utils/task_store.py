@@ -0,0 +1,577 @@
+"""
+在线推演任务状态存储
+以single_point_prediction_tasks / situation_prediction_tasks / small_scale_prediction_tasks三张表为持久化存储，
+内存中缓存任务状态：状态读取直接使用内存中的副本，写入先更新内存再由后台线程逐个写入数据库（write-behind），
+缓存超过上限时按最近访问顺序淘汰已结束且已写入数据库的任务；
+其他服务进程通过数据库向任务所在的服务进程转发停止请求，由后台线程领取
+"""
+import json
+import time
+import atexit
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from flask import current_app, has_app_context
+from config import Config
+from app import db
+from app.model.online_prediction_tasks import SinglePointPredictionTask, SituationPredictionTask, SmallScalePredictionTask
+
+# 预测模式 -> 持久化任务表
+_MODE_TABLES = {
+    'point': SinglePointPredictionTask,
+    'link': SinglePointPredictionTask,
+    'situation': SituationPredictionTask,
+    'small_scale': SmallScalePredictionTask
+}
+# 按预测模式找不到表时依次查找的表
+_TABLES = (SinglePointPredictionTask, SituationPredictionTask, SmallScalePredictionTask)
+
+# 已结束的任务状态，状态不再变化，可以被淘汰，从数据库加载后也无需刷新
+FINISHED_STATUSES = ('COMPLETED', 'ABORTED')
+
+# 连续写入失败达到该次数的任务不再重试（如模型已被删除，外键约束始终失败），避免反复回滚
+_MAX_WRITE_FAILURES = 5
+
+
+def _serialize(task_info: Dict[str, Any]) -> str:
+    """
+    将任务状态序列化为JSON，同时作为判断内容是否变化的指纹
+
+    Args:
+        task_info: 任务状态
+
+    Returns:
+        str: JSON字符串
+    """
+    # dict.copy不会被其他线程的修改打断
+    return json.dumps(task_info.copy(), ensure_ascii=False, sort_keys=True, default=str)
+
+
+class TaskStateStore:
+    """
+    任务状态存储单例类
+    提供与字典相同的读写方式（in、[]、get），任务状态在内存中修改后无需显式保存：
+    后台线程定期检查本进程写入过的未结束任务，内容变化时写入数据库。
+    其他服务进程（多个WSGI工作进程）创建的任务在本进程首次读取时从数据库加载，
+    未结束的任务每隔TASK_STORE_REFRESH_SECONDS重新加载；
+    其他服务进程通过request_stop写入的停止请求由后台线程领取，交给set_hooks注册的函数处理
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(TaskStateStore, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            # 任务UUID -> {'info': 任务状态, 'local': 是否由本进程写入, 'loaded_at': 从数据库加载的时间,
+            #              'flushed': 最近一次写入数据库的内容指纹}，按最近访问排序
+            self._entries: 'OrderedDict[str, Dict]' = OrderedDict()
+            # 待写入数据库的任务：显式写入的任务和本进程写入过的未结束任务（可能被原地修改）
+            self._pending = set()
+            self._entries_lock = threading.RLock()
+            self._app = None
+            self._flusher = None
+            self._stats = {'loads': 0, 'writes': 0, 'write_errors': 0, 'dropped': 0, 'evictions': 0,
+                           'stop_requests': 0}
+            # 后台线程每次写入前对本进程的未结束任务调用的函数，以及处理停止请求的函数
+            self._on_tick: Optional[Callable[[str, Dict[str, Any]], None]] = None
+            self._on_stop_request: Optional[Callable[[str], None]] = None
+            atexit.register(self._flush_at_exit)
+            self.initialized = True
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        try:
+            return current_app.config[key]
+        except RuntimeError:
+            return getattr(Config, key)
+
+    # ------------------------------------------------------------------
+    # 字典接口
+    # ------------------------------------------------------------------
+
+    def __contains__(self, task_uuid: str) -> bool:
+        return self.get(task_uuid) is not None
+
+    def __getitem__(self, task_uuid: str) -> Dict[str, Any]:
+        task_info = self.get(task_uuid)
+        if task_info is None:
+            raise KeyError(task_uuid)
+        return task_info
+
+    def __setitem__(self, task_uuid: str, task_info: Dict[str, Any]):
+        self._put(task_uuid, task_info, pending=True)
+
+    def _put(self, task_uuid: str, task_info: Dict[str, Any], pending: bool):
+        """
+        写入内存中的任务状态
+
+        Args:
+            task_uuid: 任务UUID
+            task_info: 任务状态
+            pending: 是否加入待写入集合
+        """
+        self._capture_app()
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            if entry is None:
+                entry = {'flushed': None}
+                self._entries[task_uuid] = entry
+            entry.update({'info': task_info, 'local': True, 'loaded_at': None})
+            self._entries.move_to_end(task_uuid)
+            if pending:
+                self._pending.add(task_uuid)
+            self._evict()
+        self._ensure_flusher()
+
+    def get(self, task_uuid: str, default: Any = None, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        获取任务状态，内存中没有时从数据库加载
+
+        Args:
+            task_uuid: 任务UUID
+            default: 任务不存在时的返回值
+            refresh: 其他进程写入的任务是否忽略缓存有效期，立即从数据库重新加载
+
+        Returns:
+            Dict: 任务状态（内存中的对象，修改后由后台线程写入数据库）
+        """
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            if entry is not None:
+                self._entries.move_to_end(task_uuid)
+                if entry['local'] or not (refresh or self._is_stale(entry)):
+                    return entry['info']
+
+        task_info = self._load(task_uuid)
+        if task_info is None:
+            return entry['info'] if entry is not None else default
+
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            # 加载期间本进程写入了该任务时以内存中的状态为准
+            if entry is not None and entry['local']:
+                return entry['info']
+            self._entries[task_uuid] = {'info': task_info, 'local': False, 'loaded_at': time.time(),
+                                        'flushed': _serialize(task_info)}
+            self._entries.move_to_end(task_uuid)
+            self._evict()
+            return task_info
+
+    def is_local(self, task_uuid: str) -> bool:
+        """
+        判断任务状态是否由本进程写入（不访问数据库）
+
+        Args:
+            task_uuid: 任务UUID
+
+        Returns:
+            bool: 是否为本进程写入的任务
+        """
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            return entry is not None and entry['local']
+
+    def create(self, task_uuid: str, task_info: Dict[str, Any], point_config: Optional[Dict] = None,
+               param_config: Optional[Dict] = None):
+        """
+        创建任务并立即写入数据库，其他服务进程随后即可查询到该任务
+
+        Args:
+            task_uuid: 任务UUID
+            task_info: 任务状态
+            point_config: 点位配置（请求中的原始配置，不含典型场景展开后的位置列表）
+            param_config: 参数配置
+        """
+        # 同步写入完成前不交给后台线程，避免重复插入
+        self._put(task_uuid, task_info, pending=False)
+        if not has_app_context():
+            self._settle(task_uuid, task_info)
+            return
+        try:
+            row = self._write_row(task_uuid, task_info)
+            row.point_config = point_config or {}
+            row.param_config = param_config or {}
+            db.session.commit()
+            self._mark_flushed(task_uuid, task_info)
+        except Exception as e:
+            db.session.rollback()
+            self._stats['write_errors'] += 1
+            current_app.logger.error(f"写入任务 {task_uuid} 失败，稍后重试: {str(e)}")
+            self._settle(task_uuid, task_info)
+
+    def request_stop(self, task_uuid: str) -> bool:
+        """
+        记录停止请求，由任务所在的服务进程的后台线程领取（需在应用上下文中调用）
+
+        Args:
+            task_uuid: 任务UUID
+
+        Returns:
+            bool: 任务记录存在时返回True
+        """
+        task_info = self.get(task_uuid) or {}
+        table = _MODE_TABLES.get(task_info.get('prediction_mode'))
+        try:
+            for table in ((table,) if table else _TABLES):
+                updated = table.query.filter_by(task_uuid=task_uuid).update(
+                    {'stop_requested_at': datetime.utcnow()}, synchronize_session=False)
+                if updated:
+                    db.session.commit()
+                    return True
+            db.session.rollback()
+        except Exception:
+            db.session.rollback()
+            raise
+        return False
+
+    def set_hooks(self, on_tick: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                  on_stop_request: Optional[Callable[[str], None]] = None):
+        """
+        注册后台线程调用的函数（在应用上下文中调用，调用后写入变化）
+
+        Args:
+            on_tick: 每次写入前对本进程的每个未结束任务调用，参数为任务UUID和任务状态，可原地修改任务状态
+            on_stop_request: 领取到其他服务进程转发的停止请求时调用，参数为任务UUID
+        """
+        self._on_tick = on_tick
+        self._on_stop_request = on_stop_request
+
+    def _local_unfinished(self) -> List[tuple]:
+        """
+        获取本进程写入的未结束任务
+
+        Returns:
+            List[tuple]: (任务UUID, 任务状态)列表
+        """
+        with self._entries_lock:
+            return [(task_uuid, entry['info']) for task_uuid, entry in self._entries.items()
+                    if entry['local'] and entry['info'].get('status') not in FINISHED_STATUSES]
+
+    def _take_stop_requests(self, tasks: List[tuple]) -> List[str]:
+        """
+        领取本进程未结束任务的停止请求：读取后清除请求时间
+
+        Args:
+            tasks: _local_unfinished的返回值
+
+        Returns:
+            List[str]: 有停止请求的任务UUID列表
+        """
+        by_table = {}
+        for task_uuid, task_info in tasks:
+            table = _MODE_TABLES.get(task_info.get('prediction_mode'), SinglePointPredictionTask)
+            by_table.setdefault(table, []).append(task_uuid)
+        requested = []
+        try:
+            for table, task_uuids in by_table.items():
+                rows = table.query.with_entities(table.task_uuid).filter(
+                    table.task_uuid.in_(task_uuids), table.stop_requested_at.isnot(None)).all()
+                if not rows:
+                    continue
+                uuids = [row.task_uuid for row in rows]
+                table.query.filter(table.task_uuid.in_(uuids)).update(
+                    {'stop_requested_at': None}, synchronize_session=False)
+                requested.extend(uuids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._stats['stop_requests'] += len(requested)
+        return requested
+
+    def _run_hooks(self):
+        """
+        处理停止请求并调用on_tick（后台线程在应用上下文中调用）
+        """
+        tasks = self._local_unfinished()
+        if not tasks:
+            return
+        if self._on_stop_request is not None:
+            for task_uuid in self._take_stop_requests(tasks):
+                try:
+                    self._on_stop_request(task_uuid)
+                except Exception as e:
+                    print(f"处理任务 {task_uuid} 的停止请求时发生错误: {str(e)}")
+        if self._on_tick is not None:
+            for task_uuid, task_info in tasks:
+                try:
+                    self._on_tick(task_uuid, task_info)
+                except Exception as e:
+                    print(f"更新任务 {task_uuid} 的状态时发生错误: {str(e)}")
+
+    # ------------------------------------------------------------------
+    # 持久化
+    # ------------------------------------------------------------------
+
+    def flush(self) -> int:
+        """
+        将内容有变化的任务状态写入数据库，每个任务单独提交，一个任务写入失败不影响其他任务
+
+        Returns:
+            int: 写入的任务数
+        """
+        with self._entries_lock:
+            candidates = [(task_uuid, self._entries[task_uuid]['info'])
+                          for task_uuid in list(self._pending) if task_uuid in self._entries]
+            self._pending.intersection_update(self._entries)
+
+        written = 0
+        for task_uuid, task_info in candidates:
+            fingerprint = _serialize(task_info)
+            with self._entries_lock:
+                entry = self._entries.get(task_uuid)
+                unchanged = entry is not None and entry['flushed'] == fingerprint
+            if unchanged:
+                self._settle(task_uuid, task_info)
+                continue
+            try:
+                self._write_row(task_uuid, task_info, fingerprint)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                # 缺少必要字段的任务重试也不会成功，直接放弃
+                self._record_write_failure(task_uuid, e, permanent=isinstance(e, ValueError))
+                continue
+            self._mark_flushed(task_uuid, task_info, fingerprint)
+            written += 1
+        self._stats['writes'] += written
+        return written
+
+    def _record_write_failure(self, task_uuid: str, error: Exception, permanent: bool = False):
+        """
+        记录写入失败：任务仍在待写入集合中，下次重试；连续失败达到_MAX_WRITE_FAILURES次后不再重试
+
+        Args:
+            task_uuid: 任务UUID
+            error: 写入时的异常
+            permanent: 是否为重试也不会成功的错误，为True时立即放弃
+        """
+        self._stats['write_errors'] += 1
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            if entry is None:
+                return
+            entry['failures'] = _MAX_WRITE_FAILURES if permanent else entry.get('failures', 0) + 1
+            if entry['failures'] < _MAX_WRITE_FAILURES:
+                print(f"写入任务 {task_uuid} 失败（第{entry['failures']}次），稍后重试: {str(error)}")
+                return
+            # 内存中的状态保留，本进程仍可查询；之后显式写入（store[task_uuid] = ...）时重新尝试
+            self._pending.discard(task_uuid)
+            entry['failures'] = 0
+            self._stats['dropped'] += 1
+        print(f"写入任务 {task_uuid} 失败，不再重试: {str(error)}")
+
+    def _write_row(self, task_uuid: str, task_info: Dict[str, Any], fingerprint: Optional[str] = None):
+        """
+        将任务状态写入对应预测模式的任务表（不提交事务）
+
+        Args:
+            task_uuid: 任务UUID
+            task_info: 任务状态
+            fingerprint: 序列化后的任务状态，为None时重新序列化
+
+        Returns:
+            任务表记录
+        """
+        table = _MODE_TABLES.get(task_info.get('prediction_mode'), SinglePointPredictionTask)
+        row = db.session.get(table, task_uuid)
+        if row is None:
+            # model_uuid为非空外键，不写入占位值
+            if not task_info.get('model_uuid'):
+                raise ValueError(f"任务 {task_uuid} 缺少model_uuid，无法写入任务表")
+            row = table(task_uuid=task_uuid, model_uuid=task_info['model_uuid'],
+                        point_config={}, param_config={})
+            db.session.add(row)
+        row.status = task_info.get('status')
+        row.task_state = json.loads(fingerprint or _serialize(task_info))
+        if table is SinglePointPredictionTask:
+            row.prediction_mode = task_info.get('prediction_mode') or 'point'
+            if task_info.get('result_rows') is not None:
+                row.completed_samples = task_info['result_rows']
+        elif table is SituationPredictionTask:
+            row.result_values_storage_path = task_info.get('output_csv_path')
+            if task_info.get('status') == 'COMPLETED':
+                row.result_url = f"/api/v1/online_deduction/tasks/{task_uuid}/result/download"
+        return row
+
+    def _mark_flushed(self, task_uuid: str, task_info: Dict[str, Any], fingerprint: Optional[str] = None):
+        """
+        记录已写入数据库的内容
+
+        Args:
+            task_uuid: 任务UUID
+            task_info: 写入的任务状态
+            fingerprint: 写入的内容指纹
+        """
+        with self._entries_lock:
+            entry = self._entries.get(task_uuid)
+            if entry is None or entry['info'] is not task_info:
+                return
+            entry['flushed'] = fingerprint or _serialize(task_info)
+            entry['failures'] = 0
+        self._settle(task_uuid, task_info)
+
+    def _settle(self, task_uuid: str, task_info: Dict[str, Any]):
+        """
+        已写入数据库的任务结束后不再检查变化，未结束的任务继续检查（可能被原地修改）
+
+        Args:
+            task_uuid: 任务UUID
+            task_info: 任务状态
+        """
+        with self._entries_lock:
+            if task_info.get('status') in FINISHED_STATUSES:
+                entry = self._entries.get(task_uuid)
+                if entry is not None and entry['flushed'] == _serialize(task_info):
+                    self._pending.discard(task_uuid)
+            else:
+                self._pending.add(task_uuid)
+
+    def _load(self, task_uuid: str) -> Optional[Dict[str, Any]]:
+        """
+        从数据库加载任务状态
+
+        Args:
+            task_uuid: 任务UUID
+
+        Returns:
+            Dict: 任务状态，任务不存在或没有应用上下文时返回None
+        """
+        if not has_app_context():
+            if self._app is None:
+                return None
+            with self._app.app_context():
+                return self._load(task_uuid)
+        try:
+            for table in _TABLES:
+                row = db.session.get(table, task_uuid, populate_existing=True)
+                if row is None:
+                    continue
+                self._stats['loads'] += 1
+                task_info = dict(row.task_state or {})
+                task_info.setdefault('task_uuid', task_uuid)
+                task_info.setdefault('model_uuid', row.model_uuid)
+                task_info.setdefault('created_at', row.created_at.isoformat() if row.created_at else None)
+                task_info['status'] = row.status
+                return task_info
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.error(f"加载任务 {task_uuid} 失败: {str(e)}")
+        return None
+
+    def _is_stale(self, entry: Dict) -> bool:
+        """
+        判断其他进程写入的未结束任务是否需要重新加载
+
+        Args:
+            entry: 缓存条目
+
+        Returns:
+            bool: 是否需要重新加载
+        """
+        if entry['local'] or entry['info'].get('status') in FINISHED_STATUSES:
+            return False
+        return time.time() - entry['loaded_at'] >= self._get_config('TASK_STORE_REFRESH_SECONDS')
+
+    def _evict(self):
+        """
+        缓存超过上限时淘汰最久未访问的已结束且已写入数据库的任务（调用方持有锁）
+        """
+        excess = len(self._entries) - self._get_config('TASK_STORE_MAX_CACHED')
+        if excess <= 0:
+            return
+        for task_uuid in list(self._entries):
+            if excess <= 0:
+                break
+            entry = self._entries[task_uuid]
+            if task_uuid in self._pending or entry['info'].get('status') not in FINISHED_STATUSES:
+                continue
+            del self._entries[task_uuid]
+            self._stats['evictions'] += 1
+            excess -= 1
+
+    # ------------------------------------------------------------------
+    # 后台写入
+    # ------------------------------------------------------------------
+
+    def _capture_app(self):
+        """
+        记录应用实例，供后台线程建立应用上下文
+        """
+        if self._app is None and has_app_context():
+            self._app = current_app._get_current_object()
+
+    def _ensure_flusher(self):
+        """
+        启动后台写入线程（每个服务进程一个）
+        """
+        if self._app is None:
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='task-store-flusher', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        """
+        定期处理停止请求并将任务状态写入数据库
+        """
+        while True:
+            time.sleep(self._app.config.get('TASK_STORE_FLUSH_INTERVAL', Config.TASK_STORE_FLUSH_INTERVAL))
+            with self._app.app_context():
+                try:
+                    self._run_hooks()
+                except Exception as e:
+                    print(f"处理停止请求时发生错误: {str(e)}")
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"写入任务状态时发生错误: {str(e)}")
+                finally:
+                    db.session.remove()
+
+    def _flush_at_exit(self):
+        """
+        服务进程退出前写入剩余的任务状态
+        """
+        if self._app is None:
+            return
+        try:
+            with self._app.app_context():
+                self.flush()
+                db.session.remove()
+        except Exception as e:
+            print(f"退出前写入任务状态失败: {str(e)}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取存储统计
+
+        Returns:
+            Dict: 缓存任务数、本进程写入的任务数、待写入数以及加载、写入、放弃写入、淘汰和停止请求次数
+        """
+        with self._entries_lock:
+            stats = {
+                'cached': len(self._entries),
+                'local': sum(1 for entry in self._entries.values() if entry['local']),
+                'pending': len(self._pending),
+                'max_cached': self._get_config('TASK_STORE_MAX_CACHED')
+            }
+        stats.update(self._stats)
+        return stats
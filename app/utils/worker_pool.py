@@ -0,0 +1,439 @@
+"""
+常驻模型工作进程池
+为实现了工作进程协议的模型保留若干个常驻的Python解释器，
+任务通过stdin/stdout管道下发，避免每次运行都重新启动解释器、导入依赖和加载权重
+"""
+import os
+import json
+import time
+import itertools
+import subprocess
+import threading
+from functools import partial
+from typing import Dict, Optional, Callable
+from flask import current_app
+from config import Config
+from app.utils.process_reactor import ProcessReactor
+from app.utils import resource_profile
+from app.utils import process_group
+
+# 工作进程协议消息前缀，stdout中以该前缀开头的行为协议消息，其余行为普通输出
+WORKER_MESSAGE_PREFIX = '@@bjust-worker '
+# 清理空闲工作进程的检查间隔（秒）
+_SWEEP_INTERVAL = 5
+
+
+class WarmWorkerJob:
+    """
+    在常驻工作进程上执行的任务句柄
+    提供与subprocess.Popen一致的pid、returncode、poll和terminate接口，供进程管理器统一处理
+    """
+
+    def __init__(self, job_id: str, payload: Dict, on_output: Callable[[str, str], None],
+                 on_exit: Callable[[int], None], on_unavailable: Callable[[], None]):
+        """
+        初始化任务句柄
+
+        Args:
+            job_id: 任务ID
+            payload: 下发给工作进程的任务内容
+            on_output: 任务输出回调，参数为('stdout'或'stderr', 行内容)
+            on_exit: 任务结束回调，参数为返回码
+            on_unavailable: 工作进程在就绪前退出时的回调，调用方应改用冷启动方式运行
+        """
+        self.job_id = job_id
+        self.payload = payload
+        self.on_output = on_output
+        self.on_exit = on_exit
+        self.on_unavailable = on_unavailable
+        self.returncode = None
+        self.cancelled = False
+        self.worker = None
+
+    @property
+    def pid(self) -> Optional[int]:
+        """工作进程的PID"""
+        return self.worker['process'].pid if self.worker else None
+
+    def poll(self) -> Optional[int]:
+        """
+        获取任务返回码
+
+        Returns:
+            int: 任务返回码，任务未结束时返回None
+        """
+        return self.returncode
+
+    def terminate(self, grace_seconds: Optional[float] = None, on_finished: Optional[Callable[[bool], None]] = None):
+        """
+        取消任务
+        协议不支持中断正在执行的任务，因此结束所在的工作进程及其进程组
+
+        Args:
+            grace_seconds: SIGTERM后等待的宽限期（秒），为None时使用配置值
+            on_finished: 进程组结束后的回调，参数为是否发送了SIGKILL
+        """
+        self.cancelled = True
+        if self.worker:
+            WarmWorkerPool().kill_worker(self.worker, grace_seconds, on_finished)
+
+
+class WarmWorkerPool:
+    """
+    常驻工作进程池单例类
+    按模型（model_uuid）分组管理工作进程；空闲进程超过TTL后回收，
+    总数达到上限时淘汰最久未使用的空闲进程
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(WarmWorkerPool, cls).__new__(cls)
+            return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'initialized'):
+            self._workers: Dict[str, Dict] = {}
+            self._ids = itertools.count()
+            self._state_lock = threading.RLock()
+            # 工作进程未能就绪的模型，之后一律冷启动
+            self._unsupported = set()
+            self._reactor = ProcessReactor()
+            self._sweeper = None
+            self.initialized = True
+
+    @staticmethod
+    def _get_config(key: str):
+        """
+        读取配置项，在没有应用上下文的后台线程中回退到Config类
+
+        Args:
+            key: 配置项名称
+
+        Returns:
+            配置值
+        """
+        try:
+            return current_app.config[key]
+        except RuntimeError:
+            return getattr(Config, key)
+
+    def get_worker_script(self, cwd: str) -> Optional[str]:
+        """
+        获取模型代码目录中的工作进程入口脚本
+
+        Args:
+            cwd: 模型代码目录
+
+        Returns:
+            str: 入口脚本路径，模型未实现工作进程协议时返回None
+        """
+        script = os.path.join(cwd, self._get_config('WARM_WORKER_SCRIPT'))
+        return script if os.path.isfile(script) else None
+
+    def submit(self, key: str, python_exe: str, cwd: str, env: dict, job_id: str, payload: Dict,
+               on_output: Callable[[str, str], None], on_exit: Callable[[int], None],
+               on_unavailable: Callable[[], None],
+               resource_limits: Optional[Dict] = None) -> Optional[WarmWorkerJob]:
+        """
+        将任务交给常驻工作进程执行
+
+        Args:
+            key: 工作进程分组键（model_uuid）
+            python_exe: Python解释器路径
+            cwd: 模型代码目录
+            env: 环境变量
+            job_id: 任务ID
+            payload: 任务内容
+            on_output: 任务输出回调
+            on_exit: 任务结束回调
+            on_unavailable: 工作进程未能就绪时的回调
+            resource_limits: 模型资源配置，新启动的工作进程按其内存上限和nice值运行；
+                CPU核心由调用方在每个任务开始时绑定
+
+        Returns:
+            WarmWorkerJob: 任务句柄；模型未实现协议或没有可用的工作进程时返回None，
+                调用方应改用冷启动方式运行
+        """
+        if not self._get_config('WARM_WORKER_ENABLED') or key in self._unsupported:
+            return None
+        script = self.get_worker_script(cwd)
+        if not script:
+            return None
+
+        with self._state_lock:
+            worker = self._find_idle_worker(key)
+            if worker is None:
+                worker = self._spawn_worker(key, python_exe, script, cwd, env, resource_limits or {})
+                if worker is None:
+                    return None
+
+            job = WarmWorkerJob(job_id, payload, on_output, on_exit, on_unavailable)
+            job.worker = worker
+            worker['job'] = job
+            worker['last_used'] = time.time()
+            if worker['state'] == 'idle':
+                self._send_job(worker)
+            # 启动中的工作进程在发出ready消息后再下发任务
+            return job
+
+    def _find_idle_worker(self, key: str) -> Optional[Dict]:
+        """
+        查找指定模型最近使用过的空闲工作进程
+
+        Args:
+            key: 工作进程分组键
+
+        Returns:
+            Dict: 工作进程信息，没有则返回None
+        """
+        idle = [w for w in self._workers.values() if w['key'] == key and w['state'] == 'idle' and not w['job']]
+        if not idle:
+            return None
+        return max(idle, key=lambda w: w['last_used'])
+
+    def _spawn_worker(self, key: str, python_exe: str, script: str, cwd: str, env: dict,
+                      resource_limits: Dict) -> Optional[Dict]:
+        """
+        启动一个新的工作进程，必要时淘汰最久未使用的空闲进程腾出名额
+
+        Args:
+            key: 工作进程分组键
+            python_exe: Python解释器路径
+            script: 工作进程入口脚本
+            cwd: 模型代码目录
+            env: 环境变量
+            resource_limits: 模型资源配置
+
+        Returns:
+            Dict: 工作进程信息，名额已满时返回None
+        """
+        per_model = sum(1 for w in self._workers.values() if w['key'] == key)
+        if per_model >= self._get_config('WARM_WORKERS_PER_MODEL'):
+            return None
+
+        if len(self._workers) >= self._get_config('WARM_WORKER_MAX_TOTAL'):
+            idle = [w for w in self._workers.values() if w['state'] == 'idle' and not w['job']]
+            if not idle:
+                return None
+            self.kill_worker(min(idle, key=lambda w: w['last_used']))
+
+        worker_id = f"warm-{key}-{next(self._ids)}"
+        cgroup = resource_profile.setup_cgroup(worker_id, resource_limits.get('memory_limit_mb', 0))
+        worker_env = dict(env)
+        worker_env['BJUST_WARM_WORKER'] = '1'
+        process_group.tag_env(worker_env, worker_id)
+        try:
+            process = subprocess.Popen(
+                [python_exe, script],
+                cwd=cwd,
+                env=worker_env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                preexec_fn=resource_profile.build_preexec_fn(resource_limits, [], cgroup),
+                **process_group.popen_kwargs()
+            )
+        except Exception as e:
+            print(f"启动常驻工作进程失败: {str(e)}")
+            resource_profile.remove_cgroup(cgroup)
+            self._unsupported.add(key)
+            return None
+
+        worker = {
+            'worker_id': worker_id,
+            'key': key,
+            'process': process,
+            'cgroup': cgroup,
+            'state': 'starting',
+            'job': None,
+            'ready': False,
+            'jobs_done': 0,
+            'started_at': time.time(),
+            'last_used': time.time()
+        }
+        self._workers[worker_id] = worker
+        self._reactor.watch(worker_id, process,
+                            partial(self._on_output, worker),
+                            partial(self._on_exit, worker))
+        self._ensure_sweeper()
+        return worker
+
+    def _send_job(self, worker: Dict):
+        """
+        通过stdin向工作进程下发当前任务
+
+        Args:
+            worker: 工作进程信息
+        """
+        job = worker['job']
+        message = dict(job.payload, job_id=job.job_id)
+        # 先切换状态，工作进程的输出可能在写入返回前就被反应器读到
+        worker['state'] = 'busy'
+        try:
+            worker['process'].stdin.write((json.dumps(message, ensure_ascii=False) + '\n').encode('utf-8'))
+            worker['process'].stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            print(f"向常驻工作进程下发任务失败: {str(e)}")
+            # 进程退出回调中处理该任务
+            self.kill_worker(worker)
+
+    def _on_output(self, worker: Dict, worker_id: str, stream: str, line: str):
+        """
+        反应器读到工作进程输出时的回调
+
+        Args:
+            worker: 工作进程信息
+            worker_id: 工作进程ID
+            stream: 'stdout'或'stderr'
+            line: 行内容
+        """
+        if stream == 'stdout' and line.startswith(WORKER_MESSAGE_PREFIX):
+            try:
+                message = json.loads(line[len(WORKER_MESSAGE_PREFIX):])
+            except ValueError:
+                print(f"无法解析常驻工作进程消息: {line}")
+                return
+            self._handle_message(worker, message)
+            return
+
+        job = worker['job']
+        if job is not None and worker['state'] == 'busy':
+            job.on_output(stream, line)
+
+    def _handle_message(self, worker: Dict, message: Dict):
+        """
+        处理工作进程的协议消息
+
+        Args:
+            worker: 工作进程信息
+            message: 协议消息
+        """
+        event = message.get('event')
+        with self._state_lock:
+            if event == 'ready':
+                worker['ready'] = True
+                worker['state'] = 'idle'
+                if worker['job'] is not None:
+                    self._send_job(worker)
+                return
+
+            if event != 'done':
+                return
+            job = worker['job']
+            if job is None or message.get('job_id') != job.job_id:
+                return
+            worker['job'] = None
+            worker['state'] = 'idle'
+            worker['jobs_done'] += 1
+            worker['last_used'] = time.time()
+
+        job.returncode = int(message.get('return_code', 1))
+        job.on_exit(job.returncode)
+
+    def _on_exit(self, worker: Dict, worker_id: str, return_code: int):
+        """
+        工作进程退出时的回调
+
+        Args:
+            worker: 工作进程信息
+            worker_id: 工作进程ID
+            return_code: 工作进程返回码
+        """
+        with self._state_lock:
+            self._workers.pop(worker_id, None)
+            worker['state'] = 'exited'
+            try:
+                worker['process'].stdin.close()
+            except OSError:
+                pass
+            job, worker['job'] = worker['job'], None
+            if not worker['ready'] and not worker.get('evicted'):
+                # 未能进入就绪状态，视为模型未正确实现协议
+                self._unsupported.add(worker['key'])
+        resource_profile.remove_cgroup(worker['cgroup'])
+
+        if job is None:
+            return
+        if not worker['ready'] and not job.cancelled:
+            job.worker = None
+            job.on_unavailable()
+            return
+        job.returncode = return_code if return_code != 0 else -1
+        job.on_exit(job.returncode)
+
+    def kill_worker(self, worker: Dict, grace_seconds: Optional[float] = None,
+                    on_finished: Optional[Callable[[bool], None]] = None):
+        """
+        结束一个工作进程及其进程组
+
+        Args:
+            worker: 工作进程信息
+            grace_seconds: SIGTERM后等待的宽限期（秒），为None时使用配置值
+            on_finished: 进程组结束后的回调，参数为是否发送了SIGKILL
+        """
+        worker['evicted'] = True
+        if grace_seconds is None:
+            grace_seconds = self._get_config('PROCESS_STOP_GRACE_SECONDS')
+        try:
+            process_group.terminate_group(worker['process'], grace_seconds, on_finished)
+        except Exception as e:
+            print(f"结束常驻工作进程失败: {str(e)}")
+
+    def is_worker_alive(self, worker_id: str) -> bool:
+        """
+        工作进程是否仍在池中
+
+        Args:
+            worker_id: 工作进程ID
+
+        Returns:
+            bool: 在池中时返回True
+        """
+        with self._state_lock:
+            return worker_id in self._workers
+
+    def _ensure_sweeper(self):
+        """
+        启动回收空闲工作进程的后台线程
+        """
+        if self._sweeper is not None:
+            return
+        self._sweeper = threading.Thread(target=self._sweep_loop, name='warm-worker-sweeper', daemon=True)
+        self._sweeper.start()
+
+    def _sweep_loop(self):
+        """
+        定期结束空闲时间超过TTL的工作进程
+        """
+        while True:
+            time.sleep(_SWEEP_INTERVAL)
+            ttl = self._get_config('WARM_WORKER_IDLE_TTL')
+            now = time.time()
+            with self._state_lock:
+                expired = [w for w in self._workers.values()
+                           if w['state'] == 'idle' and not w['job'] and now - w['last_used'] > ttl]
+            for worker in expired:
+                self.kill_worker(worker)
+
+    def get_workers(self) -> list:
+        """
+        获取所有工作进程的状态
+
+        Returns:
+            list: 工作进程状态列表
+        """
+        now = time.time()
+        with self._state_lock:
+            return [{
+                'worker_id': w['worker_id'],
+                'model_uuid': w['key'],
+                'pid': w['process'].pid,
+                'state': w['state'],
+                'job_id': w['job'].job_id if w['job'] else None,
+                'jobs_done': w['jobs_done'],
+                'uptime_seconds': round(now - w['started_at'], 1),
+                'idle_seconds': round(now - w['last_used'], 1) if w['state'] == 'idle' else 0
+            } for w in self._workers.values()]
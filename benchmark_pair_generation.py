@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发射机-接收机配对CSV生成性能测试脚本
+对比按块生成（app.utils.pair_generator）与原有逐行csv.writer写入的耗时、吞吐量和内存峰值
+
+用法:
+    python benchmark_pair_generation.py                       # 1e5、1e6、1e7个配对
+    python benchmark_pair_generation.py --pairs 1e5 1e8       # 指定配对数（1e8约需5GB磁盘空间）
+    python benchmark_pair_generation.py --tx 200 --legacy-max 1e6
+"""
+
+import argparse
+import csv
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app.utils.pair_generator import write_pairs_csv, DEFAULT_FREQUENCY_MHZ
+
+
+def make_positions(count: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    生成随机位置列表
+    """
+    rng = random.Random(seed)
+    return [{'lat': round(39.9 + rng.random() * 0.1, 6),
+             'lon': round(116.3 + rng.random() * 0.1, 6),
+             'height': round(rng.uniform(1.5, 30), 1)} for _ in range(count)]
+
+
+def write_pairs_csv_legacy(csv_file_path: str, tx_pos_list: List[Dict[str, Any]], rx_pos_list: List[Dict[str, Any]],
+                           frequency: Any) -> int:
+    """
+    原有实现：逐个配对调用csv_writer.writerow
+    """
+    with open(csv_file_path, 'w', newline='', encoding='utf-8') as csvfile:
+        csv_writer = csv.writer(csvfile)
+        for tx_pos in tx_pos_list:
+            for rx_pos in rx_pos_list:
+                csv_writer.writerow([
+                    tx_pos.get('lat', 0), tx_pos.get('lon', 0), tx_pos.get('height', 0),
+                    rx_pos.get('lat', 0), rx_pos.get('lon', 0), rx_pos.get('height', 0),
+                    frequency
+                ])
+    return len(tx_pos_list) * len(rx_pos_list)
+
+
+def peak_rss_mb() -> float:
+    """
+    当前进程的内存峰值（MB，Linux下ru_maxrss单位为KB）
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run(name: str, func, path: str, tx_pos_list, rx_pos_list) -> Dict[str, float]:
+    """
+    运行一次生成并统计结果
+    """
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    rows = func(path, tx_pos_list, rx_pos_list, DEFAULT_FREQUENCY_MHZ)
+    elapsed = time.perf_counter() - start
+    size_mb = os.path.getsize(path) / 1024 / 1024
+    os.remove(path)
+    result = {
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed if elapsed else 0,
+        'mb_per_second': size_mb / elapsed if elapsed else 0,
+        'size_mb': size_mb,
+        'peak_rss_growth_mb': peak_rss_mb() - rss_before
+    }
+    print(f"  {name:<8} {elapsed:9.2f}s  {result['rows_per_second'] / 1e6:8.2f}M行/s  "
+          f"{result['mb_per_second']:8.1f}MB/s  文件{size_mb:9.1f}MB  内存峰值增长{result['peak_rss_growth_mb']:7.1f}MB")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='发射机-接收机配对CSV生成性能测试')
+    parser.add_argument('--pairs', nargs='+', type=float, default=[1e5, 1e6, 1e7], help='配对数（发射机数×接收机数）')
+    parser.add_argument('--tx', type=int, default=200, help='发射机数量，接收机数量为配对数/发射机数量')
+    parser.add_argument('--legacy-max', type=float, default=1e6, help='原有实现只在配对数不超过该值时运行')
+    parser.add_argument('--dir', default=None, help='输出目录，默认为系统临时目录')
+    args = parser.parse_args()
+
+    output_dir = args.dir or tempfile.gettempdir()
+    for pairs in args.pairs:
+        pairs = int(pairs)
+        tx_count = max(1, min(args.tx, pairs))
+        rx_count = max(1, pairs // tx_count)
+        tx_pos_list = make_positions(tx_count, seed=1)
+        rx_pos_list = make_positions(rx_count, seed=2)
+        path = os.path.join(output_dir, f'benchmark_pairs_{os.getpid()}.csv')
+
+        print(f"{tx_count} TX × {rx_count} RX = {tx_count * rx_count} 个配对")
+        chunked = run('按块生成', write_pairs_csv, path, tx_pos_list, rx_pos_list)
+        if pairs <= args.legacy_max:
+            legacy = run('逐行写入', write_pairs_csv_legacy, path, tx_pos_list, rx_pos_list)
+            print(f"  加速比 {legacy['seconds'] / chunked['seconds']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 应用配置文件
 """
 import os
+import json
 from dotenv import load_dotenv
 
 # 加载环境变量
@@ -44,6 +45,29 @@ class Config:
     
     # 在线推演任务相关配置
     TASK_OUTPUT_DIR = os.path.join(STORAGE_FOLDER, 'tasks')
+    RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() in ('true', '1', 't')  # 是否启用在线推演结果缓存
+    RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(STORAGE_FOLDER, 'result_cache'))  # 结果缓存目录
+    RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', str(1024*1024*1024)))  # 结果缓存总大小上限（字节），超出时淘汰最久未使用的结果
+    SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', '15'))  # 任务事件流（SSE）没有事件时发送心跳注释的间隔（秒）
+    SSE_POLL_INTERVAL = float(os.getenv('SSE_POLL_INTERVAL', '1'))  # 任务事件流检查进度和新结果行的间隔（秒），状态变化会立即推送
+    SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '3000'))  # 通知浏览器断线后重连的等待时间（毫秒）
+    SSE_RESULT_BATCH_SIZE = int(os.getenv('SSE_RESULT_BATCH_SIZE', '500'))  # 每个results事件最多包含的结果行数
+    SSE_MAX_TASKS = int(os.getenv('SSE_MAX_TASKS', '50'))  # 一个多任务事件流最多订阅的任务数
+    RESULT_INLINE_MAX_BYTES = int(os.getenv('RESULT_INLINE_MAX_BYTES', str(1024*1024)))  # 结果查询接口直接返回result_csv_content的最大结果大小（字节），更大的结果通过下载或分页读取
+    RESULT_PAGE_MAX_ROWS = int(os.getenv('RESULT_PAGE_MAX_ROWS', '5000'))  # 分页读取结果时每页最多返回的行数
+    RESULT_GZIP_MIN_BYTES = int(os.getenv('RESULT_GZIP_MIN_BYTES', '1024'))  # 下载结果时启用gzip压缩的最小结果大小（字节）
+    TASK_STORE_MAX_CACHED = int(os.getenv('TASK_STORE_MAX_CACHED', '1000'))  # 内存中缓存的任务状态数上限，超出时淘汰最久未访问的已结束任务（未结束的任务不淘汰）
+    TASK_STORE_FLUSH_INTERVAL = float(os.getenv('TASK_STORE_FLUSH_INTERVAL', '1'))  # 后台线程将任务状态变化写入数据库的间隔（秒）
+    TASK_STORE_REFRESH_SECONDS = float(os.getenv('TASK_STORE_REFRESH_SECONDS', '2'))  # 其他服务进程的未结束任务在本进程中的缓存有效期（秒），到期后从数据库重新加载
+    TASK_STOP_FORWARD_TIMEOUT = float(os.getenv('TASK_STOP_FORWARD_TIMEOUT', '5'))  # 停止其他服务进程中运行的任务时等待该进程确认的时间（秒），超时后停止请求仍保留在数据库中
+    TASK_SNAPSHOT_LOG_LINES = int(os.getenv('TASK_SNAPSHOT_LOG_LINES', '50'))  # 任务所在的服务进程写入任务状态的最新进程输出行数，供其他服务进程查询
+    SHARD_ENABLED = os.getenv('SHARD_ENABLED', 'True').lower() in ('true', '1', 't')  # 是否自动将大型单点、链路和态势预测任务拆分为多个分片并行运行
+    SHARD_MIN_ROWS = int(os.getenv('SHARD_MIN_ROWS', '1000000'))  # 自动分片的最小输入行数
+    SHARD_MIN_ROWS_PER_SHARD = int(os.getenv('SHARD_MIN_ROWS_PER_SHARD', '250000'))  # 每个分片至少包含的输入行数
+    SHARD_MAX_COUNT = int(os.getenv('SHARD_MAX_COUNT', '0'))  # 单个任务最多拆分的分片数，0表示以MAX_PROCESSES为上限
+    SCENARIO_CATALOG_RECHECK_SECONDS = int(os.getenv('SCENARIO_CATALOG_RECHECK_SECONDS', '5'))  # 典型场景目录索引的复查间隔（秒），超过后重新检查各场景的元信息文件是否变化
+    MATRIX_CACHE_MAX_BYTES = int(os.getenv('MATRIX_CACHE_MAX_BYTES', str(256*1024*1024)))  # 结果矩阵（如验证任务类型2的高程和路径损耗矩阵）缓存的总大小上限（字节），超出时淘汰最久未使用的矩阵
+    SITUATION_GRID_MAX_CELLS = int(os.getenv('SITUATION_GRID_MAX_CELLS', '4000000'))  # 态势热力图网格的单元数上限，按经纬度去重后的行列数超出时按固定间隔分箱（float64网格约32MB）
     
     # 模型存储基础路径配置
     MODEL_STORAGE_BASE_PATH = STORAGE_FOLDER  # 模型文件存储基础路径
@@ -56,6 +80,36 @@ class Config:
     
     # 进程管理配置
     MAX_PROCESSES = int(os.getenv('MAX_PROCESSES', '5'))  # 最大进程数，默认为3
+    PROCESS_RUNTIME_ESTIMATE = int(os.getenv('PROCESS_RUNTIME_ESTIMATE', '60'))  # 无历史数据时估算排队时间使用的单任务运行时长（秒）
+    PROCESS_LOG_BUFFER_BYTES = int(os.getenv('PROCESS_LOG_BUFFER_BYTES', str(1024*1024)))  # 每个进程在内存中保留的输出字节数，超出部分溢写到任务目录
+    PROCESS_SAMPLE_INTERVAL = float(os.getenv('PROCESS_SAMPLE_INTERVAL', '2'))  # 从/proc采样任务资源占用的间隔（秒），仅Linux
+    PROCESS_SAMPLE_HISTORY = int(os.getenv('PROCESS_SAMPLE_HISTORY', '60'))  # 每个任务保留的最近采样点数量
+    PROCESS_STOP_GRACE_SECONDS = float(os.getenv('PROCESS_STOP_GRACE_SECONDS', '10'))  # 停止任务时SIGTERM后等待进程组退出的宽限期（秒），超时发送SIGKILL
+    PROCESS_REAPER_INTERVAL = int(os.getenv('PROCESS_REAPER_INTERVAL', '30'))  # 清理残留进程的间隔（秒），仅Linux
+    TASK_REGISTRY_PATH = os.getenv('TASK_REGISTRY_PATH', os.path.join(STORAGE_FOLDER, 'task_registry.db'))  # 持久化任务登记表（SQLite）文件路径
+    MODEL_RESOURCE_PROFILE_FILE = 'resource_profile.json'  # 模型资源配置文件名，位于模型目录下（与模型Python环境目录同级）
+    MODEL_DEFAULT_MEMORY_LIMIT_MB = int(os.getenv('MODEL_DEFAULT_MEMORY_LIMIT_MB', '0'))  # 默认内存上限（MB），0表示不限制
+    MODEL_DEFAULT_CPU_CORES = int(os.getenv('MODEL_DEFAULT_CPU_CORES', '0'))  # 默认独占的CPU核心数，0表示不绑定核心
+    MODEL_DEFAULT_NICE = int(os.getenv('MODEL_DEFAULT_NICE', '0'))  # 默认nice值（仅Linux）
+    MODEL_DEFAULT_MAX_WALL_SECONDS = int(os.getenv('MODEL_DEFAULT_MAX_WALL_SECONDS', '0'))  # 默认最长运行时间（秒），0表示不限制
+    CGROUP_ROOT = os.getenv('CGROUP_ROOT', '/sys/fs/cgroup/bjust')  # 任务cgroup（v2）的父目录，不可写时退回rlimit
+    WARM_WORKER_ENABLED = os.getenv('WARM_WORKER_ENABLED', 'True').lower() in ('true', '1', 't')  # 是否为实现了工作进程协议的模型启用常驻工作进程
+    WARM_WORKER_SCRIPT = os.getenv('WARM_WORKER_SCRIPT', 'worker.py')  # 模型代码目录中的工作进程入口脚本，存在该文件即表示模型支持常驻模式
+    WARM_WORKERS_PER_MODEL = int(os.getenv('WARM_WORKERS_PER_MODEL', '1'))  # 每个模型最多保留的常驻工作进程数
+    WARM_WORKER_MAX_TOTAL = int(os.getenv('WARM_WORKER_MAX_TOTAL', '4'))  # 常驻工作进程总数上限，超出时淘汰最久未使用的空闲进程
+    WARM_WORKER_IDLE_TTL = int(os.getenv('WARM_WORKER_IDLE_TTL', '600'))  # 常驻工作进程空闲多久后回收（秒）
+    SCHEDULER_AGING_SECONDS = int(os.getenv('SCHEDULER_AGING_SECONDS', '30'))  # 排队任务每等待多少秒优先级数值减1，避免低优先级任务饿死，0表示不老化
+    SCHEDULER_MAX_PER_SUBMITTER = int(os.getenv('SCHEDULER_MAX_PER_SUBMITTER', '0'))  # 每个提交者同时运行的任务数上限，0表示不限制
+    SCHEDULER_MAX_PER_MODEL = int(os.getenv('SCHEDULER_MAX_PER_MODEL', '0'))  # 每个模型同时运行的任务数上限（可在模型资源配置中用max_concurrency覆盖），0表示不限制
+    SCHEDULER_SUBMITTER_WEIGHTS = json.loads(os.getenv('SCHEDULER_SUBMITTER_WEIGHTS', '{}'))  # 提交者分享权重，JSON对象，如{"alice": 2}，未配置的提交者权重为1
+    SCHEDULER_SUBMITTER_HEADER = os.getenv('SCHEDULER_SUBMITTER_HEADER', 'X-User-Id')  # 识别提交者的请求头，缺失时使用客户端地址
+    MODEL_DEFAULT_SHARE_WEIGHT = int(os.getenv('MODEL_DEFAULT_SHARE_WEIGHT', '1'))  # 模型默认分享权重（可在模型资源配置中用share_weight覆盖）
+    EXECUTION_MODE = os.getenv('EXECUTION_MODE', 'local')  # 模型运行方式：local为本机子进程，distributed为写入共享执行任务表、由worker_agent.py领取执行
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', '30'))  # 执行节点领取任务的租约时长（秒），到期未续约的任务可被其他节点重新领取
+    JOB_HEARTBEAT_INTERVAL = float(os.getenv('JOB_HEARTBEAT_INTERVAL', '5'))  # 执行节点心跳续约间隔（秒），应明显小于租约时长
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '2'))  # 执行节点领取新任务、提交方检查已结束任务的间隔（秒）
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))  # 执行节点失联后任务最多被领取的次数，超过后任务失败
+    AGENT_SLOTS = int(os.getenv('AGENT_SLOTS', '1'))  # 每个执行节点同时运行的任务数
     
     # 其他配置
     DEBUG = os.getenv('FLASK_DEBUG', 'True').lower() in ('true', '1', 't') 
\ No newline at end of file
@@ -0,0 +1,317 @@
+"""
+分布式执行节点入口
+从共享数据库的执行任务表中领取模型运行任务（服务端EXECUTION_MODE为distributed时写入），
+在本机以子进程执行，定期心跳续约并回报结果
+
+用法:
+    python worker_agent.py [--slots 2] [--storage /mnt/bjust/storage] [--agent-id NAME]
+
+各节点需通过DATABASE_URL连接同一个数据库，并挂载同一个共享存储目录
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import threading
+import subprocess
+from typing import Dict, List, Optional
+from app import create_app, db
+from app.model.execution_job import ExecutionJobStatus
+from app.utils.job_queue import JobQueue, from_portable, AGENT_LOG_FILENAME
+from app.utils import proc_stats, process_group, resource_profile
+
+
+class AgentJob:
+    """执行节点上正在运行的一个任务"""
+
+    def __init__(self, job: Dict, process: subprocess.Popen, log_file, cores: List[int], cgroup: Optional[str]):
+        """
+        初始化
+
+        Args:
+            job: JobQueue.claim返回的任务内容
+            process: 子进程
+            log_file: 输出日志文件（可能为None）
+            cores: 绑定的CPU核心
+            cgroup: 子cgroup目录
+        """
+        self.job = job
+        self.process = process
+        self.log_file = log_file
+        self.log_lock = threading.Lock()
+        self.cores = cores
+        self.cgroup = cgroup
+        self.started = time.monotonic()
+        self.last_heartbeat = self.started
+        # 终止后回报的状态（stopped或timeout），为None表示正常运行
+        self.stop_status = None
+        self.tracker = proc_stats.ResourceTracker(process.pid) if proc_stats.is_supported() else None
+        self.readers = []
+
+    def write_log(self, stream: str, line: str):
+        """
+        写入一行输出
+
+        Args:
+            stream: 'stdout'或'stderr'
+            line: 行内容
+        """
+        if self.log_file is None:
+            return
+        with self.log_lock:
+            self.log_file.write(f"{stream}\t{line}\n")
+            self.log_file.flush()
+
+
+class WorkerAgent:
+    """
+    执行节点
+    主线程负责领取、心跳和回报（所有数据库操作都在主线程中进行），每个任务的输出由两个读取线程写入日志文件
+    """
+
+    def __init__(self, app, agent_id: str, slots: int, storage_folder: str):
+        """
+        初始化
+
+        Args:
+            app: Flask应用实例
+            agent_id: 执行节点标识
+            slots: 同时运行的任务数
+            storage_folder: 本机共享存储目录
+        """
+        self.app = app
+        self.agent_id = agent_id
+        self.slots = slots
+        self.storage_folder = storage_folder
+        self.queue = JobQueue()
+        self.jobs: Dict[str, AgentJob] = {}
+        self.core_allocator = resource_profile.CoreAllocator()
+        self._shutdown = False
+        self._last_claim = 0.0
+
+    def run(self):
+        """主循环，收到SIGINT或SIGTERM后交还任务并退出"""
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        print(f"执行节点 {self.agent_id} 已启动，并发数 {self.slots}，共享存储目录 {self.storage_folder}")
+
+        with self.app.app_context():
+            while not self._shutdown:
+                try:
+                    self._check_jobs()
+                    self._claim_jobs()
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"执行节点循环发生错误: {str(e)}")
+                time.sleep(0.5)
+            self._release_all()
+        print(f"执行节点 {self.agent_id} 已退出")
+
+    def _on_signal(self, signum, frame):
+        """
+        退出信号处理
+
+        Args:
+            signum: 信号
+            frame: 栈帧
+        """
+        self._shutdown = True
+
+    def _claim_jobs(self):
+        """有空闲并发数时领取任务"""
+        now = time.monotonic()
+        if now - self._last_claim < self.app.config['JOB_POLL_INTERVAL']:
+            return
+        self._last_claim = now
+        while len(self.jobs) < self.slots and not self._shutdown:
+            job = self.queue.claim(self.agent_id)
+            if job is None:
+                return
+            try:
+                self._start_job(job)
+            except Exception as e:
+                print(f"启动任务 {job['job_id']} 失败: {str(e)}")
+                self.queue.finish(job['job_id'], self.agent_id, job['attempt'], ExecutionJobStatus.FAILED, -1,
+                                  error_message=f"执行节点 {self.agent_id} 启动任务失败: {str(e)}")
+
+    def _start_job(self, job: Dict):
+        """
+        启动任务子进程
+
+        Args:
+            job: JobQueue.claim返回的任务内容
+        """
+        job_id = job['job_id']
+        cmd = [from_portable(arg, self.storage_folder) for arg in job['cmd']]
+        cwd = from_portable(job['cwd'], self.storage_folder)
+        env = os.environ.copy()
+        env.update({key: from_portable(value, self.storage_folder) for key, value in job['env_delta'].items()})
+        process_group.tag_env(env, job_id)
+        log_dir = from_portable(job['log_dir'], self.storage_folder)
+
+        log_file = None
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+            # 重新领取的任务从头执行，覆盖上一次的输出
+            log_file = open(os.path.join(log_dir, AGENT_LOG_FILENAME), 'w', encoding='utf-8')
+
+        limits = job['resource_limits']
+        cores = self.core_allocator.allocate(limits.get('cpu_cores', 0)) or []
+        cgroup = resource_profile.setup_cgroup(f"{self.agent_id}-{job_id}", limits.get('memory_limit_mb', 0))
+        try:
+            process = subprocess.Popen(
+                cmd,
+                cwd=cwd,
+                env=env,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                encoding='utf-8',
+                errors='replace',
+                bufsize=1,
+                preexec_fn=resource_profile.build_preexec_fn(limits, cores, cgroup),
+                **process_group.popen_kwargs()
+            )
+        except Exception:
+            self.core_allocator.release(cores)
+            resource_profile.remove_cgroup(cgroup)
+            if log_file is not None:
+                log_file.close()
+            raise
+
+        agent_job = AgentJob(job, process, log_file, cores, cgroup)
+        for stream in ('stdout', 'stderr'):
+            reader = threading.Thread(target=self._read_output, args=(agent_job, stream),
+                                      name=f'agent-{stream}-{job_id}', daemon=True)
+            reader.start()
+            agent_job.readers.append(reader)
+        self.jobs[job_id] = agent_job
+        print(f"领取任务 {job_id}（第{job['attempt']}次），PID {process.pid}")
+
+    @staticmethod
+    def _read_output(agent_job: AgentJob, stream: str):
+        """
+        读取子进程输出并写入日志文件
+
+        Args:
+            agent_job: 任务
+            stream: 'stdout'或'stderr'
+        """
+        pipe = getattr(agent_job.process, stream)
+        for line in pipe:
+            agent_job.write_log(stream, line.rstrip('\r\n'))
+        pipe.close()
+
+    def _check_jobs(self):
+        """检查运行中的任务：回报已结束的任务，为其余任务续约、采样并执行停止请求和超时限制"""
+        if not self.jobs:
+            return
+        table = children = None
+        if proc_stats.is_supported():
+            table = proc_stats.scan_processes()
+            children = proc_stats.build_children_map(table)
+
+        heartbeat_interval = self.app.config['JOB_HEARTBEAT_INTERVAL']
+        now = time.monotonic()
+        for job_id, agent_job in list(self.jobs.items()):
+            if agent_job.process.poll() is not None:
+                self._finish_job(agent_job)
+                continue
+            if agent_job.tracker is not None:
+                agent_job.tracker.sample(table, children)
+
+            max_wall_seconds = agent_job.job['resource_limits'].get('max_wall_seconds', 0)
+            if max_wall_seconds and now - agent_job.started > max_wall_seconds and agent_job.stop_status is None:
+                print(f"任务 {job_id} 运行超过 {max_wall_seconds} 秒，终止")
+                self._terminate(agent_job, ExecutionJobStatus.TIMEOUT)
+
+            if now - agent_job.last_heartbeat < heartbeat_interval:
+                continue
+            agent_job.last_heartbeat = now
+            cancel_requested = self.queue.heartbeat(job_id, self.agent_id, agent_job.job['attempt'])
+            if cancel_requested is None:
+                # 租约已被其他节点接手，本地进程的结果不会再被采用
+                print(f"任务 {job_id} 的租约已失效，结束本地进程")
+                process_group.terminate_group(agent_job.process, 0)
+                agent_job.stop_status = ExecutionJobStatus.FAILED
+                agent_job.job['lease_lost'] = True
+            elif cancel_requested and agent_job.stop_status is None:
+                print(f"任务 {job_id} 已被请求停止")
+                self._terminate(agent_job, ExecutionJobStatus.STOPPED)
+
+    def _terminate(self, agent_job: AgentJob, status: str):
+        """
+        终止任务进程组：先SIGTERM，宽限期后仍未退出则SIGKILL
+
+        Args:
+            agent_job: 任务
+            status: 回报的结束状态
+        """
+        agent_job.stop_status = status
+        process_group.terminate_group(agent_job.process, self.app.config['PROCESS_STOP_GRACE_SECONDS'])
+
+    def _finish_job(self, agent_job: AgentJob):
+        """
+        回报已结束的任务并释放资源
+
+        Args:
+            agent_job: 任务
+        """
+        job_id = agent_job.job['job_id']
+        return_code = agent_job.process.returncode
+        for reader in agent_job.readers:
+            reader.join(timeout=5)
+        if agent_job.log_file is not None:
+            agent_job.log_file.close()
+        self.core_allocator.release(agent_job.cores)
+        resource_profile.remove_cgroup(agent_job.cgroup)
+        del self.jobs[job_id]
+
+        if agent_job.job.get('lease_lost'):
+            return
+        wall_time = time.monotonic() - agent_job.started
+        resource_usage = agent_job.tracker.summary(wall_time) if agent_job.tracker is not None else None
+        status = agent_job.stop_status or ExecutionJobStatus.COMPLETED
+        if not self.queue.finish(job_id, self.agent_id, agent_job.job['attempt'], status, return_code, resource_usage):
+            print(f"回报任务 {job_id} 结果失败：租约已失效")
+            return
+        print(f"任务 {job_id} 已结束，状态 {status}，返回码 {return_code}")
+
+    def _release_all(self):
+        """退出前终止本节点上的任务并交还给任务表"""
+        for job_id, agent_job in list(self.jobs.items()):
+            if agent_job.process.poll() is None:
+                process_group.terminate_group(agent_job.process, 0)
+                agent_job.process.wait()
+            for reader in agent_job.readers:
+                reader.join(timeout=5)
+            if agent_job.log_file is not None:
+                agent_job.log_file.close()
+            self.core_allocator.release(agent_job.cores)
+            resource_profile.remove_cgroup(agent_job.cgroup)
+            try:
+                self.queue.release(job_id, self.agent_id, agent_job.job['attempt'])
+                print(f"已交还任务 {job_id}")
+            except Exception as e:
+                print(f"交还任务 {job_id} 失败: {str(e)}")
+        self.jobs.clear()
+
+
+def main():
+    """命令行入口"""
+    app = create_app()
+    parser = argparse.ArgumentParser(description='分布式执行节点')
+    parser.add_argument('--slots', type=int, default=app.config['AGENT_SLOTS'], help='同时运行的任务数')
+    parser.add_argument('--storage', default=app.config['STORAGE_FOLDER'], help='本机挂载的共享存储目录')
+    parser.add_argument('--agent-id', default=f"{socket.gethostname()}-{os.getpid()}", help='执行节点标识')
+    args = parser.parse_args()
+
+    agent = WorkerAgent(app, args.agent_id, max(args.slots, 1), os.path.abspath(args.storage))
+    agent.run()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())